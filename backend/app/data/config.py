@@ -20,11 +20,33 @@ class Settings(BaseSettings):
     # Application Settings
     max_session_duration: int = 3600  # seconds
     frame_processing_fps: int = 10
+    timeline_resolution: str = "0.5s"  # bucket width for session timelines ("raw" = no aggregation)
+    timeline_max_points: int = 300  # LTTB cap on timeline points sent to the UI
 
     # Pose Detection Settings
-    mediapipe_model_complexity: int = 1  # 0, 1, or 2 (higher = more accurate but slower)
+    mediapipe_model_complexity: int = 1  # 0, 1, or 2 (higher = more accurate but slower); starting level
     mediapipe_min_detection_confidence: float = 0.5
     mediapipe_min_tracking_confidence: float = 0.5
+    adaptive_model_complexity: bool = True  # step the complexity with measured latency and load
+    mediapipe_min_model_complexity: int = 0  # lowest complexity the controller may choose
+    mediapipe_max_model_complexity: int = 2  # highest complexity the controller may choose
+    inference_latency_budget_ms: float = 80.0  # pose inference latency (EMA) to stay under
+    max_server_utilization: float = 0.8  # share of wall time spent on snapshots before stepping down
+    pose_input_cropping: bool = True  # crop snapshots to the tracked person before pose inference
+    pose_working_resolution: int = 384  # longest side of the person crop given to the pose model
+    pose_search_resolution: int = 512  # longest side of the frame while no person is tracked
+    pose_crop_margin: float = 0.25  # crop margin around the person (fraction of their size)
+    motion_gating: bool = True  # reuse results of snapshots that barely changed
+    motion_changed_pixel_ratio: float = 0.02  # share of changed thumbnail pixels that triggers processing
+    motion_max_reuse_seconds: float = 1.0  # longest a result with a dancer is reused
+    absent_refresh_seconds: float = 3.0  # longest processing is skipped with nobody in frame
+    presence_min_visibility: float = 0.3  # average landmark visibility below which nobody is in frame
+    hand_inference_scheduling: bool = True  # run the hand model only near reference gestures
+    hand_gesture_window_seconds: float = 0.5  # reference time around the match searched for gestures
+    hand_result_max_age_seconds: float = 1.0  # reused hand results older than this are dropped
+    hand_detection_mode: str = "roi"  # "roi" = pose-guided wrist crops, "full" = whole-frame palm search
+    hand_roi_scale: float = 3.0  # crop side as a multiple of the wrist-to-knuckles distance
+    hand_roi_retry_interval: int = 3  # snapshots a side is skipped after its crop had no hand
 
     # Comparison Thresholds
     angle_error_threshold_high: float = 30.0  # degrees - major error
@@ -36,6 +58,25 @@ class Settings(BaseSettings):
     llm_max_tokens: int = 150
     llm_temperature: float = 0.7
     max_feedback_items_per_section: int = 5
+    llm_max_concurrency: int = 5  # concurrent LLM requests per feedback batch
+    llm_item_deadline_seconds: float = 8.0  # per-item deadline before template fallback
+
+    # Feedback Cache Settings
+    feedback_cache_enabled: bool = True
+    feedback_cache_max_entries: int = 512
+    feedback_cache_ttl_seconds: float = 120.0
+    feedback_cache_index_bucket: int = 15  # reference frames per bucket (~1s at 15 FPS)
+    feedback_cache_score_bucket: float = 0.1  # score width per bucket
+    dual_cache_time_bucket_seconds: float = 0.5  # reference video time per dual-snapshot bucket
+    dual_cache_hash_size: int = 16  # hash grid side inside the dancer's person box
+
+    # Reference Ingestion Settings
+    reference_ingestion_workers: int = 1  # reference videos processed concurrently
+    reference_ingestion_chunk_seconds: float = 10.0  # video time per checkpointed chunk
+
+    # Session Summary Settings
+    summary_draft_interval_seconds: float = 20.0  # min seconds between background drafts
+    summary_draft_min_new_feedback: int = 3  # new feedback items needed before a redraft
 
     class Config:
         env_file = ".env"
@@ -2,17 +2,17 @@
 FastAPI main application entry point.
 Unified API for K-Pop Dance Trainer with real-time pose detection and feedback.
 """
-from fastapi import FastAPI, HTTPException
+from fastapi import FastAPI, File, Form, HTTPException, UploadFile
 from fastapi.middleware.cors import CORSMiddleware
 from pydantic import BaseModel
-from typing import Optional, List, Dict, Any
-import base64
+from typing import Optional, List, Dict, Any, Tuple
+import asyncio
+from dataclasses import replace
 import time
 import os
+import shutil
+import tempfile
 import numpy as np
-import cv2
-from PIL import Image
-from io import BytesIO
 
 # Import configuration
 from app.data.config import settings
@@ -23,7 +23,19 @@ from app.services.pose_comparison_config import PoseComparisonConfig, DEFAULT_CO
 from app.services.live_feedback_service import LiveFeedbackService, SnapshotData
 from app.services.angle_calculator import AngleCalculator
 from app.services.scoring import ScoringService
-from app.services.feedback_generation import FeedbackGenerationService
+from app.services.pose_library_index import PoseLibraryIndex
+from app.services.practice_evaluation import PracticeVideoEvaluator
+from app.services.process_video_pose import VideoPoseProcessor
+from app.services.reference_ingestion import ReferenceIngestionQueue
+from app.services.reference_library import ReferenceLibrary
+from app.services.reference_features import ReferenceFeatures
+from app.services.hand_scheduling import HandInferenceScheduler
+from app.services.hand_roi import PoseGuidedHandDetector, extract_hands
+from app.services.frame_input import PersonCropper, decode_image, decode_thumbnail, full_resolution
+from app.services.motion_gate import MotionGate
+from app.services.complexity_controller import LatencyStats, ModelComplexityController, PoseModelPool
+from app.services.feedback_generation import FeedbackGenerationService, FeedbackStream
+from app.services.session_summarizer import RollingSessionSummarizer
 from app.services.dual_snapshot_service import dual_snapshot_service, DualSnapshotData
 from app.services.mediapipe_service import mediapipe_service, MediaPipeResult
 
@@ -62,6 +74,9 @@ async def startup_event():
     except Exception as e:
         print(f"WARNING: Could not test OpenAI API: {e}")
     
+    # Start reference ingestion workers (resumes jobs interrupted by a restart)
+    ingestion_queue.start()
+    
     print("Server startup complete!")
 
 # Configure CORS
@@ -81,6 +96,7 @@ app.add_middleware(
 class ImageSnapshotRequest(BaseModel):
     """Request model for processing image snapshots."""
     image: str  # base64 encoded image
+    detect_hands: bool = False  # run the hand model even outside reference gesture sections
 
 
 class ProcessSnapshotResponse(BaseModel):
@@ -89,6 +105,9 @@ class ProcessSnapshotResponse(BaseModel):
     pose_landmarks: Optional[List[List[float]]] = None
     hand_landmarks: List[List[List[float]]] = []
     hand_classifications: List[Dict[str, Any]] = []
+    hands_inferred: bool = False  # False = hand results reused from an earlier snapshot
+    model_complexity: Optional[int] = None  # pose model complexity used for this snapshot
+    frame_reused: bool = False  # True = result reused from a near-identical earlier snapshot
     preprocessed_angles: Dict[str, float] = {}
     comparison_result: Optional[Dict[str, Any]] = None
     live_feedback: Optional[str] = None
@@ -124,6 +143,10 @@ class SessionFeedbackResponse(BaseModel):
     improvement_areas: Optional[List[Dict[str, Any]]] = None
     strengths: Optional[List[str]] = None
     severity_distribution: Optional[Dict[str, int]] = None
+    summary_status: Optional[str] = None  # "template", "draft" or "final"
+    timeline: Optional[List[Dict[str, Any]]] = None  # Downsampled score timeline
+    segment_feedback: Optional[List[Dict[str, Any]]] = None  # Feedback for problem segments
+    timing_report: Optional[Dict[str, Any]] = None  # Full-session DTW alignment (rushing/dragging)
 
 
 class LoadReferenceRequest(BaseModel):
@@ -131,11 +154,35 @@ class LoadReferenceRequest(BaseModel):
     video_name: str
 
 
+class IngestReferenceRequest(BaseModel):
+    """Request model for queueing a video already in reference_videos/."""
+    video_filename: str
+    output_filename: Optional[str] = None
+
+
+class RebuildReferencesRequest(BaseModel):
+    """Request model for rebuilding stale reference library artifacts."""
+    names: Optional[List[str]] = None  # all references if None
+    force: bool = False  # rebuild every stage, stale or not
+    dry_run: bool = False  # only report what would be rebuilt
+
+
+class IdentifyReferenceRequest(BaseModel):
+    """Request model for identifying the reference video from user poses."""
+    landmarks: List[List[List[float]]]  # (frames, 33, 4) user pose landmarks, a few seconds
+    timestamps: Optional[List[float]] = None  # seconds per frame (15 FPS assumed if None)
+    top_k: int = 3
+    auto_load: bool = False  # load the best match as the reference video
+    rebuild_index: bool = False  # re-scan processed_poses/ (after adding videos)
+
+
 class UpdateConfigRequest(BaseModel):
     """Request model for updating pose comparison config."""
     pose_weight: Optional[float] = None
     motion_weight: Optional[float] = None
     dtw_enabled: Optional[bool] = None
+    matching_mode: Optional[str] = None  # "coordinates" or "angles"
+    mirror_mode: Optional[str] = None  # "off", "on" or "auto"
     preset: Optional[str] = None  # "default", "dance", "position_focused", "motion_focused"
 
 
@@ -190,6 +237,7 @@ class MediaPipeResponse(BaseModel):
     reference_analysis: Optional[Dict[str, Any]] = None
     user_image_with_landmarks: Optional[str] = None  # base64 encoded image with drawn landmarks
     reference_image_with_landmarks: Optional[str] = None  # base64 encoded image with drawn landmarks
+    model_complexity: Optional[int] = None  # pose model complexity for the next snapshot
     success: bool
     error: Optional[str] = None
 
@@ -203,14 +251,28 @@ mp_pose = mp.solutions.pose
 mp_hands = mp.solutions.hands
 mp_drawing = mp.solutions.drawing_utils
 
+# Pose model complexity follows measured latency and load (one model per level)
+complexity_controller = ModelComplexityController(
+    initial_level=settings.mediapipe_model_complexity,
+    min_level=settings.mediapipe_min_model_complexity,
+    max_level=settings.mediapipe_max_model_complexity,
+    latency_budget_ms=settings.inference_latency_budget_ms,
+    max_utilization=settings.max_server_utilization,
+    enabled=settings.adaptive_model_complexity
+)
+
 # Initialize pose and hand detection
-pose = mp_pose.Pose(
+pose_models = PoseModelPool(lambda level: mp_pose.Pose(
     static_image_mode=False,
-    model_complexity=settings.mediapipe_model_complexity,
+    model_complexity=level,
     enable_segmentation=False,
     min_detection_confidence=settings.mediapipe_min_detection_confidence,
     min_tracking_confidence=settings.mediapipe_min_tracking_confidence
-)
+))
+complexity_controller.acquire(pose_models)
+
+# The dual-frame MediaPipe endpoint shares the controller
+mediapipe_service.complexity_controller = complexity_controller
 
 hands = mp_hands.Hands(
     static_image_mode=False,
@@ -219,6 +281,21 @@ hands = mp_hands.Hands(
     min_tracking_confidence=0.5
 )
 
+# Hand detection on pose-derived wrist crops (one single-hand model per side)
+hand_detector = PoseGuidedHandDetector(
+    lambda: mp_hands.Hands(
+        static_image_mode=False,
+        max_num_hands=1,
+        min_detection_confidence=0.5,
+        min_tracking_confidence=0.5
+    ),
+    scale=settings.hand_roi_scale,
+    retry_interval=settings.hand_roi_retry_interval
+)
+
+# Hand model scheduling (rebuilt with the reference's gesture track on load)
+hand_scheduler = HandInferenceScheduler(max_reuse_seconds=settings.hand_result_max_age_seconds)
+
 # Global services (INTERNAL - Never exposed to API)
 comparison_service: Optional[PoseComparisonService] = None
 live_feedback_service = LiveFeedbackService()  # Internal LLM service
@@ -227,14 +304,62 @@ feedback_generation_service = FeedbackGenerationService()  # Internal LLM servic
 angle_calculator = AngleCalculator()
 current_config = DEFAULT_CONFIG
 
+# Processed reference poses ("<video_name>_poses.npy")
+PROCESSED_POSES_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "data", "processed_poses")
+
+# Index over every processed reference video (built on first identify request)
+pose_library_index: Optional[PoseLibraryIndex] = None
+
+# Offline practice-video evaluator for the loaded reference (built on first upload)
+practice_evaluator: Optional[PracticeVideoEvaluator] = None
+
+# Manifest of how each processed reference was built (content hash, stage versions)
+reference_library = ReferenceLibrary(VideoPoseProcessor(os.path.dirname(PROCESSED_POSES_DIR)))
+
+# Background reference ingestion (workers start with the server, resuming unfinished jobs)
+ingestion_queue = ReferenceIngestionQueue(
+    reference_library.processor,
+    num_workers=settings.reference_ingestion_workers,
+    chunk_seconds=settings.reference_ingestion_chunk_seconds,
+    library=reference_library
+)
+
 # Session management
-current_session = {
-    'session_id': None,
-    'start_time': None,
-    'pose_data': [],
-    'feedback_history': [],
-    'reference_video': None
-}
+def _new_session_state(session_id: Optional[str] = None,
+                       reference_video: Optional[str] = None) -> Dict[str, Any]:
+    """Create an empty session state dictionary."""
+    return {
+        'session_id': session_id,
+        'start_time': time.time() if session_id else None,
+        'pose_data': [],
+        'feedback_history': [],
+        'problem_segments': [],  # Worst closed problem segments, lowest score first
+        'segment_feedback': {},  # id(segment) -> feedback task for the kept problem segments
+        'feedback_stream': FeedbackStream(feedback_generation_service),
+        'reference_video': reference_video,
+        'person_crop': PersonCropper(  # Person box of the previous snapshot
+            working_resolution=settings.pose_working_resolution,
+            search_resolution=settings.pose_search_resolution,
+            margin=settings.pose_crop_margin
+        ),
+        'inference_latency': LatencyStats(),  # Pose inference latency of this session
+        'motion_gate': MotionGate(  # Reuses results while the snapshot barely changes
+            changed_pixel_ratio=settings.motion_changed_pixel_ratio,
+            max_reuse_seconds=settings.motion_max_reuse_seconds,
+            absent_refresh_seconds=settings.absent_refresh_seconds,
+            min_visibility=settings.presence_min_visibility
+        )
+    }
+
+
+current_session = _new_session_state()
+
+# Rolling summary for the active session (kept up to date while dancing)
+session_summarizer = RollingSessionSummarizer(feedback_generation_service)
+
+# Summaries of ended sessions (draft returned at end, replaced by final polish)
+session_summaries: Dict[str, Dict[str, Any]] = {}
+MAX_STORED_SUMMARIES = 20
 
 # Pose sequence storage
 pose_sequence = []
@@ -257,15 +382,23 @@ def load_reference_video(video_name: str) -> bool:
     """
     global comparison_service
     try:
-        # Get the correct path relative to app directory
-        current_dir = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
-        data_path = os.path.join(current_dir, "data", "processed_poses", f"{video_name}_poses.npy")
+        # Memory-mapped feature bundle (written at ingest / by a library rebuild)
+        features = ReferenceFeatures.load(PROCESSED_POSES_DIR, video_name)
+        if features is not None:
+            comparison_service = PoseComparisonService.from_features(features, current_config)
+            comparison_service.set_reference_clock(current_session['start_time'])
+            current_session['reference_video'] = video_name
+            _reset_hand_scheduler()
+            print(f"✅ Loaded {len(features)} reference poses from the {video_name} feature bundle")
+            return True
+
+        data_path = os.path.join(PROCESSED_POSES_DIR, f"{video_name}_poses.npy")
 
         if not os.path.exists(data_path):
             print(f"Reference video file not found: {data_path}")
             return False
 
-        # Load the numpy array
+        # No up-to-date bundle (POST /api/references/rebuild writes it): compute features here
         reference_data = np.load(data_path, allow_pickle=True)
 
         # Convert to format expected by PoseComparisonService
@@ -275,13 +408,16 @@ def load_reference_video(video_name: str) -> bool:
                 pose_dict = {
                     'landmarks': frame_data['landmarks'],
                     'timestamp': frame_data['timestamp'],
-                    'frame_number': frame_data['frame_number']
+                    'frame_number': frame_data['frame_number'],
+                    'gestures': frame_data.get('gestures', [])
                 }
                 reference_poses_list.append(pose_dict)
 
         # Initialize comparison service with reference poses
         comparison_service = PoseComparisonService(reference_poses_list, current_config)
+        comparison_service.set_reference_clock(current_session['start_time'])
         current_session['reference_video'] = video_name
+        _reset_hand_scheduler()
 
         print(f"✅ Loaded {len(reference_poses_list)} reference poses from {video_name}")
         return True
@@ -293,6 +429,130 @@ def load_reference_video(video_name: str) -> bool:
         return False
 
 
+def _reset_hand_scheduler():
+    """Schedule hand inference from the loaded reference's gesture track."""
+    global hand_scheduler
+    track = None
+    if settings.hand_inference_scheduling and comparison_service is not None:
+        track = comparison_service.get_reference_gesture_track()
+    hand_scheduler = HandInferenceScheduler(
+        track,
+        comparison_service.reference_timestamps if comparison_service is not None else None,
+        window_seconds=settings.hand_gesture_window_seconds,
+        max_reuse_seconds=settings.hand_result_max_age_seconds
+    )
+    stats = hand_scheduler.get_stats()
+    print(f"[Hands] Hand model scheduled on {stats['gesture_coverage']:.0%} of the reference")
+
+
+def get_pose_library_index(rebuild: bool = False) -> PoseLibraryIndex:
+    """
+    Get the index over all processed reference videos, building it on first use.
+
+    Args:
+        rebuild: Re-scan the processed_poses directory
+
+    Returns:
+        PoseLibraryIndex
+    """
+    global pose_library_index
+    if pose_library_index is None or rebuild:
+        pose_library_index = PoseLibraryIndex.from_directory(PROCESSED_POSES_DIR)
+    return pose_library_index
+
+
+def _feedback_segment(segment: Dict[str, Any]) -> Dict[str, Any]:
+    """Convert a ScoringService problem segment to FeedbackGenerationService's format."""
+    return {
+        'timestamp_start': segment['start_time'],
+        'timestamp_end': segment['end_time'],
+        'accuracy': segment['average_score'],
+        'errors': segment['errors']
+    }
+
+
+async def _collect_segment_feedback(session: Dict[str, Any]) -> List[Dict[str, Any]]:
+    """
+    Wait for the feedback of a session's worst problem segments.
+
+    Feedback normally started when each segment was kept (see
+    _on_problem_segment()), so only what is still pending is awaited. All
+    items share the session's FeedbackStream (one client, concurrency limit
+    and per-item deadline with template fallback).
+
+    Args:
+        session: Session state whose problem segments are final
+
+    Returns:
+        Feedback dictionaries in segment (time) order
+    """
+    stream = session['feedback_stream']
+    tasks = session['segment_feedback']
+    try:
+        feedback_items = await asyncio.gather(*(
+            tasks.get(id(segment)) or stream.submit(_feedback_segment(segment))
+            for segment in session['problem_segments']
+        ))
+    finally:
+        await stream.close()
+    return sorted(feedback_items, key=lambda item: item['timestamp'])
+
+
+def _keep_worst_segments(segments: List[Dict[str, Any]], segment: Dict[str, Any],
+                         limit: int) -> List[Dict[str, Any]]:
+    """
+    Add a problem segment, keeping only the `limit` lowest-scoring ones.
+
+    Args:
+        segments: Kept segments, lowest average_score first (updated in place)
+        segment: Newly closed problem segment
+        limit: Number of segments to keep
+
+    Returns:
+        Segments pushed out (may include the new segment itself)
+    """
+    segments.append(segment)
+    segments.sort(key=lambda kept: kept['average_score'])
+    dropped = segments[max(limit, 0):]
+    del segments[max(limit, 0):]
+    return dropped
+
+
+def _on_problem_segment(segment: Dict[str, Any]):
+    """
+    Keep a closed problem segment if it is among the session's worst.
+
+    Called by ScoringService while the user is dancing. Only the
+    max_feedback_items_per_section lowest-scoring segments get feedback, so
+    the number of LLM calls does not grow with the session length. A kept
+    segment's feedback starts right away in the background and is cancelled
+    if a worse segment pushes it out.
+    """
+    if not current_session['session_id']:
+        return
+
+    tasks = current_session['segment_feedback']
+    dropped = _keep_worst_segments(current_session['problem_segments'], segment,
+                                   settings.max_feedback_items_per_section)
+    for dropped_segment in dropped:
+        task = tasks.pop(id(dropped_segment), None)
+        if task is not None:
+            task.cancel()
+
+    print(f"[Session] Problem segment {segment['start_time']:.1f}s-{segment['end_time']:.1f}s closed "
+          f"(score {segment['average_score']:.2f})")
+
+    if any(dropped_segment is segment for dropped_segment in dropped):
+        return
+    try:
+        tasks[id(segment)] = current_session['feedback_stream'].submit(_feedback_segment(segment))
+    except RuntimeError:
+        pass  # No running event loop: feedback starts when the session ends
+
+
+scoring_service.add_problem_listener(_on_problem_segment)
+
+
 def generate_llm_feedback(image_data: str, comparison_result: Dict[str, Any]) -> Optional[Dict[str, Any]]:
     """
     Generate LLM-powered feedback using LiveFeedbackService (INTERNAL).
@@ -314,6 +574,8 @@ def generate_llm_feedback(image_data: str, comparison_result: Dict[str, Any]) ->
         Returns None if no feedback generated.
     """
     try:
+        timing = comparison_result.get('timing') or {}
+
         # Convert comparison data to SnapshotData format
         snapshot_data = SnapshotData(
             timestamp=time.time(),
@@ -321,10 +583,10 @@ def generate_llm_feedback(image_data: str, comparison_result: Dict[str, Any]) ->
             pose_similarity=comparison_result.get('pose_score', 0.0),
             motion_similarity=comparison_result.get('motion_score', 0.0),
             combined_score=comparison_result.get('combined_score', 0.0),
-            errors=[],  # TODO: Convert angle/position differences to error format
+            errors=comparison_result.get('errors', []),
             best_match_idx=comparison_result.get('best_match_idx', 0),
-            reference_timestamp=0.0,
-            timing_offset=0.0
+            reference_timestamp=timing.get('reference_time', 0.0),
+            timing_offset=timing.get('timing_offset') or 0.0
         )
 
         # Call INTERNAL service (OpenAI interaction happens here, internally)
@@ -356,35 +618,85 @@ def generate_llm_feedback(image_data: str, comparison_result: Dict[str, Any]) ->
         }
 
 
-def process_image_snapshot(image_data: str) -> Dict[str, Any]:
+def _record_comparison(pose_landmarks: np.ndarray, comparison_result: Dict[str, Any]):
+    """
+    Record a compared pose in the session data, scoring timeline and rolling summary.
+
+    Args:
+        pose_landmarks: (33, 4) user landmarks
+        comparison_result: Result of comparison_service.update_user_pose()
+    """
+    now = time.time()
+    current_session['pose_data'].append({
+        'timestamp': now,
+        'pose_landmarks': pose_landmarks,
+        'comparison_result': comparison_result
+    })
+
+    scoring_service.add_score(
+        timestamp=now - current_session['start_time'] if current_session['start_time'] else 0,
+        combined_score=comparison_result.get('combined_score', 0.0),
+        pose_score=comparison_result.get('pose_score', 0.0),
+        motion_score=comparison_result.get('motion_score', 0.0),
+        errors=comparison_result.get('errors', []),
+        limb_scores=comparison_result.get('limb_scores')
+    )
+    session_summarizer.record_score(comparison_result.get('combined_score', 0.0))
+
+    # Refresh the draft narrative in the background when it is stale
+    session_summarizer.maybe_refresh_draft(scoring_service.get_session_statistics)
+
+
+def process_image_snapshot(image_data: str, detect_hands: bool = False) -> Dict[str, Any]:
     """
     Process a single image snapshot for pose detection and comparison.
 
+    The hand model only runs when the matched reference segment has
+    gestures (see HandInferenceScheduler) or detect_hands is set; otherwise
+    the last hand result is reused. It runs on wrist crops placed from the
+    pose landmarks (see PoseGuidedHandDetector), cut from the full-resolution
+    frame, unless the pose is missing.
+    Snapshots that barely changed since the last processed one reuse its
+    result (re-recorded at the new time, without inference), or are skipped
+    while nobody is in frame (see MotionGate).
+
     Args:
         image_data: Base64 encoded image
+        detect_hands: Run the hand model regardless of the reference (and
+            process the snapshot even if it barely changed)
 
     Returns:
         dict: Processing results including landmarks, comparison, and feedback
     """
+    request_started = time.time()
     try:
-        # Convert base64 to image
-        image_bytes = base64.b64decode(image_data)
-        image = Image.open(BytesIO(image_bytes))
-        frame = cv2.cvtColor(np.array(image), cv2.COLOR_RGB2BGR)
-
-        # Convert BGR to RGB for MediaPipe
-        rgb_frame = cv2.cvtColor(frame, cv2.COLOR_BGR2RGB)
-
-        # Process pose
-        pose_results = pose.process(rgb_frame)
-
-        # Process hands
-        hand_results = hands.process(rgb_frame)
+        # Nearly identical to the last processed snapshot: reuse its result
+        gate = current_session['motion_gate'] if settings.motion_gating and not detect_hands else None
+        if gate:
+            thumbnail = decode_thumbnail(image_data)
+            previous = gate.reuse(thumbnail, current_session['person_crop'].box, request_started)
+            if previous is not None:
+                # The dancer held still: the session still scores them at this time
+                if not gate.absent and previous['comparison_result'] is not None:
+                    _record_comparison(np.asarray(previous['pose_landmarks']), previous['comparison_result'])
+                return previous
+
+        # Decode as RGB, only at the scale the person crop needs
+        cropper = current_session['person_crop'] if settings.pose_input_cropping else None
+        rgb_frame = decode_image(image_data, cropper.decode_size if cropper else None)
+
+        # Process pose on the previous frame's person box, downscaled to the working resolution
+        if cropper:
+            pose_input, crop_box = cropper.prepare(rgb_frame)
+        else:
+            pose_input, crop_box = rgb_frame, None
+        pose, model_complexity = complexity_controller.acquire(pose_models)
+        inference_start = time.perf_counter()
+        pose_results = pose.process(pose_input)
+        inference_seconds = time.perf_counter() - inference_start
 
         # Extract landmarks
         pose_landmarks = None
-        hand_landmarks = []
-        hand_classifications = []
         preprocessed_angles = {}
 
         if pose_results.pose_landmarks:
@@ -393,41 +705,16 @@ def process_image_snapshot(image_data: str) -> Dict[str, Any]:
                 [lm.x, lm.y, lm.z, lm.visibility]
                 for lm in pose_results.pose_landmarks.landmark
             ])
+            if crop_box is not None:
+                pose_landmarks = cropper.to_frame(pose_landmarks, crop_box)
 
-        if hand_results.multi_hand_landmarks:
-            for idx, hand_landmark in enumerate(hand_results.multi_hand_landmarks):
-                # Convert hand landmarks to numpy array
-                hand_array = np.array([[lm.x, lm.y, lm.z] for lm in hand_landmark.landmark])
-                hand_landmarks.append(hand_array)
-
-                # Get hand classification
-                if hand_results.multi_handedness and idx < len(hand_results.multi_handedness):
-                    handedness = hand_results.multi_handedness[idx]
-                    hand_classifications.append({
-                        'label': handedness.classification[0].label,
-                        'confidence': handedness.classification[0].score
-                    })
-
-        # Calculate preprocessed angles if we have pose landmarks
-        if pose_landmarks is not None:
-            try:
-                # Flatten pose landmarks for angle calculation (x, y, z coordinates only)
-                pose_flat = pose_landmarks[:, :3].flatten()
-
-                # Calculate angles
-                if hand_landmarks:
-                    hand_flat = hand_landmarks[0].flatten()
-                    preprocessed_angles = angle_calculator.calculate_all_angles(pose_flat, hand_flat)
-                else:
-                    preprocessed_angles = angle_calculator.calculate_all_angles(pose_flat)
-
-            except Exception as e:
-                print(f"Error calculating angles: {e}")
-                preprocessed_angles = {}
+        if cropper:
+            cropper.update(pose_landmarks)
 
         # Perform real-time comparison if service is available
         comparison_result = None
         live_feedback = None
+        feedback_seconds = 0.0  # Remote LLM time, not counted as local load
 
         if pose_landmarks is not None and comparison_service is not None:
             try:
@@ -436,21 +723,16 @@ def process_image_snapshot(image_data: str) -> Dict[str, Any]:
 
                 # Generate detailed feedback using LiveFeedbackService (internal LLM call)
                 # Returns processed feedback dict (NO OpenAI metadata)
+                feedback_start = time.time()
                 feedback_data = generate_llm_feedback(image_data, comparison_result)
-
-                # Store in session data
-                current_session['pose_data'].append({
-                    'timestamp': time.time(),
-                    'pose_landmarks': pose_landmarks,
-                    'comparison_result': comparison_result
-                })
+                feedback_seconds = time.time() - feedback_start
 
                 # Store complete feedback record for session summary (if feedback was generated)
                 # This data structure is used by FeedbackGenerationService.generate_session_summary()
                 if feedback_data:
                     session_timestamp = time.time() - current_session['start_time'] if current_session['start_time'] else 0
 
-                    current_session['feedback_history'].append({
+                    feedback_record = {
                         # Required fields for session summary
                         'timestamp': session_timestamp,  # Seconds from session start
                         'feedback_text': feedback_data.get('feedback_text', ''),
@@ -461,31 +743,74 @@ def process_image_snapshot(image_data: str) -> Dict[str, Any]:
 
                         # Additional context for analysis
                         'context': feedback_data.get('context', {})
-                    })
+                    }
+                    current_session['feedback_history'].append(feedback_record)
+
+                    # Keep the rolling session summary up to date
+                    session_summarizer.add_feedback(feedback_record)
 
                 # Extract feedback text for immediate response
                 live_feedback = feedback_data.get('feedback_text', None) if feedback_data else None
 
-                # Add to scoring service
-                scoring_service.add_score(
-                    timestamp=time.time() - current_session['start_time'] if current_session['start_time'] else 0,
-                    combined_score=comparison_result.get('combined_score', 0.0),
-                    pose_score=comparison_result.get('pose_score', 0.0),
-                    motion_score=comparison_result.get('motion_score', 0.0),
-                    errors=[]
-                )
+                # Store in session data and add to scoring service
+                _record_comparison(pose_landmarks, comparison_result)
 
             except Exception as e:
                 print(f"Error in pose comparison: {e}")
                 comparison_result = None
                 live_feedback = "Comparison unavailable"
 
+        # Process hands only near reference gestures (matched frame known after comparison)
+        now = time.time()
+        reference_index = comparison_result.get('best_match_idx') if comparison_result else None
+        hands_inferred = hand_scheduler.should_run(reference_index, force=detect_hands)
+        if hands_inferred:
+            if settings.hand_detection_mode == "roi" and pose_landmarks is not None:
+                # Wrist crops at native resolution, not the person crop's decode scale
+                hand_frame = full_resolution(image_data, rgb_frame) if cropper else rgb_frame
+                hand_landmarks, hand_classifications = hand_detector.process(hand_frame, pose_landmarks)
+            else:
+                hand_landmarks, hand_classifications = extract_hands(hands.process(rgb_frame))
+            hand_scheduler.store((hand_landmarks, hand_classifications), now)
+        else:
+            hand_landmarks, hand_classifications = hand_scheduler.reuse(now) or ([], [])
+
+        # Calculate preprocessed angles if we have pose landmarks
+        if pose_landmarks is not None:
+            try:
+                # Flatten pose landmarks for angle calculation (x, y, z coordinates only)
+                pose_flat = pose_landmarks[:, :3].flatten()
+
+                # Calculate angles
+                if hand_landmarks:
+                    hand_flat = hand_landmarks[0].flatten()
+                    preprocessed_angles = angle_calculator.calculate_all_angles(pose_flat, hand_flat)
+                else:
+                    preprocessed_angles = angle_calculator.calculate_all_angles(pose_flat)
+
+            except Exception as e:
+                print(f"Error calculating angles: {e}")
+                preprocessed_angles = {}
+
+        # Adapt the model complexity to this snapshot's latency and the server load
+        # (local compute only: decode, pose, comparison and hands, not the feedback call)
+        complexity_controller.record(
+            inference_seconds,
+            request_started=request_started,
+            request_seconds=time.time() - request_started - feedback_seconds,
+            session=current_session['inference_latency'],
+            level=model_complexity
+        )
+
         # Create result
         result = {
-            'timestamp': time.time(),
+            'timestamp': now,
             'pose_landmarks': pose_landmarks.tolist() if pose_landmarks is not None else None,
             'hand_landmarks': [hand.tolist() for hand in hand_landmarks],
             'hand_classifications': hand_classifications,
+            'hands_inferred': hands_inferred,
+            'model_complexity': model_complexity,
+            'frame_reused': False,
             'preprocessed_angles': preprocessed_angles,
             'comparison_result': comparison_result,
             'live_feedback': live_feedback,
@@ -498,6 +823,9 @@ def process_image_snapshot(image_data: str) -> Dict[str, Any]:
             if len(pose_sequence) > MAX_SEQUENCE_LENGTH:
                 pose_sequence.pop(0)
 
+        if gate:
+            gate.store(thumbnail, result, request_started, pose_landmarks, time.time() - request_started)
+
         return result
 
     except Exception as e:
@@ -529,7 +857,8 @@ async def root():
         "endpoints": {
             "sessions": "/api/sessions",
             "reference": "/api/reference",
-            "config": "/api/config"
+            "config": "/api/config",
+            "metrics": "/api/metrics"
         }
     }
 
@@ -547,7 +876,30 @@ async def health_check():
             "pose_comparison": comparison_service is not None,
             "live_feedback": True,
             "scoring": True
-        }
+        },
+        "model_complexity": complexity_controller.level
+    }
+
+
+@app.get("/api/metrics")
+async def get_metrics():
+    """
+    Inference metrics: the adaptive model complexity with server-wide and
+    session latency, hand inference scheduling and snapshot input cropping.
+
+    Returns:
+        dict: Metrics by pipeline stage
+    """
+    return {
+        "timestamp": time.time(),
+        "inference": complexity_controller.get_stats(),
+        "session": {
+            "session_id": current_session['session_id'],
+            "latency": current_session['inference_latency'].to_dict()
+        },
+        "hand_inference": {**hand_scheduler.get_stats(), "mode": settings.hand_detection_mode, **hand_detector.get_stats()},
+        "pose_input": current_session['person_crop'].get_stats(),
+        "motion_gate": current_session['motion_gate'].get_stats()
     }
 
 
@@ -556,27 +908,54 @@ async def health_check():
 # ============================================================================
 
 @app.post("/api/sessions/start", response_model=StartSessionResponse)
-async def start_session():
+async def start_session(matching_mode: Optional[str] = None, mirror_mode: Optional[str] = None):
     """
     Start a new dance session.
 
+    Args:
+        matching_mode: Optional reference matching engine for this session
+            ("coordinates" or "angles"); keeps the current config if None
+        mirror_mode: Optional mirror mode for this session ("off", "on" or
+            "auto" to detect a dancer facing a mirrored video); keeps the
+            current config if None
+
     Returns:
         StartSessionResponse: Session ID and confirmation message
     """
-    global current_session
+    global current_session, session_summarizer, current_config
 
-    session_id = f"session_{int(time.time())}"
-    current_session = {
-        'session_id': session_id,
-        'start_time': time.time(),
-        'pose_data': [],
-        'feedback_history': [],
-        'reference_video': current_session.get('reference_video')
+    overrides = {
+        key: value for key, value in (('matching_mode', matching_mode), ('mirror_mode', mirror_mode))
+        if value is not None and value != getattr(current_config, key)
     }
+    if overrides:
+        try:
+            current_config = replace(current_config, **overrides)
+        except ValueError as e:
+            raise HTTPException(status_code=400, detail=str(e))
+        if comparison_service:
+            comparison_service.update_config(current_config)
+
+    # Detect the dancer's orientation afresh for every session
+    if comparison_service:
+        comparison_service.orientation_detector.reset()
+
+    # Segment feedback of a session that was never ended is no longer needed
+    for task in current_session['segment_feedback'].values():
+        task.cancel()
+    await current_session['feedback_stream'].close()
+
+    session_id = f"session_{int(time.time())}"
+    current_session = _new_session_state(session_id, current_session.get('reference_video'))
+
+    # Reference playback starts with the session: timing offsets are measured against it
+    if comparison_service:
+        comparison_service.set_reference_clock(current_session['start_time'])
 
     # Reset services for new session
     live_feedback_service.reset()
     scoring_service.reset()
+    session_summarizer = RollingSessionSummarizer(feedback_generation_service)
 
     return StartSessionResponse(
         session_id=session_id,
@@ -585,56 +964,59 @@ async def start_session():
 
 
 @app.post("/api/sessions/end", response_model=SessionFeedbackResponse)
-async def end_session():
+async def end_session(polish: bool = True):
     """
     End the current session and get comprehensive AI-generated summary.
 
     SERVER-SIDE EVENT TRIGGER:
-    When this endpoint is called, it automatically triggers the internal
-    FeedbackGenerationService to analyze all live feedback from the session
-    and generate a comprehensive summary. This is the ONLY way the session
-    summary LLM is invoked - no separate API call needed.
+    The session summary is maintained incrementally while the user dances
+    (RollingSessionSummarizer), so this endpoint returns the latest summary
+    immediately instead of waiting for a large LLM call. If polish is True,
+    a final LLM narrative is generated in the background and can be fetched
+    from /api/sessions/{session_id}/summary.
 
     SECURITY NOTE: Calls internal LLM service (OpenAI) automatically but
     returns ONLY processed feedback text. No OpenAI metadata is exposed.
 
+    Args:
+        polish: Generate a final LLM narrative in the background
+
     Returns:
         SessionFeedbackResponse: Complete session summary with AI-generated insights
     """
-    global current_session
+    global current_session, session_summarizer
 
     if not current_session['session_id']:
         raise HTTPException(status_code=400, detail="No active session to end")
 
-    # Calculate basic session metrics
+    session_id = current_session['session_id']
+
+    # Calculate basic session metrics (running average - no recompute)
     total_poses = len(current_session['pose_data'])
+    average_similarity = session_summarizer.average_score
 
-    if total_poses > 0:
-        similarity_scores = [
-            data['comparison_result'].get('combined_score', 0.0)
-            for data in current_session['pose_data']
-            if data['comparison_result']
-        ]
-        average_similarity = np.mean(similarity_scores) if similarity_scores else 0.0
-    else:
-        average_similarity = 0.0
+    # Close a problem segment still open at the end, then wait for the worst
+    # segments' feedback (mostly done already) while the timing report is computed
+    scoring_service.close_problem_segment()
+    segment_feedback_task = asyncio.ensure_future(_collect_segment_feedback(current_session))
 
     # Get session statistics from scoring service
     session_stats = scoring_service.get_session_statistics()
 
-    # SERVER-SIDE EVENT: Automatically generate comprehensive AI summary
-    # This is triggered internally when session ends (not a separate API call)
-    # FeedbackGenerationService calls OpenAI internally but returns ONLY processed text
-    ai_summary = feedback_generation_service.generate_session_summary(
-        live_feedback_history=current_session['feedback_history'],
-        session_statistics=session_stats
+    # Align the whole session with the reference (CPU-bound, off the event loop)
+    timing_report = await asyncio.get_running_loop().run_in_executor(
+        None, _build_timing_report, current_session['pose_data'], current_session['start_time']
     )
 
+    # Latest rolling summary (draft narrative or template) - returns immediately
+    finished_summarizer = session_summarizer
+    ai_summary = finished_summarizer.get_summary(session_stats)
+
     # Build comprehensive response with AI insights
     # All AI-generated content (overall_summary, key_insights, etc.) comes from
     # the internal FeedbackGenerationService - NO OpenAI metadata is included
     response = SessionFeedbackResponse(
-        session_id=current_session['session_id'],
+        session_id=session_id,
         total_poses=total_poses,
         average_similarity=float(average_similarity),
         session_summary=ai_summary.get('overall_summary', 'Session completed!'),
@@ -644,22 +1026,131 @@ async def end_session():
         key_insights=ai_summary.get('key_insights', []),
         improvement_areas=ai_summary.get('improvement_areas', []),
         strengths=ai_summary.get('strengths', []),
-        severity_distribution=ai_summary.get('severity_distribution', {})
+        severity_distribution=ai_summary.get('severity_distribution', {}),
+        summary_status=ai_summary.get('summary_status'),
+        timeline=scoring_service.get_timeline(
+            resolution=settings.timeline_resolution,
+            max_points=settings.timeline_max_points
+        ),
+        # Segment feedback that is not ready yet is added to the stored summary later
+        segment_feedback=_segment_feedback_result(segment_feedback_task),
+        timing_report=timing_report
     )
 
+    _store_session_summary(session_id, response.model_dump())
+
+    # Feedback still being generated is added to the stored summary when ready
+    if not segment_feedback_task.done():
+        segment_feedback_task.add_done_callback(
+            lambda task: _finish_segment_feedback(session_id, task)
+        )
+
+    # SERVER-SIDE EVENT: final polish runs in the background
+    if polish and ai_summary.get('feedback_count', 0) > 0:
+        asyncio.get_running_loop().run_in_executor(
+            None, _polish_session_summary, session_id, finished_summarizer, session_stats
+        )
+
     # Keep reference video loaded but reset session
-    reference_video = current_session.get('reference_video')
-    current_session = {
-        'session_id': None,
-        'start_time': None,
-        'pose_data': [],
-        'feedback_history': [],
-        'reference_video': reference_video
-    }
+    current_session = _new_session_state(reference_video=current_session.get('reference_video'))
+    session_summarizer = RollingSessionSummarizer(feedback_generation_service)
 
     return response
 
 
+def _build_timing_report(pose_data: List[Dict[str, Any]],
+                         start_time: Optional[float]) -> Optional[Dict[str, Any]]:
+    """Full-session DTW timing report against the loaded reference (None if unavailable)."""
+    if comparison_service is None or start_time is None or len(pose_data) < 2:
+        return None
+
+    aligner = comparison_service.get_session_aligner()
+    if aligner is None:
+        return None
+
+    try:
+        return aligner.align(
+            np.stack([entry['pose_landmarks'][:33, :3] for entry in pose_data]),
+            np.array([entry['timestamp'] - start_time for entry in pose_data]),
+            mirrored=comparison_service.mirrored,
+            timeline_resolution=settings.timeline_resolution,
+            timeline_max_points=settings.timeline_max_points
+        )
+    except Exception as e:
+        print(f"❌ Session alignment failed: {e}")
+        return None
+
+
+def _store_session_summary(session_id: str, summary: Dict[str, Any]):
+    """Store an ended session's summary, keeping only the most recent ones."""
+    session_summaries[session_id] = summary
+    while len(session_summaries) > MAX_STORED_SUMMARIES:
+        session_summaries.pop(next(iter(session_summaries)))
+
+
+def _segment_feedback_result(task: asyncio.Future) -> List[Dict[str, Any]]:
+    """Segment feedback of a finished collection ([] while running or if it failed)."""
+    if not task.done() or task.cancelled():
+        return []
+    if task.exception() is not None:
+        print(f"❌ Segment feedback failed: {task.exception()}")
+        return []
+    return task.result()
+
+
+def _finish_segment_feedback(session_id: str, task: asyncio.Future):
+    """Add segment feedback that finished after the response to the stored summary."""
+    feedback = _segment_feedback_result(task)
+    stored = session_summaries.get(session_id)
+    if stored is not None:
+        stored['segment_feedback'] = feedback
+
+
+def _polish_session_summary(session_id: str,
+                            summarizer: RollingSessionSummarizer,
+                            session_stats: Dict[str, Any]):
+    """Generate the final LLM summary for an ended session (runs in a worker thread)."""
+    try:
+        final_summary = summarizer.polish(session_stats)
+        stored = session_summaries.get(session_id)
+        if stored is None:
+            return
+
+        stored.update({
+            'session_summary': final_summary.get('overall_summary', stored['session_summary']),
+            'key_insights': final_summary.get('key_insights', []),
+            'improvement_areas': final_summary.get('improvement_areas', []),
+            'strengths': final_summary.get('strengths', []),
+            'severity_distribution': final_summary.get('severity_distribution', {}),
+            'summary_status': final_summary.get('summary_status', 'final')
+        })
+        print(f"✅ Final summary ready for {session_id}")
+
+    except Exception as e:
+        print(f"❌ Final summary polish failed for {session_id}: {e}")
+
+
+@app.get("/api/sessions/{session_id}/summary", response_model=SessionFeedbackResponse)
+async def get_session_summary(session_id: str):
+    """
+    Get the latest summary of an ended session.
+
+    Returns the summary from /api/sessions/end, replaced by the final
+    polished version once the background LLM call completes
+    (summary_status == "final").
+
+    Args:
+        session_id: ID of an ended session
+
+    Returns:
+        SessionFeedbackResponse: Latest session summary
+    """
+    summary = session_summaries.get(session_id)
+    if summary is None:
+        raise HTTPException(status_code=404, detail=f"No summary for session '{session_id}'")
+    return SessionFeedbackResponse(**summary)
+
+
 @app.get("/api/sessions/status", response_model=SessionStatusResponse)
 async def get_session_status():
     """
@@ -697,7 +1188,7 @@ async def process_snapshot(request: ImageSnapshotRequest):
         if not request.image:
             raise HTTPException(status_code=400, detail='No image data provided')
 
-        result = process_image_snapshot(request.image)
+        result = process_image_snapshot(request.image, request.detect_hands)
         return ProcessSnapshotResponse(**result)
 
     except Exception as e:
@@ -830,6 +1321,7 @@ async def analyze_mediapipe_poses(request: MediaPipeRequest):
             "reference_pose_detected": result.reference_pose.has_pose if result.reference_pose else False,
             "similarity_score": result.similarity_score,
             "processing_time": result.processing_time,
+            "model_complexity": complexity_controller.level,
             "success": True
         }
         
@@ -875,6 +1367,32 @@ async def analyze_mediapipe_poses(request: MediaPipeRequest):
         )
 
 
+@app.get("/api/sessions/timeline")
+async def get_session_timeline(resolution: Optional[str] = None, max_points: Optional[int] = None):
+    """
+    Get the score timeline of the current (or most recently ended) session.
+
+    Args:
+        resolution: Bucket width like "0.5s" or "1s", or "raw" (config default if None)
+        max_points: Maximum number of points after LTTB downsampling (config default if None)
+
+    Returns:
+        dict: Timeline points with mean/min/max score per bucket
+    """
+    try:
+        timeline = scoring_service.get_timeline(
+            resolution=resolution or settings.timeline_resolution,
+            max_points=max_points or settings.timeline_max_points
+        )
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+    return {
+        'timeline': timeline,
+        'length': len(timeline)
+    }
+
+
 @app.get("/api/sessions/pose-sequence")
 async def get_pose_sequence():
     """
@@ -935,6 +1453,233 @@ async def load_reference(request: LoadReferenceRequest):
         raise HTTPException(status_code=500, detail=str(e))
 
 
+@app.post("/api/reference/identify")
+async def identify_reference(request: IdentifyReferenceRequest):
+    """
+    Identify which reference video (and where in it) the user is dancing.
+
+    Matches a few seconds of user landmarks against an index of every
+    processed reference video, so the user can just start dancing instead
+    of loading a reference by name.
+
+    Args:
+        request: IdentifyReferenceRequest with user landmarks
+
+    Returns:
+        dict: Candidates (video_name, offset, current_time, confidence), best first
+    """
+    landmarks = np.array(request.landmarks, dtype=np.float64)
+    if landmarks.ndim != 3 or landmarks.shape[1] < 33 or landmarks.shape[2] < 3:
+        raise HTTPException(status_code=400, detail="landmarks must have shape (frames, 33, >=3)")
+    if request.timestamps is not None and len(request.timestamps) != len(landmarks):
+        raise HTTPException(status_code=400, detail="timestamps must have one entry per frame")
+
+    start = time.perf_counter()
+    index = await asyncio.get_running_loop().run_in_executor(
+        None, get_pose_library_index, request.rebuild_index
+    )
+    candidates = index.identify(landmarks, request.timestamps, top_k=request.top_k)
+
+    loaded = None
+    if request.auto_load and candidates:
+        best = candidates[0]['video_name']
+        if best == current_session.get('reference_video') or load_reference_video(best):
+            loaded = best
+
+    return {
+        "candidates": candidates,
+        "loaded_video": loaded,
+        "indexed_frames": len(index),
+        "processing_ms": round((time.perf_counter() - start) * 1000, 2)
+    }
+
+
+def get_practice_evaluator() -> PracticeVideoEvaluator:
+    """Get the practice-video evaluator for the currently loaded reference."""
+    global practice_evaluator
+    if practice_evaluator is None or practice_evaluator.comparison_service is not comparison_service:
+        practice_evaluator = PracticeVideoEvaluator(comparison_service)
+    return practice_evaluator
+
+
+@app.post("/api/practice/evaluate")
+async def evaluate_practice_video(
+    video: UploadFile = File(...),
+    video_name: Optional[str] = Form(None),
+    mirror_mode: Optional[str] = Form(None),
+    reference_offset: float = Form(0.0)
+):
+    """
+    Evaluate a recorded practice video instead of a live session.
+
+    The upload is decoded and scored offline against the reference (poses
+    extracted in parallel, scores computed in batch), and the same report
+    structures as a live session are returned.
+
+    Args:
+        video: Uploaded video file
+        video_name: Reference video to load first (current reference if None)
+        mirror_mode: "off", "on" or "auto" (current config if None)
+        reference_offset: Reference time (seconds) at which the recording starts
+
+    Returns:
+        dict: video_info, processing, statistics, timeline, problem_areas, timing_report
+    """
+    if video_name and video_name != current_session.get('reference_video'):
+        if not load_reference_video(video_name):
+            raise HTTPException(status_code=400, detail=f"Failed to load reference video '{video_name}'")
+    if comparison_service is None:
+        raise HTTPException(status_code=400, detail="No reference video loaded")
+    if mirror_mode is not None and mirror_mode not in ("off", "on", "auto"):
+        raise HTTPException(status_code=400, detail=f"Unknown mirror mode '{mirror_mode}'")
+
+    suffix = os.path.splitext(video.filename or "")[1] or ".mp4"
+    with tempfile.NamedTemporaryFile(suffix=suffix, delete=False) as upload:
+        shutil.copyfileobj(video.file, upload)
+        upload_path = upload.name
+
+    try:
+        evaluator = get_practice_evaluator()
+        report = await asyncio.get_running_loop().run_in_executor(
+            None, evaluator.evaluate, upload_path, mirror_mode, reference_offset
+        )
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    except RuntimeError as e:
+        raise HTTPException(status_code=500, detail=str(e))
+    finally:
+        os.remove(upload_path)
+
+    report['reference_video'] = current_session.get('reference_video')
+    return report
+
+
+@app.post("/api/references/upload")
+async def upload_reference_video(video: UploadFile = File(...)):
+    """
+    Upload a reference video and queue it for background processing.
+
+    Args:
+        video: Video file (.mp4, .avi, .mov, .mkv)
+
+    Returns:
+        dict: The queued ingestion job (poll /api/references/jobs/{job_id})
+    """
+    filename = os.path.basename(video.filename or "")
+    if not filename.lower().endswith(('.mp4', '.avi', '.mov', '.mkv')):
+        raise HTTPException(status_code=400, detail="Unsupported video format")
+
+    # Never replace a reference (an ingestion job may still be reading it)
+    video_path = os.path.join(ingestion_queue.processor.reference_videos_dir, filename)
+    if os.path.exists(video_path):
+        raise HTTPException(status_code=409, detail=f"Reference video '{filename}' already exists")
+
+    try:
+        await asyncio.get_running_loop().run_in_executor(None, _save_reference_upload, video.file, video_path)
+    except FileExistsError:
+        raise HTTPException(status_code=409, detail=f"Reference video '{filename}' already exists")
+
+    return ingestion_queue.submit(filename)
+
+
+def _save_reference_upload(upload, video_path: str):
+    """
+    Write an uploaded reference video without replacing an existing file (runs in a worker thread).
+
+    The upload is copied to a temporary file in the same directory and then
+    linked into place, so the video never appears half-written.
+
+    Args:
+        upload: Uploaded file object
+        video_path: Destination path in reference_videos/
+
+    Raises:
+        FileExistsError: If video_path exists
+    """
+    with tempfile.NamedTemporaryFile(dir=os.path.dirname(video_path), suffix=".part", delete=False) as f:
+        temp_path = f.name
+    try:
+        with open(temp_path, "wb") as f:
+            shutil.copyfileobj(upload, f)
+        os.link(temp_path, video_path)  # Fails instead of replacing a file created meanwhile
+    finally:
+        os.remove(temp_path)
+
+
+@app.post("/api/references/jobs")
+async def register_reference_video(request: IngestReferenceRequest):
+    """
+    Queue a video already in reference_videos/ for background processing.
+
+    Args:
+        request: IngestReferenceRequest with the video file name
+
+    Returns:
+        dict: The queued ingestion job
+    """
+    try:
+        return ingestion_queue.submit(request.video_filename, request.output_filename)
+    except FileNotFoundError as e:
+        raise HTTPException(status_code=404, detail=str(e))
+
+
+@app.get("/api/references/jobs")
+async def list_ingestion_jobs():
+    """List reference ingestion jobs, newest first."""
+    return {"jobs": ingestion_queue.list_jobs()}
+
+
+@app.get("/api/references/jobs/{job_id}")
+async def get_ingestion_job(job_id: str):
+    """
+    Get the progress of a reference ingestion job.
+
+    Returns:
+        dict: status, progress (0-1), processed/total frames, frames_per_second,
+        eta_seconds, completed chunks and error (if failed)
+    """
+    job = ingestion_queue.get_job(job_id)
+    if job is None:
+        raise HTTPException(status_code=404, detail=f"Unknown ingestion job '{job_id}'")
+    return job
+
+
+@app.get("/api/references/library")
+async def get_reference_library():
+    """
+    Get the build state of every processed reference.
+
+    Returns:
+        dict: references (name, video_filename, poses_file, stale stages with reasons)
+    """
+    references = await asyncio.get_running_loop().run_in_executor(None, reference_library.status)
+    return {"references": references}
+
+
+@app.post("/api/references/rebuild")
+async def rebuild_reference_library(request: RebuildReferencesRequest):
+    """
+    Rebuild only the stale artifacts of the reference library.
+
+    Changed videos and pose pipeline upgrades re-run MediaPipe; derived
+    stage upgrades are recomputed from the existing poses files.
+
+    Args:
+        request: RebuildReferencesRequest (names, force, dry_run)
+
+    Returns:
+        dict: plan, rebuilt, failed, elapsed_seconds
+    """
+    global pose_library_index
+    result = await asyncio.get_running_loop().run_in_executor(
+        None, reference_library.rebuild, request.names, request.force,
+        settings.reference_ingestion_workers, request.dry_run
+    )
+    if result["rebuilt"]:
+        pose_library_index = None  # rebuilt from the new artifacts on next identify
+    return result
+
+
 @app.get("/api/reference/current")
 async def get_current_reference():
     """
@@ -995,7 +1740,9 @@ async def update_config(request: UpdateConfigRequest):
                 dtw_enabled=request.dtw_enabled if request.dtw_enabled is not None else current_config.dtw_enabled,
                 smoothing_window=current_config.smoothing_window,
                 dtw_window=current_config.dtw_window,
-                dtw_interval=current_config.dtw_interval
+                dtw_interval=current_config.dtw_interval,
+                matching_mode=request.matching_mode or current_config.matching_mode,
+                mirror_mode=request.mirror_mode or current_config.mirror_mode
             )
 
         # Validate weights sum to 1.0
@@ -1017,6 +1764,8 @@ async def update_config(request: UpdateConfigRequest):
 
     except HTTPException:
         raise
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
@@ -1,15 +1,160 @@
 """
 Angle Calculator Service
 Preprocesses key dance angles from pose landmarks for LLM analysis
+
+Angles are declared in tables (name, kind, landmark indices) and computed by
+a batched kernel, so a single frame and a whole (F, 33, C) clip go through
+the same few NumPy operations.
 """
 
 import numpy as np
-from typing import Dict, List, Optional, Tuple
-import math
+from dataclasses import dataclass
+from functools import lru_cache
+from typing import Dict, List, Optional, Sequence, Tuple
+
+
+@dataclass(frozen=True)
+class AngleSpec:
+    """
+    Declarative definition of one angle.
+
+    Kinds (all computed on x, y only):
+    - "bend": interior angle at landmarks[1] between landmarks[0] and landmarks[2] (0-180)
+    - "tilt": arctan of the y difference between landmarks[0] and landmarks[1]
+    - "lean": direction from the midpoint of landmarks[0:2] to the midpoint of landmarks[2:4]
+    - "orientation": direction from landmarks[0] to landmarks[1]
+    """
+    name: str
+    kind: str
+    landmarks: Tuple[int, ...]
+
+
+ARM_ANGLES = (
+    AngleSpec('left_elbow_bend', 'bend', (11, 13, 15)),    # shoulder-elbow-wrist
+    AngleSpec('right_elbow_bend', 'bend', (12, 14, 16)),
+)
+
+BODY_ANGLES = (
+    AngleSpec('shoulder_tilt', 'tilt', (11, 12)),
+    AngleSpec('hip_tilt', 'tilt', (23, 24)),
+    AngleSpec('body_lean', 'lean', (11, 12, 23, 24)),      # shoulder center -> hip center
+)
+
+LEG_ANGLES = (
+    AngleSpec('left_knee_bend', 'bend', (23, 25, 27)),     # hip-knee-ankle
+    AngleSpec('right_knee_bend', 'bend', (24, 26, 28)),
+)
+
+HAND_ANGLES = (
+    AngleSpec('hand_orientation', 'orientation', (9, 12)),  # middle finger base -> tip
+    AngleSpec('thumb_extension', 'bend', (0, 2, 4)),
+    AngleSpec('index_extension', 'bend', (0, 5, 8)),
+)
+
+POSE_ANGLES = ARM_ANGLES + BODY_ANGLES + LEG_ANGLES
+
+# Compact feature set for angle-space matching (see AngleSpaceMatcher)
+MATCHING_ANGLES = (
+    ARM_ANGLES + LEG_ANGLES + (
+        AngleSpec('left_shoulder_raise', 'bend', (23, 11, 13)),   # hip-shoulder-elbow
+        AngleSpec('right_shoulder_raise', 'bend', (24, 12, 14)),
+        AngleSpec('left_hip_bend', 'bend', (11, 23, 25)),          # shoulder-hip-knee
+        AngleSpec('right_hip_bend', 'bend', (12, 24, 26)),
+        AngleSpec('body_lean', 'lean', (11, 12, 23, 24)),
+    )
+)
+
+
+@dataclass
+class AngleTable:
+    """Named (F, K) array of angles in degrees."""
+    names: Tuple[str, ...]
+    values: np.ndarray
+
+    def __len__(self) -> int:
+        return len(self.values)
+
+    def column(self, name: str) -> np.ndarray:
+        """All frames of one angle."""
+        return self.values[:, self.names.index(name)]
+
+    def frame(self, index: int) -> Dict[str, float]:
+        """One frame as a {name: degrees} dictionary."""
+        return dict(zip(self.names, self.values[index].tolist()))
+
+
+def _required_length(specs: Sequence[AngleSpec], stride: int = 3) -> int:
+    """Minimum flat array length needed for the x, y of every landmark in specs."""
+    return max(max(spec.landmarks) for spec in specs) * stride + 2
+
+
+def _interior_angles(point1: np.ndarray, vertex: np.ndarray, point2: np.ndarray) -> np.ndarray:
+    """
+    Interior angles (degrees) at vertex for arrays of shape (..., D).
+
+    Degenerate angles (a zero-length side) are 0.0.
+    """
+    v1 = point1 - vertex
+    v2 = point2 - vertex
+    norms = np.linalg.norm(v1, axis=-1) * np.linalg.norm(v2, axis=-1)
+    dots = np.einsum('...i,...i->...', v1, v2)
+
+    degenerate = norms == 0
+    cos_angle = np.where(degenerate, 1.0, dots / np.where(degenerate, 1.0, norms))
+    return np.degrees(np.arccos(np.clip(cos_angle, -1.0, 1.0)))
+
+
+@lru_cache(maxsize=None)
+def _compile_specs(specs: Tuple[AngleSpec, ...]) -> List[Tuple[str, np.ndarray, np.ndarray]]:
+    """Group specs by kind into (kind, output columns, landmark index matrix)."""
+    plan = []
+    for kind in ('bend', 'tilt', 'lean', 'orientation'):
+        columns = [i for i, spec in enumerate(specs) if spec.kind == kind]
+        if columns:
+            indices = np.array([specs[i].landmarks for i in columns])
+            plan.append((kind, np.array(columns), indices))
+    return plan
+
+
+def compute_angle_table(points: np.ndarray, specs: Sequence[AngleSpec]) -> AngleTable:
+    """
+    Compute angles for every frame in one batched pass.
+
+    Args:
+        points: Landmarks of shape (F, N, C) with C >= 2 (x, y[, z, visibility])
+        specs: Angles to compute
+
+    Returns:
+        AngleTable with one column per spec
+    """
+    specs = tuple(specs)
+    xy = np.asarray(points, dtype=np.float64)[..., :2]
+    values = np.empty((xy.shape[0], len(specs)), dtype=np.float64)
+
+    for kind, columns, indices in _compile_specs(specs):
+        # (F, K_kind, L, 2) - every landmark of every spec of this kind
+        gathered = xy[:, indices]
+
+        if kind == 'bend':
+            values[:, columns] = _interior_angles(gathered[:, :, 0], gathered[:, :, 1], gathered[:, :, 2])
+        elif kind == 'tilt':
+            diff = gathered[:, :, 0, 1] - gathered[:, :, 1, 1]
+            values[:, columns] = np.degrees(np.arctan2(diff, 1.0))
+        elif kind == 'lean':
+            start = (gathered[:, :, 0] + gathered[:, :, 1]) / 2
+            end = (gathered[:, :, 2] + gathered[:, :, 3]) / 2
+            vector = end - start
+            values[:, columns] = np.degrees(np.arctan2(vector[..., 0], vector[..., 1]))
+        else:
+            vector = gathered[:, :, 1] - gathered[:, :, 0]
+            values[:, columns] = np.degrees(np.arctan2(vector[..., 1], vector[..., 0]))
+
+    return AngleTable(names=tuple(spec.name for spec in specs), values=values)
+
 
 class AngleCalculator:
     """Calculates key dance angles from pose landmarks"""
-    
+
     def __init__(self):
         # Key landmark indices for angle calculations
         self.landmark_indices = {
@@ -27,202 +172,108 @@ class AngleCalculator:
             'left_heel': 29, 'right_heel': 30,
             'left_foot_index': 31, 'right_foot_index': 32
         }
-    
-    def calculate_angle(self, point1: Tuple[float, float], 
-                       vertex: Tuple[float, float], 
+
+    def calculate_angle(self, point1: Tuple[float, float],
+                       vertex: Tuple[float, float],
                        point2: Tuple[float, float]) -> float:
-        """Calculate angle between three points in degrees"""
-        try:
-            # Convert to numpy arrays for easier calculation
-            p1 = np.array(point1)
-            v = np.array(vertex)
-            p2 = np.array(point2)
-            
-            # Calculate vectors
-            v1 = p1 - v
-            v2 = p2 - v
-            
-            # Calculate angle using dot product
-            cos_angle = np.dot(v1, v2) / (np.linalg.norm(v1) * np.linalg.norm(v2))
-            
-            # Clamp to avoid numerical errors
-            cos_angle = np.clip(cos_angle, -1.0, 1.0)
-            
-            # Convert to degrees
-            angle = np.degrees(np.arccos(cos_angle))
-            
-            return float(angle)
-        except Exception as e:
-            print(f"Error calculating angle: {e}")
-            return 0.0
-    
+        """Calculate angle between three points in degrees (0.0 if a side has zero length)"""
+        return float(_interior_angles(
+            np.asarray(point1, dtype=np.float64),
+            np.asarray(vertex, dtype=np.float64),
+            np.asarray(point2, dtype=np.float64)
+        ))
+
+    def calculate_pose_angles_batch(self, pose_landmarks: np.ndarray,
+                                    specs: Sequence[AngleSpec] = POSE_ANGLES) -> AngleTable:
+        """
+        Calculate pose angles for many frames at once.
+
+        Args:
+            pose_landmarks: (F, 33, C) landmarks, or (F, 33 * 3) flattened x, y, z
+            specs: Angles to compute (all pose angles by default)
+
+        Returns:
+            AngleTable of shape (F, len(specs))
+        """
+        return compute_angle_table(self._as_points(pose_landmarks), specs)
+
+    def calculate_hand_angles_batch(self, hand_landmarks: np.ndarray) -> AngleTable:
+        """
+        Calculate hand angles for many frames at once.
+
+        Args:
+            hand_landmarks: (F, 21, C) landmarks, or (F, 21 * 3) flattened x, y, z
+
+        Returns:
+            AngleTable of shape (F, 3)
+        """
+        return compute_angle_table(self._as_points(hand_landmarks), HAND_ANGLES)
+
+    def _as_points(self, landmarks: np.ndarray) -> np.ndarray:
+        """Reshape flattened (F, N * 3) or (N * 3,) landmarks to (F, N, 3)."""
+        landmarks = np.asarray(landmarks, dtype=np.float64)
+        if landmarks.ndim == 3:
+            return landmarks
+        if landmarks.ndim == 1:
+            landmarks = landmarks[np.newaxis]
+
+        # Pad partial trailing landmarks so the array reshapes cleanly
+        padding = -landmarks.shape[1] % 3
+        if padding:
+            landmarks = np.pad(landmarks, ((0, 0), (0, padding)), constant_values=np.nan)
+        return landmarks.reshape(landmarks.shape[0], -1, 3)
+
+    def _calculate_group(self, landmarks: np.ndarray, specs: Sequence[AngleSpec],
+                         group: str) -> Dict[str, float]:
+        """Calculate one group of angles for a single flattened frame."""
+        landmarks = np.asarray(landmarks, dtype=np.float64).ravel()
+        min_required = _required_length(specs)
+        if len(landmarks) < min_required:
+            print(f"Error calculating {group} angles: Landmarks array too short: "
+                  f"{len(landmarks)} < {min_required}")
+            return {spec.name: 0.0 for spec in specs}
+
+        return compute_angle_table(self._as_points(landmarks), specs).frame(0)
+
     def calculate_arm_angles(self, landmarks: np.ndarray) -> Dict[str, float]:
         """Calculate arm-related angles"""
-        angles = {}
-
-        try:
-            # Validate landmarks array has enough elements
-            min_required = max(self.landmark_indices['left_wrist'],
-                             self.landmark_indices['right_wrist']) * 3 + 2
-            if len(landmarks) < min_required:
-                raise ValueError(f"Landmarks array too short: {len(landmarks)} < {min_required}")
-
-            # Left elbow bend angle (shoulder-elbow-wrist)
-            left_shoulder = (landmarks[self.landmark_indices['left_shoulder'] * 3],
-                           landmarks[self.landmark_indices['left_shoulder'] * 3 + 1])
-            left_elbow = (landmarks[self.landmark_indices['left_elbow'] * 3],
-                         landmarks[self.landmark_indices['left_elbow'] * 3 + 1])
-            left_wrist = (landmarks[self.landmark_indices['left_wrist'] * 3],
-                         landmarks[self.landmark_indices['left_wrist'] * 3 + 1])
-
-            angles['left_elbow_bend'] = self.calculate_angle(left_shoulder, left_elbow, left_wrist)
-
-            # Right elbow bend angle (shoulder-elbow-wrist)
-            right_shoulder = (landmarks[self.landmark_indices['right_shoulder'] * 3],
-                            landmarks[self.landmark_indices['right_shoulder'] * 3 + 1])
-            right_elbow = (landmarks[self.landmark_indices['right_elbow'] * 3],
-                          landmarks[self.landmark_indices['right_elbow'] * 3 + 1])
-            right_wrist = (landmarks[self.landmark_indices['right_wrist'] * 3],
-                          landmarks[self.landmark_indices['right_wrist'] * 3 + 1])
-
-            angles['right_elbow_bend'] = self.calculate_angle(right_shoulder, right_elbow, right_wrist)
-
-        except Exception as e:
-            print(f"Error calculating arm angles: {e}")
-            angles = {'left_elbow_bend': 0.0, 'right_elbow_bend': 0.0}
-
-        return angles
-    
+        return self._calculate_group(landmarks, ARM_ANGLES, 'arm')
+
     def calculate_body_angles(self, landmarks: np.ndarray) -> Dict[str, float]:
         """Calculate body posture angles"""
-        angles = {}
-        
-        try:
-            # Shoulder alignment
-            left_shoulder = (landmarks[self.landmark_indices['left_shoulder'] * 3],
-                           landmarks[self.landmark_indices['left_shoulder'] * 3 + 1])
-            right_shoulder = (landmarks[self.landmark_indices['right_shoulder'] * 3],
-                            landmarks[self.landmark_indices['right_shoulder'] * 3 + 1])
-            
-            # Calculate shoulder tilt
-            shoulder_diff = left_shoulder[1] - right_shoulder[1]
-            angles['shoulder_tilt'] = float(np.degrees(np.arctan2(shoulder_diff, 1.0)))
-            
-            # Hip alignment
-            left_hip = (landmarks[self.landmark_indices['left_hip'] * 3],
-                       landmarks[self.landmark_indices['left_hip'] * 3 + 1])
-            right_hip = (landmarks[self.landmark_indices['right_hip'] * 3],
-                        landmarks[self.landmark_indices['right_hip'] * 3 + 1])
-            
-            # Calculate hip tilt
-            hip_diff = left_hip[1] - right_hip[1]
-            angles['hip_tilt'] = float(np.degrees(np.arctan2(hip_diff, 1.0)))
-            
-            # Body lean (shoulder to hip)
-            shoulder_center = ((left_shoulder[0] + right_shoulder[0]) / 2,
-                             (left_shoulder[1] + right_shoulder[1]) / 2)
-            hip_center = ((left_hip[0] + right_hip[0]) / 2,
-                         (left_hip[1] + right_hip[1]) / 2)
-            
-            # Calculate body lean angle
-            body_vector = (hip_center[0] - shoulder_center[0], 
-                          hip_center[1] - shoulder_center[1])
-            angles['body_lean'] = float(np.degrees(np.arctan2(body_vector[0], body_vector[1])))
-            
-        except Exception as e:
-            print(f"Error calculating body angles: {e}")
-            angles = {'shoulder_tilt': 0.0, 'hip_tilt': 0.0, 'body_lean': 0.0}
-        
-        return angles
-    
+        return self._calculate_group(landmarks, BODY_ANGLES, 'body')
+
     def calculate_leg_angles(self, landmarks: np.ndarray) -> Dict[str, float]:
         """Calculate leg-related angles"""
-        angles = {}
-
-        try:
-            # Validate landmarks array
-            min_required = max(self.landmark_indices['left_ankle'],
-                             self.landmark_indices['right_ankle']) * 3 + 2
-            if len(landmarks) < min_required:
-                raise ValueError(f"Landmarks array too short: {len(landmarks)} < {min_required}")
-
-            # Left knee bend angle (hip-knee-ankle)
-            left_hip = (landmarks[self.landmark_indices['left_hip'] * 3],
-                       landmarks[self.landmark_indices['left_hip'] * 3 + 1])
-            left_knee = (landmarks[self.landmark_indices['left_knee'] * 3],
-                        landmarks[self.landmark_indices['left_knee'] * 3 + 1])
-            left_ankle = (landmarks[self.landmark_indices['left_ankle'] * 3],
-                         landmarks[self.landmark_indices['left_ankle'] * 3 + 1])
-
-            angles['left_knee_bend'] = self.calculate_angle(left_hip, left_knee, left_ankle)
-
-            # Right knee bend angle (hip-knee-ankle)
-            right_hip = (landmarks[self.landmark_indices['right_hip'] * 3],
-                        landmarks[self.landmark_indices['right_hip'] * 3 + 1])
-            right_knee = (landmarks[self.landmark_indices['right_knee'] * 3],
-                         landmarks[self.landmark_indices['right_knee'] * 3 + 1])
-            right_ankle = (landmarks[self.landmark_indices['right_ankle'] * 3],
-                          landmarks[self.landmark_indices['right_ankle'] * 3 + 1])
-
-            angles['right_knee_bend'] = self.calculate_angle(right_hip, right_knee, right_ankle)
-
-        except Exception as e:
-            print(f"Error calculating leg angles: {e}")
-            angles = {'left_knee_bend': 0.0, 'right_knee_bend': 0.0}
-
-        return angles
-    
+        return self._calculate_group(landmarks, LEG_ANGLES, 'leg')
+
     def calculate_hand_angles(self, hand_landmarks: np.ndarray) -> Dict[str, float]:
         """Calculate hand gesture angles"""
-        angles = {}
-        
-        try:
-            if len(hand_landmarks) < 21 * 3:  # Need 21 landmarks * 3 coordinates
-                return angles
-            
-            # Hand orientation (palm direction)
-            # Use wrist, middle finger base, and middle finger tip
-            wrist = (hand_landmarks[0], hand_landmarks[1])
-            middle_base = (hand_landmarks[9 * 3], hand_landmarks[9 * 3 + 1])
-            middle_tip = (hand_landmarks[12 * 3], hand_landmarks[12 * 3 + 1])
-            
-            # Calculate hand orientation angle
-            hand_vector = (middle_tip[0] - middle_base[0], middle_tip[1] - middle_base[1])
-            angles['hand_orientation'] = float(np.degrees(np.arctan2(hand_vector[1], hand_vector[0])))
-            
-            # Finger extension angles (simplified)
-            # Thumb
-            thumb_tip = (hand_landmarks[4 * 3], hand_landmarks[4 * 3 + 1])
-            thumb_base = (hand_landmarks[2 * 3], hand_landmarks[2 * 3 + 1])
-            angles['thumb_extension'] = self.calculate_angle(wrist, thumb_base, thumb_tip)
-            
-            # Index finger
-            index_tip = (hand_landmarks[8 * 3], hand_landmarks[8 * 3 + 1])
-            index_base = (hand_landmarks[5 * 3], hand_landmarks[5 * 3 + 1])
-            angles['index_extension'] = self.calculate_angle(wrist, index_base, index_tip)
-            
-        except Exception as e:
-            print(f"Error calculating hand angles: {e}")
-            angles = {'hand_orientation': 0.0, 'thumb_extension': 0.0, 'index_extension': 0.0}
-        
-        return angles
-    
-    def calculate_all_angles(self, pose_landmarks: np.ndarray, 
+        if len(hand_landmarks) < 21 * 3:  # Need 21 landmarks * 3 coordinates
+            return {}
+
+        return compute_angle_table(self._as_points(hand_landmarks), HAND_ANGLES).frame(0)
+
+    def calculate_all_angles(self, pose_landmarks: np.ndarray,
                            hand_landmarks: Optional[np.ndarray] = None) -> Dict[str, float]:
         """Calculate all key dance angles"""
-        all_angles = {}
-        
-        # Calculate pose angles
-        all_angles.update(self.calculate_arm_angles(pose_landmarks))
-        all_angles.update(self.calculate_body_angles(pose_landmarks))
-        all_angles.update(self.calculate_leg_angles(pose_landmarks))
-        
+        pose_landmarks = np.asarray(pose_landmarks, dtype=np.float64).ravel()
+
+        if len(pose_landmarks) >= _required_length(POSE_ANGLES):
+            # Common case: every pose angle in one batched pass
+            all_angles = compute_angle_table(self._as_points(pose_landmarks), POSE_ANGLES).frame(0)
+        else:
+            all_angles = {}
+            all_angles.update(self.calculate_arm_angles(pose_landmarks))
+            all_angles.update(self.calculate_body_angles(pose_landmarks))
+            all_angles.update(self.calculate_leg_angles(pose_landmarks))
+
         # Calculate hand angles if provided
         if hand_landmarks is not None:
             all_angles.update(self.calculate_hand_angles(hand_landmarks))
-        
+
         return all_angles
-    
+
     def get_angle_summary(self, angles: Dict[str, float]) -> str:
         """Generate a human-readable summary of key angles"""
         summary = []
@@ -240,7 +291,7 @@ class AngleCalculator:
             summary.append(f"Knees: L{angles['left_knee_bend']:.1f}° R{angles['right_knee_bend']:.1f}°")
 
         return " | ".join(summary)
-    
+
     def extract_key_landmarks(self, landmarks_flat: np.ndarray) -> Dict[str, Dict[str, List[float]]]:
         """Extract key landmark positions for LLM feedback."""
         key_landmarks = {
@@ -249,7 +300,7 @@ class AngleCalculator:
             'legs': {},
             'head': {}
         }
-        
+
         # Helper function to get coordinates from flattened landmarks
         def get_coords(landmarks_flat, index):
             start_idx = index * 3
@@ -257,40 +308,40 @@ class AngleCalculator:
             if end_idx <= len(landmarks_flat):
                 return landmarks_flat[start_idx:end_idx].tolist()
             return None
-        
+
         # Extract specific landmarks by index
         key_landmarks['torso']['left_shoulder'] = get_coords(landmarks_flat, self.landmark_indices["left_shoulder"])
         key_landmarks['torso']['right_shoulder'] = get_coords(landmarks_flat, self.landmark_indices["right_shoulder"])
         key_landmarks['torso']['left_hip'] = get_coords(landmarks_flat, self.landmark_indices["left_hip"])
         key_landmarks['torso']['right_hip'] = get_coords(landmarks_flat, self.landmark_indices["right_hip"])
-        
+
         key_landmarks['arms']['left_elbow'] = get_coords(landmarks_flat, self.landmark_indices["left_elbow"])
         key_landmarks['arms']['right_elbow'] = get_coords(landmarks_flat, self.landmark_indices["right_elbow"])
         key_landmarks['arms']['left_wrist'] = get_coords(landmarks_flat, self.landmark_indices["left_wrist"])
         key_landmarks['arms']['right_wrist'] = get_coords(landmarks_flat, self.landmark_indices["right_wrist"])
-        
+
         key_landmarks['legs']['left_knee'] = get_coords(landmarks_flat, self.landmark_indices["left_knee"])
         key_landmarks['legs']['right_knee'] = get_coords(landmarks_flat, self.landmark_indices["right_knee"])
         key_landmarks['legs']['left_ankle'] = get_coords(landmarks_flat, self.landmark_indices["left_ankle"])
         key_landmarks['legs']['right_ankle'] = get_coords(landmarks_flat, self.landmark_indices["right_ankle"])
-        
+
         key_landmarks['head']['head_center'] = get_coords(landmarks_flat, self.landmark_indices["head_center"])
-        
+
         # Filter out None values
         filtered_landmarks = {}
         for category, landmarks in key_landmarks.items():
             filtered_landmarks[category] = {k: v for k, v in landmarks.items() if v is not None}
-        
+
         return filtered_landmarks
 
 # Example usage
 if __name__ == "__main__":
     calculator = AngleCalculator()
-    
+
     # Test with dummy data
     dummy_pose = np.random.random(33 * 3)  # 33 landmarks * 3 coordinates
     dummy_hand = np.random.random(21 * 3)  # 21 hand landmarks * 3 coordinates
-    
+
     angles = calculator.calculate_all_angles(dummy_pose, dummy_hand)
     print("Calculated angles:", angles)
     print("Summary:", calculator.get_angle_summary(angles))
@@ -0,0 +1,224 @@
+"""
+Angle-Space Reference Matching
+
+Alternative matching engine for PoseComparisonService (matching_mode="angles").
+
+Instead of comparing 69-dimensional shoulder-width-scaled coordinates, poses
+are compared in a compact joint-angle feature space (elbows, knees,
+shoulders, hips, trunk lean). Joint angles do not change when the camera
+moves closer, further or sideways, and the reference features are
+precomputed once, so matching against the whole reference is one small
+matrix-vector product.
+
+- Pose similarity: mean cosine of the per-joint angle differences, computed
+  as a dot product of unit-circle embeddings [cos θ, sin θ]
+- Motion similarity: cosine similarity of angular velocity vectors
+- Mirror support: features of the mirrored reference are stacked under the
+  normal ones, so both orientations are scored with one matrix product
+"""
+from typing import Callable, Optional, Sequence, Tuple
+import numpy as np
+from app.services.angle_calculator import AngleSpec, MATCHING_ANGLES, compute_angle_table
+from app.services.pose_mirroring import mirror_landmarks
+
+
+def wrap_radians(angles: np.ndarray) -> np.ndarray:
+    """Wrap angles (or angle differences) to [-pi, pi)."""
+    return (angles + np.pi) % (2 * np.pi) - np.pi
+
+
+class AngleSpaceMatcher:
+    """
+    Reference matcher in joint-angle feature space.
+
+    Stateless per call: the user's angular velocity is computed from the
+    previous pose passed by the caller.
+    """
+
+    def __init__(
+        self,
+        reference_landmarks: np.ndarray,
+        specs: Sequence[AngleSpec] = MATCHING_ANGLES,
+        motion_window: int = 10,
+        mirror: bool = False,
+        reference_angles: Optional[np.ndarray] = None
+    ):
+        """
+        Initialize the matcher and precompute reference features.
+
+        Args:
+            reference_landmarks: Reference landmarks of shape (F, 33, C), C >= 2
+            specs: Joint angles used as features
+            motion_window: Search window (± frames) for motion matching
+            mirror: Also precompute features of the mirrored reference
+            reference_angles: Precomputed (F, K) angles in degrees for specs
+                (e.g. from the reference feature bundle); computed if None
+        """
+        self.specs = tuple(specs)
+        self.motion_window = motion_window
+
+        # (O, F, K) reference angles in radians, O = 1 or 2 orientations
+        # (index 0 = normal, 1 = mirrored)
+        angle_tables = [
+            reference_angles if reference_angles is not None
+            else compute_angle_table(reference_landmarks, self.specs).values
+        ]
+        if mirror:
+            angle_tables.append(compute_angle_table(mirror_landmarks(reference_landmarks), self.specs).values)
+        self.orientation_angles = np.radians(np.stack(angle_tables))
+        self.reference_angles = self.orientation_angles[0]
+        num_frames, num_features = self.reference_angles.shape
+
+        # Unit-circle embedding scaled so that a dot product = mean cos(Δθ),
+        # orientations stacked row-wise: (O * F, 2K)
+        self.orientation_embedding = np.concatenate(
+            [np.cos(self.orientation_angles), np.sin(self.orientation_angles)], axis=2
+        ).reshape(-1, 2 * num_features) / np.sqrt(num_features)
+        self.reference_embedding = self.orientation_embedding[:num_frames]
+
+        # Angular velocity ending at each frame (zero for the first frame)
+        self.orientation_velocities = np.zeros_like(self.orientation_angles)
+        self.orientation_velocities[:, 1:] = wrap_radians(np.diff(self.orientation_angles, axis=1))
+        self.orientation_velocity_norms = np.linalg.norm(self.orientation_velocities, axis=2)
+        self.reference_velocities = self.orientation_velocities[0]
+        self.reference_velocity_norms = self.orientation_velocity_norms[0]
+
+    def __len__(self) -> int:
+        return len(self.reference_angles)
+
+    @property
+    def num_orientations(self) -> int:
+        """1 (normal only) or 2 (normal + mirrored)."""
+        return len(self.orientation_angles)
+
+    def user_angles(self, landmarks: np.ndarray) -> np.ndarray:
+        """
+        Joint-angle features (radians) for one or more user poses.
+
+        Args:
+            landmarks: (33, C) or (N, 33, C) user landmarks
+
+        Returns:
+            (K,) or (N, K) angles
+        """
+        landmarks = np.asarray(landmarks, dtype=np.float64)
+        single = landmarks.ndim == 2
+        angles = np.radians(compute_angle_table(landmarks[np.newaxis] if single else landmarks, self.specs).values)
+        return angles[0] if single else angles
+
+    def pose_scores(self, user_angles: np.ndarray) -> np.ndarray:
+        """
+        Pose similarity with every (normal) reference frame.
+
+        Args:
+            user_angles: (K,) user angles in radians
+
+        Returns:
+            (F,) similarities in [0, 1]
+        """
+        return self._score_embedding(self.reference_embedding, user_angles)
+
+    def orientation_pose_scores(self, user_angles: np.ndarray) -> np.ndarray:
+        """
+        Pose similarity with every reference frame in every orientation (one matrix product).
+
+        Args:
+            user_angles: (K,) user angles in radians
+
+        Returns:
+            (O, F) similarities in [0, 1], row 1 = mirrored reference (if built)
+        """
+        return self._score_embedding(self.orientation_embedding, user_angles).reshape(self.num_orientations, -1)
+
+    def _score_embedding(self, embedding: np.ndarray, user_angles: np.ndarray) -> np.ndarray:
+        """Dot products of reference embedding rows with the user's embedding, clamped to [0, 1]."""
+        user_embedding = np.concatenate([np.cos(user_angles), np.sin(user_angles)]) / np.sqrt(len(user_angles))
+        scores = embedding @ user_embedding
+        return np.clip(np.nan_to_num(scores, nan=0.0), 0.0, 1.0)
+
+    def motion_scores(self, user_velocity: np.ndarray, start: int, end: int, orientation: int = 0) -> np.ndarray:
+        """
+        Motion similarity with reference frames [start, end).
+
+        Args:
+            user_velocity: (K,) user angular velocity in radians
+            start: First reference frame
+            end: End reference frame (exclusive)
+            orientation: 0 = normal reference, 1 = mirrored reference
+
+        Returns:
+            (end - start,) cosine similarities clamped to [0, 1]
+        """
+        user_norm = np.linalg.norm(user_velocity)
+        reference_norms = self.orientation_velocity_norms[orientation, start:end]
+        norms = user_norm * reference_norms
+
+        dots = self.orientation_velocities[orientation, start:end] @ user_velocity
+        valid = norms > 0
+        scores = np.where(valid, dots / np.where(valid, norms, 1.0), 0.0)
+        return np.clip(np.nan_to_num(scores, nan=0.0), 0.0, 1.0)
+
+    def find_best_match(
+        self,
+        user_landmarks: np.ndarray,
+        previous_landmarks: Optional[np.ndarray],
+        pose_weight: float,
+        motion_weight: float,
+        choose_orientation: Optional[Callable[[np.ndarray], int]] = None,
+        search_center: Optional[int] = None
+    ) -> Tuple[int, float, float]:
+        """
+        Find the best matching reference frame.
+
+        Follows the coordinate engine: best pose match first, then the best
+        combined pose + motion score within ±motion_window frames of it.
+
+        Args:
+            user_landmarks: (33, C) current user landmarks
+            previous_landmarks: (33, C) previous user landmarks (None = no motion yet)
+            pose_weight: Weight of pose similarity in the combined score
+            motion_weight: Weight of motion similarity in the combined score
+            choose_orientation: Called with the (O, F) pose scores of all
+                orientations; returns the orientation to match against
+                (None = normal reference only)
+            search_center: Search the best pose within ±motion_window frames
+                of this reference frame (None = whole reference)
+
+        Returns:
+            (best_match_idx, pose_score, motion_score)
+        """
+        if previous_landmarks is not None and np.shape(previous_landmarks) == np.shape(user_landmarks):
+            current_angles, previous_angles = self.user_angles(np.stack([user_landmarks, previous_landmarks]))
+        else:
+            current_angles, previous_angles = self.user_angles(user_landmarks), None
+
+        orientation = 0
+        if choose_orientation is not None:
+            orientation_scores = self.orientation_pose_scores(current_angles)
+            orientation = choose_orientation(orientation_scores)
+            pose_scores = orientation_scores[orientation]
+        else:
+            pose_scores = self.pose_scores(current_angles)
+
+        if search_center is not None:
+            low = int(np.clip(search_center - self.motion_window, 0, len(self) - 1))
+            high = max(low + 1, min(len(self), search_center + self.motion_window + 1))
+            best_match_idx = low + int(np.argmax(pose_scores[low:high]))
+        else:
+            best_match_idx = int(np.argmax(pose_scores))
+        best_pose_score = float(pose_scores[best_match_idx])
+        best_motion_score = 0.0
+
+        if previous_angles is not None and len(self) > 1:
+            user_velocity = np.nan_to_num(wrap_radians(current_angles - previous_angles))
+            start = max(0, best_match_idx - self.motion_window)
+            end = min(len(self), best_match_idx + self.motion_window)
+
+            motion_scores = self.motion_scores(user_velocity, start, end, orientation)
+            if len(motion_scores) > 0:
+                best_motion_score = float(motion_scores.max())
+                combined = pose_weight * pose_scores[start:end] + motion_weight * motion_scores
+                best_match_idx = start + int(np.argmax(combined))
+                best_pose_score = float(pose_scores[best_match_idx])
+
+        return best_match_idx, best_pose_score, best_motion_score
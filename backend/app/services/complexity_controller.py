@@ -0,0 +1,298 @@
+"""
+Adaptive MediaPipe Model Complexity
+
+MediaPipe Pose comes in three model complexities (0 = lite, 1 = full,
+2 = heavy). A fixed level either wastes accuracy on a fast machine or
+queues snapshots on a slow or busy one, since the snapshot endpoint runs
+inference in the request.
+
+ModelComplexityController measures pose inference latency (server-wide
+and per session) and how busy the server is (request time / time between
+requests):
+- Step DOWN when the latency EMA exceeds the budget or utilization exceeds
+  its limit for `downgrade_samples` consecutive snapshots
+- Step UP when both are well below their limits (headroom_ratio) for the
+  longer `upgrade_samples` streak
+
+The gap between the thresholds and the asymmetric streaks are the
+hysteresis that keeps the level from oscillating. PoseModelPool keeps one
+Pose instance per level, so switching does not rebuild graphs.
+"""
+from collections import deque
+import threading
+import time
+from typing import Any, Callable, Deque, Dict, List, Optional, Tuple
+
+
+# Inferences of a newly created model excluded from decisions (graph warm-up)
+WARMUP_SAMPLES = 1
+
+
+class LatencyStats:
+    """Exponential moving average and peak of a latency series."""
+
+    def __init__(self, alpha: float = 0.2):
+        """
+        Args:
+            alpha: EMA weight of the newest sample
+        """
+        self.alpha = alpha
+        self.ema: Optional[float] = None
+        self.peak = 0.0
+        self.count = 0
+
+    def add(self, seconds: float):
+        """Add one latency sample (seconds)."""
+        self.ema = seconds if self.ema is None else self.alpha * seconds + (1 - self.alpha) * self.ema
+        self.peak = max(self.peak, seconds)
+        self.count += 1
+
+    def to_dict(self) -> Dict[str, Any]:
+        """Summary in milliseconds."""
+        return {
+            'count': self.count,
+            'ema_ms': round(self.ema * 1000, 1) if self.ema is not None else None,
+            'peak_ms': round(self.peak * 1000, 1)
+        }
+
+
+class PoseModelPool:
+    """
+    One lazily created pose model per complexity level.
+
+    Usage:
+        pool = PoseModelPool(lambda level: mp.solutions.pose.Pose(model_complexity=level))
+        pose = pool.get(1)
+    """
+
+    def __init__(self, create_pose: Callable[[int], Any]):
+        """
+        Args:
+            create_pose: Factory for a pose model at a complexity level
+        """
+        self.create_pose = create_pose
+        self._models: Dict[int, Any] = {}
+        self._lock = threading.Lock()
+
+    def get(self, level: int) -> Any:
+        """The model for a level, created on first use (creation errors propagate)."""
+        with self._lock:
+            if level not in self._models:
+                self._models[level] = self.create_pose(level)
+            return self._models[level]
+
+    @property
+    def loaded_levels(self) -> List[int]:
+        return sorted(self._models)
+
+    def close(self):
+        """Release all models."""
+        with self._lock:
+            for model in self._models.values():
+                model.close()
+            self._models = {}
+
+
+class ModelComplexityController:
+    """
+    Chooses the pose model complexity from measured latency and load.
+
+    Usage:
+        pose, level = controller.acquire(pool)
+        ... run inference ...
+        controller.record(inference_seconds, request_started, request_seconds, session_stats)
+    """
+
+    def __init__(
+        self,
+        initial_level: int = 1,
+        min_level: int = 0,
+        max_level: int = 2,
+        latency_budget_ms: float = 80.0,
+        max_utilization: float = 0.8,
+        headroom_ratio: float = 0.5,
+        downgrade_samples: int = 5,
+        upgrade_samples: int = 20,
+        ema_alpha: float = 0.2,
+        enabled: bool = True
+    ):
+        """
+        Initialize the controller.
+
+        Args:
+            initial_level: Starting complexity (clamped to [min_level, max_level])
+            min_level: Lowest complexity the controller may choose
+            max_level: Highest complexity the controller may choose
+            latency_budget_ms: Pose inference latency (EMA) to stay under
+            max_utilization: Share of wall time spent processing snapshots
+                above which the server counts as overloaded
+            headroom_ratio: Fraction of both limits to be under before stepping up
+            downgrade_samples: Consecutive violating snapshots before stepping down
+            upgrade_samples: Consecutive snapshots with headroom before stepping up
+            ema_alpha: EMA weight of the newest sample
+            enabled: False keeps the initial level (fixed complexity)
+        """
+        self.levels = list(range(min_level, max_level + 1))
+        self._level = min(max(initial_level, min_level), max_level)
+        self.latency_budget = latency_budget_ms / 1000.0
+        self.max_utilization = max_utilization
+        self.headroom_ratio = headroom_ratio
+        self.downgrade_samples = downgrade_samples
+        self.upgrade_samples = upgrade_samples
+        self.ema_alpha = ema_alpha
+        self.enabled = enabled
+
+        self.latency = LatencyStats(ema_alpha)  # current level since the last switch
+        self.level_latency = {level: LatencyStats(ema_alpha) for level in self.levels}
+        self.utilization: Optional[float] = None
+        self._last_request_start: Optional[float] = None
+        self._over = 0
+        self._under = 0
+        self._warmup = 0
+        self.switches: Deque[Dict[str, Any]] = deque(maxlen=10)
+        self._lock = threading.Lock()
+
+    @property
+    def level(self) -> int:
+        """Model complexity to use for the next inference."""
+        return self._level
+
+    def record(
+        self,
+        inference_seconds: float,
+        request_started: Optional[float] = None,
+        request_seconds: Optional[float] = None,
+        session: Optional[LatencyStats] = None,
+        level: Optional[int] = None
+    ) -> int:
+        """
+        Record one snapshot and adapt the level.
+
+        Args:
+            inference_seconds: Pose inference time at the current level
+            request_started: time.time() when the snapshot request started
+            request_seconds: Local snapshot processing time, excluding remote
+                calls such as LLM feedback (for utilization)
+            session: Per-session latency stats to update as well
+            level: Level the inference ran at (default: the current level);
+                samples from a level switched away from do not drive decisions
+
+        Returns:
+            The level for the next inference
+        """
+        with self._lock:
+            level = self._level if level is None else level
+            if level in self.level_latency:
+                self.level_latency[level].add(inference_seconds)
+            current = level == self._level
+            if current and self._warmup:
+                self._warmup -= 1
+                current = False
+            elif current:
+                self.latency.add(inference_seconds)
+            if session is not None:
+                session.add(inference_seconds)
+
+            if request_started is not None and request_seconds is not None:
+                if self._last_request_start is not None:
+                    interval = request_started - self._last_request_start
+                    busy = min(request_seconds / interval, 1.0) if interval > 0 else 1.0
+                    self.utilization = busy if self.utilization is None else \
+                        self.ema_alpha * busy + (1 - self.ema_alpha) * self.utilization
+                self._last_request_start = request_started
+
+            if self.enabled and current:
+                self._adapt()
+            return self._level
+
+    def _adapt(self):
+        utilization = self.utilization or 0.0
+        over_latency = self.latency.ema > self.latency_budget
+        overloaded = utilization > self.max_utilization
+        headroom = (
+            self.latency.ema < self.headroom_ratio * self.latency_budget
+            and utilization < self.headroom_ratio * self.max_utilization
+        )
+
+        self._over = self._over + 1 if over_latency or overloaded else 0
+        self._under = self._under + 1 if headroom else 0
+
+        position = self.levels.index(self._level)
+        if self._over >= self.downgrade_samples and position > 0:
+            reason = "latency" if over_latency else "load"
+            self._switch(self.levels[position - 1], reason)
+        elif self._under >= self.upgrade_samples and position < len(self.levels) - 1:
+            self._switch(self.levels[position + 1], "headroom")
+
+    def _switch(self, level: int, reason: str):
+        self.switches.append({
+            'time': time.time(),
+            'from': self._level,
+            'to': level,
+            'reason': reason,
+            'latency_ms': round(self.latency.ema * 1000, 1) if self.latency.ema is not None else None,
+            'utilization': round(self.utilization or 0.0, 3)
+        })
+        print(f"[Complexity] Model complexity {self._level} -> {level} ({reason})")
+        self._level = level
+        self.latency = LatencyStats(self.ema_alpha)
+        self._over = 0
+        self._under = 0
+
+    def acquire(self, pool: PoseModelPool) -> Tuple[Any, int]:
+        """
+        The pool's model at the current level.
+
+        Levels whose model fails to load (e.g. the lite and heavy models are
+        downloaded on first use) are dropped, falling back to the next lower
+        level (or the next higher one if none is lower).
+
+        Returns:
+            (model, level)
+        """
+        while True:
+            level = self.level
+            fresh = level not in pool.loaded_levels
+            try:
+                model = pool.get(level)
+            except Exception as e:
+                print(f"[Complexity] Model complexity {level} unavailable: {e}")
+                if not self.drop_level(level):
+                    raise
+                continue
+            if fresh:
+                # A new model's first inference includes graph initialization
+                with self._lock:
+                    self._warmup += WARMUP_SAMPLES
+            return model, level
+
+    def drop_level(self, level: int) -> bool:
+        """
+        Stop using a level (e.g. its model failed to load).
+
+        Returns:
+            False if no level is left
+        """
+        with self._lock:
+            if level not in self.levels:
+                return bool(self.levels)
+            position = self.levels.index(level)
+            self.levels.remove(level)
+            if not self.levels:
+                return False
+            if self._level == level:
+                self._switch(self.levels[max(position - 1, 0)], "unavailable")
+            return True
+
+    def get_stats(self) -> Dict[str, Any]:
+        """Active level, latency and utilization, and recent switches."""
+        return {
+            'level': self._level,
+            'adaptive': self.enabled,
+            'levels': list(self.levels),
+            'latency_budget_ms': round(self.latency_budget * 1000, 1),
+            'latency': self.latency.to_dict(),
+            'latency_by_level': {level: stats.to_dict() for level, stats in self.level_latency.items()},
+            'utilization': round(self.utilization, 3) if self.utilization is not None else None,
+            'switches': list(self.switches)
+        }
@@ -14,7 +14,8 @@ import base64
 import json
 import os
 import re
-from typing import Dict, List, Optional, Tuple, Union
+import threading
+from typing import Any, Callable, Dict, List, Optional, Tuple, Union
 from dataclasses import dataclass
 from collections import deque
 import time
@@ -24,6 +25,11 @@ import cv2
 import numpy as np
 from PIL import Image
 from io import BytesIO
+from app.data.config import settings
+from app.services.feedback_cache import FeedbackCache, image_signature
+from app.services.frame_input import decode_image, landmark_box
+from app.services.joint_errors import JointErrorDetector
+from app.services.limb_similarity import LimbSimilarity
 
 # Load environment variables
 load_dotenv()
@@ -83,7 +89,12 @@ class DualSnapshotService:
     using GPT-4o vision API for real-time dance feedback.
     """
     
-    def __init__(self):
+    def __init__(self, pose_factory: Optional[Callable[[], Any]] = None):
+        """
+        Args:
+            pose_factory: Factory for the MediaPipe Pose instance used to
+                measure both frames locally (static-image mode if None)
+        """
         api_key = os.getenv("OPENAI_API_KEY")
         if not api_key:
             raise ValueError("OPENAI_API_KEY environment variable is not set")
@@ -96,6 +107,25 @@ class DualSnapshotService:
         self.tier2_analysis_interval = 3.0  # Run Tier 2 analysis every 3 seconds for better readability
         self.last_tier2_analysis = -999.0  # Initialize to negative value to prevent early triggers
         self.tier2_analysis_in_progress = False  # Prevent concurrent Tier 2 analyses
+
+        # Narrative cache keyed on the reference time bucket and the dancer's
+        # person-box hash (shared across sessions)
+        self.response_cache = FeedbackCache()
+
+        # Local pose measurement of both frames (score, joint errors, person box)
+        self.pose_factory = pose_factory or self._default_pose_factory
+        self._pose = None
+        self._pose_lock = threading.Lock()
+
+    @staticmethod
+    def _default_pose_factory():
+        import mediapipe as mp
+        return mp.solutions.pose.Pose(
+            static_image_mode=True,
+            model_complexity=1,
+            enable_segmentation=False,
+            min_detection_confidence=settings.mediapipe_min_detection_confidence
+        )
         
     def downscale_image_for_openai(self, frame: np.ndarray, max_width: int = 640, max_height: int = 480) -> np.ndarray:
         """
@@ -232,12 +262,133 @@ class DualSnapshotService:
             print(f"[DualSnapshot] Error extracting reference frame: {e}")
             return None
     
+    def _pose_input_size(self, width: int, height: int) -> Tuple[int, int]:
+        """Decode size for pose detection: the frame fitted into max_image_size."""
+        scale = min(self.max_image_size[0] / width, self.max_image_size[1] / height, 1.0)
+        return max(int(width * scale), 1), max(int(height * scale), 1)
+
+    def _detect_landmarks(self, image_base64: str) -> Optional[np.ndarray]:
+        """(33, 4) pose landmarks of a base64 image or data URL (None if no pose)."""
+        if image_base64.startswith("data:"):
+            image_base64 = image_base64.split(",", 1)[1]
+        try:
+            rgb = decode_image(image_base64, self._pose_input_size)
+            with self._pose_lock:
+                if self._pose is None:
+                    self._pose = self.pose_factory()
+                results = self._pose.process(rgb)
+        except Exception as e:
+            print(f"[DualSnapshot] Pose detection failed: {e}")
+            return None
+        if not results.pose_landmarks:
+            return None
+        return np.array([[lm.x, lm.y, lm.z, lm.visibility] for lm in results.pose_landmarks.landmark])
+
+    def _analyze_poses(self, snapshot_data: DualSnapshotData) -> Optional[Dict[str, Any]]:
+        """
+        Compare the dancer's pose with the reference frame's pose locally.
+
+        Returns:
+            {"landmarks": (33, 4) dancer landmarks, "similarity_score": mean
+            per-limb similarity, "errors": JointErrorDetector errors}, or None
+            if either frame has no pose
+        """
+        user_landmarks = self._detect_landmarks(snapshot_data.webcam_frame_base64)
+        if user_landmarks is None:
+            return None
+        reference_landmarks = self._detect_landmarks(snapshot_data.reference_frame_base64)
+        if reference_landmarks is None:
+            return None
+
+        reference_frames = reference_landmarks[np.newaxis]
+        limb_scores = LimbSimilarity(reference_frames).compare_array(user_landmarks, 0)
+        return {
+            "landmarks": user_landmarks,
+            "similarity_score": float(np.mean(limb_scores)) if limb_scores is not None else 0.0,
+            "errors": JointErrorDetector(reference_frames).detect(user_landmarks, 0)
+        }
+
+    def _build_cache_key(self, snapshot_data: DualSnapshotData, user_landmarks: Optional[np.ndarray]) -> Optional[tuple]:
+        """
+        Build the response cache key for a dual snapshot.
+
+        The reference position is a bucket of the reference video time and the
+        dancer's pose a finer hash of the webcam frame inside the person box,
+        so the background (which dominates a whole-frame hash) cannot map
+        different poses to the same key.
+        """
+        box = landmark_box(user_landmarks) if user_landmarks is not None else None
+        if box is None:
+            return None
+        person_hash = image_signature(
+            snapshot_data.webcam_frame_base64, hash_size=settings.dual_cache_hash_size, box=box
+        )
+        if person_hash is None:
+            return None
+        time_bucket = int(snapshot_data.video_current_time // settings.dual_cache_time_bucket_seconds)
+        return ("dual", time_bucket, person_hash)
+
+    def _build_feedback_result(
+        self,
+        snapshot_data: DualSnapshotData,
+        narrative: Tuple[str, Tuple[str, ...]],
+        analysis: Dict[str, Any]
+    ) -> DanceFeedbackResult:
+        """
+        Pair the LLM narrative with this snapshot's locally measured fields.
+
+        Shared by fresh analyses and cache hits, so a cached narrative is
+        always returned with the current pose's score, severity and issues.
+
+        Args:
+            snapshot_data: Current dual snapshot
+            narrative: (feedback_text, recommendations) written by the LLM
+            analysis: Output of _analyze_poses()
+        """
+        feedback_text, recommendations = narrative
+        score = analysis["similarity_score"]
+        errors = analysis["errors"]
+
+        if score < 0.5 or len(errors) >= 3:
+            severity = "high"
+        elif score < 0.7 or errors:
+            severity = "medium"
+        else:
+            severity = "low"
+
+        return DanceFeedbackResult(
+            timestamp=snapshot_data.timestamp,
+            feedback_text=feedback_text,
+            severity=severity,
+            focus_areas=[error["body_part"] for error in errors[:2]] or ["general"],
+            similarity_score=round(score, 3),
+            is_positive=score > 0.7 or "good" in feedback_text.lower(),
+            specific_issues=[
+                f"{error['body_part'].replace('_', ' ')} is {abs(error['difference']):.0f}° off the reference"
+                for error in errors[:3]
+            ],
+            recommendations=list(recommendations)
+        )
+
+    def get_cache_statistics(self) -> Dict:
+        """Get response cache statistics for monitoring."""
+        return self.response_cache.get_statistics()
+
     async def analyze_dual_snapshot(self, snapshot_data: DualSnapshotData) -> DanceFeedbackResult:
         """
         Analyze both webcam and reference video frames using GPT-4o vision API
         to provide detailed dance pose comparison feedback.
         """
         print(f"[DualSnapshot] Analyzing dual snapshot at {snapshot_data.timestamp}s...")
+
+        # Measure both poses locally (off the event loop), then serve repeated
+        # situations from the cache before paying for a completion
+        analysis = await asyncio.get_running_loop().run_in_executor(None, self._analyze_poses, snapshot_data)
+        cache_key = self._build_cache_key(snapshot_data, analysis["landmarks"] if analysis else None)
+        cached_narrative = self.response_cache.get(cache_key) if cache_key else None
+        if cached_narrative is not None:
+            print(f"[DualSnapshot] Serving cached narrative for {snapshot_data.timestamp}s")
+            return self._build_feedback_result(snapshot_data, cached_narrative, analysis)
         
         # Downscale both images for OpenAI API
         webcam_data_url = self.downscale_data_url(snapshot_data.webcam_frame_base64)
@@ -375,6 +526,15 @@ class DualSnapshotService:
                     print(f"[DualSnapshot] Extracted similarity_score: {similarity_score}")
                     print(f"[DualSnapshot] Extracted severity: {severity}")
                     
+                    # Per-frame fields come from the local measurement when both poses were found
+                    narrative = (feedback_text, tuple(recommendations))
+                    if analysis is not None:
+                        feedback_result = self._build_feedback_result(snapshot_data, narrative, analysis)
+                        if cache_key:
+                            self.response_cache.put(cache_key, narrative)
+                        print(f"[DualSnapshot] Returning feedback_result: {feedback_result.feedback_text}")
+                        return feedback_result
+
                     # Create and return the result immediately after JSON parsing
                     feedback_result = DanceFeedbackResult(
                         timestamp=snapshot_data.timestamp,
@@ -0,0 +1,272 @@
+"""
+Feedback Response Cache
+
+Serves repeated coaching situations without paying for a fresh LLM completion.
+
+Consecutive snapshots often describe the same situation: the same stretch of
+the reference, the same score band and the same failing joints. Instead of
+keying on raw inputs (which never repeat exactly), callers build a quantized
+feature signature and use it as the cache key:
+
+- Reference index bucket (where in the choreography the dancer is)
+- Score bucket (how well they are matching)
+- Sorted focus areas (which body parts are off)
+- Error directions (which way each body part is off)
+
+Entries expire after a TTL and the least recently used entry is evicted when
+the cache is full. The cache is process-wide, so repeated situations are
+served both within and across sessions.
+"""
+from typing import Any, Dict, Hashable, Iterable, Optional, Tuple
+from collections import OrderedDict
+from dataclasses import dataclass
+import base64
+import threading
+import time
+import numpy as np
+import cv2
+from app.data.config import settings
+
+
+@dataclass
+class CacheEntry:
+    """Single cached response with hit statistics."""
+    value: Any
+    created_at: float
+    hits: int = 0
+    last_hit_at: Optional[float] = None
+
+
+class FeedbackCache:
+    """
+    TTL + LRU cache for generated feedback.
+
+    Values are stored as-is; callers should cache immutable payloads
+    (e.g. feedback text) and rebuild per-snapshot fields on a hit.
+    """
+
+    def __init__(
+        self,
+        max_entries: Optional[int] = None,
+        ttl_seconds: Optional[float] = None,
+        enabled: Optional[bool] = None
+    ):
+        """
+        Initialize the cache.
+
+        Args:
+            max_entries: Maximum number of entries before LRU eviction
+            ttl_seconds: Seconds an entry stays valid after it was stored
+            enabled: If False, every lookup misses and nothing is stored
+        """
+        self.max_entries = max_entries if max_entries is not None else settings.feedback_cache_max_entries
+        self.ttl_seconds = ttl_seconds if ttl_seconds is not None else settings.feedback_cache_ttl_seconds
+        self.enabled = enabled if enabled is not None else settings.feedback_cache_enabled
+
+        self._entries: "OrderedDict[Hashable, CacheEntry]" = OrderedDict()
+        self._lock = threading.Lock()
+
+        # Statistics
+        self.total_hits = 0
+        self.total_misses = 0
+        self.total_evictions = 0
+        self.total_expirations = 0
+
+    def get(self, key: Hashable) -> Optional[Any]:
+        """
+        Look up a cached value.
+
+        Args:
+            key: Feature signature built by the caller
+
+        Returns:
+            Cached value, or None on a miss or expired entry
+        """
+        if not self.enabled:
+            return None
+
+        now = time.time()
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                self.total_misses += 1
+                return None
+
+            if now - entry.created_at > self.ttl_seconds:
+                del self._entries[key]
+                self.total_expirations += 1
+                self.total_misses += 1
+                return None
+
+            # Mark as most recently used
+            self._entries.move_to_end(key)
+            entry.hits += 1
+            entry.last_hit_at = now
+            self.total_hits += 1
+            return entry.value
+
+    def put(self, key: Hashable, value: Any):
+        """
+        Store a value, evicting the least recently used entry if full.
+
+        Args:
+            key: Feature signature built by the caller
+            value: Value to cache
+        """
+        if not self.enabled or self.max_entries <= 0:
+            return
+
+        with self._lock:
+            if key in self._entries:
+                self._entries.move_to_end(key)
+            self._entries[key] = CacheEntry(value=value, created_at=time.time())
+
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+                self.total_evictions += 1
+
+    def clear(self):
+        """Remove all entries (statistics are preserved)."""
+        with self._lock:
+            self._entries.clear()
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def get_statistics(self, top_n: int = 5) -> Dict[str, Any]:
+        """
+        Get cache statistics for monitoring.
+
+        Args:
+            top_n: Number of most-hit entries to include
+
+        Returns:
+            Statistics dictionary with totals and per-entry hit counts
+        """
+        with self._lock:
+            lookups = self.total_hits + self.total_misses
+            top_entries = sorted(
+                self._entries.items(),
+                key=lambda item: item[1].hits,
+                reverse=True
+            )[:top_n]
+
+            return {
+                "enabled": self.enabled,
+                "size": len(self._entries),
+                "max_entries": self.max_entries,
+                "ttl_seconds": self.ttl_seconds,
+                "total_hits": self.total_hits,
+                "total_misses": self.total_misses,
+                "total_evictions": self.total_evictions,
+                "total_expirations": self.total_expirations,
+                "hit_rate": self.total_hits / lookups if lookups > 0 else 0.0,
+                "top_entries": [
+                    {
+                        "key": repr(key),
+                        "hits": entry.hits,
+                        "age_seconds": time.time() - entry.created_at
+                    }
+                    for key, entry in top_entries
+                ]
+            }
+
+
+def _error_direction(error: Dict[str, Any]) -> str:
+    """Reduce an error to the direction the body part is off by."""
+    direction = error.get("direction")
+    if direction:
+        return str(direction)
+
+    difference = error.get("difference")
+    if isinstance(difference, (int, float)):
+        return "+" if difference >= 0 else "-"
+    return "?"
+
+
+def build_feedback_signature(
+    reference_index: int,
+    combined_score: float,
+    focus_areas: Iterable[str],
+    errors: Iterable[Dict[str, Any]] = (),
+    index_bucket_size: Optional[int] = None,
+    score_bucket_size: Optional[float] = None
+) -> Tuple:
+    """
+    Build a quantized feature signature for a feedback situation.
+
+    Args:
+        reference_index: Matched reference frame index
+        combined_score: Overall similarity score (0.0-1.0)
+        focus_areas: Body parts the feedback focuses on
+        errors: Detected errors (body_part + difference/direction)
+        index_bucket_size: Reference frames per bucket (config default if None)
+        score_bucket_size: Score width per bucket (config default if None)
+
+    Returns:
+        Hashable signature tuple
+    """
+    index_bucket_size = index_bucket_size or settings.feedback_cache_index_bucket
+    score_bucket_size = score_bucket_size or settings.feedback_cache_score_bucket
+
+    score = min(max(float(combined_score), 0.0), 1.0)
+    error_directions = tuple(sorted(
+        (error.get("body_part", "unknown"), _error_direction(error))
+        for error in errors
+    ))
+
+    return (
+        int(reference_index) // max(1, int(index_bucket_size)),
+        int(score / score_bucket_size),
+        tuple(sorted(focus_areas)),
+        error_directions
+    )
+
+
+def image_signature(
+    image_base64: str,
+    hash_size: int = 8,
+    box: Optional[Tuple[float, float, float, float]] = None
+) -> Optional[int]:
+    """
+    Compute a perceptual (average) hash of a base64 image.
+
+    The image is decoded in grayscale at reduced scale (1/8, or 1/2 when
+    hashing a box), shrunk to hash_size x hash_size and thresholded at its
+    mean, so small changes in lighting or compression map to the same
+    signature.
+
+    Args:
+        image_base64: Base64 image, optionally as a data URL
+        hash_size: Side length of the hash grid
+        box: Normalized (x0, y0, x1, y1) region to hash instead of the whole
+            image (e.g. the person box, so the background does not dominate)
+
+    Returns:
+        Integer hash, or None if the image cannot be decoded
+    """
+    try:
+        if image_base64.startswith("data:"):
+            image_base64 = image_base64.split(",", 1)[1]
+
+        image_bytes = base64.b64decode(image_base64 + "=" * (-len(image_base64) % 4))
+        buffer = np.frombuffer(image_bytes, np.uint8)
+        image = cv2.imdecode(buffer, cv2.IMREAD_REDUCED_GRAYSCALE_2 if box else cv2.IMREAD_REDUCED_GRAYSCALE_8)
+        if image is None:
+            return None
+
+        if box is not None:
+            height, width = image.shape[:2]
+            x0, y0 = int(box[0] * width), int(box[1] * height)
+            x1 = max(int(np.ceil(box[2] * width)), x0 + 1)
+            y1 = max(int(np.ceil(box[3] * height)), y0 + 1)
+            image = image[y0:y1, x0:x1]
+
+        small = cv2.resize(image, (hash_size, hash_size), interpolation=cv2.INTER_AREA)
+        bits = (small > small.mean()).flatten()
+        return int(np.packbits(bits).tobytes().hex(), 16)
+
+    except Exception as e:
+        print(f"[FeedbackCache] Could not hash image: {e}")
+        return None
+
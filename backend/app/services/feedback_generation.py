@@ -4,11 +4,151 @@ Feedback Generation Service
 Converts technical pose comparison data into human-readable feedback using OpenAI LLM.
 This service is called AFTER dance sections complete (batch processing, not real-time).
 """
-from typing import List, Dict, Any, Optional
-from openai import OpenAI
+from typing import List, Dict, Any, Optional, Deque
+from collections import deque
+from dataclasses import dataclass, field
+import asyncio
+from openai import AsyncOpenAI, OpenAI
 from app.data.config import settings
 
 
+@dataclass
+class SessionAggregates:
+    """
+    Running aggregates of a session's live feedback.
+
+    Everything a session summary needs is folded in one record at a time,
+    so the summary can be built without re-scanning the feedback history.
+    """
+    feedback_count: int = 0
+    positive_count: int = 0
+    severity_counts: Dict[str, int] = field(
+        default_factory=lambda: {'high': 0, 'medium': 0, 'low': 0}
+    )
+    focus_area_counts: Dict[str, int] = field(default_factory=dict)
+    focus_area_samples: Dict[str, str] = field(default_factory=dict)  # First feedback per area
+    similarity_scores: List[float] = field(default_factory=list)  # For early/late trend
+
+    # Prompt samples: first 5 records plus the last 2
+    first_feedback: List[Dict[str, Any]] = field(default_factory=list)
+    last_feedback: Deque[Dict[str, Any]] = field(default_factory=lambda: deque(maxlen=2))
+
+    def add(self, feedback: Dict[str, Any]):
+        """Fold one live feedback record into the aggregates."""
+        self.feedback_count += 1
+        if feedback.get('is_positive', False):
+            self.positive_count += 1
+
+        severity = feedback.get('severity')
+        if severity in self.severity_counts:
+            self.severity_counts[severity] += 1
+
+        for area in feedback.get('focus_areas', []):
+            self.focus_area_counts[area] = self.focus_area_counts.get(area, 0) + 1
+            if area not in self.focus_area_samples:
+                self.focus_area_samples[area] = feedback.get('feedback_text', '')
+
+        self.similarity_scores.append(feedback.get('similarity_score', 0))
+
+        if len(self.first_feedback) < 5:
+            self.first_feedback.append(feedback)
+        self.last_feedback.append(feedback)
+
+    def common_problems(self, limit: int = 5) -> List[tuple]:
+        """Most frequent focus areas as (area, count), highest first."""
+        return sorted(
+            self.focus_area_counts.items(),
+            key=lambda x: x[1],
+            reverse=True
+        )[:limit]
+
+    def sample_feedback(self) -> List[Dict[str, Any]]:
+        """Sample of feedback for prompts (first 3 and last 2 records)."""
+        if self.feedback_count > 5:
+            return self.first_feedback[:3] + list(self.last_feedback)
+        return list(self.first_feedback)
+
+    def copy(self) -> 'SessionAggregates':
+        """Snapshot the aggregates (safe to read while recording continues)."""
+        return SessionAggregates(
+            feedback_count=self.feedback_count,
+            positive_count=self.positive_count,
+            severity_counts=dict(self.severity_counts),
+            focus_area_counts=dict(self.focus_area_counts),
+            focus_area_samples=dict(self.focus_area_samples),
+            similarity_scores=list(self.similarity_scores),
+            first_feedback=list(self.first_feedback),
+            last_feedback=deque(self.last_feedback, maxlen=2)
+        )
+
+
+class FeedbackStream:
+    """
+    Feedback requests started one at a time that share one client,
+    concurrency limit and per-item deadline.
+
+    generate_feedback_async() fans a whole batch out through a stream; a live
+    session keeps one open and submits each problem segment as it is found,
+    so its feedback is ready (or nearly) by the time the session ends. Must
+    be used from a single event loop.
+    """
+
+    def __init__(
+        self,
+        service: 'FeedbackGenerationService',
+        max_concurrency: Optional[int] = None,
+        item_deadline: Optional[float] = None
+    ):
+        """
+        Initialize the stream.
+
+        Args:
+            service: Service that builds the prompts and fallback feedback
+            max_concurrency: Maximum concurrent LLM requests (uses config default if None)
+            item_deadline: Seconds an item's request may take before it falls back to a
+                template, counted from when the request starts (uses config default if None)
+        """
+        self.service = service
+        self.item_deadline = item_deadline or settings.llm_item_deadline_seconds
+        self._semaphore = asyncio.Semaphore(max(1, max_concurrency or settings.llm_max_concurrency))
+        self._client: Optional[AsyncOpenAI] = None
+
+    def submit(self, segment: Dict[str, Any]) -> 'asyncio.Task[Dict[str, Any]]':
+        """
+        Start generating feedback for one segment in the background.
+
+        Args:
+            segment: Problem segment (see FeedbackGenerationService.generate_feedback())
+
+        Returns:
+            Task resolving to the feedback item; cancel it if the item is no longer needed
+        """
+        return asyncio.get_running_loop().create_task(self._generate_with_fallback(segment))
+
+    async def close(self):
+        """Close the shared client (after all submitted items have finished)."""
+        if self._client is not None:
+            await self._client.close()
+            self._client = None
+
+    async def _generate_with_fallback(self, segment: Dict[str, Any]) -> Dict[str, Any]:
+        # The deadline starts once the request does, not while queued for the semaphore
+        async with self._semaphore:
+            if self._client is None:
+                self._client = AsyncOpenAI(api_key=settings.openai_api_key)
+            try:
+                return await asyncio.wait_for(
+                    self.service._generate_single_feedback_async(self._client, segment),
+                    timeout=self.item_deadline
+                )
+            except asyncio.TimeoutError:
+                print(f"LLM feedback missed {self.item_deadline:.1f}s deadline. Using fallback.")
+            except Exception as e:
+                print(f"LLM feedback generation failed: {e}. Using fallback.")
+        # Fallback to template-based feedback if LLM fails
+        return self.service._generate_fallback_feedback(segment)
+
+
 class FeedbackGenerationService:
     """
     Service for generating AI-powered dance feedback.
@@ -40,6 +180,11 @@ class FeedbackGenerationService:
         """
         Generate feedback for detected problem segments.
 
+        Synchronous wrapper around generate_feedback_async(). All segments are
+        sent to the LLM concurrently, so the call takes roughly one LLM
+        round-trip regardless of the number of items. Async callers must
+        await generate_feedback_async() instead (RuntimeError otherwise).
+
         Args:
             problem_segments: List of problem segments with technical error data.
                 Each segment should have:
@@ -57,7 +202,41 @@ class FeedbackGenerationService:
             - severity: str ("high", "medium", "low")
             - body_parts: List[str]
         """
+        try:
+            asyncio.get_running_loop()
+        except RuntimeError:
+            return asyncio.run(self.generate_feedback_async(problem_segments, max_items))
+
+        # Blocking here would stall the caller's event loop for the whole batch
+        raise RuntimeError("generate_feedback() called inside a running event loop; await generate_feedback_async()")
+
+    async def generate_feedback_async(
+        self,
+        problem_segments: List[Dict[str, Any]],
+        max_items: Optional[int] = None,
+        max_concurrency: Optional[int] = None,
+        item_deadline: Optional[float] = None
+    ) -> List[Dict[str, Any]]:
+        """
+        Generate feedback for problem segments concurrently.
+
+        Segments are fanned out under a bounded semaphore. Any item that fails
+        or misses its deadline gets template-based feedback instead, so one
+        slow request never holds up the batch.
+
+        Args:
+            problem_segments: List of problem segments (see generate_feedback())
+            max_items: Maximum number of feedback items (uses config default if None)
+            max_concurrency: Maximum concurrent LLM requests (uses config default if None)
+            item_deadline: Seconds an item's request may take before it falls back to a
+                template, counted from when the request starts (uses config default if None)
+
+        Returns:
+            List of feedback dictionaries, ordered from biggest problem to smallest
+        """
         max_items = max_items or settings.max_feedback_items_per_section
+        max_concurrency = max_concurrency or settings.llm_max_concurrency
+        item_deadline = item_deadline or settings.llm_item_deadline_seconds
 
         # Limit to most significant problems
         sorted_segments = sorted(
@@ -65,18 +244,15 @@ class FeedbackGenerationService:
             key=lambda x: x.get('accuracy', 1.0)  # Lower accuracy = bigger problem
         )[:max_items]
 
-        feedback_items = []
-
-        for segment in sorted_segments:
-            try:
-                feedback_item = self._generate_single_feedback(segment)
-                feedback_items.append(feedback_item)
-            except Exception as e:
-                # Fallback to template-based feedback if LLM fails
-                feedback_items.append(self._generate_fallback_feedback(segment))
-                print(f"LLM feedback generation failed: {e}. Using fallback.")
+        if not sorted_segments:
+            return []
 
-        return feedback_items
+        stream = FeedbackStream(self, max_concurrency, item_deadline)
+        try:
+            # gather() preserves input order
+            return list(await asyncio.gather(*(stream.submit(segment) for segment in sorted_segments)))
+        finally:
+            await stream.close()
 
     def _generate_single_feedback(self, segment: Dict[str, Any]) -> Dict[str, Any]:
         """
@@ -88,41 +264,82 @@ class FeedbackGenerationService:
         Returns:
             Feedback dictionary
         """
-        # Construct the prompt with structured error data
-        prompt = self._build_prompt(segment)
-
-        # Call OpenAI API
         response = self.client.chat.completions.create(
             model=self.model,
-            messages=[
-                {
-                    "role": "system",
-                    "content": (
-                        "You are a friendly and encouraging K-pop dance instructor. "
-                        "Your job is to help students improve their dance technique by "
-                        "providing specific, actionable feedback based on technical error data. "
-                        "Keep feedback conversational, positive, and under 100 words."
-                    )
-                },
-                {
-                    "role": "user",
-                    "content": prompt
-                }
-            ],
+            messages=self._build_messages(segment),
+            max_tokens=self.max_tokens,
+            temperature=self.temperature
+        )
+
+        return self._build_feedback_item(segment, response.choices[0].message.content.strip())
+
+    async def _generate_single_feedback_async(
+        self,
+        client: AsyncOpenAI,
+        segment: Dict[str, Any]
+    ) -> Dict[str, Any]:
+        """
+        Generate feedback for a single problem segment without blocking the event loop.
+
+        Args:
+            client: Async OpenAI client shared by the batch
+            segment: Problem segment data with errors and timing
+
+        Returns:
+            Feedback dictionary
+        """
+        response = await client.chat.completions.create(
+            model=self.model,
+            messages=self._build_messages(segment),
             max_tokens=self.max_tokens,
             temperature=self.temperature
         )
 
-        feedback_text = response.choices[0].message.content.strip()
+        return self._build_feedback_item(segment, response.choices[0].message.content.strip())
+
+    def _build_messages(self, segment: Dict[str, Any]) -> List[Dict[str, str]]:
+        """
+        Build the chat messages for a problem segment.
 
+        Args:
+            segment: Problem segment data
+
+        Returns:
+            System + user messages for the chat completion
+        """
+        return [
+            {
+                "role": "system",
+                "content": (
+                    "You are a friendly and encouraging K-pop dance instructor. "
+                    "Your job is to help students improve their dance technique by "
+                    "providing specific, actionable feedback based on technical error data. "
+                    "Keep feedback conversational, positive, and under 100 words."
+                )
+            },
+            {
+                "role": "user",
+                "content": self._build_prompt(segment)
+            }
+        ]
+
+    def _build_feedback_item(self, segment: Dict[str, Any], feedback_text: str) -> Dict[str, Any]:
+        """
+        Wrap generated feedback text into a feedback dictionary.
+
+        Args:
+            segment: Problem segment data
+            feedback_text: Feedback text from the LLM
+
+        Returns:
+            Feedback dictionary
+        """
         # Extract body parts and determine severity
         body_parts = list(set(
             error.get('body_part', 'unknown')
             for error in segment.get('errors', [])
         ))
 
-        severity = self._calculate_severity(segment)
-
         # Calculate midpoint timestamp for the feedback
         timestamp = (
             segment.get('timestamp_start', 0) + segment.get('timestamp_end', 0)
@@ -132,7 +349,7 @@ class FeedbackGenerationService:
             "timestamp": timestamp,
             "title": self._generate_title(segment),
             "feedback": feedback_text,
-            "severity": severity,
+            "severity": self._calculate_severity(segment),
             "body_parts": body_parts
         }
 
@@ -159,8 +376,8 @@ Technical errors detected:
 
         for error in errors:
             body_part = error.get('body_part', 'unknown')
-            expected = error.get('expected', 'N/A')
-            actual = error.get('actual', 'N/A')
+            expected = error.get('expected', error.get('expected_angle', 'N/A'))
+            actual = error.get('actual', error.get('actual_angle', 'N/A'))
             difference = error.get('difference', 'N/A')
 
             prompt += f"- {body_part}: expected {expected}, got {actual} (difference: {difference})\n"
@@ -295,7 +512,33 @@ Keep it conversational and under 100 words."""
             - session_statistics: Dict (passed through)
             - feedback_count: int (total feedback items)
         """
-        if not live_feedback_history:
+        aggregates = SessionAggregates()
+        for feedback in live_feedback_history:
+            aggregates.add(feedback)
+
+        return self.build_session_summary(aggregates, session_statistics)
+
+    def build_session_summary(
+        self,
+        aggregates: SessionAggregates,
+        session_statistics: Dict[str, Any],
+        overall_summary: Optional[str] = None,
+        use_llm: bool = True
+    ) -> Dict[str, Any]:
+        """
+        Build a session summary from running feedback aggregates.
+
+        Args:
+            aggregates: Running aggregates of the session's live feedback
+            session_statistics: Session stats from ScoringService
+            overall_summary: Pre-generated narrative (e.g. a background draft).
+                If None, one is generated (LLM if use_llm, else template).
+            use_llm: Whether a missing narrative may be generated with the LLM
+
+        Returns:
+            Same structure as generate_session_summary()
+        """
+        if aggregates.feedback_count == 0:
             return {
                 "overall_summary": "No feedback data available for this session.",
                 "key_insights": [],
@@ -305,39 +548,66 @@ Keep it conversational and under 100 words."""
                 "feedback_count": 0
             }
 
-        # Analyze the feedback history
-        total_feedback = len(live_feedback_history)
-        negative_feedback = [f for f in live_feedback_history if not f.get('is_positive', False)]
-        positive_feedback = [f for f in live_feedback_history if f.get('is_positive', False)]
+        common_problems = aggregates.common_problems()
 
-        # Extract common problem areas
-        focus_area_counts = {}
-        for feedback in live_feedback_history:
-            for area in feedback.get('focus_areas', []):
-                focus_area_counts[area] = focus_area_counts.get(area, 0) + 1
+        if overall_summary is None:
+            if use_llm:
+                overall_summary = self.generate_summary_narrative(aggregates, session_statistics)
+            else:
+                overall_summary = self._generate_fallback_session_summary(
+                    session_statistics.get('average_score', 0.0),
+                    aggregates.feedback_count,
+                    common_problems
+                )
 
-        # Sort to find most frequent problem areas
-        common_problems = sorted(
-            focus_area_counts.items(),
-            key=lambda x: x[1],
-            reverse=True
-        )[:5]  # Top 5 problem areas
+        # Extract key insights
+        key_insights = self._extract_key_insights(
+            aggregates.similarity_scores, session_statistics, common_problems
+        )
+
+        # Generate improvement areas with recommendations
+        improvement_areas = self._generate_improvement_areas(
+            common_problems, aggregates.focus_area_samples
+        )
+
+        # Extract strengths
+        strengths = self._extract_strengths(session_statistics, aggregates.positive_count)
+
+        return {
+            "overall_summary": overall_summary,
+            "key_insights": key_insights,
+            "improvement_areas": improvement_areas,
+            "strengths": strengths,
+            "session_statistics": session_statistics,
+            "feedback_count": aggregates.feedback_count,
+            "severity_distribution": dict(aggregates.severity_counts)
+        }
+
+    def generate_summary_narrative(
+        self,
+        aggregates: SessionAggregates,
+        session_statistics: Dict[str, Any]
+    ) -> str:
+        """
+        Generate the LLM narrative for a session summary.
 
-        # Group feedback by severity
-        high_severity = [f for f in live_feedback_history if f.get('severity') == 'high']
-        medium_severity = [f for f in live_feedback_history if f.get('severity') == 'medium']
-        low_severity = [f for f in live_feedback_history if f.get('severity') == 'low']
+        Falls back to a template summary if the LLM call fails.
+
+        Args:
+            aggregates: Running aggregates of the session's live feedback
+            session_statistics: Session stats from ScoringService
+
+        Returns:
+            Narrative summary text
+        """
+        common_problems = aggregates.common_problems()
 
         # Build prompt for LLM summary
         prompt = self._build_session_summary_prompt(
-            live_feedback_history=live_feedback_history,
+            live_feedback_history=aggregates.sample_feedback(),
             session_statistics=session_statistics,
             common_problems=common_problems,
-            severity_distribution={
-                'high': len(high_severity),
-                'medium': len(medium_severity),
-                'low': len(low_severity)
-            }
+            severity_distribution=aggregates.severity_counts
         )
 
         # Generate LLM summary
@@ -362,41 +632,16 @@ Keep it conversational and under 100 words."""
                 temperature=0.7
             )
 
-            overall_summary = response.choices[0].message.content.strip()
+            return response.choices[0].message.content.strip()
 
         except Exception as e:
             print(f"LLM session summary generation failed: {e}. Using fallback.")
             # Fallback summary
             avg_score = session_statistics.get('average_score', 0.0)
-            overall_summary = self._generate_fallback_session_summary(
-                avg_score, total_feedback, common_problems
+            return self._generate_fallback_session_summary(
+                avg_score, aggregates.feedback_count, common_problems
             )
 
-        # Extract key insights
-        key_insights = self._extract_key_insights(
-            live_feedback_history, session_statistics, common_problems
-        )
-
-        # Generate improvement areas with recommendations
-        improvement_areas = self._generate_improvement_areas(common_problems, live_feedback_history)
-
-        # Extract strengths
-        strengths = self._extract_strengths(session_statistics, positive_feedback)
-
-        return {
-            "overall_summary": overall_summary,
-            "key_insights": key_insights,
-            "improvement_areas": improvement_areas,
-            "strengths": strengths,
-            "session_statistics": session_statistics,
-            "feedback_count": total_feedback,
-            "severity_distribution": {
-                'high': len(high_severity),
-                'medium': len(medium_severity),
-                'low': len(low_severity)
-            }
-        }
-
     def _build_session_summary_prompt(
         self,
         live_feedback_history: List[Dict[str, Any]],
@@ -477,7 +722,7 @@ Keep it conversational, specific, and actionable."""
 
     def _extract_key_insights(
         self,
-        live_feedback_history: List[Dict[str, Any]],
+        similarity_scores: List[float],
         session_statistics: Dict[str, Any],
         common_problems: List[tuple]
     ) -> List[str]:
@@ -500,9 +745,9 @@ Keep it conversational, specific, and actionable."""
             insights.append(f"Most frequent issue: {top_issue} (appeared {count} times)")
 
         # Trend insight
-        if len(live_feedback_history) >= 4:
-            early_scores = [f.get('similarity_score', 0) for f in live_feedback_history[:len(live_feedback_history)//2]]
-            late_scores = [f.get('similarity_score', 0) for f in live_feedback_history[len(live_feedback_history)//2:]]
+        if len(similarity_scores) >= 4:
+            early_scores = similarity_scores[:len(similarity_scores)//2]
+            late_scores = similarity_scores[len(similarity_scores)//2:]
 
             if late_scores and early_scores:
                 import numpy as np
@@ -519,20 +764,15 @@ Keep it conversational, specific, and actionable."""
     def _generate_improvement_areas(
         self,
         common_problems: List[tuple],
-        live_feedback_history: List[Dict[str, Any]]
+        focus_area_samples: Dict[str, str]
     ) -> List[Dict[str, Any]]:
         """Generate improvement areas with specific recommendations."""
         improvement_areas = []
 
         for area, count in common_problems[:3]:  # Top 3 problem areas
-            # Find sample feedback for this area
-            relevant_feedback = [
-                f for f in live_feedback_history
-                if area in f.get('focus_areas', [])
-            ]
-
-            if relevant_feedback:
-                sample = relevant_feedback[0].get('feedback_text', '')
+            # First feedback given for this area
+            if area in focus_area_samples:
+                sample = focus_area_samples[area]
             else:
                 sample = f"Focus on your {area.replace('_', ' ')} positioning"
 
@@ -548,7 +788,7 @@ Keep it conversational, specific, and actionable."""
     def _extract_strengths(
         self,
         session_statistics: Dict[str, Any],
-        positive_feedback: List[Dict[str, Any]]
+        positive_count: int
     ) -> List[str]:
         """Extract strengths from the session."""
         strengths = []
@@ -565,8 +805,8 @@ Keep it conversational, specific, and actionable."""
             strengths.append(f"Maintained good form consistently ({good_count} instances)")
 
         # Extract from positive feedback
-        if positive_feedback:
-            strengths.append(f"Received {len(positive_feedback)} positive feedback moments")
+        if positive_count:
+            strengths.append(f"Received {positive_count} positive feedback moments")
 
         # Best moment
         best_moment = session_statistics.get('best_moment')
@@ -0,0 +1,280 @@
+"""
+Snapshot Input Stage: Person Crop and Downscaling
+
+Client frames arrive at whatever resolution the browser canvas produced,
+but the pose landmark model only looks at a 256 px region around the person.
+Decoding and converting a full 1080p frame per snapshot is mostly wasted.
+
+PersonCropper keeps the previous frame's person box (normalized to the
+frame, so it survives any decode scale):
+1. decode_size() tells the JPEG decoder how small it may decode (PIL draft
+   mode decodes at 1/2, 1/4 or 1/8 scale) while the person box keeps the
+   working resolution
+2. prepare() crops the box and downscales it to the working resolution
+   (the whole frame to the search resolution while nobody is tracked)
+3. to_frame() maps the crop's landmarks back to full-frame coordinates
+4. update() moves the box only when the person leaves its inner region or
+   becomes much smaller, so the pose tracker sees a stable input
+
+Stages that need native pixels (the hand crops) re-decode the frame with
+full_resolution(), only on the snapshots they run on.
+"""
+from io import BytesIO
+import base64
+from typing import Any, Callable, Dict, Optional, Tuple
+import numpy as np
+import cv2
+from PIL import Image
+
+
+# Longest side of the person crop given to the pose model (the person
+# itself then keeps about the landmark model's 256 px with CROP_MARGIN)
+WORKING_RESOLUTION = 384
+
+# Longest side of the frame while no person is tracked
+SEARCH_RESOLUTION = 512
+
+# Box margin around the landmarks, as a fraction of the person's size
+CROP_MARGIN = 0.25
+
+# Landmark visibility needed to count toward the person box
+BOX_VISIBILITY_THRESHOLD = 0.5
+
+Box = Tuple[float, float, float, float]
+
+
+def decode_image(
+    image_data: str,
+    draft_size: Optional[Callable[[int, int], Tuple[int, int]]] = None
+) -> np.ndarray:
+    """
+    Decode a base64 image to an RGB array.
+
+    Args:
+        image_data: Base64 encoded image
+        draft_size: Maps the encoded (width, height) to the size the decoded
+            image must keep at least; JPEGs are then decoded at the smallest
+            DCT scale that does (e.g. PersonCropper.decode_size)
+
+    Returns:
+        (H, W, 3) uint8 RGB array
+    """
+    image = Image.open(BytesIO(base64.b64decode(image_data)))
+    if draft_size is not None and image.format == "JPEG":
+        image.draft("RGB", draft_size(*image.size))
+    return np.asarray(image.convert("RGB"))
+
+
+def full_resolution(image_data: str, rgb_frame: np.ndarray) -> np.ndarray:
+    """
+    A snapshot at its encoded resolution, for stages that need native pixels.
+
+    Args:
+        image_data: Base64 encoded image
+        rgb_frame: The same image as decoded by decode_image (possibly at reduced scale)
+
+    Returns:
+        rgb_frame if it already has the encoded size, else a full-resolution decode
+    """
+    image = Image.open(BytesIO(base64.b64decode(image_data)))
+    if image.size == (rgb_frame.shape[1], rgb_frame.shape[0]):
+        return rgb_frame
+    return np.asarray(image.convert("RGB"))
+
+
+def decode_thumbnail(image_data: str, size: Tuple[int, int] = (64, 48)) -> np.ndarray:
+    """
+    Decode a tiny grayscale version of a base64 image (for change detection).
+
+    JPEGs are decoded in draft mode straight to grayscale at 1/8 scale where
+    possible, which costs a fraction of a full decode.
+
+    Args:
+        image_data: Base64 encoded image
+        size: (width, height) of the thumbnail
+
+    Returns:
+        (height, width) uint8 grayscale array
+    """
+    image = Image.open(BytesIO(base64.b64decode(image_data)))
+    if image.format == "JPEG":
+        image.draft("L", size)
+    return np.asarray(image.convert("L").resize(size, Image.BILINEAR))
+
+
+def landmark_box(landmarks: np.ndarray, margin: float = CROP_MARGIN) -> Optional[Box]:
+    """
+    Normalized box around the visible landmarks, expanded by margin.
+
+    Args:
+        landmarks: (33, 4) normalized pose landmarks (x, y, z, visibility)
+        margin: Expansion on each side, as a fraction of the box's longer side
+
+    Returns:
+        (x0, y0, x1, y1) clipped to [0, 1], or None if fewer than 2 landmarks are visible
+    """
+    landmarks = np.asarray(landmarks)
+    visible = landmarks[:, 3] > BOX_VISIBILITY_THRESHOLD if landmarks.shape[1] > 3 else np.ones(len(landmarks), bool)
+    if visible.sum() < 2:
+        return None
+    points = landmarks[visible, :2]
+    low, high = points.min(axis=0), points.max(axis=0)
+    pad = margin * float((high - low).max())
+    x0, y0 = np.clip(low - pad, 0.0, 1.0)
+    x1, y1 = np.clip(high + pad, 0.0, 1.0)
+    if x1 <= x0 or y1 <= y0:
+        return None
+    return float(x0), float(y0), float(x1), float(y1)
+
+
+class PersonCropper:
+    """
+    Per-session person crop for pose inference.
+
+    Usage:
+        rgb = decode_image(image_data, cropper.decode_size)
+        model_input, box = cropper.prepare(rgb)
+        landmarks = cropper.to_frame(pose_landmarks, box)
+        cropper.update(landmarks)
+    """
+
+    def __init__(
+        self,
+        working_resolution: int = WORKING_RESOLUTION,
+        search_resolution: int = SEARCH_RESOLUTION,
+        margin: float = CROP_MARGIN
+    ):
+        """
+        Initialize the cropper.
+
+        Args:
+            working_resolution: Longest side of the person crop given to the model
+            search_resolution: Longest side of the frame while no person is tracked
+            margin: Box margin around the landmarks (fraction of the person's size)
+        """
+        self.working_resolution = working_resolution
+        self.search_resolution = search_resolution
+        self.margin = margin
+        self.box: Optional[Box] = None
+        self.frames = 0
+        self.input_pixels = 0
+        self.source_pixels = 0
+        self.box_moves = 0
+
+    def decode_size(self, width: int, height: int) -> Tuple[int, int]:
+        """
+        Smallest frame size that keeps the next model input at full resolution.
+
+        Args:
+            width: Encoded frame width
+            height: Encoded frame height
+
+        Returns:
+            (width, height) to pass to decode_image
+        """
+        if self.box is None:
+            scale = self.search_resolution / max(width, height)
+        else:
+            x0, y0, x1, y1 = self.box
+            scale = self.working_resolution / max((x1 - x0) * width, (y1 - y0) * height)
+        scale = min(scale, 1.0)
+        return int(np.ceil(width * scale)), int(np.ceil(height * scale))
+
+    def prepare(self, rgb_frame: np.ndarray) -> Tuple[np.ndarray, Box]:
+        """
+        Crop and downscale a frame for the pose model.
+
+        Args:
+            rgb_frame: (H, W, 3) RGB frame
+
+        Returns:
+            (model_input, box): the contiguous RGB input and the normalized
+            box it was cut from (the whole frame while no person is tracked)
+        """
+        height, width = rgb_frame.shape[:2]
+        box = self.box or (0.0, 0.0, 1.0, 1.0)
+        x0, y0 = int(box[0] * width), int(box[1] * height)
+        x1, y1 = max(int(np.ceil(box[2] * width)), x0 + 1), max(int(np.ceil(box[3] * height)), y0 + 1)
+        crop = rgb_frame[y0:y1, x0:x1]
+
+        target = self.working_resolution if self.box is not None else self.search_resolution
+        scale = target / max(crop.shape[:2])
+        if scale < 1.0:
+            size = (max(int(round(crop.shape[1] * scale)), 1), max(int(round(crop.shape[0] * scale)), 1))
+            crop = cv2.resize(crop, size, interpolation=cv2.INTER_AREA)
+
+        self.frames += 1
+        self.input_pixels += crop.shape[0] * crop.shape[1]
+        self.source_pixels += width * height
+        return np.ascontiguousarray(crop), (x0 / width, y0 / height, x1 / width, y1 / height)
+
+    @staticmethod
+    def to_frame(landmarks: np.ndarray, box: Box) -> np.ndarray:
+        """
+        Map landmarks normalized to a crop back to the full frame.
+
+        Args:
+            landmarks: (N, 3+) landmarks normalized to the crop
+            box: Normalized box returned by prepare()
+
+        Returns:
+            (N, 3+) landmarks normalized to the frame (z scaled like x)
+        """
+        x0, y0, x1, y1 = box
+        mapped = np.array(landmarks, dtype=np.float64)
+        mapped[:, 0] = mapped[:, 0] * (x1 - x0) + x0
+        mapped[:, 1] = mapped[:, 1] * (y1 - y0) + y0
+        mapped[:, 2] = mapped[:, 2] * (x1 - x0)
+        return mapped
+
+    def update(self, landmarks: Optional[np.ndarray]):
+        """
+        Track the person box from this frame's full-frame landmarks.
+
+        The box is kept while the person stays inside its inner region (the
+        margin shrunk by half) and covers at least half its area; otherwise
+        it is replaced. Losing the person returns to full-frame search.
+
+        Args:
+            landmarks: (33, 4) full-frame landmarks, or None if no pose was found
+        """
+        if landmarks is None:
+            self.box = None
+            return
+
+        person = landmark_box(landmarks, margin=0.0)
+        if person is None:
+            self.box = None
+            return
+
+        if self.box is not None:
+            x0, y0, x1, y1 = self.box
+            inset = self.margin / (1.0 + 2.0 * self.margin) / 2.0
+            inner = (
+                x0 + inset * (x1 - x0), y0 + inset * (y1 - y0),
+                x1 - inset * (x1 - x0), y1 - inset * (y1 - y0)
+            )
+            inside = (
+                (person[0] >= inner[0] or x0 <= 0.0) and (person[1] >= inner[1] or y0 <= 0.0)
+                and (person[2] <= inner[2] or x1 >= 1.0) and (person[3] <= inner[3] or y1 >= 1.0)
+            )
+            target = landmark_box(landmarks, self.margin)
+            large_enough = (target[2] - target[0]) * (target[3] - target[1]) >= 0.5 * (x1 - x0) * (y1 - y0)
+            if inside and large_enough:
+                return
+
+        self.box = landmark_box(landmarks, self.margin)
+        self.box_moves += 1
+
+    def reset(self):
+        """Return to full-frame search."""
+        self.box = None
+
+    def get_stats(self) -> Dict[str, Any]:
+        """Input counters (pixel_ratio = model input pixels / decoded frame pixels)."""
+        return {
+            'frames': self.frames,
+            'tracking': self.box is not None,
+            'box_moves': self.box_moves,
+            'pixel_ratio': round(self.input_pixels / self.source_pixels, 3) if self.source_pixels else 0.0
+        }
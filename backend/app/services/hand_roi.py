@@ -0,0 +1,223 @@
+"""
+Pose-Guided Hand Regions of Interest
+
+The MediaPipe Hands model normally searches the whole webcam frame for
+palms. The pose landmarks computed for the same frame already locate the
+hands (wrist, index and pinky points), so the hand stage can run on a
+small wrist-centered crop per side instead and map the landmarks back to
+full-frame coordinates.
+
+Each side gets its own single-hand model instance, so tracking continues
+inside the crop that follows the wrist and the palm detector only re-runs
+when a hand is lost. Sides whose wrist is not visible are skipped, and a
+side whose crop had no hand waits a few snapshots before the (comparatively
+expensive) palm search runs on it again.
+"""
+from typing import Any, Callable, Dict, List, Tuple
+import numpy as np
+
+
+# Pose landmark indices per side: (wrist, pinky, index)
+POSE_HAND_POINTS = {
+    "left": (15, 17, 19),
+    "right": (16, 18, 20),
+}
+
+# Crop side as a multiple of the wrist-to-knuckles distance
+ROI_SCALE = 3.0
+
+# Smallest crop side in pixels (hands far from the camera)
+MIN_ROI_PIXELS = 48
+
+# Pose landmark visibility needed to place a crop
+ROI_VISIBILITY_THRESHOLD = 0.5
+
+# Snapshots a side is skipped after its crop had no hand
+RETRY_INTERVAL = 3
+
+Box = Tuple[int, int, int, int]
+
+
+def extract_hands(hand_results) -> Tuple[List[np.ndarray], List[Dict[str, Any]]]:
+    """Hand landmark arrays and handedness classifications from a MediaPipe Hands result."""
+    hand_landmarks = []
+    hand_classifications = []
+    if hand_results.multi_hand_landmarks:
+        for idx, hand_landmark in enumerate(hand_results.multi_hand_landmarks):
+            # Convert hand landmarks to numpy array
+            hand_array = np.array([[lm.x, lm.y, lm.z] for lm in hand_landmark.landmark])
+            hand_landmarks.append(hand_array)
+
+            # Get hand classification
+            if hand_results.multi_handedness and idx < len(hand_results.multi_handedness):
+                handedness = hand_results.multi_handedness[idx]
+                hand_classifications.append({
+                    'label': handedness.classification[0].label,
+                    'confidence': handedness.classification[0].score
+                })
+    return hand_landmarks, hand_classifications
+
+
+def hand_rois(
+    pose_landmarks: np.ndarray,
+    width: int,
+    height: int,
+    scale: float = ROI_SCALE,
+    min_size: int = MIN_ROI_PIXELS
+) -> Dict[str, Box]:
+    """
+    Square wrist-centered crops for each hand located by the pose.
+
+    The crop is centered on the knuckles (midpoint of the pose index and
+    pinky points) so that it covers the wrist and the extended fingers.
+
+    Args:
+        pose_landmarks: (33, 3+) normalized pose landmarks (x, y, z[, visibility])
+        width: Frame width in pixels
+        height: Frame height in pixels
+        scale: Crop side as a multiple of the wrist-to-knuckles distance
+        min_size: Smallest crop side in pixels
+
+    Returns:
+        (x0, y0, x1, y1) pixel box per side ("left"/"right"), clipped to the
+        frame; sides with an invisible or off-frame hand are left out
+    """
+    pose_landmarks = np.asarray(pose_landmarks, dtype=np.float64)
+    pixels = pose_landmarks[:, :2] * np.array([width, height])
+    rois = {}
+    for side, points in POSE_HAND_POINTS.items():
+        if pose_landmarks.shape[1] > 3 and pose_landmarks[points[0], 3] < ROI_VISIBILITY_THRESHOLD:
+            continue
+        wrist = pixels[points[0]]
+        knuckles = (pixels[points[1]] + pixels[points[2]]) / 2
+        half = max(scale * float(np.linalg.norm(knuckles - wrist)), min_size) / 2
+
+        x0, y0 = np.floor(knuckles - half).astype(int)
+        x1, y1 = np.ceil(knuckles + half).astype(int)
+        x0, y0 = max(x0, 0), max(y0, 0)
+        x1, y1 = min(x1, width), min(y1, height)
+        if x1 - x0 < min_size / 2 or y1 - y0 < min_size / 2:
+            continue
+        rois[side] = (int(x0), int(y0), int(x1), int(y1))
+    return rois
+
+
+def crop_to_frame(hand_array: np.ndarray, box: Box, width: int, height: int) -> np.ndarray:
+    """
+    Map normalized hand landmarks of a crop back to full-frame coordinates.
+
+    Args:
+        hand_array: (21, 3) landmarks normalized to the crop
+        box: (x0, y0, x1, y1) crop in pixels
+        width: Frame width in pixels
+        height: Frame height in pixels
+
+    Returns:
+        (21, 3) landmarks normalized to the frame (z scaled like x, as MediaPipe does)
+    """
+    x0, y0, x1, y1 = box
+    mapped = np.array(hand_array, dtype=np.float64)
+    mapped[:, 0] = (mapped[:, 0] * (x1 - x0) + x0) / width
+    mapped[:, 1] = (mapped[:, 1] * (y1 - y0) + y0) / height
+    mapped[:, 2] = mapped[:, 2] * (x1 - x0) / width
+    return mapped
+
+
+class PoseGuidedHandDetector:
+    """
+    Runs the hand model on pose-derived wrist crops.
+
+    Usage:
+        detector = PoseGuidedHandDetector(lambda: mp.solutions.hands.Hands(max_num_hands=1))
+        hand_landmarks, hand_classifications = detector.process(rgb_frame, pose_landmarks)
+    """
+
+    def __init__(
+        self,
+        create_hands: Callable[[], Any],
+        scale: float = ROI_SCALE,
+        min_size: int = MIN_ROI_PIXELS,
+        retry_interval: int = RETRY_INTERVAL
+    ):
+        """
+        Initialize the detector.
+
+        Args:
+            create_hands: Factory for a single-hand MediaPipe Hands instance
+                (one is created per side on first use)
+            scale: Crop side as a multiple of the wrist-to-knuckles distance
+            min_size: Smallest crop side in pixels
+            retry_interval: Snapshots a side is skipped after its crop had no hand
+                (0 = search every snapshot)
+        """
+        self.create_hands = create_hands
+        self.scale = scale
+        self.min_size = min_size
+        self.retry_interval = retry_interval
+        self._models: Dict[str, Any] = {}
+        self._backoff: Dict[str, int] = {}
+        self.crops = 0
+        self.skipped = 0
+        self.cropped_pixels = 0
+        self.frame_pixels = 0
+
+    def process(
+        self,
+        rgb_frame: np.ndarray,
+        pose_landmarks: np.ndarray
+    ) -> Tuple[List[np.ndarray], List[Dict[str, Any]]]:
+        """
+        Detect hands inside the wrist crops of one frame.
+
+        Args:
+            rgb_frame: (H, W, 3) RGB frame
+            pose_landmarks: (33, 4) pose landmarks of the same frame
+
+        Returns:
+            (hand_landmarks, hand_classifications) in full-frame coordinates,
+            as extract_hands returns them for a full-frame pass
+        """
+        height, width = rgb_frame.shape[:2]
+        hand_landmarks = []
+        hand_classifications = []
+        self.frame_pixels += width * height
+
+        for side, box in hand_rois(pose_landmarks, width, height, self.scale, self.min_size).items():
+            if self._backoff.get(side, 0) > 0:
+                self._backoff[side] -= 1
+                self.skipped += 1
+                continue
+
+            x0, y0, x1, y1 = box
+            crop = np.ascontiguousarray(rgb_frame[y0:y1, x0:x1])
+            self.crops += 1
+            self.cropped_pixels += crop.shape[0] * crop.shape[1]
+
+            if side not in self._models:
+                self._models[side] = self.create_hands()
+            landmarks, classifications = extract_hands(self._models[side].process(crop))
+
+            # One hand per crop: keep the first detection
+            if landmarks:
+                hand_landmarks.append(crop_to_frame(landmarks[0], box, width, height))
+                if classifications:
+                    hand_classifications.append(classifications[0])
+            else:
+                self._backoff[side] = self.retry_interval
+
+        return hand_landmarks, hand_classifications
+
+    def get_stats(self) -> Dict[str, Any]:
+        """Crop counters (pixel_ratio = cropped pixels / full-frame pixels)."""
+        return {
+            'crops': self.crops,
+            'skipped_crops': self.skipped,
+            'pixel_ratio': round(self.cropped_pixels / self.frame_pixels, 3) if self.frame_pixels else 0.0
+        }
+
+    def close(self):
+        """Release the per-side hand models."""
+        for model in self._models.values():
+            model.close()
+        self._models = {}
+        self._backoff = {}
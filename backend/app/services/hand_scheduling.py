@@ -0,0 +1,119 @@
+"""
+Reference-Driven Hand Inference Scheduling
+
+Running the MediaPipe hand model on every snapshot roughly doubles the
+per-frame inference cost, but most references only have meaningful hand
+gestures in a few sections.
+
+The scheduler looks at the reference's precomputed gesture track (see
+reference_features.py) around the frame the user was matched to: the hand
+model only runs when that segment has gesture annotations (or when the
+client asks for hands explicitly). Otherwise the last hand result is
+reused while it is fresh enough, and dropped after that.
+
+Without a gesture track (no reference loaded) hands run on every frame.
+"""
+from typing import Any, Dict, Optional
+import numpy as np
+
+
+class HandInferenceScheduler:
+    """
+    Decides per snapshot whether to run the hand model or reuse the last result.
+
+    Usage:
+    1. Create once per loaded reference with its gesture track
+    2. Per snapshot: should_run(); then store() the fresh result or reuse() the last one
+    """
+
+    def __init__(
+        self,
+        gesture_track: Optional[np.ndarray] = None,
+        reference_timestamps: Optional[np.ndarray] = None,
+        window_seconds: float = 0.5,
+        max_reuse_seconds: float = 1.0
+    ):
+        """
+        Initialize the scheduler.
+
+        Args:
+            gesture_track: (F, H) gesture labels per reference frame and hand
+                ("" = no gesture), or None to run on every frame
+            reference_timestamps: (F,) reference timestamps in seconds
+            window_seconds: Reference time around the matched frame searched
+                for gestures (covers matching lag and upcoming gestures)
+            max_reuse_seconds: Age after which a reused hand result is dropped
+        """
+        self.max_reuse_seconds = max_reuse_seconds
+        self._prefix = None
+        self.window_frames = 0
+        self.gesture_coverage = 1.0
+
+        if gesture_track is not None and len(gesture_track):
+            track = np.asarray(gesture_track)
+            active = (track != "").any(axis=1) if track.ndim == 2 else track.astype(bool)
+            self._prefix = np.concatenate([[0], np.cumsum(active)])
+
+            fps = 15.0
+            if reference_timestamps is not None:
+                steps = np.diff(np.asarray(reference_timestamps, dtype=np.float64))
+                steps = steps[steps > 0]
+                fps = 1.0 / float(np.median(steps)) if len(steps) else fps
+            self.window_frames = int(round(window_seconds * fps))
+            # Share of reference frames whose segment triggers hand inference
+            indices = np.arange(len(active))
+            low = np.clip(indices - self.window_frames, 0, len(active))
+            high = np.clip(indices + self.window_frames + 1, 0, len(active))
+            self.gesture_coverage = float(np.mean(self._prefix[high] - self._prefix[low] > 0))
+
+        self._last_result: Optional[Any] = None
+        self._last_time: Optional[float] = None
+        self.runs = 0
+        self.reuses = 0
+
+    def segment_has_gestures(self, reference_index: int) -> bool:
+        """True if any reference frame within the window of reference_index has a gesture."""
+        if self._prefix is None:
+            return True
+        num_frames = len(self._prefix) - 1
+        low = int(np.clip(reference_index - self.window_frames, 0, num_frames))
+        high = int(np.clip(reference_index + self.window_frames + 1, 0, num_frames))
+        return bool(self._prefix[high] - self._prefix[low] > 0)
+
+    def should_run(self, reference_index: Optional[int], force: bool = False) -> bool:
+        """
+        Whether to run the hand model for this snapshot.
+
+        Args:
+            reference_index: Reference frame the user was matched to (None if no match)
+            force: The client asked for hands explicitly
+        """
+        if force or self._prefix is None:
+            return True
+        if reference_index is None:
+            return False
+        return self.segment_has_gestures(reference_index)
+
+    def store(self, result: Any, timestamp: float):
+        """Remember a fresh hand result."""
+        self._last_result = result
+        self._last_time = timestamp
+        self.runs += 1
+
+    def reuse(self, timestamp: float) -> Optional[Any]:
+        """The last hand result if it is fresh enough, else None."""
+        self.reuses += 1
+        if self._last_time is None or timestamp - self._last_time > self.max_reuse_seconds:
+            return None
+        return self._last_result
+
+    def get_stats(self) -> Dict[str, Any]:
+        """Inference counters (skip_ratio = share of snapshots without hand inference)."""
+        total = self.runs + self.reuses
+        return {
+            'runs': self.runs,
+            'reuses': self.reuses,
+            'skip_ratio': round(self.reuses / total, 3) if total else 0.0,
+            'gesture_coverage': round(self.gesture_coverage, 3),
+            'scheduled': self._prefix is not None
+        }
@@ -0,0 +1,156 @@
+"""
+Joint Error Detection
+
+Turns the difference between the user's joint angles and the matched
+reference frame into severity-tagged per-joint errors.
+
+Reference angle tracks are computed once when the reference is loaded
+(one batched AngleCalculator pass over the whole clip). At runtime the user's
+angles are computed with the same kernel and diffed against one row of the
+track, so every snapshot gets error data for the cost of a few array ops.
+"""
+from typing import Any, Dict, List, Optional, Sequence
+import numpy as np
+from app.data.config import settings
+from app.services.angle_calculator import AngleSpec, AngleTable, POSE_ANGLES, compute_angle_table
+
+
+# Body part reported for each angle
+ANGLE_BODY_PARTS = {
+    'left_elbow_bend': 'left_elbow',
+    'right_elbow_bend': 'right_elbow',
+    'shoulder_tilt': 'shoulders',
+    'hip_tilt': 'hips',
+    'body_lean': 'torso',
+    'left_knee_bend': 'left_knee',
+    'right_knee_bend': 'right_knee',
+}
+
+SEVERITY_LEVELS = ("low", "medium", "high")
+
+
+class JointErrorDetector:
+    """
+    Per-joint error detector backed by precomputed reference angle tracks.
+
+    Usage:
+    1. Create once per reference clip with its landmarks
+    2. Call detect() with the user's landmarks and the matched reference index
+    """
+
+    def __init__(
+        self,
+        reference_landmarks: np.ndarray,
+        specs: Sequence[AngleSpec] = POSE_ANGLES,
+        thresholds: Optional[Sequence[float]] = None,
+        reference_angles: Optional[AngleTable] = None
+    ):
+        """
+        Initialize the detector and precompute reference angle tracks.
+
+        Args:
+            reference_landmarks: Reference landmarks of shape (F, 33, C), C >= 2
+            specs: Angles to compare
+            thresholds: (low, medium, high) degree thresholds (config defaults if None)
+            reference_angles: Precomputed angle table for specs (e.g. from the
+                reference feature bundle); computed from the landmarks if None
+        """
+        self.specs = tuple(specs)
+        self.reference_angles = (
+            reference_angles if reference_angles is not None
+            else compute_angle_table(reference_landmarks, self.specs)
+        )
+        self.body_parts = [ANGLE_BODY_PARTS.get(spec.name, spec.name) for spec in self.specs]
+        self.thresholds = np.asarray(
+            thresholds if thresholds is not None else (
+                settings.angle_error_threshold_low,
+                settings.angle_error_threshold_medium,
+                settings.angle_error_threshold_high
+            ),
+            dtype=np.float64
+        )
+
+    def __len__(self) -> int:
+        return len(self.reference_angles)
+
+    def detect(self, user_landmarks: np.ndarray, reference_index: int) -> List[Dict[str, Any]]:
+        """
+        Detect per-joint errors against one reference frame.
+
+        Args:
+            user_landmarks: User landmarks of shape (33, C), C >= 2
+            reference_index: Matched reference frame index
+
+        Returns:
+            Errors sorted by magnitude (largest first):
+            [
+                {
+                    "body_part": "left_elbow",
+                    "angle_name": "left_elbow_bend",
+                    "expected_angle": 145.0,
+                    "actual_angle": 95.0,
+                    "difference": -50.0,  # actual - expected
+                    "severity": "high"
+                },
+                ...
+            ]
+        """
+        user_landmarks = np.asarray(user_landmarks, dtype=np.float64)
+        if (
+            user_landmarks.ndim != 2 or user_landmarks.shape[0] < 33 or user_landmarks.shape[1] < 2 or
+            not 0 <= reference_index < len(self.reference_angles)
+        ):
+            return []
+
+        user_angles = compute_angle_table(user_landmarks[np.newaxis], self.specs).values[0]
+        return self._format_errors(user_angles, self.reference_angles.values[reference_index])
+
+    def detect_batch(self, user_landmarks: np.ndarray, reference_indices: np.ndarray) -> List[List[Dict[str, Any]]]:
+        """
+        Detect per-joint errors for many frames in one batched angle pass.
+
+        Args:
+            user_landmarks: User landmarks of shape (N, 33, C), C >= 2
+            reference_indices: (N,) matched reference frame per user frame
+
+        Returns:
+            One detect()-style error list per frame
+        """
+        user_landmarks = np.asarray(user_landmarks, dtype=np.float64)
+        reference_indices = np.asarray(reference_indices, dtype=np.int64)
+        if user_landmarks.ndim != 3 or user_landmarks.shape[1] < 33 or user_landmarks.shape[2] < 2:
+            return [[] for _ in range(len(reference_indices))]
+
+        user_angles = compute_angle_table(user_landmarks, self.specs).values
+        valid = (reference_indices >= 0) & (reference_indices < len(self.reference_angles))
+        expected_angles = self.reference_angles.values[np.where(valid, reference_indices, 0)]
+
+        # Only frames with at least one flagged joint need per-error dicts
+        differences = (user_angles - expected_angles + 180.0) % 360.0 - 180.0
+        flagged = valid & (np.abs(differences) >= self.thresholds[0]).any(axis=1)
+
+        return [
+            self._format_errors(user_angles[i], expected_angles[i]) if flagged[i] else []
+            for i in range(len(reference_indices))
+        ]
+
+    def _format_errors(self, user_angles: np.ndarray, expected_angles: np.ndarray) -> List[Dict[str, Any]]:
+        """Severity-tagged errors for one frame's user and expected angles (degrees)."""
+        # Signed difference wrapped to [-180, 180)
+        differences = (user_angles - expected_angles + 180.0) % 360.0 - 180.0
+        severity_levels = np.searchsorted(self.thresholds, np.abs(differences), side='right')
+
+        flagged = np.flatnonzero(severity_levels > 0)
+        flagged = flagged[np.argsort(-np.abs(differences[flagged]))]
+
+        return [
+            {
+                "body_part": self.body_parts[i],
+                "angle_name": self.specs[i].name,
+                "expected_angle": round(float(expected_angles[i]), 1),
+                "actual_angle": round(float(user_angles[i]), 1),
+                "difference": round(float(differences[i]), 1),
+                "severity": SEVERITY_LEVELS[severity_levels[i] - 1]
+            }
+            for i in flagged.tolist()
+        ]
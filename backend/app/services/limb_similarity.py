@@ -0,0 +1,168 @@
+"""
+Per-Limb Similarity
+
+Breaks the pose comparison down into body-part groups (head, torso, arms,
+legs) so feedback can say which limb is off.
+
+Every reference frame is normalized once into one row of a matrix whose
+columns are laid out group by group: each landmark is taken relative to
+its group's anchor (shoulder for an arm, hip for a leg, ...) and scaled by
+shoulder width. The per-group cosine similarities with a user pose are then
+segment sums (ufunc.reduceat) over column slices of that row, which costs a
+few microseconds per comparison.
+"""
+from typing import Dict, Optional
+import numpy as np
+
+
+# Landmark groups (MediaPipe pose indices) and the anchor landmarks each
+# group is measured from (anchor = mean of the listed landmarks)
+LIMB_GROUPS = {
+    'head': ([0, 7, 8], [11, 12]),                  # nose, ears from mid-shoulder
+    'torso': ([11, 12, 23, 24], [23, 24]),          # shoulders, hips from mid-hip
+    'left_arm': ([13, 15, 17, 19, 21], [11]),       # elbow, wrist, hand from shoulder
+    'right_arm': ([14, 16, 18, 20, 22], [12]),
+    'left_leg': ([25, 27, 29, 31], [23]),           # knee, ankle, foot from hip
+    'right_leg': ([26, 28, 30, 32], [24]),
+}
+
+LIMB_NAMES = tuple(LIMB_GROUPS)
+
+# Column layout: landmarks ordered group by group
+_LANDMARK_ORDER = np.array([idx for landmarks, _ in LIMB_GROUPS.values() for idx in landmarks])
+_LANDMARK_GROUP = np.repeat(
+    np.arange(len(LIMB_GROUPS)), [len(landmarks) for landmarks, _ in LIMB_GROUPS.values()]
+)
+_LANDMARK_STARTS = np.concatenate(
+    ([0], np.cumsum([len(landmarks) for landmarks, _ in LIMB_GROUPS.values()])[:-1])
+)
+_COLUMN_STARTS = 3 * _LANDMARK_STARTS
+
+# (G, 33) averaging matrix that turns landmarks into group anchors
+_ANCHOR_WEIGHTS = np.zeros((len(LIMB_GROUPS), 33))
+for _group, (_, _anchors) in enumerate(LIMB_GROUPS.values()):
+    _ANCHOR_WEIGHTS[_group, _anchors] = 1.0 / len(_anchors)
+
+
+def normalize_limb_frames(landmarks: np.ndarray) -> np.ndarray:
+    """
+    Normalize poses into the group-ordered limb feature layout.
+
+    Args:
+        landmarks: (N, 33, C) landmarks, C >= 3 (x, y, z used)
+
+    Returns:
+        (N, 3 * num_grouped_landmarks) anchor-relative, shoulder-width-scaled coordinates
+    """
+    points = np.asarray(landmarks, dtype=np.float64)[:, :33, :3]
+
+    anchors = np.einsum('gj,njc->ngc', _ANCHOR_WEIGHTS, points)
+    shoulder_width = np.linalg.norm(points[:, 11] - points[:, 12], axis=1)
+    shoulder_width = np.where(shoulder_width > 0, shoulder_width, 1.0)
+
+    relative = points[:, _LANDMARK_ORDER] - anchors[:, _LANDMARK_GROUP]
+    return (relative / shoulder_width[:, np.newaxis, np.newaxis]).reshape(len(points), -1)
+
+
+def limb_motion_energy(limb_rows: np.ndarray) -> np.ndarray:
+    """
+    Per-limb motion energy between consecutive normalized rows.
+
+    Args:
+        limb_rows: (N, D) rows from normalize_limb_frames()
+
+    Returns:
+        (N - 1, num_groups) sum of landmark speeds per group (shoulder widths per frame)
+    """
+    if len(limb_rows) < 2:
+        return np.zeros((0, len(LIMB_NAMES)))
+    steps = np.diff(limb_rows, axis=0).reshape(len(limb_rows) - 1, -1, 3)
+    return np.add.reduceat(np.linalg.norm(steps, axis=2), _LANDMARK_STARTS, axis=1)
+
+
+class LimbSimilarity:
+    """
+    Per-limb cosine similarity against precomputed reference rows.
+
+    Usage:
+    1. Create once per reference clip with its landmarks
+    2. Call compare() with the user's landmarks and the matched reference index
+    """
+
+    def __init__(self, reference_landmarks: np.ndarray, reference_matrix: Optional[np.ndarray] = None):
+        """
+        Initialize and normalize the reference frames.
+
+        Args:
+            reference_landmarks: Reference landmarks of shape (F, 33, C), C >= 3
+            reference_matrix: Precomputed normalize_limb_frames() rows (e.g. from
+                the reference feature bundle); computed from the landmarks if None
+        """
+        self.reference_matrix = (
+            reference_matrix if reference_matrix is not None else normalize_limb_frames(reference_landmarks)
+        )
+        self.reference_norms = np.sqrt(np.add.reduceat(self.reference_matrix ** 2, _COLUMN_STARTS, axis=1))
+
+    def __len__(self) -> int:
+        return len(self.reference_matrix)
+
+    def compare(self, user_landmarks: np.ndarray, reference_index: int) -> Dict[str, float]:
+        """
+        Per-limb similarity with one reference frame.
+
+        Args:
+            user_landmarks: User landmarks of shape (33, C), C >= 3
+            reference_index: Matched reference frame index
+
+        Returns:
+            {"head": 0.97, "torso": 0.99, "left_arm": 0.62, ...} (0.0-1.0),
+            or {} if the input cannot be compared
+        """
+        scores = self.compare_array(user_landmarks, reference_index)
+        if scores is None:
+            return {}
+        return dict(zip(LIMB_NAMES, scores.tolist()))
+
+    def compare_array(self, user_landmarks: np.ndarray, reference_index: int) -> Optional[np.ndarray]:
+        """Per-limb similarity as a (num_groups,) array ordered like LIMB_NAMES (None if invalid)."""
+        user_landmarks = np.asarray(user_landmarks)
+        if (
+            user_landmarks.ndim != 2 or user_landmarks.shape[0] < 33 or user_landmarks.shape[1] < 3 or
+            not 0 <= reference_index < len(self.reference_matrix)
+        ):
+            return None
+
+        user_row = normalize_limb_frames(user_landmarks[np.newaxis])[0]
+        reference_row = self.reference_matrix[reference_index]
+
+        dots = np.add.reduceat(user_row * reference_row, _COLUMN_STARTS)
+        norms = np.sqrt(np.add.reduceat(user_row * user_row, _COLUMN_STARTS)) * self.reference_norms[reference_index]
+
+        valid = norms > 0
+        scores = np.where(valid, dots / np.where(valid, norms, 1.0), 0.0)
+        return np.clip(np.nan_to_num(scores, nan=0.0), 0.0, 1.0)
+
+    def compare_batch(self, user_landmarks: np.ndarray, reference_indices: np.ndarray) -> np.ndarray:
+        """
+        Per-limb similarity for many frames at once.
+
+        Args:
+            user_landmarks: User landmarks of shape (N, 33, C), C >= 3
+            reference_indices: (N,) matched reference frame per user frame
+
+        Returns:
+            (N, num_groups) similarities ordered like LIMB_NAMES (0 for invalid indices)
+        """
+        reference_indices = np.asarray(reference_indices, dtype=np.int64)
+        valid_indices = (reference_indices >= 0) & (reference_indices < len(self.reference_matrix))
+        indices = np.where(valid_indices, reference_indices, 0)
+
+        user_rows = normalize_limb_frames(user_landmarks)
+        reference_rows = self.reference_matrix[indices]
+
+        dots = np.add.reduceat(user_rows * reference_rows, _COLUMN_STARTS, axis=1)
+        norms = np.sqrt(np.add.reduceat(user_rows * user_rows, _COLUMN_STARTS, axis=1)) * self.reference_norms[indices]
+
+        valid = (norms > 0) & valid_indices[:, np.newaxis]
+        scores = np.where(valid, dots / np.where(valid, norms, 1.0), 0.0)
+        return np.clip(np.nan_to_num(scores, nan=0.0), 0.0, 1.0)
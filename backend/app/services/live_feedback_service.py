@@ -26,6 +26,7 @@ import base64
 import numpy as np
 from openai import OpenAI
 from app.data.config import settings
+from app.services.feedback_cache import FeedbackCache, build_feedback_signature
 
 
 @dataclass
@@ -174,6 +175,9 @@ class LiveFeedbackService:
         # Context management
         self.context = FeedbackContext()
 
+        # Response cache (shared across sessions - not cleared by reset())
+        self.response_cache = FeedbackCache()
+
         # Rate limiting
         self.last_llm_call_time = 0
         self.min_llm_interval = 0.5  # Minimum 0.5s between LLM calls (matches snapshot rate)
@@ -184,6 +188,7 @@ class LiveFeedbackService:
         self.total_feedback_generated = 0
         self.total_llm_calls = 0
         self.total_llm_errors = 0
+        self.total_cache_hits = 0
 
     def process_snapshot(
         self,
@@ -223,6 +228,16 @@ class LiveFeedbackService:
         if not should_generate:
             return None
 
+        # Serve repeated situations from the cache (no LLM call, no rate limit)
+        cache_key = self._build_cache_key(snapshot)
+        cached_text = self.response_cache.get(cache_key)
+        if cached_text is not None:
+            feedback = self._build_feedback_result(snapshot, cached_text)
+            self.total_cache_hits += 1
+            self.total_feedback_generated += 1
+            self.context.add_feedback(feedback)
+            return feedback
+
         # Check rate limiting
         current_time = time.time()
         time_since_last_call = current_time - self.last_llm_call_time
@@ -238,6 +253,9 @@ class LiveFeedbackService:
             self.total_llm_calls += 1
             self.total_feedback_generated += 1
 
+            # Only LLM output is cached - fallbacks are never stored
+            self.response_cache.put(cache_key, feedback["feedback_text"])
+
             # Add to context
             self.context.add_feedback(feedback)
 
@@ -299,9 +317,18 @@ class LiveFeedbackService:
 
         feedback_text = response.choices[0].message.content.strip()
 
+        return self._build_feedback_result(snapshot, feedback_text)
+
+    def _build_feedback_result(self, snapshot: SnapshotData, feedback_text: str) -> Dict[str, Any]:
+        """
+        Wrap feedback text with the per-snapshot severity, focus areas and context.
+
+        Shared by fresh LLM responses and cache hits, so a cached text is
+        always paired with the current snapshot's metadata.
+        """
         # Determine severity and focus areas
         severity = self._calculate_severity(snapshot)
-        focus_areas = [error.get("body_part", "posture") for error in snapshot.errors[:2]]
+        focus_areas = self._get_focus_areas(snapshot)
 
         # Detect if feedback is positive (encouragement) or corrective
         is_positive = snapshot.combined_score > 0.7 or "good" in feedback_text.lower()
@@ -377,7 +404,7 @@ Focus on the most impactful improvement. Be conversational and brief (under 50 w
             severity = "medium"
             is_positive = False
 
-        focus_areas = [error.get("body_part", "posture") for error in snapshot.errors[:2]]
+        focus_areas = self._get_focus_areas(snapshot)
 
         return {
             "timestamp": snapshot.timestamp,
@@ -388,6 +415,25 @@ Focus on the most impactful improvement. Be conversational and brief (under 50 w
             "context": self.context.get_summary()
         }
 
+    def _get_focus_areas(self, snapshot: SnapshotData) -> List[str]:
+        """Body parts the feedback should focus on (top 2 errors)."""
+        return [error.get("body_part", "posture") for error in snapshot.errors[:2]]
+
+    def _build_cache_key(self, snapshot: SnapshotData) -> tuple:
+        """
+        Build the response cache key for a snapshot.
+
+        Uses a quantized signature (reference index bucket, score bucket,
+        focus areas, error directions) so near-identical situations share
+        one cached response.
+        """
+        return ("live",) + build_feedback_signature(
+            reference_index=snapshot.best_match_idx,
+            combined_score=snapshot.combined_score,
+            focus_areas=self._get_focus_areas(snapshot),
+            errors=snapshot.errors[:2]
+        )
+
     def _calculate_severity(self, snapshot: SnapshotData) -> str:
         """Calculate severity based on score and errors."""
         if snapshot.combined_score < 0.5 or len(snapshot.errors) >= 3:
@@ -422,6 +468,7 @@ Focus on the most impactful improvement. Be conversational and brief (under 50 w
             "total_feedback_generated": self.total_feedback_generated,
             "total_llm_calls": self.total_llm_calls,
             "total_llm_errors": self.total_llm_errors,
+            "total_cache_hits": self.total_cache_hits,
             "feedback_generation_rate": (
                 self.total_feedback_generated / self.total_snapshots_processed
                 if self.total_snapshots_processed > 0 else 0
@@ -430,7 +477,8 @@ Focus on the most impactful improvement. Be conversational and brief (under 50 w
                 self.total_llm_errors / self.total_llm_calls
                 if self.total_llm_calls > 0 else 0
             ),
-            "current_context": self.context.get_summary()
+            "current_context": self.context.get_summary(),
+            "response_cache": self.response_cache.get_statistics()
         }
 
 
@@ -12,6 +12,7 @@ from typing import Dict, List, Optional, Tuple, Any
 from dataclasses import dataclass
 from io import BytesIO
 from PIL import Image
+from app.services.complexity_controller import ModelComplexityController, PoseModelPool
 
 
 @dataclass
@@ -40,21 +41,31 @@ class MediaPipeService:
     Processes both user webcam frames and reference video frames.
     """
     
-    def __init__(self):
-        """Initialize MediaPipe components."""
+    def __init__(self, model_complexity: int = 1,
+                 complexity_controller: Optional[ModelComplexityController] = None):
+        """
+        Initialize MediaPipe components.
+
+        Args:
+            model_complexity: Pose model complexity (0, 1 or 2) without a controller
+            complexity_controller: Optional controller choosing the complexity
+                from measured latency (shared with the snapshot pipeline)
+        """
         # Initialize MediaPipe solutions
         self.mp_pose = mp.solutions.pose
         self.mp_drawing = mp.solutions.drawing_utils
         self.mp_drawing_styles = mp.solutions.drawing_styles
         
-        # Initialize pose detection
-        self.pose_detector = self.mp_pose.Pose(
+        # Pose detectors per complexity level (created on first use)
+        self.model_complexity = model_complexity
+        self.complexity_controller = complexity_controller
+        self.pose_models = PoseModelPool(lambda level: self.mp_pose.Pose(
             static_image_mode=False,
-            model_complexity=1,
+            model_complexity=level,
             enable_segmentation=False,
             min_detection_confidence=0.5,
             min_tracking_confidence=0.5
-        )
+        ))
         
         # Initialize drawing utilities
         self.drawing_utils = mp.solutions.drawing_utils
@@ -143,8 +154,15 @@ class MediaPipeService:
             frame = cv2.cvtColor(np.array(image), cv2.COLOR_RGB2BGR)
             rgb_frame = cv2.cvtColor(frame, cv2.COLOR_BGR2RGB)
             
-            # Process with MediaPipe
-            results = self.pose_detector.process(rgb_frame)
+            # Process with MediaPipe at the controller's complexity
+            if self.complexity_controller is not None:
+                pose_detector, level = self.complexity_controller.acquire(self.pose_models)
+            else:
+                pose_detector, level = self.pose_models.get(self.model_complexity), self.model_complexity
+            inference_start = time.perf_counter()
+            results = pose_detector.process(rgb_frame)
+            if self.complexity_controller is not None:
+                self.complexity_controller.record(time.perf_counter() - inference_start, level=level)
             
             if results.pose_landmarks:
                 # Extract landmarks
@@ -325,8 +343,8 @@ class MediaPipeService:
     
     def cleanup(self):
         """Clean up MediaPipe resources."""
-        if hasattr(self, 'pose_detector'):
-            self.pose_detector.close()
+        if hasattr(self, 'pose_models'):
+            self.pose_models.close()
         print("[MediaPipe] Service cleaned up")
 
 
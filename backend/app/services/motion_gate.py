@@ -0,0 +1,183 @@
+"""
+Motion-Gated Snapshot Processing
+
+While a dancer holds a pose, consecutive snapshots are nearly identical,
+yet each one pays decode, pose and hand inference, comparison and possibly
+an LLM call. MotionGate compares a tiny grayscale thumbnail of each
+snapshot (see frame_input.decode_thumbnail) with the one of the last
+processed snapshot, inside the tracked person box when there is one:
+
+- Unchanged and the last result had a dancer: reuse the previous landmarks
+  and scores (refreshed at least every max_reuse_seconds, since the
+  reference keeps playing)
+- Unchanged and the last result had no dancer in frame (no pose or low
+  average visibility): skip processing entirely (refreshed every
+  absent_refresh_seconds)
+- Changed: process normally
+
+Change is the share of thumbnail pixels whose brightness moved by more
+than pixel_level, which ignores sensor noise and catches a moving arm even
+when the dancer is small in the frame.
+"""
+from typing import Any, Dict, Optional, Tuple
+import numpy as np
+
+
+# Brightness change (0-255) for a thumbnail pixel to count as changed
+PIXEL_CHANGE_LEVEL = 16
+
+# Share of changed pixels at which a snapshot counts as changed
+CHANGED_PIXEL_RATIO = 0.02
+
+# Longest a result is reused while the dancer holds still
+MAX_REUSE_SECONDS = 1.0
+
+# Longest processing is skipped while nobody is in frame
+ABSENT_REFRESH_SECONDS = 3.0
+
+# Average landmark visibility below which the dancer counts as out of frame
+MIN_VISIBILITY = 0.3
+
+
+class MotionGate:
+    """
+    Per-session change detector deciding whether a snapshot needs processing.
+
+    Usage:
+        thumbnail = decode_thumbnail(image_data)
+        previous = gate.reuse(thumbnail, person_box, now)
+        if previous is None:
+            result = ... process the snapshot ...
+            gate.store(thumbnail, result, now, pose_landmarks, processing_seconds)
+        elif not gate.absent:
+            ... record previous scores and landmarks at the new time ...
+    """
+
+    def __init__(
+        self,
+        changed_pixel_ratio: float = CHANGED_PIXEL_RATIO,
+        pixel_level: int = PIXEL_CHANGE_LEVEL,
+        max_reuse_seconds: float = MAX_REUSE_SECONDS,
+        absent_refresh_seconds: float = ABSENT_REFRESH_SECONDS,
+        min_visibility: float = MIN_VISIBILITY
+    ):
+        """
+        Initialize the gate.
+
+        Args:
+            changed_pixel_ratio: Share of changed pixels at which a snapshot is processed
+            pixel_level: Brightness change for a pixel to count as changed
+            max_reuse_seconds: Longest a result with a dancer is reused
+            absent_refresh_seconds: Longest processing is skipped with nobody in frame
+            min_visibility: Average landmark visibility below which nobody is in frame
+        """
+        self.changed_pixel_ratio = changed_pixel_ratio
+        self.pixel_level = pixel_level
+        self.max_reuse_seconds = max_reuse_seconds
+        self.absent_refresh_seconds = absent_refresh_seconds
+        self.min_visibility = min_visibility
+
+        self._thumbnail: Optional[np.ndarray] = None
+        self._result: Optional[Dict[str, Any]] = None
+        self._time: Optional[float] = None
+        self._absent = False
+        self._processing_seconds: Optional[float] = None
+
+        self.processed = 0
+        self.reused = 0
+        self.absent_skipped = 0
+        self.saved_seconds = 0.0
+
+    @property
+    def absent(self) -> bool:
+        """Whether the last processed snapshot had nobody in frame."""
+        return self._absent
+
+    def change(self, thumbnail: np.ndarray, box: Optional[Tuple[float, float, float, float]] = None) -> float:
+        """
+        Share of changed pixels since the last processed snapshot.
+
+        Args:
+            thumbnail: (h, w) grayscale thumbnail
+            box: Normalized (x0, y0, x1, y1) region to compare (whole frame if None)
+
+        Returns:
+            Changed pixel share in [0, 1] (1.0 without a comparable snapshot)
+        """
+        if self._thumbnail is None or self._thumbnail.shape != thumbnail.shape:
+            return 1.0
+        height, width = thumbnail.shape
+        if box is not None:
+            x0, y0 = int(box[0] * width), int(box[1] * height)
+            x1, y1 = max(int(np.ceil(box[2] * width)), x0 + 1), max(int(np.ceil(box[3] * height)), y0 + 1)
+        else:
+            x0, y0, x1, y1 = 0, 0, width, height
+        diff = np.abs(thumbnail[y0:y1, x0:x1].astype(np.int16) - self._thumbnail[y0:y1, x0:x1].astype(np.int16))
+        return float(np.mean(diff > self.pixel_level))
+
+    def reuse(
+        self,
+        thumbnail: np.ndarray,
+        box: Optional[Tuple[float, float, float, float]],
+        now: float
+    ) -> Optional[Dict[str, Any]]:
+        """
+        The previous result if this snapshot does not need processing.
+
+        Args:
+            thumbnail: (h, w) grayscale thumbnail of the snapshot
+            box: Normalized person box to compare inside (None = whole frame)
+            now: Snapshot time (seconds)
+
+        Returns:
+            A copy of the previous result (timestamp updated, frame_reused set),
+            or None to process the snapshot
+        """
+        if self._result is None:
+            return None
+        max_age = self.absent_refresh_seconds if self._absent else self.max_reuse_seconds
+        if now - self._time > max_age or self.change(thumbnail, box) >= self.changed_pixel_ratio:
+            return None
+
+        if self._absent:
+            self.absent_skipped += 1
+        else:
+            self.reused += 1
+        self.saved_seconds += self._processing_seconds or 0.0
+        return {**self._result, 'timestamp': now, 'frame_reused': True, 'hands_inferred': False}
+
+    def store(
+        self,
+        thumbnail: np.ndarray,
+        result: Dict[str, Any],
+        now: float,
+        pose_landmarks: Optional[np.ndarray],
+        processing_seconds: float
+    ):
+        """
+        Remember a processed snapshot.
+
+        Args:
+            thumbnail: (h, w) grayscale thumbnail of the snapshot
+            result: Snapshot result to reuse for unchanged snapshots
+            now: Snapshot time (seconds)
+            pose_landmarks: (33, 4) detected landmarks, or None if no pose
+            processing_seconds: Time the snapshot took (for the saved-time estimate)
+        """
+        self._thumbnail = thumbnail
+        self._result = result
+        self._time = now
+        self._absent = pose_landmarks is None or float(np.mean(pose_landmarks[:, 3])) < self.min_visibility
+        self._processing_seconds = processing_seconds
+        self.processed += 1
+
+    def get_stats(self) -> Dict[str, Any]:
+        """Work-saved counters (saved_ratio = share of snapshots not processed)."""
+        total = self.processed + self.reused + self.absent_skipped
+        return {
+            'processed': self.processed,
+            'reused': self.reused,
+            'absent_skipped': self.absent_skipped,
+            'saved_ratio': round((self.reused + self.absent_skipped) / total, 3) if total else 0.0,
+            'saved_seconds': round(self.saved_seconds, 3)
+        }
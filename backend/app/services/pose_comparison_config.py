@@ -5,6 +5,17 @@ Configuration for pose comparison service
 from typing import Dict, Any
 from dataclasses import dataclass
 
+# Reference matching engines:
+# - "coordinates": cosine similarity of shoulder-width-scaled landmark coordinates
+# - "angles": similarity of joint angles + angular velocities (camera invariant, cheaper)
+MATCHING_MODES = ("coordinates", "angles")
+
+# Mirror modes (dancer facing a mirrored reference video):
+# - "off": compare with the reference as is
+# - "on": compare with the left/right-swapped, x-flipped reference
+# - "auto": score both orientations and detect which one the dancer uses
+MIRROR_MODES = ("off", "on", "auto")
+
 @dataclass
 class PoseComparisonConfig:
     """Configuration for pose comparison"""
@@ -21,6 +32,22 @@ class PoseComparisonConfig:
     # Smoothing settings
     smoothing_window: int = 5
     
+    # Matching engine ("coordinates" or "angles")
+    matching_mode: str = "coordinates"
+    
+    # Mirror mode ("off", "on" or "auto")
+    mirror_mode: str = "off"
+    
+    # Timing synchronization (motion-energy cross-correlation)
+    sync_enabled: bool = True
+    sync_window_seconds: float = 4.0  # user history correlated with the reference
+    sync_max_lag_seconds: float = 2.0  # search range around the expected position
+    sync_min_confidence: float = 0.5  # correlation needed to re-center the reference search
+    
+    # End-of-session DTW alignment
+    alignment_band_seconds: float = 3.0  # Sakoe-Chiba band around the reference clock
+    alignment_segment_seconds: float = 4.0  # segment length in the timing report
+    
     # Detection thresholds
     min_detection_confidence: float = 0.5
     min_tracking_confidence: float = 0.5
@@ -33,6 +60,12 @@ class PoseComparisonConfig:
     position_difference_threshold: float = 0.05  # Only mention positions if difference > 0.05
     min_score_threshold: float = 0.8  # Only provide detailed feedback if score < 0.8
     
+    def __post_init__(self):
+        if self.matching_mode not in MATCHING_MODES:
+            raise ValueError(f"Unknown matching mode '{self.matching_mode}' (expected one of {MATCHING_MODES})")
+        if self.mirror_mode not in MIRROR_MODES:
+            raise ValueError(f"Unknown mirror mode '{self.mirror_mode}' (expected one of {MIRROR_MODES})")
+    
     def to_dict(self) -> Dict[str, Any]:
         """Convert config to dictionary"""
         return {
@@ -42,6 +75,14 @@ class PoseComparisonConfig:
             'dtw_window': self.dtw_window,
             'dtw_interval': self.dtw_interval,
             'smoothing_window': self.smoothing_window,
+            'matching_mode': self.matching_mode,
+            'mirror_mode': self.mirror_mode,
+            'sync_enabled': self.sync_enabled,
+            'sync_window_seconds': self.sync_window_seconds,
+            'sync_max_lag_seconds': self.sync_max_lag_seconds,
+            'sync_min_confidence': self.sync_min_confidence,
+            'alignment_band_seconds': self.alignment_band_seconds,
+            'alignment_segment_seconds': self.alignment_segment_seconds,
             'min_detection_confidence': self.min_detection_confidence,
             'min_tracking_confidence': self.min_tracking_confidence,
             'max_sequence_length': self.max_sequence_length,
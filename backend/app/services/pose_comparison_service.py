@@ -7,6 +7,14 @@ from dtaidistance import dtw
 import time
 from collections import deque
 from .pose_comparison_config import PoseComparisonConfig, DEFAULT_CONFIG
+from .joint_errors import JointErrorDetector
+from .angle_matching import AngleSpaceMatcher
+from .limb_similarity import LimbSimilarity
+from .pose_mirroring import OrientationDetector, mirror_landmarks
+from .timing_sync import TimingSynchronizer
+from .session_alignment import SessionAligner
+from .reference_features import ReferenceFeatures, gesture_labels
+from .angle_calculator import MATCHING_ANGLES, POSE_ANGLES
 
 class PoseComparisonService:
     """
@@ -15,24 +23,67 @@ class PoseComparisonService:
     """
     
     def __init__(self, reference_poses_data: List[Dict[str, Any]], 
-                 config: PoseComparisonConfig = None):
+                 config: PoseComparisonConfig = None,
+                 features: Optional[ReferenceFeatures] = None):
         """
         Initialize pose comparison service.
         
         Args:
             reference_poses_data: List of reference pose data from processed video
             config: Configuration for pose comparison
+            features: Precomputed feature bundle of the same reference (see
+                from_features); reference features are read from it instead
+                of being recomputed
         """
         self.reference_poses = reference_poses_data
         self.config = config if config is not None else DEFAULT_CONFIG
+        self.features = features
         
         # Initialize MediaPipe pose detection
         self.mp_pose = mp.solutions.pose
         self.mp_drawing = mp.solutions.drawing_utils
         
         # Extract and normalize reference pose landmarks
-        self.reference_landmarks = self._extract_reference_landmarks()
-        self.reference_motions = self._calculate_reference_motions()
+        if features is not None:
+            self.reference_landmarks = features.filtered
+            self.reference_motions = features.velocities[1:]
+        else:
+            self.reference_landmarks = self._extract_reference_landmarks()
+            self.reference_motions = self._calculate_reference_motions()
+        
+        # Normalized reference pose matrix: pose similarity with every frame is one matrix product
+        if features is not None:
+            self._reference_pose_matrix, self._reference_pose_norms = features.normalized, features.normalized_norms
+        else:
+            self._reference_pose_matrix, self._reference_pose_norms = self._build_pose_matrix(self.reference_landmarks)
+        
+        # Precompute reference joint-angle tracks for per-joint error detection
+        self.reference_landmark_frames = self._stack_reference_frames()
+        self.joint_error_detector = self._build_joint_error_detector()
+        
+        # Normalized reference rows for the per-limb similarity breakdown
+        self.limb_similarity = (
+            LimbSimilarity(
+                self.reference_landmark_frames,
+                reference_matrix=features.limb_rows if features is not None else None
+            )
+            if self.reference_landmark_frames is not None else None
+        )
+        
+        # Motion-energy timing synchronizer (re-centers the reference search)
+        self.reference_timestamps = self._stack_reference_timestamps()
+        self.synchronizer = self._build_synchronizer()
+        
+        # Angle-space matching engine (built on first use in "angles" mode)
+        self._angle_matcher: Optional[AngleSpaceMatcher] = None
+        
+        # Full-session DTW aligner (built on first use at session end)
+        self._session_aligner: Optional[SessionAligner] = None
+        
+        # Mirrored reference (built on first use when mirror_mode is not "off")
+        self._mirror_reference: Optional[Dict[str, Any]] = None
+        self.orientation_detector = OrientationDetector()
+        self.mirrored = False
         
         # Initialize user pose tracking
         self.user_pose_history = deque(maxlen=self.config.smoothing_window * 2)
@@ -44,15 +95,23 @@ class PoseComparisonService:
         self.last_dtw_time = 0
         self.dtw_interval = self.config.dtw_interval
         self.dtw_enabled = self.config.dtw_enabled
-        
-    def _extract_reference_landmarks(self) -> List[np.ndarray]:
-        """Extract and normalize reference pose landmarks."""
+    
+    @classmethod
+    def from_features(cls, features: ReferenceFeatures,
+                      config: PoseComparisonConfig = None) -> 'PoseComparisonService':
+        """Create the service from a (memory-mapped) reference feature bundle."""
+        return cls(features.pose_dicts(), config, features=features)
+        
+    def _extract_reference_landmarks(self, mirrored: bool = False) -> List[np.ndarray]:
+        """Extract and normalize reference pose landmarks (optionally of the mirrored reference)."""
         landmarks_list = []
         
         for pose_data in self.reference_poses:
             if pose_data.get("landmarks") is not None:
                 # Extract 3D coordinates (x, y, z) from landmarks
                 landmarks = pose_data["landmarks"]
+                if mirrored and landmarks.shape[0] >= 33:
+                    landmarks = mirror_landmarks(landmarks)
                 if landmarks.shape[1] >= 3:  # Ensure we have x, y, z coordinates
                     # Extract only x, y, z coordinates (ignore visibility)
                     coords = landmarks[:, :3].flatten()
@@ -62,6 +121,174 @@ class PoseComparisonService:
         
         return landmarks_list
     
+    def _stack_reference_frames(self) -> Optional[np.ndarray]:
+        """Stack reference landmarks into (F, 33, 3) (indices aligned with reference_landmarks)."""
+        if self.features is not None:
+            return self.features.frames
+        frames = [
+            pose_data["landmarks"] for pose_data in self.reference_poses
+            if pose_data.get("landmarks") is not None and pose_data["landmarks"].shape[1] >= 3
+        ]
+        if not frames or any(frame.shape[0] < 33 for frame in frames):
+            return None
+        return np.stack([frame[:33, :3] for frame in frames]).astype(np.float64)
+    
+    def _build_joint_error_detector(self) -> Optional[JointErrorDetector]:
+        """Build reference joint-angle tracks for per-joint error detection."""
+        if self.reference_landmark_frames is None:
+            return None
+        
+        try:
+            return JointErrorDetector(
+                self.reference_landmark_frames,
+                reference_angles=self.features.angle_table(POSE_ANGLES) if self.features is not None else None
+            )
+        except Exception as e:
+            print(f"Could not build reference angle tracks: {e}")
+            return None
+    
+    def _stack_reference_timestamps(self) -> np.ndarray:
+        """Reference timestamps in seconds (indices aligned with reference_landmark_frames)."""
+        if self.features is not None:
+            return self.features.timestamps
+        timestamps = [
+            pose_data.get("timestamp", i / 15.0) for i, pose_data in enumerate(
+                pose_data for pose_data in self.reference_poses
+                if pose_data.get("landmarks") is not None and pose_data["landmarks"].shape[1] >= 3
+            )
+        ]
+        return np.array(timestamps, dtype=np.float64)
+    
+    def _build_synchronizer(self) -> Optional[TimingSynchronizer]:
+        """Build reference motion-energy signals for timing synchronization."""
+        if self.reference_landmark_frames is None or len(self.reference_landmark_frames) < 3:
+            return None
+        
+        try:
+            return TimingSynchronizer(
+                self.reference_landmark_frames, self.reference_timestamps,
+                window_seconds=self.config.sync_window_seconds,
+                max_lag_seconds=self.config.sync_max_lag_seconds,
+                reference_energy=self.features.limb_energy[1:] if self.features is not None else None
+            )
+        except Exception as e:
+            print(f"Could not build timing synchronizer: {e}")
+            return None
+    
+    def set_reference_clock(self, start_time: Optional[float]):
+        """Set the user timestamp at which reference playback started (enables timing offsets)."""
+        if self.synchronizer is not None:
+            self.synchronizer.set_reference_clock(start_time)
+    
+    def _get_angle_matcher(self) -> Optional[AngleSpaceMatcher]:
+        """Get the angle-space matcher, precomputing reference features on first use."""
+        mirror = self.config.mirror_mode != "off"
+        if self.reference_landmark_frames is not None and (
+            self._angle_matcher is None or (mirror and self._angle_matcher.num_orientations < 2)
+        ):
+            self._angle_matcher = AngleSpaceMatcher(
+                self.reference_landmark_frames, mirror=mirror,
+                reference_angles=(
+                    self.features.angle_table(MATCHING_ANGLES).values if self.features is not None else None
+                )
+            )
+        return self._angle_matcher
+    
+    def get_session_aligner(self) -> Optional[SessionAligner]:
+        """Get the full-session DTW aligner, precomputing reference features on first use."""
+        if self.reference_landmark_frames is None or len(self.reference_landmark_frames) < 2:
+            return None
+        aligner = self._session_aligner
+        if aligner is None or (aligner.band_seconds, aligner.segment_seconds) != (
+            self.config.alignment_band_seconds, self.config.alignment_segment_seconds
+        ):
+            self._session_aligner = SessionAligner(
+                self.reference_landmark_frames, self.reference_timestamps,
+                band_seconds=self.config.alignment_band_seconds,
+                segment_seconds=self.config.alignment_segment_seconds,
+                reference_features=self.features.embedding if self.features is not None else None
+            )
+        return self._session_aligner
+    
+    def _build_pose_matrix(self, reference_landmarks: List[np.ndarray]) -> Tuple[Optional[np.ndarray], Optional[np.ndarray]]:
+        """Stack scale-normalized reference poses into a (F, D) matrix with row norms."""
+        if not reference_landmarks:
+            return None, None
+        
+        rows = [self._normalize_pose_by_scale(landmarks) for landmarks in reference_landmarks]
+        width = min(len(row) for row in rows)
+        matrix = np.stack([row[:width] for row in rows]).astype(np.float64)
+        return matrix, np.linalg.norm(matrix, axis=1)
+    
+    def _get_mirror_reference(self) -> Optional[Dict[str, Any]]:
+        """Get the mirrored reference (left/right-swapped, x-flipped), building it on first use."""
+        if self._mirror_reference is None and self._reference_pose_matrix is not None:
+            mirrored_landmarks = self._extract_reference_landmarks(mirrored=True)
+            mirrored_matrix, mirrored_norms = self._build_pose_matrix(mirrored_landmarks)
+            if mirrored_matrix is None or mirrored_matrix.shape != self._reference_pose_matrix.shape:
+                return None
+            
+            mirrored_frames = (
+                mirror_landmarks(self.reference_landmark_frames)
+                if self.reference_landmark_frames is not None else None
+            )
+            self._mirror_reference = {
+                # Normal and mirrored rows stacked: both orientations in one matrix product
+                'pose_matrix': np.concatenate([self._reference_pose_matrix, mirrored_matrix]),
+                'pose_norms': np.concatenate([self._reference_pose_norms, mirrored_norms]),
+                'motions': [mirrored_landmarks[i] - mirrored_landmarks[i - 1] for i in range(1, len(mirrored_landmarks))],
+                'joint_error_detector': JointErrorDetector(mirrored_frames) if mirrored_frames is not None else None,
+                'limb_similarity': LimbSimilarity(mirrored_frames) if mirrored_frames is not None else None
+            }
+        return self._mirror_reference
+    
+    def _choose_orientation(self, orientation_scores: np.ndarray) -> int:
+        """Pick the reference orientation (0 = normal, 1 = mirrored) from the (2, F) pose scores."""
+        if self.config.mirror_mode == "on":
+            self.mirrored = True
+        else:
+            self.mirrored = self.orientation_detector.update(
+                float(orientation_scores[0].max()), float(orientation_scores[1].max())
+            )
+        return int(self.mirrored)
+    
+    def detect_joint_errors(self, user_landmarks: np.ndarray, reference_index: int) -> List[Dict[str, Any]]:
+        """Detect per-joint angle errors against a reference frame (mirrored if the dancer is)."""
+        detector = self.joint_error_detector
+        if self.mirrored and self._mirror_reference is not None:
+            detector = self._mirror_reference['joint_error_detector']
+        if detector is None:
+            return []
+        return detector.detect(user_landmarks, reference_index)
+    
+    def calculate_limb_similarity(self, user_landmarks: np.ndarray, reference_index: int) -> Dict[str, float]:
+        """Calculate per-limb similarity (head, torso, arms, legs) against a reference frame."""
+        limb_similarity = self.limb_similarity
+        if self.mirrored and self._mirror_reference is not None:
+            limb_similarity = self._mirror_reference['limb_similarity']
+        if limb_similarity is None:
+            return {}
+        return limb_similarity.compare(user_landmarks, reference_index)
+    
+    def get_reference_analyzers(self, mirrored: bool = False) -> Tuple[Optional[JointErrorDetector], Optional[LimbSimilarity]]:
+        """Joint error detector and limb similarity of the normal or mirrored reference."""
+        if not mirrored:
+            return self.joint_error_detector, self.limb_similarity
+        mirror_reference = self._get_mirror_reference()
+        if mirror_reference is None:
+            return None, None
+        return mirror_reference['joint_error_detector'], mirror_reference['limb_similarity']
+
+    def get_reference_pose_matrix(self, mirrored: bool = False) -> Tuple[Optional[np.ndarray], Optional[np.ndarray]]:
+        """Scale-normalized (F, D) pose matrix and row norms of the normal or mirrored reference."""
+        if not mirrored:
+            return self._reference_pose_matrix, self._reference_pose_norms
+        mirror_reference = self._get_mirror_reference()
+        if mirror_reference is None:
+            return None, None
+        num_frames = len(self._reference_pose_matrix)
+        return mirror_reference['pose_matrix'][num_frames:], mirror_reference['pose_norms'][num_frames:]
+
     def _calculate_reference_motions(self) -> List[np.ndarray]:
         """Calculate motion vectors for reference poses."""
         motions = []
@@ -142,6 +369,23 @@ class PoseComparisonService:
         
         return 0.0
     
+    def _calculate_pose_scores(self, user_landmarks: np.ndarray, pose_matrix: np.ndarray,
+                               pose_norms: np.ndarray) -> np.ndarray:
+        """Cosine similarity with every row of a normalized reference matrix (same result as _calculate_pose_similarity)."""
+        user_normalized = self._normalize_pose_by_scale(user_landmarks)
+        
+        # Ensure same dimensions
+        length = min(len(user_normalized), pose_matrix.shape[1])
+        user_vec = user_normalized[:length]
+        if length < pose_matrix.shape[1]:
+            pose_matrix = pose_matrix[:, :length]
+            pose_norms = np.linalg.norm(pose_matrix, axis=1)
+        
+        norms = pose_norms * np.linalg.norm(user_vec)
+        valid = norms > 0
+        scores = np.where(valid, (pose_matrix @ user_vec) / np.where(valid, norms, 1.0), 0.0)
+        return np.clip(np.nan_to_num(scores, nan=0.0), 0.0, 1.0)
+    
     def _calculate_motion_similarity(self, user_motion: np.ndarray, 
                                    reference_motion: np.ndarray) -> float:
         """Calculate similarity between motion vectors."""
@@ -166,32 +410,74 @@ class PoseComparisonService:
         return 0.0
     
     def _find_best_reference_match(self, user_landmarks: np.ndarray, 
-                                 user_motion: Optional[np.ndarray] = None) -> Tuple[int, float, float]:
-        """Find the best matching reference pose using combined metrics."""
+                                 user_motion: Optional[np.ndarray] = None,
+                                 search_center: Optional[int] = None) -> Tuple[int, float, float]:
+        """
+        Find the best matching reference pose using combined metrics.
+        
+        If search_center is given (reference position from timing
+        synchronization), the best pose is searched within ±motion_window
+        frames of it instead of over the whole reference.
+        """
+        mirror_reference = self._get_mirror_reference() if self.config.mirror_mode != "off" else None
+        if mirror_reference is None:
+            self.mirrored = False
+        
+        if self.config.matching_mode == "angles":
+            matcher = self._get_angle_matcher()
+            if matcher is not None and user_landmarks.ndim == 2 and user_landmarks.shape[0] >= 33:
+                previous_landmarks = None
+                if user_motion is not None and len(self.user_pose_history) >= 2:
+                    previous_landmarks = self.user_pose_history[-2]['landmarks']
+                return matcher.find_best_match(
+                    user_landmarks, previous_landmarks,
+                    self.config.pose_weight, self.config.motion_weight,
+                    choose_orientation=self._choose_orientation if mirror_reference is not None else None,
+                    search_center=search_center
+                )
+        
         best_pose_score = 0.0
         best_motion_score = 0.0
         best_match_idx = 0
         
-        # Calculate pose similarity with all reference poses
-        pose_scores = []
-        for ref_landmarks in self.reference_landmarks:
-            pose_score = self._calculate_pose_similarity(user_landmarks, ref_landmarks)
-            pose_scores.append(pose_score)
-        
-        # Find best pose match
-        best_pose_idx = np.argmax(pose_scores)
-        best_pose_score = pose_scores[best_pose_idx]
+        if self._reference_pose_matrix is None:
+            return best_match_idx, best_pose_score, best_motion_score
+        
+        # Calculate pose similarity with all reference poses (both orientations in mirror mode)
+        reference_motions = self.reference_motions
+        if mirror_reference is not None:
+            orientation_scores = self._calculate_pose_scores(
+                user_landmarks, mirror_reference['pose_matrix'], mirror_reference['pose_norms']
+            ).reshape(2, -1)
+            orientation = self._choose_orientation(orientation_scores)
+            pose_scores = orientation_scores[orientation]
+            if orientation == 1:
+                reference_motions = mirror_reference['motions']
+        else:
+            pose_scores = self._calculate_pose_scores(
+                user_landmarks, self._reference_pose_matrix, self._reference_pose_norms
+            )
+        
+        motion_window = 10  # Search within ±10 frames
+        
+        # Find best pose match (near the synchronized position if known)
+        if search_center is not None:
+            low = int(np.clip(search_center - motion_window, 0, len(pose_scores) - 1))
+            high = min(len(pose_scores), search_center + motion_window + 1)
+            best_pose_idx = low + int(np.argmax(pose_scores[low:max(high, low + 1)]))
+        else:
+            best_pose_idx = int(np.argmax(pose_scores))
+        best_pose_score = float(pose_scores[best_pose_idx])
         
         # Calculate motion similarity if motion data is available
-        if user_motion is not None and len(self.reference_motions) > 0:
+        if user_motion is not None and len(reference_motions) > 0:
             # Find best motion match within a window around the best pose match
-            motion_window = 10  # Search within ±10 frames
             start_idx = max(0, best_pose_idx - motion_window)
-            end_idx = min(len(self.reference_motions), best_pose_idx + motion_window)
+            end_idx = min(len(reference_motions), best_pose_idx + motion_window)
             
             motion_scores = []
             for i in range(start_idx, end_idx):
-                motion_score = self._calculate_motion_similarity(user_motion, self.reference_motions[i])
+                motion_score = self._calculate_motion_similarity(user_motion, reference_motions[i])
                 motion_scores.append(motion_score)
             
             if motion_scores:
@@ -206,7 +492,7 @@ class PoseComparisonService:
                 if combined_scores:
                     best_combined_idx = np.argmax(combined_scores)
                     best_match_idx = start_idx + best_combined_idx
-                    best_pose_score = pose_scores[best_match_idx]
+                    best_pose_score = float(pose_scores[best_match_idx])
         
         return best_match_idx, best_pose_score, best_motion_score
     
@@ -280,9 +566,18 @@ class PoseComparisonService:
             user_motion = current_pose - previous_pose
             self.user_motion_history.append(user_motion)
         
+        # Timing synchronization: where in the reference the user's motion is now
+        timing = None
+        if self.synchronizer is not None and self.config.sync_enabled:
+            self.synchronizer.add_user_pose(timestamp, user_landmarks)
+            timing = self.synchronizer.estimate(timestamp, mirrored=self.mirrored)
+        search_center = None
+        if timing is not None and timing['confidence'] >= self.config.sync_min_confidence:
+            search_center = timing['reference_index']
+        
         # Find best reference match
         best_match_idx, pose_score, motion_score = self._find_best_reference_match(
-            user_landmarks, user_motion
+            user_landmarks, user_motion, search_center
         )
         
         # Calculate combined score using config weights
@@ -314,6 +609,12 @@ class PoseComparisonService:
         # Apply smoothing
         smoothed_scores = self._apply_smoothing()
         
+        # Per-joint errors against the matched reference frame
+        errors = self.detect_joint_errors(user_landmarks, best_match_idx)
+        
+        # Per-limb similarity against the same reference frame
+        limb_scores = self.calculate_limb_similarity(user_landmarks, best_match_idx)
+        
         return {
             'combined_score': smoothed_scores['combined_score'],
             'pose_score': smoothed_scores['pose_score'],
@@ -321,6 +622,10 @@ class PoseComparisonService:
             'dtw_score': smoothed_scores['dtw_score'],
             'best_match_idx': best_match_idx,
             'dtw_path': dtw_path,
+            'errors': errors,
+            'limb_scores': limb_scores,
+            'mirrored': self.mirrored,
+            'timing': timing,
             'timestamp': timestamp
         }
     
@@ -357,6 +662,12 @@ class PoseComparisonService:
             return self.reference_motions[index]
         return None
     
+    def get_reference_gesture_track(self) -> np.ndarray:
+        """(F, 2) left/right hand gesture labels per reference frame ("" = none)."""
+        if self.features is not None:
+            return self.features.gestures
+        return gesture_labels(self.reference_poses)
+    
     def get_reference_frame_info(self, index: int) -> Optional[Dict[str, Any]]:
         """Get reference frame information at specific index."""
         if 0 <= index < len(self.reference_poses):
@@ -388,7 +699,18 @@ class PoseComparisonService:
     
     def update_config(self, config: PoseComparisonConfig):
         """Update the configuration dynamically."""
+        if config.mirror_mode != self.config.mirror_mode:
+            self.orientation_detector.reset()
+            self.mirrored = False
+        sync_changed = (
+            (config.sync_window_seconds, config.sync_max_lag_seconds) !=
+            (self.config.sync_window_seconds, self.config.sync_max_lag_seconds)
+        )
         self.config = config
+        if sync_changed and self.synchronizer is not None:
+            clock_start = self.synchronizer.reference_clock_start
+            self.synchronizer = self._build_synchronizer()
+            self.set_reference_clock(clock_start)
         # Update internal settings
         self.dtw_window = min(self.config.dtw_window, len(self.reference_landmarks))
         self.dtw_interval = self.config.dtw_interval
@@ -0,0 +1,366 @@
+"""
+Pose Library Index
+
+Identifies which reference video (and which part of it) a dancer is
+performing from a few seconds of landmarks, without the user having to
+load the reference first.
+
+Every frame of every processed reference is embedded once:
+- Joint-angle features (unit-circle embedding of MATCHING_ANGLES)
+- Limb-relative, shoulder-width-scaled coordinates (see limb_similarity)
+Both are camera invariant. The embeddings are PCA-reduced and stored in an
+IVF-style partitioned index: k-means centroids, with each frame stored in the
+list of its nearest centroid. A query frame only scans the lists of its
+nprobe nearest centroids.
+
+Each query frame's nearest neighbours vote for (video, time offset) pairs;
+consistent offsets across the clip accumulate, so the winner is both the
+song and the position in it.
+"""
+import os
+from typing import Any, Dict, List, Optional, Sequence, Tuple
+import numpy as np
+from app.services.angle_calculator import MATCHING_ANGLES, compute_angle_table
+from app.services.limb_similarity import normalize_limb_frames
+
+
+# Weight of the coordinate block relative to the angle block in the embedding
+COORDINATE_WEIGHT = 0.5
+
+# Rows per chunk when assigning vectors to partitions (bounds the distance matrix)
+ASSIGN_CHUNK_SIZE = 65536
+
+
+def pose_embedding(landmarks: np.ndarray) -> np.ndarray:
+    """
+    Camera-invariant embedding of poses (before PCA).
+
+    Stored in the reference feature bundles: bump
+    reference_features.FEATURES_VERSION when this changes.
+
+    Args:
+        landmarks: (N, 33, C) landmarks, C >= 3
+
+    Returns:
+        (N, D) embeddings
+    """
+    landmarks = np.asarray(landmarks, dtype=np.float64)
+    angles = np.nan_to_num(np.radians(compute_angle_table(landmarks, MATCHING_ANGLES).values))
+    angle_block = np.concatenate([np.cos(angles), np.sin(angles)], axis=1) / np.sqrt(angles.shape[1])
+
+    coordinates = normalize_limb_frames(landmarks)
+    coordinate_block = coordinates * (COORDINATE_WEIGHT / np.sqrt(coordinates.shape[1] / 3))
+
+    return np.concatenate([angle_block, coordinate_block], axis=1)
+
+
+def _squared_distances(points: np.ndarray, centers: np.ndarray) -> np.ndarray:
+    """(N, K) squared Euclidean distances."""
+    return (
+        np.sum(points ** 2, axis=1)[:, np.newaxis]
+        - 2 * points @ centers.T
+        + np.sum(centers ** 2, axis=1)[np.newaxis, :]
+    )
+
+
+def nearest_centers(points: np.ndarray, centers: np.ndarray) -> np.ndarray:
+    """Index of the nearest center for each point (chunked for large inputs)."""
+    return np.concatenate([
+        np.argmin(_squared_distances(points[start:start + ASSIGN_CHUNK_SIZE], centers), axis=1)
+        for start in range(0, len(points), ASSIGN_CHUNK_SIZE)
+    ]) if len(points) else np.zeros(0, dtype=np.int64)
+
+
+def kmeans(points: np.ndarray, num_clusters: int, iterations: int = 20, seed: int = 0) -> np.ndarray:
+    """
+    Lloyd's k-means with k-means++ style seeding.
+
+    Args:
+        points: (N, D) points
+        num_clusters: Number of centroids (<= N)
+        iterations: Maximum Lloyd iterations
+        seed: Random seed
+
+    Returns:
+        (num_clusters, D) centroids
+    """
+    rng = np.random.default_rng(seed)
+    centers = [points[rng.integers(len(points))]]
+    closest = np.sum((points - centers[0]) ** 2, axis=1)
+    for _ in range(1, num_clusters):
+        total = closest.sum()
+        index = rng.choice(len(points), p=closest / total) if total > 0 else rng.integers(len(points))
+        centers.append(points[index])
+        closest = np.minimum(closest, np.sum((points - points[index]) ** 2, axis=1))
+    centers = np.array(centers)
+
+    for _ in range(iterations):
+        labels = nearest_centers(points, centers)
+        counts = np.bincount(labels, minlength=num_clusters)
+        sums = np.zeros_like(centers)
+        np.add.at(sums, labels, points)
+        updated = np.where(counts[:, np.newaxis] > 0, sums / np.maximum(counts, 1)[:, np.newaxis], centers)
+        if np.allclose(updated, centers):
+            break
+        centers = updated
+
+    return centers
+
+
+class PoseLibraryIndex:
+    """
+    Partitioned nearest-neighbour index over all reference videos.
+
+    Usage:
+    1. PoseLibraryIndex.from_directory(processed_poses_dir), or add_video() + build()
+    2. Call identify() with a few seconds of user landmarks
+    """
+
+    def __init__(
+        self,
+        num_components: int = 16,
+        nprobe: int = 4,
+        neighbors_per_frame: int = 10,
+        offset_bin_seconds: float = 0.5,
+        max_training_points: int = 20000
+    ):
+        """
+        Initialize an empty index.
+
+        Args:
+            num_components: PCA dimensions kept
+            nprobe: Number of partitions scanned per query frame
+            neighbors_per_frame: Nearest reference frames voting per query frame
+            offset_bin_seconds: Width of the time-offset voting bins
+            max_training_points: Frames sampled to fit PCA and k-means
+        """
+        self.num_components = num_components
+        self.nprobe = nprobe
+        self.neighbors_per_frame = neighbors_per_frame
+        self.offset_bin_seconds = offset_bin_seconds
+        self.max_training_points = max_training_points
+
+        self.video_names: List[str] = []
+        self._video_features: List[Tuple[np.ndarray, np.ndarray]] = []
+
+        # Built state
+        self.mean: Optional[np.ndarray] = None
+        self.components: Optional[np.ndarray] = None
+        self.centroids: Optional[np.ndarray] = None
+        self.vectors: Optional[np.ndarray] = None        # (N, d), ordered by partition
+        self.frame_videos: Optional[np.ndarray] = None   # (N,) video id per vector
+        self.frame_times: Optional[np.ndarray] = None    # (N,) reference timestamp per vector
+        self.list_offsets: Optional[np.ndarray] = None   # (K + 1,) partition boundaries
+
+    def __len__(self) -> int:
+        return 0 if self.vectors is None else len(self.vectors)
+
+    @classmethod
+    def from_directory(cls, directory: str, **kwargs) -> 'PoseLibraryIndex':
+        """
+        Build an index over every "<video>_poses.npy" file in a directory.
+
+        Args:
+            directory: processed_poses directory (embeddings from up-to-date
+                reference feature bundles are used instead of recomputed)
+            **kwargs: PoseLibraryIndex options
+
+        Returns:
+            Built index (empty if no usable files)
+        """
+        # Deferred import: reference_library depends on pose_embedding
+        from app.services.reference_library import load_stage_arrays
+
+        index = cls(**kwargs)
+        for filename in sorted(os.listdir(directory)):
+            if not filename.endswith(".npy") or filename.endswith(".tmp.npy"):
+                continue
+            name = filename[:-len(".npy")].removesuffix("_poses")
+            try:
+                # Embeddings from the reference feature bundle, if up to date
+                cached = load_stage_arrays(directory, name, "features")
+                if cached is not None:
+                    if len(cached["timestamps"]):
+                        index.add_embeddings(name, cached["embedding"], cached["timestamps"])
+                    continue
+
+                data = np.load(os.path.join(directory, filename), allow_pickle=True)
+                frames = [frame for frame in data if frame.get('has_pose', False)]
+                if not frames:
+                    continue
+                index.add_video(
+                    name,
+                    np.stack([frame['landmarks'] for frame in frames]),
+                    np.array([frame['timestamp'] for frame in frames], dtype=np.float64)
+                )
+            except Exception as e:
+                print(f"[PoseIndex] Skipping {filename}: {e}")
+
+        index.build()
+        return index
+
+    def add_video(self, name: str, landmarks: np.ndarray, timestamps: Sequence[float]):
+        """
+        Add a reference video to the index (call build() afterwards).
+
+        Args:
+            name: Video name (as used by /api/reference/load)
+            landmarks: (F, 33, C) reference landmarks
+            timestamps: (F,) reference timestamps in seconds
+        """
+        self.add_embeddings(name, pose_embedding(landmarks), timestamps)
+
+    def add_embeddings(self, name: str, embeddings: np.ndarray, timestamps: Sequence[float]):
+        """
+        Add a reference video from precomputed pose_embedding() rows (call build() afterwards).
+
+        Args:
+            name: Video name (as used by /api/reference/load)
+            embeddings: (F, D) pose_embedding() of the reference landmarks
+            timestamps: (F,) reference timestamps in seconds
+        """
+        self.video_names.append(name)
+        self._video_features.append((np.asarray(embeddings, dtype=np.float64), np.asarray(timestamps, dtype=np.float64)))
+
+    def build(self, seed: int = 0):
+        """Fit PCA and the partitions over all added videos (rebuilds from scratch)."""
+        if not self._video_features:
+            return
+
+        embeddings = np.concatenate([embedding for embedding, _ in self._video_features])
+        videos = np.concatenate([np.full(len(times), i) for i, (_, times) in enumerate(self._video_features)])
+        times = np.concatenate([times for _, times in self._video_features])
+
+        rng = np.random.default_rng(seed)
+        sample = embeddings
+        if len(embeddings) > self.max_training_points:
+            sample = embeddings[rng.choice(len(embeddings), self.max_training_points, replace=False)]
+
+        # PCA from the sample's SVD
+        self.mean = sample.mean(axis=0)
+        _, _, vt = np.linalg.svd(sample - self.mean, full_matrices=False)
+        self.components = vt[:min(self.num_components, vt.shape[0])]
+        vectors = (embeddings - self.mean) @ self.components.T
+
+        # IVF partitions: ~sqrt(N) centroids, every vector in its nearest centroid's list
+        num_lists = int(np.clip(np.sqrt(len(vectors)), 1, len(sample)))
+        self.centroids = kmeans((sample - self.mean) @ self.components.T, num_lists, seed=seed)
+        labels = nearest_centers(vectors, self.centroids)
+
+        order = np.argsort(labels, kind='stable')
+        self.vectors = vectors[order]
+        self.frame_videos = videos[order]
+        self.frame_times = times[order]
+        self.list_offsets = np.concatenate(([0], np.cumsum(np.bincount(labels, minlength=num_lists))))
+
+        print(f"[PoseIndex] Indexed {len(self.vectors)} frames from {len(self.video_names)} videos "
+              f"({num_lists} partitions, {self.components.shape[0]} dims)")
+
+    def search(self, landmarks: np.ndarray) -> List[Tuple[np.ndarray, np.ndarray]]:
+        """
+        Nearest reference frames for each query pose.
+
+        Args:
+            landmarks: (N, 33, C) query landmarks
+
+        Returns:
+            Per query frame: (vector_indices, squared_distances), nearest first
+        """
+        if self.vectors is None:
+            return []
+
+        queries = (pose_embedding(landmarks) - self.mean) @ self.components.T
+        nprobe = min(self.nprobe, len(self.centroids))
+        probes = np.argsort(_squared_distances(queries, self.centroids), axis=1)[:, :nprobe]
+
+        results = []
+        for query, lists in zip(queries, probes):
+            candidates = np.concatenate([
+                np.arange(self.list_offsets[i], self.list_offsets[i + 1]) for i in lists
+            ])
+            distances = np.sum((self.vectors[candidates] - query) ** 2, axis=1)
+            k = min(self.neighbors_per_frame, len(candidates))
+            nearest = np.argpartition(distances, k - 1)[:k]
+            nearest = nearest[np.argsort(distances[nearest])]
+            results.append((candidates[nearest], distances[nearest]))
+        return results
+
+    def identify(
+        self,
+        landmarks: np.ndarray,
+        timestamps: Optional[Sequence[float]] = None,
+        top_k: int = 3
+    ) -> List[Dict[str, Any]]:
+        """
+        Identify the video and position a clip of user poses comes from.
+
+        Args:
+            landmarks: (N, 33, C) user landmarks (a few seconds)
+            timestamps: (N,) user timestamps in seconds (frame indices at 15 FPS if None)
+            top_k: Number of candidates returned
+
+        Returns:
+            Candidates, most likely first:
+            [
+                {
+                    "video_name": "magnetic",
+                    "offset": 42.3,         # reference time of the first user frame
+                    "current_time": 45.1,   # reference time of the last user frame
+                    "confidence": 0.81      # share of query frames supporting it
+                },
+                ...
+            ]
+        """
+        landmarks = np.asarray(landmarks, dtype=np.float64)
+        if self.vectors is None or landmarks.ndim != 3 or len(landmarks) == 0:
+            return []
+
+        user_times = (
+            np.asarray(timestamps, dtype=np.float64) if timestamps is not None
+            else np.arange(len(landmarks)) / 15.0
+        )
+        user_times = user_times - user_times[0]
+
+        # Every neighbour votes for (video, offset bin), weighted by rank within its frame
+        votes: Dict[Tuple[int, int], List[float]] = {}
+        rank_weights = 1.0 / (1.0 + np.arange(self.neighbors_per_frame))
+        for user_time, (indices, _) in zip(user_times.tolist(), self.search(landmarks)):
+            offsets = self.frame_times[indices] - user_time
+            bins = np.round(offsets / self.offset_bin_seconds).astype(np.int64)
+            seen = set()
+            for video, bin_id, offset, weight in zip(
+                self.frame_videos[indices].tolist(), bins.tolist(), offsets.tolist(),
+                rank_weights[:len(indices)].tolist()
+            ):
+                key = (video, bin_id)
+                if key in seen:
+                    continue  # one vote per frame and offset bin
+                seen.add(key)
+                entry = votes.setdefault(key, [0.0, 0.0, 0])
+                entry[0] += weight
+                entry[1] += weight * offset
+                entry[2] += 1
+
+        # Merge adjacent bins (an offset on a bin edge splits its votes)
+        candidates = []
+        for (video, bin_id), (weight, weighted_offset, count) in votes.items():
+            neighbors = [votes.get((video, bin_id + delta)) for delta in (-1, 1)]
+            total_weight = weight + sum(entry[0] for entry in neighbors if entry)
+            total_count = count + sum(entry[2] for entry in neighbors if entry)
+            candidates.append((total_weight, video, weighted_offset / weight, total_count))
+        candidates.sort(key=lambda candidate: -candidate[0])
+
+        results = []
+        for _, video, offset, count in candidates:
+            if any(r["video_name"] == self.video_names[video] and
+                   abs(r["offset"] - offset) < 2 * self.offset_bin_seconds for r in results):
+                continue
+            results.append({
+                "video_name": self.video_names[video],
+                "offset": round(offset, 2),
+                "current_time": round(offset + float(user_times[-1]), 2),
+                "confidence": round(min(1.0, count / len(landmarks)), 3)
+            })
+            if len(results) == top_k:
+                break
+        return results
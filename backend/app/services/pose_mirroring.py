@@ -0,0 +1,89 @@
+"""
+Pose Mirroring
+
+Helpers for dancers practicing in front of a mirrored reference video: their
+left side follows the dancer's right side on screen, so they are compared
+with a left/right-swapped, horizontally flipped copy of the reference.
+
+- mirror_landmarks(): swap MediaPipe left/right indices and flip x
+- OrientationDetector: decides from the best scores of both orientations
+  which one the dancer is using (with hysteresis, so it does not flicker)
+"""
+from collections import deque
+import numpy as np
+
+
+# MediaPipe pose index of the opposite-side landmark (nose maps to itself)
+MIRROR_PERMUTATION = np.array([
+    0,                          # nose
+    4, 5, 6, 1, 2, 3,           # eyes (inner, center, outer)
+    8, 7,                       # ears
+    10, 9,                      # mouth
+    12, 11, 14, 13, 16, 15,     # shoulders, elbows, wrists
+    18, 17, 20, 19, 22, 21,     # pinkies, index fingers, thumbs
+    24, 23, 26, 25, 28, 27,     # hips, knees, ankles
+    30, 29, 32, 31              # heels, foot index
+])
+
+
+def mirror_landmarks(landmarks: np.ndarray) -> np.ndarray:
+    """
+    Mirror poses: swap left/right landmarks and flip x (normalized coordinates).
+
+    Args:
+        landmarks: (..., 33, C) landmarks, x in column 0
+
+    Returns:
+        Mirrored copy with the same shape
+    """
+    landmarks = np.asarray(landmarks)
+    mirrored = landmarks[..., MIRROR_PERMUTATION, :].astype(np.float64)
+    mirrored[..., 0] = 1.0 - mirrored[..., 0]
+    return mirrored
+
+
+class OrientationDetector:
+    """
+    Detects whether the dancer follows the reference mirrored.
+
+    Keeps the recent differences between the best mirrored and the best
+    normal pose score; the orientation switches only when the mean
+    difference clearly favors the other one.
+    """
+
+    def __init__(self, window: int = 15, margin: float = 0.005):
+        """
+        Initialize the detector.
+
+        Args:
+            window: Number of recent snapshots considered
+            margin: Mean score advantage needed to switch orientation
+        """
+        self.margin = margin
+        self.mirrored = False
+        self._advantages = deque(maxlen=window)
+
+    def update(self, normal_best: float, mirrored_best: float) -> bool:
+        """
+        Add one snapshot's best scores and return the current orientation.
+
+        Args:
+            normal_best: Best pose score against the normal reference
+            mirrored_best: Best pose score against the mirrored reference
+
+        Returns:
+            True if the dancer is (now) considered mirrored
+        """
+        self._advantages.append(mirrored_best - normal_best)
+        advantage = float(np.mean(self._advantages))
+
+        if not self.mirrored and advantage > self.margin:
+            self.mirrored = True
+        elif self.mirrored and advantage < -self.margin:
+            self.mirrored = False
+        return self.mirrored
+
+    def reset(self):
+        """Forget the score history and assume normal orientation."""
+        self.mirrored = False
+        self._advantages.clear()
@@ -0,0 +1,436 @@
+"""
+Practice Video Evaluation
+
+Offline counterpart of a live session: scores a recorded practice video
+against the loaded reference and produces the same report structures
+(timeline, problem areas, statistics, DTW timing report).
+
+Pipeline:
+1. A reader thread decodes the video with cv2.VideoCapture and groups the
+   sampled frames into contiguous chunks (decoding overlaps pose inference)
+2. A pool of worker threads extracts landmarks chunk by chunk, with a fresh
+   tracking-mode MediaPipe Pose instance per chunk (frames within a chunk
+   are consecutive, so tracking works inside it and never carries over from
+   a chunk seconds away)
+3. The whole landmark sequence is aligned with the reference by banded DTW
+   and all scores (pose, motion, per-limb, joint errors) are computed in
+   batched NumPy passes against the aligned reference frames
+"""
+import os
+import queue
+import threading
+import time
+from dataclasses import dataclass
+from typing import Any, Callable, Dict, List, Optional, Tuple
+import cv2
+import numpy as np
+from app.data.config import settings
+from app.services.angle_matching import AngleSpaceMatcher, wrap_radians
+from app.services.limb_similarity import LIMB_NAMES
+from app.services.pose_comparison_service import PoseComparisonService
+from app.services.reference_features import essential_columns, scale_normalize
+from app.services.scoring import ScoringService
+from app.services.session_alignment import SessionAlignment
+
+
+@dataclass
+class ExtractedPoses:
+    """Landmarks extracted from a video (one entry per sampled frame)."""
+    frame_numbers: np.ndarray  # (N,) 0-based video frame indices
+    timestamps: np.ndarray  # (N,) seconds from the start of the video
+    landmarks: np.ndarray  # (N, 33, 4) x, y, z, visibility (NaN where no pose)
+    has_pose: np.ndarray  # (N,) bool
+    video_info: Dict[str, Any]
+    elapsed: float  # seconds spent decoding + extracting
+
+
+def default_pose_factory(model_complexity: int = 1) -> Callable[[], Any]:
+    """Factory of tracking-mode MediaPipe Pose instances."""
+    import mediapipe as mp
+
+    def create():
+        return mp.solutions.pose.Pose(
+            static_image_mode=False,
+            model_complexity=model_complexity,
+            enable_segmentation=False,
+            min_detection_confidence=settings.mediapipe_min_detection_confidence,
+            min_tracking_confidence=settings.mediapipe_min_tracking_confidence
+        )
+    return create
+
+
+class PracticeVideoEvaluator:
+    """
+    Batch evaluator for recorded practice videos.
+
+    Usage:
+    1. Create once per loaded reference (wraps its PoseComparisonService)
+    2. Call evaluate() with a video file path
+    """
+
+    def __init__(
+        self,
+        comparison_service: PoseComparisonService,
+        num_workers: Optional[int] = None,
+        target_fps: float = 15.0,
+        chunk_frames: int = 60,
+        pose_factory: Optional[Callable[[], Any]] = None
+    ):
+        """
+        Initialize the evaluator.
+
+        Args:
+            comparison_service: Service holding the reference clip and config
+            num_workers: Pose extraction threads (CPU count, at most 8, if None)
+            target_fps: Frame rate poses are extracted at (video frames are strided)
+            chunk_frames: Sampled frames per chunk handed to a worker
+            pose_factory: Creates one pose estimator per chunk (object with
+                process(rgb_frame) and close(), like mediapipe Pose)
+        """
+        self.comparison_service = comparison_service
+        self.num_workers = num_workers or min(8, os.cpu_count() or 1)
+        self.target_fps = target_fps
+        self.chunk_frames = chunk_frames
+        self.pose_factory = pose_factory or default_pose_factory(settings.mediapipe_model_complexity)
+        self._matcher: Optional[AngleSpaceMatcher] = None
+
+    def evaluate(
+        self,
+        video_path: str,
+        mirror_mode: Optional[str] = None,
+        reference_offset: float = 0.0
+    ) -> Dict[str, Any]:
+        """
+        Evaluate a practice video against the reference.
+
+        Args:
+            video_path: Path of the user's video file
+            mirror_mode: "off", "on" or "auto" (comparison service config if None)
+            reference_offset: Reference time (seconds) at which the video starts
+
+        Returns:
+            Report dict (see score())
+        """
+        extracted = self.extract_poses(video_path)
+        return self.score(extracted, mirror_mode=mirror_mode, reference_offset=reference_offset)
+
+    def extract_poses(self, video_path: str) -> ExtractedPoses:
+        """
+        Decode a video and extract pose landmarks with the worker pool.
+
+        Args:
+            video_path: Path of the video file
+
+        Returns:
+            ExtractedPoses in frame order
+
+        Raises:
+            FileNotFoundError: If the file does not exist
+            ValueError: If the video cannot be opened
+            RuntimeError: If a pose estimator cannot be created
+        """
+        if not os.path.exists(video_path):
+            raise FileNotFoundError(f"Video file not found: {video_path}")
+
+        cap = cv2.VideoCapture(video_path)
+        if not cap.isOpened():
+            raise ValueError(f"Could not open video file: {video_path}")
+
+        fps = cap.get(cv2.CAP_PROP_FPS) or 30.0
+        total_frames = int(cap.get(cv2.CAP_PROP_FRAME_COUNT))
+        video_info = {
+            "fps": fps,
+            "total_frames": total_frames,
+            "duration": total_frames / fps if fps > 0 else 0.0,
+            "resolution": {
+                "width": int(cap.get(cv2.CAP_PROP_FRAME_WIDTH)),
+                "height": int(cap.get(cv2.CAP_PROP_FRAME_HEIGHT))
+            }
+        }
+        stride = max(1, int(round(fps / self.target_fps))) if self.target_fps else 1
+
+        start = time.perf_counter()
+        chunks: queue.Queue = queue.Queue(maxsize=2 * self.num_workers)
+        results: Dict[int, List[Tuple[int, float, Optional[np.ndarray]]]] = {}
+        errors: List[Exception] = []
+
+        reader = threading.Thread(
+            target=self._read_frames, args=(cap, fps, stride, chunks, errors), daemon=True
+        )
+        workers = [
+            threading.Thread(target=self._extract_chunks, args=(chunks, results, errors), daemon=True)
+            for _ in range(self.num_workers)
+        ]
+        reader.start()
+        for worker in workers:
+            worker.start()
+        reader.join()
+        for worker in workers:
+            worker.join()
+        cap.release()
+
+        if errors:
+            raise RuntimeError(f"Could not create pose estimator: {errors[0]}") from errors[0]
+
+        frames = [frame for chunk_index in sorted(results) for frame in results[chunk_index]]
+        landmarks = np.full((len(frames), 33, 4), np.nan)
+        has_pose = np.zeros(len(frames), dtype=bool)
+        for i, (_, _, frame_landmarks) in enumerate(frames):
+            if frame_landmarks is not None:
+                landmarks[i] = frame_landmarks
+                has_pose[i] = True
+
+        return ExtractedPoses(
+            frame_numbers=np.array([frame[0] for frame in frames], dtype=np.int64),
+            timestamps=np.array([frame[1] for frame in frames], dtype=np.float64),
+            landmarks=landmarks,
+            has_pose=has_pose,
+            video_info=video_info,
+            elapsed=time.perf_counter() - start
+        )
+
+    def _read_frames(self, cap, fps: float, stride: int, chunks: queue.Queue, errors: List[Exception]):
+        """Reader thread: decode frames and queue contiguous chunks of sampled frames."""
+        chunk, chunk_index, frame_number = [], 0, 0
+        try:
+            # Skipped frames are only grabbed (no retrieve: no color conversion or copy)
+            while not errors and cap.grab():
+                if frame_number % stride == 0:
+                    success, frame = cap.retrieve()
+                    if not success:
+                        break
+                    chunk.append((frame_number, frame_number / fps, frame))
+                    if len(chunk) == self.chunk_frames:
+                        chunks.put((chunk_index, chunk))
+                        chunk, chunk_index = [], chunk_index + 1
+                frame_number += 1
+        except Exception as e:
+            print(f"[PracticeEvaluation] Video decoding stopped: {e}")
+        finally:
+            if chunk:
+                chunks.put((chunk_index, chunk))
+            for _ in range(self.num_workers):
+                chunks.put(None)
+
+    def _extract_chunks(self, chunks: queue.Queue, results: Dict[int, list], errors: List[Exception]):
+        """Worker thread: extract queued chunks until the sentinel, each with a fresh pose instance."""
+        while True:
+            item = chunks.get()
+            if item is None:
+                break
+            if errors:
+                continue  # Extraction failed: drain the queue so the reader can finish
+            chunk_index, chunk = item
+            try:
+                estimator = self.pose_factory()
+            except Exception as e:
+                print(f"[PracticeEvaluation] Could not create pose estimator: {e}")
+                errors.append(e)
+                continue
+
+            try:
+                results[chunk_index] = [
+                    (frame_number, timestamp, self._detect(estimator, frame))
+                    for frame_number, timestamp, frame in chunk
+                ]
+            finally:
+                if hasattr(estimator, "close"):
+                    estimator.close()
+
+    def _detect(self, estimator, frame: np.ndarray) -> Optional[np.ndarray]:
+        """Landmarks (33, 4) of one BGR frame, or None."""
+        try:
+            pose_results = estimator.process(cv2.cvtColor(frame, cv2.COLOR_BGR2RGB))
+        except Exception as e:
+            print(f"[PracticeEvaluation] Pose extraction failed: {e}")
+            return None
+        if not pose_results.pose_landmarks:
+            return None
+        return np.array([[lm.x, lm.y, lm.z, lm.visibility] for lm in pose_results.pose_landmarks.landmark])
+
+    def _get_matcher(self) -> Optional[AngleSpaceMatcher]:
+        """Angle features of both reference orientations (built on first use)."""
+        frames = self.comparison_service.reference_landmark_frames
+        if self._matcher is None and frames is not None:
+            self._matcher = AngleSpaceMatcher(frames, mirror=True)
+        return self._matcher
+
+    def score(
+        self,
+        extracted: ExtractedPoses,
+        mirror_mode: Optional[str] = None,
+        reference_offset: float = 0.0
+    ) -> Dict[str, Any]:
+        """
+        Score extracted poses against the reference.
+
+        Args:
+            extracted: Output of extract_poses()
+            mirror_mode: "off", "on" or "auto" (comparison service config if None)
+            reference_offset: Reference time (seconds) at which the video starts
+
+        Returns:
+            {
+                "video_info": {...},
+                "processing": {"sampled_frames", "frames_with_pose", "elapsed", "realtime_factor"},
+                "total_poses": 812,
+                "average_similarity": 0.74,
+                "mirrored": False,
+                "statistics": {...},      # ScoringService.get_session_statistics()
+                "timeline": [...],        # ScoringService.get_timeline()
+                "problem_areas": [...],   # ScoringService.identify_problem_areas()
+                "timing_report": {...}    # SessionAligner.report() (None if too short)
+            }
+        """
+        config = self.comparison_service.config
+        mirror_mode = mirror_mode or config.mirror_mode
+
+        score_start = time.perf_counter()
+        valid = extracted.has_pose
+        times = extracted.timestamps[valid] + reference_offset
+        landmarks = extracted.landmarks[valid]
+
+        scoring = ScoringService()
+        alignment = self._align(landmarks, times, mirror_mode)
+        if alignment is not None:
+            self._record_scores(scoring, landmarks, times, reference_offset, alignment)
+
+        elapsed = extracted.elapsed + (time.perf_counter() - score_start)
+        duration = extracted.video_info.get("duration", 0.0)
+        aligner = self.comparison_service.get_session_aligner()
+        statistics = scoring.get_session_statistics()
+
+        return {
+            "video_info": extracted.video_info,
+            "processing": {
+                "sampled_frames": int(len(extracted.timestamps)),
+                "frames_with_pose": int(valid.sum()),
+                "elapsed": round(elapsed, 3),
+                "realtime_factor": round(duration / elapsed, 2) if elapsed > 0 else None
+            },
+            "total_poses": int(len(landmarks)) if alignment is not None else 0,
+            "average_similarity": statistics.get("average_score", 0.0),
+            "mirrored": alignment.mirrored if alignment is not None else False,
+            "statistics": statistics,
+            "timeline": scoring.get_timeline(
+                resolution=settings.timeline_resolution,
+                max_points=settings.timeline_max_points
+            ),
+            "problem_areas": scoring.identify_problem_areas(),
+            "timing_report": aligner.report(
+                alignment,
+                timeline_resolution=settings.timeline_resolution,
+                timeline_max_points=settings.timeline_max_points
+            ) if alignment is not None and aligner is not None else None
+        }
+
+    def _align(self, landmarks: np.ndarray, times: np.ndarray, mirror_mode: str) -> Optional[SessionAlignment]:
+        """Align with the reference (both orientations in "auto" mode, best mean score wins)."""
+        aligner = self.comparison_service.get_session_aligner()
+        if aligner is None or len(landmarks) < 2:
+            return None
+
+        orientations = {"off": [False], "on": [True]}.get(mirror_mode, [False, True])
+        alignments = [aligner.compute_alignment(landmarks, times, mirrored) for mirrored in orientations]
+        alignments = [alignment for alignment in alignments if alignment is not None]
+        if not alignments:
+            return None
+        return max(alignments, key=lambda alignment: float(np.mean(alignment.scores)))
+
+    def _angle_scores(
+        self,
+        landmarks: np.ndarray,
+        reference_indices: np.ndarray,
+        mirrored: bool
+    ) -> Tuple[np.ndarray, np.ndarray]:
+        """Pose/motion scores of the angle-space engine (matching_mode "angles")."""
+        matcher = self._get_matcher()
+        user_angles = np.nan_to_num(matcher.user_angles(landmarks))
+        reference_angles = np.nan_to_num(matcher.orientation_angles[int(mirrored)][reference_indices])
+
+        # Pose: mean cos of the angle differences
+        pose_scores = np.clip(np.mean(np.cos(user_angles - reference_angles), axis=1), 0.0, 1.0)
+
+        # Motion: cosine of the user's and the matched reference's angular velocities
+        return pose_scores, self._velocity_scores(
+            wrap_radians(np.diff(user_angles, axis=0)), wrap_radians(np.diff(reference_angles, axis=0))
+        )
+
+    def _coordinate_scores(
+        self,
+        landmarks: np.ndarray,
+        reference_indices: np.ndarray,
+        mirrored: bool
+    ) -> Tuple[np.ndarray, np.ndarray]:
+        """Pose/motion scores on scale-normalized coordinates (matching_mode "coordinates")."""
+        pose_matrix, pose_norms = self.comparison_service.get_reference_pose_matrix(mirrored)
+        if pose_matrix is None:
+            return np.zeros(len(landmarks)), np.zeros(len(landmarks))
+
+        coords = np.nan_to_num(landmarks[:, :, :3]).reshape(len(landmarks), -1)
+        # User rows built like the reference rows (_extract_reference_landmarks + _build_pose_matrix)
+        user_rows = scale_normalize(coords[:, essential_columns(coords.shape[1])])
+        width = min(user_rows.shape[1], pose_matrix.shape[1])
+        user_rows = user_rows[:, :width]
+        reference_rows = pose_matrix[reference_indices, :width]
+        reference_norms = (
+            pose_norms[reference_indices] if width == pose_matrix.shape[1]
+            else np.linalg.norm(reference_rows, axis=1)
+        )
+
+        # Pose: cosine with the aligned reference row
+        norms = np.linalg.norm(user_rows, axis=1) * reference_norms
+        valid = norms > 0
+        dots = np.sum(user_rows * reference_rows, axis=1)
+        pose_scores = np.clip(np.where(valid, dots / np.where(valid, norms, 1.0), 0.0), 0.0, 1.0)
+
+        # Motion: cosine of the user's and the matched reference's coordinate velocities
+        return pose_scores, self._velocity_scores(np.diff(user_rows, axis=0), np.diff(reference_rows, axis=0))
+
+    @staticmethod
+    def _velocity_scores(user_velocity: np.ndarray, reference_velocity: np.ndarray) -> np.ndarray:
+        """Clipped cosine of per-frame velocity rows (the first frame has no motion and scores 0)."""
+        motion_scores = np.zeros(len(user_velocity) + 1)
+        if len(user_velocity) > 0:
+            norms = np.linalg.norm(user_velocity, axis=1) * np.linalg.norm(reference_velocity, axis=1)
+            dots = np.sum(user_velocity * reference_velocity, axis=1)
+            valid = norms > 0
+            motion_scores[1:] = np.clip(np.where(valid, dots / np.where(valid, norms, 1.0), 0.0), 0.0, 1.0)
+        return motion_scores
+
+    def _record_scores(
+        self,
+        scoring: ScoringService,
+        landmarks: np.ndarray,
+        times: np.ndarray,
+        reference_offset: float,
+        alignment: SessionAlignment
+    ):
+        """Batched pose/motion/limb/error scores against the aligned reference frames."""
+        config = self.comparison_service.config
+        reference_indices = alignment.positions_at(times)
+
+        if config.matching_mode == "angles":
+            pose_scores, motion_scores = self._angle_scores(landmarks, reference_indices, alignment.mirrored)
+        else:
+            pose_scores, motion_scores = self._coordinate_scores(landmarks, reference_indices, alignment.mirrored)
+
+        combined_scores = config.pose_weight * pose_scores + config.motion_weight * motion_scores
+
+        joint_error_detector, limb_similarity = self.comparison_service.get_reference_analyzers(alignment.mirrored)
+        errors = (
+            joint_error_detector.detect_batch(landmarks, reference_indices)
+            if joint_error_detector is not None else [[] for _ in range(len(landmarks))]
+        )
+        limb_scores = limb_similarity.compare_batch(landmarks, reference_indices) if limb_similarity is not None else None
+
+        for i, timestamp in enumerate((times - reference_offset).tolist()):
+            scoring.add_score(
+                timestamp=timestamp,
+                combined_score=float(combined_scores[i]),
+                pose_score=float(pose_scores[i]),
+                motion_score=float(motion_scores[i]),
+                errors=errors[i],
+                limb_scores=dict(zip(LIMB_NAMES, limb_scores[i].tolist())) if limb_scores is not None else None
+            )
+        scoring.close_problem_segment()
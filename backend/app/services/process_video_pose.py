@@ -3,9 +3,16 @@ import mediapipe as mp
 import json
 import pickle
 import os
-from typing import List, Dict, Any, Union
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor
+from typing import List, Dict, Any, Optional, Union
 import numpy as np
 
+# Version of the MediaPipe extraction stage (bump when its output changes:
+# model settings, frame sampling, normalization, gesture classification).
+# Recorded in the reference library manifest, see reference_library.py.
+POSE_PIPELINE_VERSION = 2
+
 class VideoPoseProcessor:
     """
     Service for processing reference videos and extracting pose landmarks.
@@ -32,13 +39,21 @@ class VideoPoseProcessor:
         os.makedirs(self.reference_videos_dir, exist_ok=True)
         os.makedirs(self.processed_poses_dir, exist_ok=True)
     
-    def process_video(self, video_filename: str, output_filename: str = None) -> Dict[str, Any]:
+    def process_video(self, video_filename: str, output_filename: str = None,
+                      num_workers: int = 1, warmup_seconds: float = 1.0,
+                      target_fps: float = 15.0) -> Dict[str, Any]:
         """
         Process a reference video and extract pose landmarks.
         
         Args:
             video_filename: Name of the video file in reference_videos directory
             output_filename: Optional custom name for the output file
+            num_workers: Number of processes; > 1 splits the video into time
+                chunks processed in parallel (same output as serial mode)
+            warmup_seconds: Frames processed before each chunk (and discarded)
+                so tracking-mode MediaPipe has converged at the chunk start
+            target_fps: Pose sampling rate; every round(video FPS / target_fps)-th
+                frame is processed (e.g. every 4th of 60 FPS, every 2nd of 30 FPS)
             
         Returns:
             Dictionary containing processing results and metadata
@@ -54,19 +69,137 @@ class VideoPoseProcessor:
         
         output_path = os.path.join(self.processed_poses_dir, output_filename)
         
-        # Initialize video capture
+        # Read video properties
+        video_info = self.probe_video(video_path)
+        fps = video_info["fps"]
+        total_frames = video_info["total_frames"]
+        duration = video_info["duration"]
+        resolution = video_info["resolution"]
+        
+        print(f"Processing video: {video_filename}")
+        stride = self.frame_stride(fps, target_fps)
+        print(f"FPS: {fps}, Total frames: {total_frames}, Duration: {duration:.2f}s")
+        print(f"Sampling every {stride} frame(s) ({fps / stride:.1f} FPS)")
+        
+        if num_workers > 1 and total_frames > 0:
+            poses_data = self._process_parallel(video_path, total_frames, fps, num_workers, warmup_seconds, stride)
+        else:
+            poses_data = self.process_frame_range(video_path, stride=stride, report_progress=True)
+        
+        # Create output data structure
+        output_data = {
+            "video_info": {
+                "filename": video_filename,
+                "fps": fps,
+                "total_frames": total_frames,
+                "duration": duration,
+                "resolution": resolution,
+                "sample_fps": fps / stride,
+                "frame_stride": stride
+            },
+            "poses": poses_data,
+            "processing_info": {
+                "total_poses_detected": len([p for p in poses_data if p["landmarks"] is not None]),
+                "frames_with_no_pose": len([p for p in poses_data if p["landmarks"] is None])
+            }
+        }
+        
+        # Save as NumPy array for maximum speed
+        self.save_poses(output_path, poses_data)
+        print(f"Saved as NumPy array: {output_path}")
+        
+        print(f"Processing complete! Saved to: {output_path}")
+        print(f"Total poses detected: {output_data['processing_info']['total_poses_detected']}")
+        print(f"Frames with no pose: {output_data['processing_info']['frames_with_no_pose']}")
+        
+        return output_data
+    
+    def probe_video(self, video_path: str) -> Dict[str, Any]:
+        """
+        Read video properties (fps, total_frames, duration, resolution).
+        
+        Raises:
+            ValueError: If the video cannot be opened
+        """
         cap = cv2.VideoCapture(video_path)
         
         if not cap.isOpened():
             raise ValueError(f"Could not open video file: {video_path}")
         
-        # Get video properties
         fps = cap.get(cv2.CAP_PROP_FPS)
         total_frames = int(cap.get(cv2.CAP_PROP_FRAME_COUNT))
-        duration = total_frames / fps
+        video_info = {
+            "fps": fps,
+            "total_frames": total_frames,
+            "duration": total_frames / fps if fps > 0 else 0.0,
+            "resolution": {
+                "width": int(cap.get(cv2.CAP_PROP_FRAME_WIDTH)),
+                "height": int(cap.get(cv2.CAP_PROP_FRAME_HEIGHT))
+            }
+        }
+        cap.release()
+        return video_info
+    
+    @staticmethod
+    def save_poses(output_path: str, poses_data: List[Dict[str, Any]]):
+        """Save pose frames as a NumPy array (written to a temp file, then renamed)."""
+        temp_path = output_path + ".tmp.npy"
+        np.save(temp_path, np.array(poses_data, dtype=object), allow_pickle=True)
+        os.replace(temp_path, output_path)
+    
+    @staticmethod
+    def frame_stride(fps: float, target_fps: float) -> int:
+        """Frames between samples for the target rate (1 = every frame)."""
+        if not fps or fps <= 0 or not target_fps or target_fps <= 0:
+            return 1
+        return max(1, int(round(fps / target_fps)))
+    
+    def _process_parallel(self, video_path: str, total_frames: int, fps: float,
+                          num_workers: int, warmup_seconds: float, stride: int) -> List[Dict[str, Any]]:
+        """
+        Process time chunks of the video in a process pool and merge them in order.
         
-        print(f"Processing video: {video_filename}")
-        print(f"FPS: {fps}, Total frames: {total_frames}, Duration: {duration:.2f}s")
+        Each worker seeks to its chunk start minus a warm-up margin; warm-up
+        frames only feed the trackers, so every sampled frame appears exactly
+        once with the same frame number as in serial mode.
+        """
+        chunk_size = int(np.ceil(total_frames / num_workers))
+        warmup_frames = int(round(warmup_seconds * fps))
+        starts = list(range(0, total_frames, chunk_size))
+        # The last chunk reads to the end (the container's frame count can be inexact)
+        chunks = list(zip(starts, starts[1:] + [None]))
+        
+        # Spawned workers: no MediaPipe state is inherited from this process
+        context = multiprocessing.get_context("spawn")
+        with ProcessPoolExecutor(max_workers=min(num_workers, len(chunks)), mp_context=context) as pool:
+            futures = [
+                pool.submit(_process_chunk, self.data_dir, video_path, start, end, warmup_frames, stride)
+                for start, end in chunks
+            ]
+            poses_data = []
+            for chunk_index, future in enumerate(futures):
+                poses_data.extend(future.result())
+                print(f"Progress: chunk {chunk_index + 1}/{len(chunks)} merged ({len(poses_data)} frames)")
+        return poses_data
+    
+    def process_frame_range(self, video_path: str, start_frame: int = 0, end_frame: int = None,
+                             warmup_frames: int = 0, stride: int = 4,
+                             report_progress: bool = False) -> List[Dict[str, Any]]:
+        """
+        Extract poses for video frames [start_frame, end_frame) (0-based indices).
+        
+        Frames are numbered like the serial loop (frame_number = index + 1) and
+        every stride-th frame number is sampled. Up to warmup_frames frames
+        before start_frame are processed but not returned.
+        """
+        cap = cv2.VideoCapture(video_path)
+        fps = cap.get(cv2.CAP_PROP_FPS)
+        total_frames = int(cap.get(cv2.CAP_PROP_FRAME_COUNT))
+        
+        first_frame = max(0, start_frame - warmup_frames)
+        if first_frame > 0:
+            cap.set(cv2.CAP_PROP_POS_FRAMES, first_frame)
+        frame_count = first_frame
         
         # Initialize pose detection and hand detection
         with self.mp_pose.Pose(
@@ -83,104 +216,86 @@ class VideoPoseProcessor:
         ) as hands:
             
             poses_data = []
-            frame_count = 0
             
-            while cap.isOpened():
-                success, frame = cap.read()
-                if not success:
+            while cap.isOpened() and (end_frame is None or frame_count < end_frame):
+                # grab() only demuxes/decodes; skipped frames are never converted or copied
+                if not cap.grab():
                     break
                 
                 frame_count += 1
                 
-                # Process every 4th frame for 15 FPS (from 60 FPS video)
-                if frame_count % 4 != 0:
+                if frame_count % stride != 0:
                     continue
                 
-                # Convert BGR to RGB
-                frame_rgb = cv2.cvtColor(frame, cv2.COLOR_BGR2RGB)
-                
-                # Process frame for pose landmarks
-                pose_results = pose.process(frame_rgb)
-                
-                # Process frame for hand landmarks (gestures)
-                hand_results = hands.process(frame_rgb)
-                
-                # Calculate timestamp
-                timestamp = frame_count / fps
-                
-                # Extract pose data
-                pose_data = {
-                    "frame_number": frame_count,
-                    "timestamp": timestamp,
-                    "landmarks": None,
-                    "has_pose": False,
-                    "gestures": []
-                }
-                
-                if pose_results.pose_landmarks:
-                    # Convert landmarks to numpy arrays for speed
-                    landmarks = np.array([[lm.x, lm.y, lm.z, lm.visibility] for lm in pose_results.pose_landmarks.landmark])
-                    pose_data["landmarks"] = landmarks
-                    pose_data["has_pose"] = True
+                success, frame = cap.retrieve()
+                if not success:
+                    break
                 
-                # Extract gesture data
-                if hand_results.multi_hand_landmarks:
-                    for idx, hand_landmarks in enumerate(hand_results.multi_hand_landmarks):
-                        gesture_info = {
-                            "hand_landmarks": np.array([[lm.x, lm.y, lm.z, lm.visibility] for lm in hand_landmarks.landmark]),
-                            "handedness": None
-                        }
-                        
-                        # Get hand classification if available
-                        if hand_results.multi_handedness and idx < len(hand_results.multi_handedness):
-                            handedness = hand_results.multi_handedness[idx].classification[0]
-                            gesture_info["handedness"] = {
-                                "label": handedness.label,
-                                "confidence": handedness.score
-                            }
-                        
-                        # Basic gesture classification (simple finger counting)
-                        gesture_info["gesture"] = self._classify_simple_gesture(hand_landmarks.landmark)
-                        
-                        pose_data["gestures"].append(gesture_info)
+                pose_data = self._process_frame(pose, hands, frame, frame_count, fps)
                 
-                poses_data.append(pose_data)
+                # Warm-up frames only let the trackers converge
+                if frame_count > start_frame:
+                    poses_data.append(pose_data)
                 
                 # Progress indicator (every 120 frames = 4 seconds at 30 FPS)
-                if frame_count % 120 == 0:
+                if report_progress and frame_count % 120 == 0:
                     progress = (frame_count / total_frames) * 100
                     print(f"Progress: {progress:.1f}% ({frame_count}/{total_frames} frames)")
         
         cap.release()
-        
-        # Create output data structure
-        output_data = {
-            "video_info": {
-                "filename": video_filename,
-                "fps": fps,
-                "total_frames": total_frames,
-                "duration": duration,
-                "resolution": {
-                    "width": int(cap.get(cv2.CAP_PROP_FRAME_WIDTH)),
-                    "height": int(cap.get(cv2.CAP_PROP_FRAME_HEIGHT))
-                }
-            },
-            "poses": poses_data,
-            "processing_info": {
-                "total_poses_detected": len([p for p in poses_data if p["landmarks"] is not None]),
-                "frames_with_no_pose": len([p for p in poses_data if p["landmarks"] is None])
-            }
+        return poses_data
+    
+    def _process_frame(self, pose, hands, frame: np.ndarray, frame_count: int, fps: float) -> Dict[str, Any]:
+        """Run pose and hand detection on one BGR frame."""
+        # Convert BGR to RGB
+        frame_rgb = cv2.cvtColor(frame, cv2.COLOR_BGR2RGB)
+        
+        # Process frame for pose landmarks
+        pose_results = pose.process(frame_rgb)
+        
+        # Process frame for hand landmarks (gestures)
+        hand_results = hands.process(frame_rgb)
+        
+        # Calculate timestamp
+        timestamp = frame_count / fps
+        
+        # Extract pose data
+        pose_data = {
+            "frame_number": frame_count,
+            "timestamp": timestamp,
+            "landmarks": None,
+            "has_pose": False,
+            "gestures": []
         }
         
-        # Save as NumPy array for maximum speed
-        np.save(output_path, poses_data)
-        print(f"Saved as NumPy array: {output_path}")
-        
-        print(f"Processing complete! Saved to: {output_path}")
-        print(f"Total poses detected: {output_data['processing_info']['total_poses_detected']}")
-        print(f"Frames with no pose: {output_data['processing_info']['frames_with_no_pose']}")
+        if pose_results.pose_landmarks:
+            # Convert landmarks to numpy arrays for speed
+            landmarks = np.array([[lm.x, lm.y, lm.z, lm.visibility] for lm in pose_results.pose_landmarks.landmark])
+            pose_data["landmarks"] = landmarks
+            pose_data["has_pose"] = True
+        
+        # Extract gesture data
+        if hand_results.multi_hand_landmarks:
+            for idx, hand_landmarks in enumerate(hand_results.multi_hand_landmarks):
+                gesture_info = {
+                    "hand_landmarks": np.array([[lm.x, lm.y, lm.z, lm.visibility] for lm in hand_landmarks.landmark]),
+                    "handedness": None
+                }
+                
+                # Get hand classification if available
+                if hand_results.multi_handedness and idx < len(hand_results.multi_handedness):
+                    handedness = hand_results.multi_handedness[idx].classification[0]
+                    gesture_info["handedness"] = {
+                        "label": handedness.label,
+                        "confidence": handedness.score
+                    }
+                
+                # Basic gesture classification (simple finger counting)
+                gesture_info["gesture"] = self._classify_simple_gesture(hand_landmarks.landmark)
+                
+                pose_data["gestures"].append(gesture_info)
         
-        return output_data
+        return pose_data
     
     def _normalize_pose(self, landmarks: List[Dict]) -> List[Dict]:
         """
@@ -318,6 +433,13 @@ class VideoPoseProcessor:
         return npy_files
 
 
+def _process_chunk(data_dir: str, video_path: str, start_frame: int, end_frame: Optional[int],
+                   warmup_frames: int, stride: int) -> List[Dict[str, Any]]:
+    """Process-pool entry point: extract poses for one time chunk of a video."""
+    processor = VideoPoseProcessor(data_dir)
+    return processor.process_frame_range(video_path, start_frame, end_frame, warmup_frames, stride)
+
+
 # Example usage
 if __name__ == "__main__":
     # Initialize the processor
@@ -332,7 +454,7 @@ if __name__ == "__main__":
         video_file = videos[0]
         
         print(f"\n=== Processing {video_file} at 15 FPS with gesture recognition ===")
-        result = processor.process_video(video_file)
+        result = processor.process_video(video_file, num_workers=os.cpu_count() or 1)
         
         print(f"Processed {video_file} successfully!")
         
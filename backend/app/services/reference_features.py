@@ -0,0 +1,257 @@
+"""
+Reference Feature Bundle
+
+Everything the runtime derives from a reference clip, computed once at
+ingest and stored as one .npy file per feature under
+processed_poses/features/<name>/ (the "features" stage of the reference
+library, see reference_library.py).
+
+Every array has one row per reference frame with a pose, aligned with
+"timestamps":
+- landmarks (F, 33, 4), visible (F, 33) visibility mask
+- filtered (F, 69) essential-landmark coordinates, normalized (F, D)
+  scale-normalized pose matrix rows (exactly what PoseComparisonService
+  builds) with their norms
+- velocities / accelerations (F, 69) of the filtered coordinates (row i is
+  the change ending at frame i, zero for the first rows)
+- angles (F, K) joint angles in degrees for ANGLE_SPECS ("angle_names")
+- limb_rows (F, D) limb-relative coordinates, limb_energy (F, G) per-limb
+  motion energy ending at each frame
+- embedding (F, D) pose library index embedding
+- gestures (F, 2) hand gesture labels (left, right; "" if no hand)
+- hand_count (F,) detected hands, with per-hand slots in detection order:
+  hand_landmarks (F, 2, 21, 4), hand_labels / hand_confidence (F, 2)
+  handedness ("" / NaN if unknown), hand_gestures (F, 2) gesture names
+
+Consumers load the bundle memory-mapped, so loading a reference costs a
+few file opens instead of recomputing features from the pickled poses.
+"""
+from dataclasses import dataclass, fields
+from typing import Any, Dict, List, Optional, Sequence
+import numpy as np
+from app.services.angle_calculator import AngleSpec, AngleTable, MATCHING_ANGLES, POSE_ANGLES, compute_angle_table
+from app.services.limb_similarity import LIMB_NAMES, limb_motion_energy, normalize_limb_frames
+from app.services.pose_library_index import pose_embedding
+
+
+# Version of the bundle contents (bump when any feature, including
+# pose_embedding, changes; stale bundles are rebuilt from the poses files)
+FEATURES_VERSION = 2
+
+# Joint angles stored in the bundle (union of the detector and matcher sets)
+ANGLE_SPECS = tuple({spec.name: spec for spec in POSE_ANGLES + MATCHING_ANGLES}.values())
+
+# Landmarks kept for comparison: nose + body/limbs (see PoseComparisonService)
+ESSENTIAL_LANDMARKS = [0] + list(range(11, 33))
+
+# Landmark visibility above which a landmark counts as visible
+VISIBILITY_THRESHOLD = 0.5
+
+HANDS = ("Left", "Right")
+
+# Hand slots per frame (max_num_hands of the reference Hands model)
+MAX_HANDS = 2
+
+# MediaPipe hand landmarks per hand
+HAND_LANDMARKS = 21
+
+
+def essential_columns(length: int) -> np.ndarray:
+    """Columns of a flat (x, y, z) row kept by PoseComparisonService._filter_essential_landmarks."""
+    return np.array([
+        column for index in ESSENTIAL_LANDMARKS if index * 3 + 3 <= length
+        for column in range(index * 3, index * 3 + 3)
+    ], dtype=np.int64)
+
+
+def scale_normalize(filtered: np.ndarray) -> np.ndarray:
+    """
+    Batched PoseComparisonService._normalize_pose_by_scale of filtered rows.
+
+    Args:
+        filtered: (F, 69) essential-landmark rows
+
+    Returns:
+        (F, D) rows, divided by the width between columns 3:6 and 6:9 where positive
+    """
+    rows = filtered[:, essential_columns(filtered.shape[1])]
+    if rows.shape[1] < 9:
+        return rows
+    width = np.linalg.norm(rows[:, 3:6] - rows[:, 6:9], axis=1)
+    return np.where(width[:, np.newaxis] > 0, rows / np.where(width > 0, width, 1.0)[:, np.newaxis], rows)
+
+
+def gesture_labels(frames: Sequence[Dict[str, Any]]) -> np.ndarray:
+    """(F, 2) gesture label per hand from the frames' "gestures" lists."""
+    labels = [["", ""] for _ in frames]
+    for row, frame in zip(labels, frames):
+        for gesture in frame.get("gestures") or []:
+            handedness = gesture.get("handedness") or {}
+            if handedness.get("label") in HANDS:
+                row[HANDS.index(handedness["label"])] = gesture.get("gesture") or ""
+    return np.array(labels, dtype=str)
+
+
+def hand_arrays(frames: Sequence[Dict[str, Any]]) -> Dict[str, np.ndarray]:
+    """Per-hand slot arrays of the frames' "gestures" lists (see module docstring)."""
+    num_frames = len(frames)
+    arrays = {
+        "hand_count": np.zeros(num_frames, dtype=np.int64),
+        "hand_landmarks": np.full((num_frames, MAX_HANDS, HAND_LANDMARKS, 4), np.nan),
+        "hand_labels": np.full((num_frames, MAX_HANDS), "", dtype="<U8"),
+        "hand_confidence": np.full((num_frames, MAX_HANDS), np.nan),
+        "hand_gestures": np.full((num_frames, MAX_HANDS), "", dtype="<U32"),
+    }
+    for i, frame in enumerate(frames):
+        gestures = (frame.get("gestures") or [])[:MAX_HANDS]
+        arrays["hand_count"][i] = len(gestures)
+        for slot, gesture in enumerate(gestures):
+            hand = np.asarray(gesture["hand_landmarks"], dtype=np.float64)
+            arrays["hand_landmarks"][i, slot, :, :hand.shape[1]] = hand
+            handedness = gesture.get("handedness")
+            if handedness:
+                arrays["hand_labels"][i, slot] = handedness.get("label") or ""
+                arrays["hand_confidence"][i, slot] = handedness.get("confidence", np.nan)
+            arrays["hand_gestures"][i, slot] = gesture.get("gesture") or ""
+    return arrays
+
+
+def build_feature_arrays(frames: Sequence[Dict[str, Any]]) -> Dict[str, np.ndarray]:
+    """
+    Compute the feature bundle of a reference clip.
+
+    Args:
+        frames: Reference frames with a pose (landmarks (33, C), timestamp,
+            frame_number, gestures)
+
+    Returns:
+        Arrays by name (see module docstring)
+    """
+    landmarks = np.stack([np.asarray(frame["landmarks"], dtype=np.float64) for frame in frames])
+    num_frames = len(landmarks)
+    if landmarks.shape[2] < 4:
+        landmarks = np.concatenate([landmarks, np.ones((num_frames, landmarks.shape[1], 1))], axis=2)
+
+    filtered = landmarks[:, :, :3].reshape(num_frames, -1)[:, essential_columns(landmarks.shape[1] * 3)]
+    normalized = scale_normalize(filtered)
+
+    velocities = np.zeros_like(filtered)
+    velocities[1:] = np.diff(filtered, axis=0)
+    accelerations = np.zeros_like(filtered)
+    accelerations[1:] = np.diff(velocities, axis=0)
+
+    limb_rows = normalize_limb_frames(landmarks)
+    limb_energy = np.zeros((num_frames, len(LIMB_NAMES)))
+    limb_energy[1:] = limb_motion_energy(limb_rows)
+
+    return {
+        "timestamps": np.array([frame.get("timestamp", i / 15.0) for i, frame in enumerate(frames)], dtype=np.float64),
+        "frame_numbers": np.array([frame.get("frame_number", i) for i, frame in enumerate(frames)], dtype=np.int64),
+        "landmarks": landmarks,
+        "visible": landmarks[:, :, 3] > VISIBILITY_THRESHOLD,
+        "filtered": filtered,
+        "normalized": normalized,
+        "normalized_norms": np.linalg.norm(normalized, axis=1),
+        "velocities": velocities,
+        "accelerations": accelerations,
+        "angles": compute_angle_table(landmarks, ANGLE_SPECS).values,
+        "angle_names": np.array([spec.name for spec in ANGLE_SPECS]),
+        "limb_rows": limb_rows,
+        "limb_energy": limb_energy,
+        "embedding": pose_embedding(landmarks),
+        "gestures": gesture_labels(frames),
+        **hand_arrays(frames),
+    }
+
+
+@dataclass
+class ReferenceFeatures:
+    """Feature bundle of one reference clip (arrays are read-only memory maps when loaded)."""
+    timestamps: np.ndarray
+    frame_numbers: np.ndarray
+    landmarks: np.ndarray
+    visible: np.ndarray
+    filtered: np.ndarray
+    normalized: np.ndarray
+    normalized_norms: np.ndarray
+    velocities: np.ndarray
+    accelerations: np.ndarray
+    angles: np.ndarray
+    angle_names: np.ndarray
+    limb_rows: np.ndarray
+    limb_energy: np.ndarray
+    embedding: np.ndarray
+    gestures: np.ndarray
+    hand_count: np.ndarray
+    hand_landmarks: np.ndarray
+    hand_labels: np.ndarray
+    hand_confidence: np.ndarray
+    hand_gestures: np.ndarray
+
+    @classmethod
+    def from_arrays(cls, arrays: Dict[str, np.ndarray]) -> 'ReferenceFeatures':
+        return cls(**{field.name: arrays[field.name] for field in fields(cls)})
+
+    @classmethod
+    def from_frames(cls, frames: Sequence[Dict[str, Any]]) -> 'ReferenceFeatures':
+        """Compute the bundle in memory (frames with a pose, as in a poses file)."""
+        return cls.from_arrays(build_feature_arrays(frames))
+
+    @classmethod
+    def load(cls, processed_poses_dir: str, name: str) -> Optional['ReferenceFeatures']:
+        """
+        Memory-map the bundle of a reference.
+
+        Returns:
+            The bundle, or None if it is missing or stale (see reference_library)
+        """
+        # Deferred import: reference_library registers build_feature_arrays as a stage
+        from app.services.reference_library import load_stage_arrays
+
+        arrays = load_stage_arrays(processed_poses_dir, name, "features")
+        if arrays is None or any(field.name not in arrays for field in fields(cls)):
+            return None
+        return cls.from_arrays(arrays)
+
+    def __len__(self) -> int:
+        return len(self.timestamps)
+
+    @property
+    def frames(self) -> np.ndarray:
+        """(F, 33, 3) reference coordinates (a view, no copy)."""
+        return self.landmarks[:, :, :3]
+
+    def angle_table(self, specs: Sequence[AngleSpec]) -> AngleTable:
+        """Stored angles for specs (computed from the landmarks if a spec is not stored)."""
+        names = self.angle_names.tolist()
+        if not all(spec.name in names for spec in specs):
+            return compute_angle_table(self.landmarks, specs)
+        columns = [names.index(spec.name) for spec in specs]
+        return AngleTable(names=tuple(spec.name for spec in specs), values=self.angles[:, columns])
+
+    def hand_gesture_dicts(self, index: int) -> List[Dict[str, Any]]:
+        """A frame's "gestures" list as process_video_pose writes it (hand landmarks are views)."""
+        gestures = []
+        for slot in range(int(self.hand_count[index])):
+            label = str(self.hand_labels[index, slot])
+            gestures.append({
+                'hand_landmarks': self.hand_landmarks[index, slot],
+                'handedness': {
+                    'label': label,
+                    'confidence': float(self.hand_confidence[index, slot])
+                } if label else None,
+                'gesture': str(self.hand_gestures[index, slot])
+            })
+        return gestures
+
+    def pose_dicts(self) -> List[Dict[str, Any]]:
+        """Per-frame dictionaries as PoseComparisonService takes them (landmarks are views)."""
+        return [
+            {
+                'landmarks': self.landmarks[i],
+                'timestamp': float(self.timestamps[i]),
+                'frame_number': int(self.frame_numbers[i]),
+                'gestures': self.hand_gesture_dicts(i)
+            }
+            for i in range(len(self))
+        ]
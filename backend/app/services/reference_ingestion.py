@@ -0,0 +1,311 @@
+"""
+Reference Ingestion Jobs
+
+Background processing of reference videos into processed_poses/ without
+running process_video_pose.py by hand.
+
+- Jobs are queued and processed by a configurable number of worker threads
+- A video is processed in time chunks (with a tracking warm-up before each
+  chunk, see VideoPoseProcessor.process_frame_range); every finished chunk is
+  written to its own partial .npy file and recorded in the job's job.json
+- On restart, unfinished jobs are re-queued and skip their finished chunks
+- The final <name>_poses.npy is assembled from the chunk files when all are
+  done, so the output has the same frames as a one-shot process_video()
+- With a ReferenceLibrary, the output is recorded in the library manifest
+  and its derived stages are built right away
+
+Job state on disk:
+    <jobs_dir>/<job_id>/job.json
+    <jobs_dir>/<job_id>/chunk_00000.npy ...
+"""
+import json
+import os
+import queue
+import threading
+import time
+import uuid
+from dataclasses import asdict, dataclass, field
+from typing import Any, Dict, List, Optional
+import numpy as np
+from app.services.process_video_pose import VideoPoseProcessor
+from app.services.reference_library import ReferenceLibrary
+
+
+@dataclass
+class IngestionJob:
+    """Persistent state of one reference ingestion job."""
+    job_id: str
+    video_filename: str
+    output_filename: str
+    status: str = "queued"  # "queued", "running", "completed" or "failed"
+    fps: float = 0.0
+    total_frames: int = 0
+    chunk_frames: int = 0
+    frame_stride: int = 1
+    num_chunks: int = 0
+    completed_chunks: List[int] = field(default_factory=list)
+    processed_frames: int = 0  # video frames covered by completed chunks
+    created_at: float = field(default_factory=time.time)
+    started_at: Optional[float] = None
+    finished_at: Optional[float] = None
+    error: Optional[str] = None
+
+    # Throughput of the current run (not persisted across restarts)
+    frames_per_second: Optional[float] = None
+    eta_seconds: Optional[float] = None
+
+    def to_dict(self) -> Dict[str, Any]:
+        """Public view of the job with progress information."""
+        progress = self.processed_frames / self.total_frames if self.total_frames else 0.0
+        return {
+            **asdict(self),
+            "completed_chunks": len(self.completed_chunks),
+            "progress": round(min(progress, 1.0), 4) if self.status != "completed" else 1.0
+        }
+
+
+class ReferenceIngestionQueue:
+    """
+    Queue of checkpointed reference ingestion jobs.
+
+    Usage:
+    1. Create once with the VideoPoseProcessor whose directories are used
+    2. Call start() (re-queues jobs left unfinished by a previous run)
+    3. submit() videos in the reference_videos directory; poll get_job()
+    """
+
+    def __init__(
+        self,
+        processor: VideoPoseProcessor,
+        jobs_dir: Optional[str] = None,
+        num_workers: int = 1,
+        chunk_seconds: float = 10.0,
+        warmup_seconds: float = 1.0,
+        target_fps: float = 15.0,
+        library: Optional[ReferenceLibrary] = None
+    ):
+        """
+        Initialize the queue (no worker runs until start()).
+
+        Args:
+            processor: Processor for the video and processed_poses directories
+            jobs_dir: Directory for job state and partial chunk files
+                (<data_dir>/ingestion_jobs if None)
+            num_workers: Number of jobs processed concurrently
+            chunk_seconds: Video time per checkpointed chunk
+            warmup_seconds: Tracking warm-up processed before each chunk
+            target_fps: Pose sampling rate
+            library: Reference library manifest updated with finished outputs
+        """
+        self.processor = processor
+        self.jobs_dir = jobs_dir or os.path.join(processor.data_dir, "ingestion_jobs")
+        self.num_workers = max(1, num_workers)
+        self.chunk_seconds = chunk_seconds
+        self.warmup_seconds = warmup_seconds
+        self.target_fps = target_fps
+        self.library = library
+
+        self._jobs: Dict[str, IngestionJob] = {}
+        self._lock = threading.Lock()
+        self._queue: queue.Queue = queue.Queue()
+        self._workers: List[threading.Thread] = []
+
+        os.makedirs(self.jobs_dir, exist_ok=True)
+
+    def start(self):
+        """Load persisted jobs, re-queue unfinished ones and start the workers."""
+        if self._workers:
+            return
+
+        for job in self._load_jobs():
+            with self._lock:
+                self._jobs[job.job_id] = job
+            if job.status in ("queued", "running"):
+                job.status = "queued"
+                self._save_job(job)
+                self._queue.put(job.job_id)
+                print(f"[Ingestion] Resuming job {job.job_id} ({job.video_filename}, "
+                      f"{len(job.completed_chunks)}/{job.num_chunks} chunks done)")
+
+        for _ in range(self.num_workers):
+            worker = threading.Thread(target=self._work, daemon=True)
+            worker.start()
+            self._workers.append(worker)
+
+    def submit(self, video_filename: str, output_filename: Optional[str] = None) -> Dict[str, Any]:
+        """
+        Queue a video from the reference_videos directory.
+
+        Args:
+            video_filename: Video file name in reference_videos
+            output_filename: Output .npy name (<video name>_poses.npy if None)
+
+        Returns:
+            The new job's to_dict()
+
+        Raises:
+            FileNotFoundError: If the video does not exist
+        """
+        video_path = os.path.join(self.processor.reference_videos_dir, video_filename)
+        if not os.path.exists(video_path):
+            raise FileNotFoundError(f"Video file not found: {video_path}")
+
+        job = IngestionJob(
+            job_id=uuid.uuid4().hex[:12],
+            video_filename=video_filename,
+            output_filename=output_filename or os.path.splitext(video_filename)[0] + "_poses.npy"
+        )
+        with self._lock:
+            self._jobs[job.job_id] = job
+        self._save_job(job)
+        self._queue.put(job.job_id)
+        return job.to_dict()
+
+    def get_job(self, job_id: str) -> Optional[Dict[str, Any]]:
+        """Progress of a job (None if unknown)."""
+        with self._lock:
+            job = self._jobs.get(job_id)
+            return job.to_dict() if job is not None else None
+
+    def list_jobs(self) -> List[Dict[str, Any]]:
+        """All known jobs, newest first."""
+        with self._lock:
+            jobs = sorted(self._jobs.values(), key=lambda job: job.created_at, reverse=True)
+            return [job.to_dict() for job in jobs]
+
+    def wait(self, timeout: Optional[float] = None) -> bool:
+        """Block until every queued job is processed (True if finished in time)."""
+        deadline = None if timeout is None else time.time() + timeout
+        while self._queue.unfinished_tasks:
+            if deadline is not None and time.time() > deadline:
+                return False
+            time.sleep(0.05)
+        return True
+
+    def _work(self):
+        """Worker thread: run queued jobs one at a time."""
+        while True:
+            job_id = self._queue.get()
+            try:
+                with self._lock:
+                    job = self._jobs.get(job_id)
+                if job is not None and job.status == "queued":
+                    self.run_job(job)
+            finally:
+                self._queue.task_done()
+
+    def run_job(self, job: IngestionJob):
+        """Process the remaining chunks of a job and assemble the output file."""
+        job_dir = os.path.join(self.jobs_dir, job.job_id)
+        video_path = os.path.join(self.processor.reference_videos_dir, job.video_filename)
+
+        try:
+            if not job.num_chunks:
+                video_info = self.processor.probe_video(video_path)
+                job.fps = video_info["fps"]
+                job.total_frames = video_info["total_frames"]
+                job.frame_stride = self.processor.frame_stride(job.fps, self.target_fps)
+                job.chunk_frames = max(job.frame_stride, int(round(self.chunk_seconds * job.fps)))
+                job.num_chunks = max(1, int(np.ceil(job.total_frames / job.chunk_frames)))
+
+            job.status = "running"
+            job.started_at = job.started_at or time.time()
+            self._save_job(job)
+            print(f"[Ingestion] Job {job.job_id}: {job.video_filename} "
+                  f"({job.num_chunks} chunks, {len(job.completed_chunks)} already done)")
+
+            warmup_frames = int(round(self.warmup_seconds * job.fps))
+            run_start, run_frames = time.time(), 0
+
+            for chunk_index in range(job.num_chunks):
+                if chunk_index in job.completed_chunks:
+                    continue
+
+                start_frame = chunk_index * job.chunk_frames
+                # The last chunk reads to the end (the container's frame count can be inexact)
+                end_frame = start_frame + job.chunk_frames if chunk_index < job.num_chunks - 1 else None
+                frames = self.processor.process_frame_range(
+                    video_path, start_frame, end_frame, warmup_frames, job.frame_stride
+                )
+                VideoPoseProcessor.save_poses(self._chunk_path(job_dir, chunk_index), frames)
+
+                covered = (end_frame if end_frame is not None else job.total_frames) - start_frame
+                run_frames += max(0, covered)
+                elapsed = time.time() - run_start
+                with self._lock:
+                    job.completed_chunks.append(chunk_index)
+                    job.processed_frames = min(job.total_frames, job.processed_frames + max(0, covered))
+                    job.frames_per_second = round(run_frames / elapsed, 2) if elapsed > 0 else None
+                    remaining = job.total_frames - job.processed_frames
+                    job.eta_seconds = (
+                        round(remaining / job.frames_per_second, 1) if job.frames_per_second else None
+                    )
+                self._save_job(job)
+
+            self._assemble(job, job_dir)
+
+        except Exception as e:
+            with self._lock:
+                job.status = "failed"
+                job.error = str(e)
+                job.finished_at = time.time()
+            self._save_job(job)
+            print(f"[Ingestion] Job {job.job_id} failed: {e}")
+
+    def _assemble(self, job: IngestionJob, job_dir: str):
+        """Merge chunk files into the processed_poses output and drop the partials."""
+        poses_data = []
+        for chunk_index in range(job.num_chunks):
+            poses_data.extend(np.load(self._chunk_path(job_dir, chunk_index), allow_pickle=True).tolist())
+
+        output_path = os.path.join(self.processor.processed_poses_dir, job.output_filename)
+        VideoPoseProcessor.save_poses(output_path, poses_data)
+
+        if self.library is not None:
+            try:
+                self.library.refresh(job.output_filename, job.video_filename, self.target_fps)
+            except Exception as e:
+                # The poses file is complete; a later library rebuild retries the derived stages
+                print(f"[Ingestion] Job {job.job_id}: library update failed: {e}")
+
+        with self._lock:
+            job.status = "completed"
+            job.processed_frames = job.total_frames
+            job.eta_seconds = 0.0
+            job.finished_at = time.time()
+        self._save_job(job)
+
+        for chunk_index in range(job.num_chunks):
+            os.remove(self._chunk_path(job_dir, chunk_index))
+        print(f"[Ingestion] Job {job.job_id} complete: {len(poses_data)} frames -> {output_path}")
+
+    def _chunk_path(self, job_dir: str, chunk_index: int) -> str:
+        return os.path.join(job_dir, f"chunk_{chunk_index:05d}.npy")
+
+    def _save_job(self, job: IngestionJob):
+        """Write job.json atomically (temp file + rename)."""
+        job_dir = os.path.join(self.jobs_dir, job.job_id)
+        os.makedirs(job_dir, exist_ok=True)
+        with self._lock:
+            state = asdict(job)
+        state.pop("frames_per_second")
+        state.pop("eta_seconds")
+
+        temp_path = os.path.join(job_dir, "job.json.tmp")
+        with open(temp_path, "w") as f:
+            json.dump(state, f, indent=2)
+        os.replace(temp_path, os.path.join(job_dir, "job.json"))
+
+    def _load_jobs(self) -> List[IngestionJob]:
+        """Jobs persisted in jobs_dir (unreadable entries are skipped)."""
+        jobs = []
+        for job_id in sorted(os.listdir(self.jobs_dir)):
+            path = os.path.join(self.jobs_dir, job_id, "job.json")
+            if not os.path.exists(path):
+                continue
+            try:
+                with open(path) as f:
+                    jobs.append(IngestionJob(**json.load(f)))
+            except Exception as e:
+                print(f"[Ingestion] Skipping unreadable job {job_id}: {e}")
+        return jobs
@@ -0,0 +1,529 @@
+"""
+Reference Library Manifest
+
+Tracks how every processed reference was built, so the library can be
+brought up to date incrementally instead of re-processing every video.
+
+processed_poses/manifest.json records, per reference:
+- The source video's content hash (sha256)
+- Every derived artifact with its pipeline stage version and the hash of
+  the input it was built from:
+  - "poses": <name>_poses.npy, the MediaPipe stage (POSE_PIPELINE_VERSION)
+  - DERIVED_STAGES: arrays under features/<name>/ computed from the poses
+    file alone (the reference feature bundle, see reference_features.py)
+
+An artifact is stale when its stage version changed, its input changed
+(video content for "poses", poses file content for derived stages) or its
+files are missing. rebuild() only re-runs stale stages: MediaPipe runs for
+new or changed videos and pose pipeline bumps, while a derived stage bump
+recomputes its arrays from the existing poses files.
+
+CLI:
+    python -m app.services.reference_library [--workers N] [--force] [--dry-run] [names ...]
+"""
+import hashlib
+import json
+import multiprocessing
+import os
+import shutil
+import threading
+import time
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor, as_completed
+from typing import Any, Callable, Dict, Iterator, List, Optional, Tuple
+import numpy as np
+from app.services.process_video_pose import POSE_PIPELINE_VERSION, VideoPoseProcessor
+from app.services.reference_features import FEATURES_VERSION, build_feature_arrays
+
+
+MANIFEST_FILENAME = "manifest.json"
+FEATURES_DIRNAME = "features"
+MANIFEST_FORMAT = 1
+
+VIDEO_EXTENSIONS = ('.mp4', '.avi', '.mov', '.mkv')
+
+# Bytes read at a time when hashing files
+HASH_BLOCK_SIZE = 1 << 20
+
+# Serializes manifest read-modify-write cycles (rebuilds and ingestion jobs)
+_MANIFEST_LOCK = threading.RLock()
+
+
+# Derived stages: name -> (version, builder from the has_pose frames to named arrays)
+DERIVED_STAGES: Dict[str, Tuple[int, Callable[[List[Dict[str, Any]]], Dict[str, np.ndarray]]]] = {
+    "features": (FEATURES_VERSION, build_feature_arrays),
+}
+
+
+def file_hash(path: str, cached: Optional[Dict[str, Any]] = None) -> Dict[str, Any]:
+    """
+    Content hash of a file.
+
+    Args:
+        path: File to hash
+        cached: Previous result for the same path; reused without reading
+            the file if its size and modification time are unchanged
+
+    Returns:
+        dict: sha256, size, mtime_ns
+    """
+    stat = os.stat(path)
+    if cached and cached.get("size") == stat.st_size and cached.get("mtime_ns") == stat.st_mtime_ns:
+        return cached
+
+    digest = hashlib.sha256()
+    with open(path, "rb") as f:
+        for block in iter(lambda: f.read(HASH_BLOCK_SIZE), b""):
+            digest.update(block)
+    return {"sha256": digest.hexdigest(), "size": stat.st_size, "mtime_ns": stat.st_mtime_ns}
+
+
+def _unchanged(path: str, record: Optional[Dict[str, Any]]) -> bool:
+    """True if the file exists with the size and modification time in record (no hashing)."""
+    if not record or not os.path.exists(path):
+        return False
+    stat = os.stat(path)
+    return record.get("size") == stat.st_size and record.get("mtime_ns") == stat.st_mtime_ns
+
+
+def load_stage_arrays(processed_poses_dir: str, name: str, stage: str,
+                      mmap_mode: Optional[str] = 'r') -> Optional[Dict[str, np.ndarray]]:
+    """
+    Load a reference's derived stage arrays if they are up to date.
+
+    Cheap enough for read paths: the poses file is compared by size and
+    modification time against the manifest instead of being re-hashed, and
+    the arrays are memory-mapped (pages are read on first access).
+
+    Args:
+        processed_poses_dir: processed_poses directory
+        name: Reference name
+        stage: Derived stage name (key of DERIVED_STAGES)
+        mmap_mode: np.load memory-map mode (None reads the arrays into memory)
+
+    Returns:
+        Arrays by name, or None if missing or stale
+    """
+    manifest = _read_manifest(os.path.join(processed_poses_dir, MANIFEST_FILENAME))
+    artifacts = manifest["references"].get(name, {}).get("artifacts", {})
+    poses, derived = artifacts.get("poses"), artifacts.get(stage)
+    if not poses or not derived or derived.get("version") != DERIVED_STAGES[stage][0]:
+        return None
+    if derived.get("source_sha256") != poses.get("sha256"):
+        return None
+    if not _unchanged(os.path.join(processed_poses_dir, poses["file"]), poses):
+        return None
+
+    stage_dir = os.path.join(processed_poses_dir, FEATURES_DIRNAME, name)
+    try:
+        return {
+            array: np.load(os.path.join(stage_dir, f"{array}.npy"), mmap_mode=mmap_mode)
+            for array in derived["arrays"]
+        }
+    except (OSError, ValueError):
+        return None
+
+
+def _read_manifest(path: str) -> Dict[str, Any]:
+    """Manifest contents (empty if missing or unreadable)."""
+    if os.path.exists(path):
+        try:
+            with open(path) as f:
+                manifest = json.load(f)
+            if manifest.get("format") == MANIFEST_FORMAT:
+                return manifest
+        except (OSError, ValueError) as e:
+            print(f"[Library] Ignoring unreadable manifest {path}: {e}")
+    return {"format": MANIFEST_FORMAT, "references": {}}
+
+
+def _save_array(path: str, array: np.ndarray):
+    """Save a numeric array (written to a temp file, then renamed)."""
+    temp_path = path + ".tmp.npy"
+    np.save(temp_path, array)
+    os.replace(temp_path, path)
+
+
+class ReferenceLibrary:
+    """
+    Manifest-driven incremental builds of the processed reference library.
+
+    Usage:
+    1. Create with the VideoPoseProcessor whose directories are used
+    2. status() / plan() to inspect, rebuild() to bring stale artifacts up to date
+    3. Ingestion jobs call refresh() after writing a poses file
+    """
+
+    def __init__(self, processor: VideoPoseProcessor, target_fps: float = 15.0):
+        """
+        Initialize the library.
+
+        Args:
+            processor: Processor for the video and processed_poses directories
+            target_fps: Pose sampling rate of the MediaPipe stage (a change
+                makes every poses artifact stale)
+        """
+        self.processor = processor
+        self.target_fps = target_fps
+        self.manifest_path = os.path.join(processor.processed_poses_dir, MANIFEST_FILENAME)
+        self.features_dir = os.path.join(processor.processed_poses_dir, FEATURES_DIRNAME)
+
+    def load_manifest(self) -> Dict[str, Any]:
+        """Current manifest contents."""
+        return _read_manifest(self.manifest_path)
+
+    def status(self) -> List[Dict[str, Any]]:
+        """
+        Staleness of every known reference.
+
+        Returns:
+            One entry per reference: name, video_filename, poses_file and
+            stale (stage -> reason, empty when up to date)
+        """
+        manifest = self.load_manifest()
+        updates = {}
+        entries = []
+        for name in self._reference_names(manifest):
+            record = manifest["references"].get(name, {})
+            video_filename = self._video_filename(name, record)
+            video = None
+            if video_filename is not None:
+                video = file_hash(
+                    os.path.join(self.processor.reference_videos_dir, video_filename), record.get("video")
+                )
+                if video is not record.get("video"):
+                    updates[name] = video
+
+            poses_file = self._poses_file(name, record)
+            if video is None and not os.path.exists(os.path.join(self.processor.processed_poses_dir, poses_file)):
+                continue
+            entries.append({
+                "name": name,
+                "video_filename": video_filename,
+                "poses_file": poses_file,
+                "stale": self._stale_stages(name, record, video, poses_file)
+            })
+
+        # Remember fresh video hashes so unchanged videos are not re-read next time
+        if updates:
+            self._update(lambda m: [
+                m["references"][name].__setitem__("video", video)
+                for name, video in updates.items() if name in m["references"]
+            ])
+        return entries
+
+    def plan(self, names: Optional[List[str]] = None, force: bool = False) -> Dict[str, List[str]]:
+        """
+        Stages to rebuild per reference.
+
+        Args:
+            names: Restrict to these references (all if None)
+            force: Rebuild every buildable stage regardless of staleness
+
+        Returns:
+            dict: reference name -> stage names ("poses" first), stale references only
+        """
+        plan = {}
+        for entry in self.status():
+            if names is not None and entry["name"] not in names:
+                continue
+            if force:
+                stages = (["poses"] if entry["video_filename"] else []) + list(DERIVED_STAGES)
+            else:
+                stages = list(entry["stale"])
+            if stages:
+                plan[entry["name"]] = stages
+        return plan
+
+    def rebuild(self, names: Optional[List[str]] = None, force: bool = False,
+                num_workers: int = 1, dry_run: bool = False) -> Dict[str, Any]:
+        """
+        Rebuild stale artifacts.
+
+        MediaPipe extraction runs in a process pool across videos (or, for
+        a single video, in chunks of that video); derived stages run in a
+        thread pool as soon as their poses file is ready.
+
+        Args:
+            names: Restrict to these references (all if None)
+            force: Rebuild every buildable stage regardless of staleness
+            num_workers: Parallel workers
+            dry_run: Only report the plan
+
+        Returns:
+            dict: plan, rebuilt (name -> stages), failed (name -> error), elapsed_seconds
+        """
+        start = time.time()
+        plan = self.plan(names, force)
+        result = {"plan": plan, "rebuilt": {}, "failed": {}}
+        if dry_run or not plan:
+            result["elapsed_seconds"] = round(time.time() - start, 3)
+            return result
+
+        num_workers = max(1, num_workers)
+        extract = [name for name, stages in plan.items() if "poses" in stages]
+        print(f"[Library] Rebuilding {len(plan)} reference(s): {len(extract)} with MediaPipe, "
+              f"{len(plan) - len(extract)} derived stages only")
+
+        with ThreadPoolExecutor(max_workers=num_workers) as threads:
+            futures = {
+                threads.submit(self.build_derived, name, stages): name
+                for name, stages in plan.items() if "poses" not in stages
+            }
+            for name, error in self._extract_poses(extract, num_workers):
+                if error is not None:
+                    result["failed"][name] = error
+                    continue
+                derived = [stage for stage in plan[name] if stage != "poses"]
+                futures[threads.submit(self.build_derived, name, derived)] = name
+
+            for future in as_completed(futures):
+                name = futures[future]
+                try:
+                    future.result()
+                    result["rebuilt"][name] = plan[name]
+                except Exception as e:
+                    result["failed"][name] = str(e)
+                    print(f"[Library] Failed to rebuild {name}: {e}")
+
+        result["elapsed_seconds"] = round(time.time() - start, 3)
+        print(f"[Library] Rebuilt {len(result['rebuilt'])} reference(s) in {result['elapsed_seconds']}s "
+              f"({len(result['failed'])} failed)")
+        return result
+
+    def refresh(self, poses_filename: str, video_filename: Optional[str] = None,
+                target_fps: Optional[float] = None):
+        """
+        Record a freshly written poses file and rebuild its derived stages.
+
+        Args:
+            poses_filename: File in processed_poses
+            video_filename: Source video in reference_videos (None if unknown)
+            target_fps: Sampling rate the poses were extracted at
+        """
+        name = poses_filename[:-len(".npy")].removesuffix("_poses")
+        self.record_poses(name, poses_filename, video_filename, target_fps)
+        self.build_derived(name, list(DERIVED_STAGES))
+
+    def record_poses(self, name: str, poses_filename: str, video_filename: Optional[str] = None,
+                     target_fps: Optional[float] = None):
+        """Record the poses artifact of a reference as built by the current pipeline."""
+        video = None
+        if video_filename is not None:
+            video = file_hash(os.path.join(self.processor.reference_videos_dir, video_filename))
+        poses = file_hash(os.path.join(self.processor.processed_poses_dir, poses_filename))
+
+        def apply(manifest):
+            record = manifest["references"].setdefault(name, {"artifacts": {}})
+            record["video_filename"] = video_filename
+            record["video"] = video
+            record["artifacts"]["poses"] = {
+                **poses,
+                "file": poses_filename,
+                "version": POSE_PIPELINE_VERSION,
+                "target_fps": target_fps if target_fps is not None else self.target_fps,
+                "source_sha256": video["sha256"] if video else None,
+                "built_at": time.time()
+            }
+        self._update(apply)
+
+    def build_derived(self, name: str, stages: List[str]):
+        """
+        Recompute derived stages of a reference from its poses file (no MediaPipe).
+
+        Raises:
+            FileNotFoundError: If the reference has no poses file
+            ValueError: If no frame has a pose
+        """
+        if not stages:
+            return
+        manifest = self.load_manifest()
+        record = manifest["references"].get(name, {})
+        poses_file = self._poses_file(name, record)
+        poses_path = os.path.join(self.processor.processed_poses_dir, poses_file)
+
+        poses_record = record.get("artifacts", {}).get("poses")
+        if poses_record is None or poses_record.get("file") != poses_file:
+            # Poses file from before the manifest (or written by hand): adopt it as is
+            poses_record = {**file_hash(poses_path), "file": poses_file, "version": None,
+                            "target_fps": None, "source_sha256": None, "built_at": None}
+        else:
+            poses_record = {**poses_record, **file_hash(poses_path, poses_record)}
+
+        frames = [frame for frame in np.load(poses_path, allow_pickle=True) if frame.get('has_pose', False)]
+        if not frames:
+            raise ValueError(f"No frames with a pose in {poses_file}")
+
+        stage_dir = os.path.join(self.features_dir, name)
+        os.makedirs(stage_dir, exist_ok=True)
+        built = {}
+        for stage in stages:
+            version, builder = DERIVED_STAGES[stage]
+            arrays = builder(frames)
+            for array_name, array in arrays.items():
+                _save_array(os.path.join(stage_dir, f"{array_name}.npy"), np.asarray(array))
+            built[stage] = {
+                "version": version,
+                "arrays": sorted(arrays),
+                "source_sha256": poses_record["sha256"],
+                "built_at": time.time()
+            }
+
+        def apply(manifest):
+            current = manifest["references"].setdefault(name, {"artifacts": {}})
+            current.setdefault("video_filename", None)
+            current.setdefault("video", None)
+            current["artifacts"]["poses"] = poses_record
+            current["artifacts"].update(built)
+        self._update(apply)
+        print(f"[Library] {name}: rebuilt {', '.join(stages)} from {poses_file}")
+
+    def prune(self) -> List[str]:
+        """Drop manifest records and features of references with neither a video nor a poses file."""
+        known = {entry["name"] for entry in self.status()}
+        removed = [name for name in self.load_manifest()["references"] if name not in known]
+        if removed:
+            self._update(lambda m: [m["references"].pop(name, None) for name in removed])
+            for name in removed:
+                shutil.rmtree(os.path.join(self.features_dir, name), ignore_errors=True)
+        return removed
+
+    def _extract_poses(self, names: List[str], num_workers: int) -> Iterator[Tuple[str, Optional[str]]]:
+        """Run the MediaPipe stage; yields (name, error or None) as videos finish."""
+        manifest = self.load_manifest()
+        jobs = {
+            name: (self._video_filename(name, manifest["references"].get(name, {})),
+                   self._poses_file(name, manifest["references"].get(name, {})))
+            for name in names
+        }
+
+        if len(jobs) == 1 or num_workers == 1:
+            # Serially per video; a single video uses the workers for its own chunks
+            for name, (video_filename, poses_file) in jobs.items():
+                try:
+                    self.processor.process_video(
+                        video_filename, poses_file,
+                        num_workers=num_workers if len(jobs) == 1 else 1, target_fps=self.target_fps
+                    )
+                    self.record_poses(name, poses_file, video_filename)
+                    yield name, None
+                except Exception as e:
+                    print(f"[Library] Pose extraction failed for {name}: {e}")
+                    yield name, str(e)
+            return
+
+        # Spawned workers: no MediaPipe state is inherited from this process
+        context = multiprocessing.get_context("spawn")
+        with ProcessPoolExecutor(max_workers=min(num_workers, len(jobs)), mp_context=context) as pool:
+            futures = {
+                pool.submit(_extract_reference, self.processor.data_dir, video_filename, poses_file,
+                            self.target_fps): name
+                for name, (video_filename, poses_file) in jobs.items()
+            }
+            for future in as_completed(futures):
+                name = futures[future]
+                try:
+                    future.result()
+                    self.record_poses(name, jobs[name][1], jobs[name][0])
+                    yield name, None
+                except Exception as e:
+                    print(f"[Library] Pose extraction failed for {name}: {e}")
+                    yield name, str(e)
+
+    def _stale_stages(self, name: str, record: Dict[str, Any], video: Optional[Dict[str, Any]],
+                      poses_file: str) -> Dict[str, str]:
+        """Stage -> reason for every stale stage of a reference."""
+        stale = {}
+        artifacts = record.get("artifacts", {})
+        poses = artifacts.get("poses")
+        poses_path = os.path.join(self.processor.processed_poses_dir, poses_file)
+
+        # The MediaPipe stage can only be rebuilt when the video is available
+        if video is not None:
+            if not os.path.exists(poses_path):
+                stale["poses"] = "missing"
+            elif poses is None or poses.get("version") is None:
+                stale["poses"] = "not built by a known pipeline version"
+            elif poses["version"] != POSE_PIPELINE_VERSION:
+                stale["poses"] = f"pipeline version {poses['version']} -> {POSE_PIPELINE_VERSION}"
+            elif poses.get("target_fps") != self.target_fps:
+                stale["poses"] = f"target fps {poses.get('target_fps')} -> {self.target_fps}"
+            elif poses.get("source_sha256") != video["sha256"]:
+                stale["poses"] = "video content changed"
+
+        poses_sha = None
+        if "poses" not in stale and os.path.exists(poses_path):
+            poses_sha = file_hash(poses_path, poses)["sha256"]
+        for stage, (version, _) in DERIVED_STAGES.items():
+            derived = artifacts.get(stage)
+            if "poses" in stale:
+                stale[stage] = "poses rebuilt"
+            elif derived is None:
+                stale[stage] = "missing"
+            elif derived.get("version") != version:
+                stale[stage] = f"version {derived.get('version')} -> {version}"
+            elif derived.get("source_sha256") != poses_sha:
+                stale[stage] = "poses file changed"
+            elif not all(os.path.exists(os.path.join(self.features_dir, name, f"{array}.npy"))
+                         for array in derived.get("arrays", [])):
+                stale[stage] = "files missing"
+        return stale
+
+    def _reference_names(self, manifest: Dict[str, Any]) -> List[str]:
+        """Names from reference videos, poses files and the manifest."""
+        names = set(manifest["references"])
+        for filename in os.listdir(self.processor.reference_videos_dir):
+            if filename.lower().endswith(VIDEO_EXTENSIONS):
+                names.add(os.path.splitext(filename)[0])
+        for filename in os.listdir(self.processor.processed_poses_dir):
+            if filename.endswith(".npy") and not filename.endswith(".tmp.npy"):
+                names.add(filename[:-len(".npy")].removesuffix("_poses"))
+        return sorted(names)
+
+    def _video_filename(self, name: str, record: Dict[str, Any]) -> Optional[str]:
+        """Source video of a reference, if present in reference_videos."""
+        candidates = [record.get("video_filename")] + [name + ext for ext in VIDEO_EXTENSIONS]
+        for filename in candidates:
+            if filename and os.path.exists(os.path.join(self.processor.reference_videos_dir, filename)):
+                return filename
+        return None
+
+    def _poses_file(self, name: str, record: Dict[str, Any]) -> str:
+        poses = record.get("artifacts", {}).get("poses")
+        return poses["file"] if poses else f"{name}_poses.npy"
+
+    def _update(self, apply: Callable[[Dict[str, Any]], Any]):
+        """Read-modify-write the manifest atomically (temp file + rename)."""
+        with _MANIFEST_LOCK:
+            manifest = self.load_manifest()
+            apply(manifest)
+            temp_path = self.manifest_path + ".tmp"
+            with open(temp_path, "w") as f:
+                json.dump(manifest, f, indent=2, sort_keys=True)
+            os.replace(temp_path, self.manifest_path)
+
+
+def _extract_reference(data_dir: str, video_filename: str, poses_file: str, target_fps: float):
+    """Process-pool entry point: run the MediaPipe stage for one video."""
+    VideoPoseProcessor(data_dir).process_video(video_filename, poses_file, target_fps=target_fps)
+
+
+if __name__ == "__main__":
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Rebuild stale reference library artifacts")
+    parser.add_argument("names", nargs="*", help="References to rebuild (all if omitted)")
+    parser.add_argument("--workers", type=int, default=os.cpu_count() or 1)
+    parser.add_argument("--target-fps", type=float, default=15.0)
+    parser.add_argument("--force", action="store_true", help="Rebuild every stage")
+    parser.add_argument("--dry-run", action="store_true", help="Only print the plan")
+    args = parser.parse_args()
+
+    library = ReferenceLibrary(VideoPoseProcessor(), target_fps=args.target_fps)
+    for entry in library.status():
+        reasons = ", ".join(f"{stage}: {reason}" for stage, reason in entry["stale"].items())
+        print(f"{entry['name']}: {reasons or 'up to date'}")
+
+    result = library.rebuild(args.names or None, args.force, args.workers, args.dry_run)
+    if not args.dry_run:
+        library.prune()
+    print(json.dumps({key: value for key, value in result.items() if key != "plan"}, indent=2))
@@ -4,13 +4,28 @@ Scoring Service
 Tracks and analyzes performance scores throughout a dance session.
 Generates timeline data and identifies problem areas for session summaries.
 
+Scores are stored column-wise in growable NumPy arrays (timestamps, combined,
+pose and motion scores, plus one column per limb for the per-limb breakdown)
+with errors in a separate interned table, so session analytics are computed
+in vectorized passes instead of per-record loops.
+
+Problem segments are also detected online: a below-threshold run is tracked
+with O(1) state and emitted to listeners as soon as it closes, so feedback
+can be generated while the user is still dancing.
+
 This service is stateful - maintains session data during active dancing.
 """
-from typing import List, Dict, Any, Optional
+from typing import Callable, List, Dict, Any, Optional, Set
 from dataclasses import dataclass, field
 import numpy as np
 
 
+# Score band thresholds (float32 to match the stored score columns)
+SCORE_BAND_THRESHOLDS = np.array([0.55, 0.70, 0.85], dtype=np.float32)
+SCORE_BAND_LABELS = ["Needs Work", "Okay", "Good", "Great!"]
+SCORE_BAND_KEYS = ["needs_work", "okay", "good", "excellent"]
+
+
 @dataclass
 class ScoreRecord:
     """Single score record at a point in time."""
@@ -19,6 +34,45 @@ class ScoreRecord:
     pose_score: float  # 0.0-1.0
     motion_score: float  # 0.0-1.0
     errors: List[Dict[str, Any]] = field(default_factory=list)
+    limb_scores: Dict[str, float] = field(default_factory=dict)  # e.g. {"left_arm": 0.62}
+
+
+@dataclass
+class _OpenProblemRun:
+    """State of the below-threshold run currently being tracked."""
+    record_start: int
+    start_time: float
+    end_time: float
+    score_sum: float
+    record_count: int
+    error_start: int  # first index in the error table belonging to this run
+    body_part_ids: Set[int] = field(default_factory=set)
+
+
+class _GrowableArray:
+    """Append-only 1D NumPy array with amortized O(1) appends."""
+
+    def __init__(self, dtype, capacity: int = 1024):
+        self._data = np.empty(capacity, dtype=dtype)
+        self._size = 0
+
+    def append(self, value):
+        if self._size == len(self._data):
+            grown = np.empty(len(self._data) * 2, dtype=self._data.dtype)
+            grown[:self._size] = self._data[:self._size]
+            self._data = grown
+        self._data[self._size] = value
+        self._size += 1
+
+    def view(self) -> np.ndarray:
+        """Filled part of the array (no copy)."""
+        return self._data[:self._size]
+
+    def clear(self):
+        self._size = 0
+
+    def __len__(self) -> int:
+        return self._size
 
 
 class ScoringService:
@@ -33,24 +87,55 @@ class ScoringService:
 
     Usage:
     1. Create service at session start
-    2. Call add_score() for each snapshot processed
-    3. Call get_timeline(), identify_problem_areas(), get_session_statistics() at session end
-    4. Call reset() to clear for new session
+    2. Optionally register add_problem_listener() callbacks for live segments
+    3. Call add_score() for each snapshot processed
+    4. Call close_problem_segment() when the session ends
+    5. Call get_timeline(), identify_problem_areas(), get_session_statistics() at session end
+    6. Call reset() to clear for new session
     """
 
-    def __init__(self):
-        """Initialize scoring service."""
-        self.score_records: List[ScoreRecord] = []
+    def __init__(self, problem_threshold: float = 0.65, min_problem_duration: float = 1.0):
+        """
+        Initialize scoring service.
+
+        Args:
+            problem_threshold: Score below which a snapshot is part of a problem segment
+            min_problem_duration: Minimum duration (seconds) of an emitted problem segment
+        """
+        # Score columns (one entry per snapshot)
+        self._timestamps = _GrowableArray(np.float32)
+        self._combined_scores = _GrowableArray(np.float32)
+        self._pose_scores = _GrowableArray(np.float32)
+        self._motion_scores = _GrowableArray(np.float32)
+
+        # Per-limb similarity columns (NaN = not recorded for that snapshot)
+        self._limb_columns: Dict[str, _GrowableArray] = {}
+
+        # Error table (one entry per error, body parts interned to ids)
+        self._error_record_idx = _GrowableArray(np.int32)
+        self._error_part_ids = _GrowableArray(np.int32)  # -1 = no body part
+        self._error_payloads: List[Dict[str, Any]] = []
+        self._body_part_ids: Dict[str, int] = {}
+        self._body_part_names: List[str] = []
+
         self.session_start_time: Optional[float] = None
 
+        # Online problem segmentation
+        self.problem_threshold = np.float32(problem_threshold)
+        self.min_problem_duration = min_problem_duration
+        self._open_run: Optional[_OpenProblemRun] = None
+        self._problem_listeners: List[Callable[[Dict[str, Any]], None]] = []
+        self.emitted_problem_segments = 0
+
     def add_score(
         self,
         timestamp: float,
         combined_score: float,
         pose_score: float = 0.0,
         motion_score: float = 0.0,
-        errors: Optional[List[Dict[str, Any]]] = None
-    ):
+        errors: Optional[List[Dict[str, Any]]] = None,
+        limb_scores: Optional[Dict[str, float]] = None
+    ) -> Optional[Dict[str, Any]]:
         """
         Record a score for the timeline.
 
@@ -60,53 +145,303 @@ class ScoringService:
             pose_score: Pose similarity component (0.0-1.0)
             motion_score: Motion similarity component (0.0-1.0)
             errors: List of detected errors at this moment
+            limb_scores: Per-limb similarity at this moment, e.g. {"left_arm": 0.62}
+
+        Returns:
+            Problem segment closed by this score (see _emit_problem_run()), or None
         """
         if self.session_start_time is None:
             self.session_start_time = timestamp
 
-        record = ScoreRecord(
-            timestamp=timestamp,
-            combined_score=combined_score,
-            pose_score=pose_score,
-            motion_score=motion_score,
-            errors=errors or []
-        )
-        self.score_records.append(record)
+        record_idx = len(self._timestamps)
+        self._timestamps.append(timestamp)
+        self._combined_scores.append(combined_score)
+        self._pose_scores.append(pose_score)
+        self._motion_scores.append(motion_score)
+        self._record_limb_scores(record_idx, limb_scores or {})
+
+        error_start = len(self._error_payloads)
+        for error in errors or []:
+            self._error_record_idx.append(record_idx)
+            self._error_part_ids.append(self._intern_body_part(error.get("body_part")))
+            self._error_payloads.append(error)
+
+        return self._update_problem_run(record_idx, error_start)
+
+    def _record_limb_scores(self, record_idx: int, limb_scores: Dict[str, float]):
+        """Append one row to the limb columns (new limbs are backfilled with NaN)."""
+        for limb, score in limb_scores.items():
+            column = self._limb_columns.get(limb)
+            if column is None:
+                column = _GrowableArray(np.float32)
+                for _ in range(record_idx):
+                    column.append(np.nan)
+                self._limb_columns[limb] = column
+            column.append(score)
+
+        for column in self._limb_columns.values():
+            if len(column) == record_idx:
+                column.append(np.nan)
+
+    def _limb_averages(self, start: int, end: int) -> Dict[str, float]:
+        """Mean per-limb similarity over records [start, end) (limbs without data omitted)."""
+        averages = {}
+        for limb, column in self._limb_columns.items():
+            values = column.view()[start:end]
+            recorded = ~np.isnan(values)
+            if recorded.any():
+                averages[limb] = float(values[recorded].mean(dtype=np.float64))
+        return averages
+
+    def add_problem_listener(self, listener: Callable[[Dict[str, Any]], None]):
+        """
+        Register a callback for problem segments as they close.
+
+        Listeners are called synchronously from add_score() /
+        close_problem_segment(), so they should hand off slow work.
+
+        Args:
+            listener: Called with each problem segment dictionary
+        """
+        self._problem_listeners.append(listener)
+
+    def close_problem_segment(self) -> Optional[Dict[str, Any]]:
+        """
+        Close the problem run that is still open (call at session end).
 
-    def get_timeline(self, resolution: str = "0.5s") -> List[Dict[str, Any]]:
+        Returns:
+            The closed problem segment, or None if no qualifying run was open
+        """
+        return self._close_problem_run(len(self._error_payloads))
+
+    def _close_problem_run(self, error_end: int) -> Optional[Dict[str, Any]]:
+        """Close the open run (errors up to error_end belong to it) and emit it."""
+        run = self._open_run
+        self._open_run = None
+        return self._emit_problem_run(run, error_end) if run is not None else None
+
+    def _update_problem_run(self, record_idx: int, error_start: int) -> Optional[Dict[str, Any]]:
+        """Advance the online segmenter with the record just added."""
+        # Read back the stored float32 values so online and batch results agree
+        timestamp = self._timestamps.view()[record_idx]
+        score = self._combined_scores.view()[record_idx]
+
+        if score >= self.problem_threshold:
+            # This record's errors are not part of the run
+            return self._close_problem_run(error_start)
+
+        run = self._open_run
+        if run is None:
+            run = _OpenProblemRun(
+                record_start=record_idx,
+                start_time=timestamp,
+                end_time=timestamp,
+                score_sum=0.0,
+                record_count=0,
+                error_start=error_start
+            )
+            self._open_run = run
+
+        run.end_time = timestamp
+        run.score_sum += float(score)
+        run.record_count += 1
+        for part_id in self._error_part_ids.view()[error_start:].tolist():
+            if part_id >= 0:
+                run.body_part_ids.add(part_id)
+        return None
+
+    def _emit_problem_run(self, run: _OpenProblemRun, error_end: int) -> Optional[Dict[str, Any]]:
+        """
+        Turn a closed run into a problem segment and notify listeners.
+
+        Returns:
+            Problem segment (same fields as identify_problem_areas() plus the
+            run's error payloads), or None if the run was too short
+        """
+        duration = run.end_time - run.start_time
+        if duration < self.min_problem_duration:
+            return None
+
+        limb_scores = self._limb_averages(run.record_start, run.record_start + run.record_count)
+
+        segment = {
+            "start_time": float(run.start_time),
+            "end_time": float(run.end_time),
+            "duration": float(duration),
+            "average_score": run.score_sum / run.record_count,
+            "body_parts": [self._body_part_names[part_id] for part_id in sorted(run.body_part_ids)],
+            "error_count": error_end - run.error_start,
+            "limb_scores": limb_scores,
+            "weakest_limb": min(limb_scores, key=limb_scores.get) if limb_scores else None,
+            "errors": self._error_payloads[run.error_start:error_end]
+        }
+        self.emitted_problem_segments += 1
+
+        for listener in self._problem_listeners:
+            try:
+                listener(segment)
+            except Exception as e:
+                print(f"[Scoring] Problem segment listener failed: {e}")
+
+        return segment
+
+    def _intern_body_part(self, body_part: Optional[str]) -> int:
+        """Map a body part name to a stable integer id (-1 if missing)."""
+        if not body_part:
+            return -1
+
+        part_id = self._body_part_ids.get(body_part)
+        if part_id is None:
+            part_id = len(self._body_part_names)
+            self._body_part_ids[body_part] = part_id
+            self._body_part_names.append(body_part)
+        return part_id
+
+    @property
+    def score_records(self) -> List[ScoreRecord]:
+        """
+        Recorded scores as ScoreRecord objects.
+
+        Built on demand from the columnar store - prefer the analytics
+        methods for anything performance sensitive.
+        """
+        errors_by_record: List[List[Dict[str, Any]]] = [[] for _ in range(len(self._timestamps))]
+        for record_idx, error in zip(self._error_record_idx.view().tolist(), self._error_payloads):
+            errors_by_record[record_idx].append(error)
+
+        limbs_by_record: List[Dict[str, float]] = [{} for _ in range(len(self._timestamps))]
+        for limb, column in self._limb_columns.items():
+            for record_idx, score in enumerate(column.view().tolist()):
+                if score == score:  # skip NaN
+                    limbs_by_record[record_idx][limb] = score
+
+        return [
+            ScoreRecord(
+                timestamp=timestamp,
+                combined_score=combined,
+                pose_score=pose,
+                motion_score=motion,
+                errors=errors,
+                limb_scores=limbs
+            )
+            for timestamp, combined, pose, motion, errors, limbs in zip(
+                self._timestamps.view().tolist(),
+                self._combined_scores.view().tolist(),
+                self._pose_scores.view().tolist(),
+                self._motion_scores.view().tolist(),
+                errors_by_record,
+                limbs_by_record
+            )
+        ]
+
+    def get_timeline(
+        self,
+        resolution: str = "0.5s",
+        max_points: Optional[int] = None
+    ) -> List[Dict[str, Any]]:
         """
         Get timeline of performance scores.
 
         Args:
-            resolution: Time resolution ("0.5s", "1s", "raw")
+            resolution: Time resolution ("0.5s", "1s", "raw" or any "<seconds>s")
                 - "0.5s": One data point every 0.5 seconds (default)
                 - "1s": Aggregate to 1-second intervals
                 - "raw": All recorded data points
+            max_points: If set, downsample the (aggregated) timeline to at most
+                this many points with Largest-Triangle-Three-Buckets, which
+                keeps the visual peaks and dips of the curve
 
         Returns:
             List of timeline points:
             [
                 {
-                    "timestamp": 0.0,
-                    "score": 0.85,
+                    "timestamp": 0.0,     # bucket start (or record time for "raw")
+                    "score": 0.85,        # mean score in the bucket
+                    "min_score": 0.80,
+                    "max_score": 0.90,
                     "label": "Great!"  # "Great!", "Good", "Okay", "Needs Work"
                 },
                 ...
             ]
         """
-        if not self.score_records:
+        if len(self._timestamps) == 0:
             return []
 
-        # For now, implement "raw" - can add aggregation later
-        timeline = []
-        for record in self.score_records:
-            timeline.append({
-                "timestamp": record.timestamp,
-                "score": record.combined_score,
-                "label": self._score_to_label(record.combined_score)
-            })
+        timestamps = self._timestamps.view()
+        scores = self._combined_scores.view()
+
+        if resolution == "raw":
+            point_times, mean_scores = timestamps, scores
+            min_scores = max_scores = scores
+        else:
+            bucket_width = self._parse_resolution(resolution)
+            point_times, mean_scores, min_scores, max_scores = self._aggregate_buckets(
+                timestamps, scores, bucket_width
+            )
+
+        if max_points is not None and len(point_times) > max_points:
+            keep = lttb_indices(point_times, mean_scores, max_points)
+            point_times, mean_scores = point_times[keep], mean_scores[keep]
+            min_scores, max_scores = min_scores[keep], max_scores[keep]
+
+        bands = self._score_bands(mean_scores)
+
+        return [
+            {
+                "timestamp": timestamp,
+                "score": score,
+                "min_score": min_score,
+                "max_score": max_score,
+                "label": SCORE_BAND_LABELS[band]
+            }
+            for timestamp, score, min_score, max_score, band in zip(
+                point_times.tolist(),
+                mean_scores.tolist(),
+                min_scores.tolist(),
+                max_scores.tolist(),
+                bands.tolist()
+            )
+        ]
+
+    def _parse_resolution(self, resolution: str) -> float:
+        """Parse a resolution string like "0.5s" into a bucket width in seconds."""
+        try:
+            bucket_width = float(resolution[:-1] if resolution.endswith("s") else resolution)
+        except ValueError:
+            raise ValueError(f"Invalid timeline resolution '{resolution}'")
+
+        if bucket_width <= 0:
+            raise ValueError(f"Invalid timeline resolution '{resolution}'")
+        return bucket_width
+
+    def _aggregate_buckets(
+        self,
+        timestamps: np.ndarray,
+        scores: np.ndarray,
+        bucket_width: float
+    ):
+        """
+        Aggregate scores into fixed-width time buckets.
+
+        Records arrive in time order, so each bucket is a contiguous slice and
+        can be reduced with ufunc.reduceat.
+
+        Returns:
+            (bucket_start_times, mean_scores, min_scores, max_scores)
+        """
+        origin = float(timestamps[0])
+        bucket_ids = np.floor((timestamps.astype(np.float64) - origin) / bucket_width).astype(np.int64)
+
+        starts = np.flatnonzero(np.concatenate(([True], np.diff(bucket_ids) != 0)))
+        counts = np.diff(np.append(starts, len(scores)))
+
+        sums = np.add.reduceat(scores.astype(np.float64), starts)
+        mean_scores = (sums / counts).astype(np.float32)
+        min_scores = np.minimum.reduceat(scores, starts)
+        max_scores = np.maximum.reduceat(scores, starts)
+        bucket_times = (origin + bucket_ids[starts] * bucket_width).astype(np.float32)
 
-        return timeline
+        return bucket_times, mean_scores, min_scores, max_scores
 
     def identify_problem_areas(
         self,
@@ -129,70 +464,85 @@ class ScoringService:
                     "average_score": 0.58,
                     "body_parts": ["left_elbow", "right_knee"],
                     "error_count": 15,
-                    "duration": 4.3
+                    "duration": 4.3,
+                    "limb_scores": {"left_arm": 0.52, "torso": 0.93, ...},
+                    "weakest_limb": "left_arm"  # None without limb data
                 },
                 ...
             ]
         """
-        if not self.score_records:
+        num_records = len(self._timestamps)
+        if num_records == 0:
+            return []
+
+        timestamps = self._timestamps.view()
+        scores = self._combined_scores.view()
+
+        # Run-length segmentation of below-threshold records
+        below = scores < np.float32(threshold)
+        edges = np.diff(np.concatenate(([0], below.astype(np.int8), [0])))
+        run_starts = np.flatnonzero(edges == 1)
+        run_ends = np.flatnonzero(edges == -1) - 1  # inclusive
+
+        durations = timestamps[run_ends] - timestamps[run_starts]
+        keep = durations >= min_duration
+        run_starts, run_ends, durations = run_starts[keep], run_ends[keep], durations[keep]
+
+        if len(run_starts) == 0:
             return []
 
-        problem_segments = []
-        current_segment = None
-
-        for record in self.score_records:
-            if record.combined_score < threshold:
-                # In a problem area
-                if current_segment is None:
-                    # Start new segment
-                    current_segment = {
-                        "start_time": record.timestamp,
-                        "end_time": record.timestamp,
-                        "scores": [record.combined_score],
-                        "body_parts_set": set(),
-                        "error_count": len(record.errors)
-                    }
-                else:
-                    # Continue segment
-                    current_segment["end_time"] = record.timestamp
-                    current_segment["scores"].append(record.combined_score)
-                    current_segment["error_count"] += len(record.errors)
-
-                # Collect body parts from errors
-                for error in record.errors:
-                    body_part = error.get("body_part")
-                    if body_part:
-                        current_segment["body_parts_set"].add(body_part)
-            else:
-                # Not in problem area
-                if current_segment is not None:
-                    # End current segment
-                    duration = current_segment["end_time"] - current_segment["start_time"]
-                    if duration >= min_duration:
-                        problem_segments.append({
-                            "start_time": current_segment["start_time"],
-                            "end_time": current_segment["end_time"],
-                            "duration": duration,
-                            "average_score": np.mean(current_segment["scores"]),
-                            "body_parts": list(current_segment["body_parts_set"]),
-                            "error_count": current_segment["error_count"]
-                        })
-                    current_segment = None
-
-        # Handle case where session ends in a problem area
-        if current_segment is not None:
-            duration = current_segment["end_time"] - current_segment["start_time"]
-            if duration >= min_duration:
-                problem_segments.append({
-                    "start_time": current_segment["start_time"],
-                    "end_time": current_segment["end_time"],
-                    "duration": duration,
-                    "average_score": np.mean(current_segment["scores"]),
-                    "body_parts": list(current_segment["body_parts_set"]),
-                    "error_count": current_segment["error_count"]
-                })
-
-        return problem_segments
+        # Per-run score means and error counts from prefix sums
+        score_cumsum = np.concatenate(([0.0], np.cumsum(scores, dtype=np.float64)))
+        run_lengths = run_ends - run_starts + 1
+        average_scores = (score_cumsum[run_ends + 1] - score_cumsum[run_starts]) / run_lengths
+
+        error_record_idx = self._error_record_idx.view()
+        errors_per_record = np.bincount(error_record_idx, minlength=num_records)
+        error_cumsum = np.concatenate(([0], np.cumsum(errors_per_record)))
+        error_counts = error_cumsum[run_ends + 1] - error_cumsum[run_starts]
+
+        # Body parts per run: map each error to the run containing its record
+        body_parts: List[List[str]] = [[] for _ in range(len(run_starts))]
+        part_ids = self._error_part_ids.view()
+        if len(part_ids) > 0:
+            error_runs = np.searchsorted(run_starts, error_record_idx, side='right') - 1
+            in_run = (
+                (error_runs >= 0) &
+                (error_record_idx <= run_ends[np.maximum(error_runs, 0)]) &
+                (part_ids >= 0)
+            )
+            num_parts = len(self._body_part_names)
+            pairs = np.unique(error_runs[in_run].astype(np.int64) * num_parts + part_ids[in_run])
+            for run, part_id in zip((pairs // num_parts).tolist(), (pairs % num_parts).tolist()):
+                body_parts[run].append(self._body_part_names[part_id])
+
+        # Per-limb averages per run (runs are few, columns are sliced directly)
+        limb_scores = [
+            self._limb_averages(start, end + 1)
+            for start, end in zip(run_starts.tolist(), run_ends.tolist())
+        ]
+
+        return [
+            {
+                "start_time": start_time,
+                "end_time": end_time,
+                "duration": duration,
+                "average_score": average_score,
+                "body_parts": parts,
+                "error_count": error_count,
+                "limb_scores": limbs,
+                "weakest_limb": min(limbs, key=limbs.get) if limbs else None
+            }
+            for start_time, end_time, duration, average_score, parts, error_count, limbs in zip(
+                timestamps[run_starts].tolist(),
+                timestamps[run_ends].tolist(),
+                durations.tolist(),
+                average_scores.tolist(),
+                body_parts,
+                error_counts.tolist(),
+                limb_scores
+            )
+        ]
 
     def get_session_statistics(self) -> Dict[str, Any]:
         """
@@ -211,10 +561,12 @@ class ScoringService:
                     "good": 40,       # 0.70 <= score < 0.85
                     "okay": 20,       # 0.55 <= score < 0.70
                     "needs_work": 15  # score < 0.55
-                }
+                },
+                "limb_averages": {"left_arm": 0.71, "torso": 0.94, ...}
             }
         """
-        if not self.score_records:
+        num_records = len(self._timestamps)
+        if num_records == 0:
             return {
                 "total_duration": 0.0,
                 "average_score": 0.0,
@@ -227,50 +579,42 @@ class ScoringService:
                     "good": 0,
                     "okay": 0,
                     "needs_work": 0
-                }
+                },
+                "limb_averages": {}
             }
 
+        timestamps = self._timestamps.view()
+        scores = self._combined_scores.view()
+
         # Calculate duration
-        first_timestamp = self.score_records[0].timestamp
-        last_timestamp = self.score_records[-1].timestamp
-        total_duration = last_timestamp - first_timestamp
+        total_duration = float(timestamps[-1] - timestamps[0])
 
         # Calculate average score
-        scores = [record.combined_score for record in self.score_records]
-        average_score = np.mean(scores)
+        average_score = float(scores.mean(dtype=np.float64))
 
         # Find best and worst moments
-        best_idx = np.argmax(scores)
-        worst_idx = np.argmin(scores)
+        best_idx = int(np.argmax(scores))
+        worst_idx = int(np.argmin(scores))
 
         best_moment = {
-            "timestamp": self.score_records[best_idx].timestamp,
-            "score": self.score_records[best_idx].combined_score
+            "timestamp": float(timestamps[best_idx]),
+            "score": float(scores[best_idx])
         }
 
         worst_moment = {
-            "timestamp": self.score_records[worst_idx].timestamp,
-            "score": self.score_records[worst_idx].combined_score
+            "timestamp": float(timestamps[worst_idx]),
+            "score": float(scores[worst_idx])
         }
 
         # Calculate score distribution
+        band_counts = np.bincount(self._score_bands(scores), minlength=len(SCORE_BAND_KEYS))
         distribution = {
-            "excellent": 0,  # >= 0.85
-            "good": 0,       # 0.70 - 0.85
-            "okay": 0,       # 0.55 - 0.70
-            "needs_work": 0  # < 0.55
+            "excellent": int(band_counts[3]),   # >= 0.85
+            "good": int(band_counts[2]),        # 0.70 - 0.85
+            "okay": int(band_counts[1]),        # 0.55 - 0.70
+            "needs_work": int(band_counts[0])   # < 0.55
         }
 
-        for score in scores:
-            if score >= 0.85:
-                distribution["excellent"] += 1
-            elif score >= 0.70:
-                distribution["good"] += 1
-            elif score >= 0.55:
-                distribution["okay"] += 1
-            else:
-                distribution["needs_work"] += 1
-
         # Count problem segments
         problem_segments = self.identify_problem_areas()
 
@@ -279,15 +623,31 @@ class ScoringService:
             "average_score": average_score,
             "best_moment": best_moment,
             "worst_moment": worst_moment,
-            "total_frames": len(self.score_records),
+            "total_frames": num_records,
             "problem_segments_count": len(problem_segments),
-            "score_distribution": distribution
+            "score_distribution": distribution,
+            "limb_averages": self._limb_averages(0, num_records)
         }
 
     def reset(self):
         """Clear session data for new session."""
-        self.score_records = []
+        self._timestamps.clear()
+        self._combined_scores.clear()
+        self._pose_scores.clear()
+        self._motion_scores.clear()
+        self._limb_columns = {}
+        self._error_record_idx.clear()
+        self._error_part_ids.clear()
+        self._error_payloads = []
+        self._body_part_ids = {}
+        self._body_part_names = []
         self.session_start_time = None
+        self._open_run = None
+        self.emitted_problem_segments = 0
+
+    def _score_bands(self, scores: np.ndarray) -> np.ndarray:
+        """Map scores to band indices (0 = "Needs Work" ... 3 = "Great!")."""
+        return np.searchsorted(SCORE_BAND_THRESHOLDS, scores.astype(np.float32), side='right')
 
     def _score_to_label(self, score: float) -> str:
         """Convert score to human-readable label."""
@@ -301,6 +661,60 @@ class ScoringService:
             return "Needs Work"
 
 
+def lttb_indices(x: np.ndarray, y: np.ndarray, max_points: int) -> np.ndarray:
+    """
+    Select points with Largest-Triangle-Three-Buckets downsampling.
+
+    The first and last points are always kept. The points in between are
+    split into (max_points - 2) buckets, and from each bucket the point
+    forming the largest triangle with the previously selected point and
+    the average of the next bucket is kept.
+
+    Args:
+        x: Point x values (timestamps), ascending
+        y: Point y values (scores)
+        max_points: Number of points to keep (>= 3 for actual selection)
+
+    Returns:
+        Sorted indices of the selected points
+    """
+    num_points = len(x)
+    if max_points >= num_points:
+        return np.arange(num_points)
+    if max_points < 3:
+        return np.array([0, num_points - 1][:max(max_points, 0)], dtype=np.int64)
+
+    x = x.astype(np.float64)
+    y = y.astype(np.float64)
+
+    # Bucket boundaries over the interior points 1 .. n-2
+    edges = np.linspace(1, num_points - 1, max_points - 1).astype(np.int64)
+
+    selected = np.empty(max_points, dtype=np.int64)
+    selected[0] = 0
+    selected[-1] = num_points - 1
+
+    previous = 0
+    for bucket in range(max_points - 2):
+        start, end = edges[bucket], edges[bucket + 1]
+
+        # Average of the next bucket (the last point for the final bucket)
+        next_start = end
+        next_end = edges[bucket + 2] if bucket + 2 < len(edges) else num_points
+        next_x = x[next_start:next_end].mean()
+        next_y = y[next_start:next_end].mean()
+
+        # Triangle areas (x2) for every candidate in this bucket
+        areas = np.abs(
+            (x[previous] - next_x) * (y[start:end] - y[previous]) -
+            (x[previous] - x[start:end]) * (next_y - y[previous])
+        )
+        previous = start + int(np.argmax(areas))
+        selected[bucket + 1] = previous
+
+    return selected
+
+
 # Factory function to get service instance
 def get_scoring_service() -> ScoringService:
     """
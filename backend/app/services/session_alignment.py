@@ -0,0 +1,402 @@
+"""
+Session Alignment
+
+End-of-session timing analysis: the whole recorded user sequence is aligned
+with the full reference by multivariate dynamic time warping, and the warping
+path is turned into a timing report.
+
+- Features: camera-invariant pose embeddings (joint angles + limb-relative
+  coordinates, see pose_library_index.pose_embedding), user frames resampled
+  onto the reference frame rate
+- Sakoe-Chiba band: each user frame may only match reference frames within
+  ±band_seconds of the reference clock, so the cost is O(N * band) instead
+  of O(N * M)
+- Each DP row is computed with NumPy: the in-row (horizontal) dependency
+  D[j] = min(t[j], c[j] + D[j - 1]) is a prefix minimum over prefix sums,
+  D[j] = S[j] + min_{k <= j}(t[k] - S[k]), i.e. one minimum.accumulate
+
+The report contains the warping path, per-segment rushing/dragging
+statistics and a score timeline computed against the aligned reference
+frames (instead of the live, possibly mistimed, matches).
+"""
+from dataclasses import dataclass
+from typing import Any, Dict, List, Optional, Tuple
+import numpy as np
+from app.services.angle_calculator import MATCHING_ANGLES
+from app.services.pose_library_index import pose_embedding
+from app.services.pose_mirroring import mirror_landmarks
+from app.services.scoring import ScoringService
+
+
+# Leading embedding columns holding the angle block (dot product = mean cos Δθ)
+_ANGLE_COLUMNS = 2 * len(MATCHING_ANGLES)
+
+
+@dataclass
+class SessionAlignment:
+    """Result of a full-session alignment (user frames resampled to the reference rate)."""
+    grid: np.ndarray  # resampled user times
+    user_path: np.ndarray  # warping path rows (indices into grid)
+    reference_path: np.ndarray  # warping path columns (reference frame indices)
+    times: np.ndarray  # grid times covered by the path
+    reference_positions: np.ndarray  # matched (fractional) reference frame per entry of times
+    scores: np.ndarray  # similarity with the matched reference frame per entry of times
+    cost: float  # accumulated DTW cost
+    mirrored: bool
+
+    def positions_at(self, timestamps: np.ndarray) -> np.ndarray:
+        """Matched reference frame (rounded) at arbitrary user timestamps."""
+        positions = np.interp(np.asarray(timestamps, dtype=np.float64), self.times, self.reference_positions)
+        return np.round(positions).astype(np.int64)
+
+
+def banded_dtw(
+    user_features: np.ndarray,
+    reference_features: np.ndarray,
+    band_low: np.ndarray,
+    band_high: np.ndarray
+) -> Tuple[np.ndarray, np.ndarray, float]:
+    """
+    Open-begin/open-end DTW restricted to a band of reference columns per user row.
+
+    Steps are (1, 1), (1, 0) and (0, 1); the path may start at any column of
+    the first row's band and end at any column of the last row's band.
+
+    Args:
+        user_features: (N, D) user features
+        reference_features: (M, D) reference features
+        band_low: (N,) first allowed reference column per row
+        band_high: (N,) end (exclusive) of the allowed columns per row;
+            both nondecreasing and band_low[i] <= band_high[i - 1]
+
+    Returns:
+        (user_indices, reference_indices, total_cost): path from start to end
+    """
+    num_rows = len(user_features)
+    widths = band_high - band_low
+    accumulated = np.full((num_rows, int(widths.max())), np.inf)
+
+    user_norms = np.sum(user_features ** 2, axis=1)
+    reference_norms = np.sum(reference_features ** 2, axis=1)
+
+    previous = None
+    for i in range(num_rows):
+        low, high = int(band_low[i]), int(band_high[i])
+        squared = reference_norms[low:high] + user_norms[i] - 2 * reference_features[low:high] @ user_features[i]
+        cost = np.sqrt(np.maximum(squared, 0.0))
+
+        if previous is None:
+            # Open begin: every first-row cell starts a path
+            candidates = cost
+        else:
+            # Previous row values at columns low - 1 .. high - 1 (inf outside its band)
+            previous_low, previous_values = previous
+            padded = np.full(high - low + 1, np.inf)
+            start = max(previous_low, low - 1)
+            end = min(previous_low + len(previous_values), high)
+            if start < end:
+                padded[start - (low - 1):end - (low - 1)] = previous_values[start - previous_low:end - previous_low]
+            candidates = cost + np.minimum(padded[:-1], padded[1:])
+
+        # Horizontal steps within the row as a prefix minimum
+        prefix = np.cumsum(cost)
+        row = prefix + np.minimum.accumulate(candidates - prefix)
+
+        accumulated[i, :high - low] = row
+        previous = (low, row)
+
+    # Open end: best cell of the last row, then backtrack
+    i = num_rows - 1
+    j = int(band_low[i]) + int(np.argmin(accumulated[i, :widths[i]]))
+    total_cost = float(accumulated[i, j - band_low[i]])
+
+    user_path, reference_path = [i], [j]
+    while i > 0:
+        diagonal = _cell(accumulated, band_low, band_high, i - 1, j - 1)
+        up = _cell(accumulated, band_low, band_high, i - 1, j)
+        left = _cell(accumulated, band_low, band_high, i, j - 1)
+        best = min(diagonal, up, left)
+        if best == np.inf:
+            break
+        if best == diagonal:
+            i, j = i - 1, j - 1
+        elif best == up:
+            i -= 1
+        else:
+            j -= 1
+        user_path.append(i)
+        reference_path.append(j)
+
+    return np.array(user_path[::-1]), np.array(reference_path[::-1]), total_cost
+
+
+def _cell(accumulated: np.ndarray, band_low: np.ndarray, band_high: np.ndarray, i: int, j: int) -> float:
+    """Accumulated cost at (i, j) (inf outside the band)."""
+    if i < 0 or j < band_low[i] or j >= band_high[i]:
+        return np.inf
+    return accumulated[i, j - band_low[i]]
+
+
+class SessionAligner:
+    """
+    Full-session DTW alignment against a reference clip.
+
+    Usage:
+    1. Create once per reference clip (precomputes reference features)
+    2. Call align() with the session's user landmarks at session end
+    """
+
+    def __init__(
+        self,
+        reference_landmarks: np.ndarray,
+        reference_timestamps: np.ndarray,
+        band_seconds: float = 3.0,
+        segment_seconds: float = 4.0,
+        on_time_tolerance: float = 0.15,
+        reference_features: Optional[np.ndarray] = None
+    ):
+        """
+        Initialize and precompute the reference features.
+
+        Args:
+            reference_landmarks: (M, 33, C) reference landmarks, C >= 3
+            reference_timestamps: (M,) reference timestamps in seconds
+            band_seconds: Sakoe-Chiba band half-width around the reference clock
+            segment_seconds: Length of the segments in the timing report
+            on_time_tolerance: Mean offset (seconds) still considered on time
+            reference_features: Precomputed (M, D) pose_embedding() of the
+                reference (e.g. from the feature bundle); computed if None
+        """
+        self.reference_times = np.asarray(reference_timestamps, dtype=np.float64)
+        steps = np.diff(self.reference_times)
+        steps = steps[steps > 0]
+        self.fps = 1.0 / float(np.median(steps)) if len(steps) else 15.0
+
+        self.band_seconds = band_seconds
+        self.band_frames = max(1, int(round(band_seconds * self.fps)))
+        self.segment_seconds = segment_seconds
+        self.on_time_tolerance = on_time_tolerance
+
+        self.reference_features = (
+            reference_features if reference_features is not None else pose_embedding(reference_landmarks)
+        )
+
+    def __len__(self) -> int:
+        return len(self.reference_features)
+
+    def align(
+        self,
+        user_landmarks: np.ndarray,
+        user_times: np.ndarray,
+        mirrored: bool = False,
+        timeline_resolution: str = "0.5s",
+        timeline_max_points: Optional[int] = None,
+        max_path_points: int = 300
+    ) -> Optional[Dict[str, Any]]:
+        """
+        Align a recorded session with the reference and build the timing report.
+
+        Args:
+            user_landmarks: (N, 33, C) user landmarks in recording order
+            user_times: (N,) user timestamps on the reference clock (seconds
+                since reference playback started)
+            mirrored: Dancer followed the mirrored reference
+            timeline_resolution: Bucket width of the aligned score timeline
+            timeline_max_points: LTTB cap on timeline points
+            max_path_points: Maximum number of warping path points returned
+
+        Returns:
+            None if the session is too short, otherwise the report() dict
+        """
+        alignment = self.compute_alignment(user_landmarks, user_times, mirrored)
+        if alignment is None:
+            return None
+        return self.report(alignment, timeline_resolution, timeline_max_points, max_path_points)
+
+    def compute_alignment(
+        self,
+        user_landmarks: np.ndarray,
+        user_times: np.ndarray,
+        mirrored: bool = False
+    ) -> Optional[SessionAlignment]:
+        """
+        Run the banded DTW for a recorded session.
+
+        Args:
+            user_landmarks: (N, 33, C) user landmarks in recording order
+            user_times: (N,) user timestamps on the reference clock
+            mirrored: Dancer followed the mirrored reference
+
+        Returns:
+            SessionAlignment, or None if the session is too short
+        """
+        user_landmarks = np.asarray(user_landmarks, dtype=np.float64)
+        user_times = np.asarray(user_times, dtype=np.float64)
+        if user_landmarks.ndim != 3 or user_landmarks.shape[1] < 33 or user_landmarks.shape[2] < 3:
+            return None
+
+        order = np.argsort(user_times, kind='stable')
+        user_times, user_landmarks = user_times[order], user_landmarks[order]
+        keep = np.concatenate(([True], np.diff(user_times) > 0))
+        user_times, user_landmarks = user_times[keep], user_landmarks[keep]
+        if len(user_times) < 2 or len(self.reference_features) < 2:
+            return None
+
+        if mirrored:
+            user_landmarks = mirror_landmarks(user_landmarks)
+        features = pose_embedding(user_landmarks)
+
+        # Resample onto the reference frame rate
+        grid = user_times[0] + np.arange(int((user_times[-1] - user_times[0]) * self.fps) + 1) / self.fps
+        if len(grid) < 2:
+            return None
+        position = np.clip(np.searchsorted(user_times, grid, side='right') - 1, 0, len(user_times) - 2)
+        fraction = ((grid - user_times[position]) / (user_times[position + 1] - user_times[position]))[:, np.newaxis]
+        resampled = features[position] * (1 - fraction) + features[position + 1] * fraction
+
+        band_low, band_high = self._band(grid)
+        user_path, reference_path, cost = banded_dtw(resampled, self.reference_features, band_low, band_high)
+
+        # Reference frame per user frame (mean over horizontal runs)
+        rows = user_path - user_path[0]
+        counts = np.bincount(rows)
+        matched = np.bincount(rows, weights=reference_path) / np.maximum(counts, 1)
+
+        matched_frames = np.round(matched).astype(np.int64)
+        scores = np.clip(np.sum(
+            resampled[user_path[0]:user_path[-1] + 1, :_ANGLE_COLUMNS] *
+            self.reference_features[matched_frames, :_ANGLE_COLUMNS], axis=1
+        ), 0.0, 1.0)
+
+        return SessionAlignment(
+            grid=grid,
+            user_path=user_path,
+            reference_path=reference_path,
+            times=grid[user_path[0]:user_path[-1] + 1],
+            reference_positions=matched,
+            scores=scores,
+            cost=cost,
+            mirrored=mirrored
+        )
+
+    def report(
+        self,
+        alignment: SessionAlignment,
+        timeline_resolution: str = "0.5s",
+        timeline_max_points: Optional[int] = None,
+        max_path_points: int = 300
+    ) -> Dict[str, Any]:
+        """
+        Timing report of an alignment.
+
+        Returns:
+            {
+                "mean_offset": -0.12,       # + ahead (rushing) / - behind (dragging), seconds
+                "mean_abs_offset": 0.21,
+                "tempo_ratio": 0.98,        # reference seconds covered per user second
+                "aligned_score": 0.81,      # mean similarity with the aligned reference frames
+                "segments": [{"start_time", "end_time", "reference_start", "reference_end",
+                              "mean_offset", "drift", "tempo_ratio", "score", "timing"}, ...],
+                "path": [{"user_time": 0.0, "reference_time": 0.13}, ...],
+                "aligned_timeline": [...]   # ScoringService.get_timeline() format
+            }
+        """
+        times, scores = alignment.times, alignment.scores
+        matched_times = np.interp(
+            alignment.reference_positions, np.arange(len(self.reference_times)), self.reference_times
+        )
+        offsets = matched_times - times
+
+        duration = float(times[-1] - times[0])
+        tempo_ratio = float((matched_times[-1] - matched_times[0]) / duration) if duration > 0 else 1.0
+
+        return {
+            "mean_offset": round(float(np.mean(offsets)), 3),
+            "mean_abs_offset": round(float(np.mean(np.abs(offsets))), 3),
+            "tempo_ratio": round(tempo_ratio, 3),
+            "aligned_score": round(float(np.mean(scores)), 3),
+            "segments": self._segments(times, matched_times, offsets, scores),
+            "path": self._path_points(
+                alignment.grid, alignment.user_path, alignment.reference_path, max_path_points
+            ),
+            "aligned_timeline": self._timeline(times, scores, timeline_resolution, timeline_max_points)
+        }
+
+    def _band(self, grid: np.ndarray) -> Tuple[np.ndarray, np.ndarray]:
+        """Sakoe-Chiba band around the reference clock, made connected and monotonic."""
+        last = len(self.reference_times)
+        center = np.searchsorted(self.reference_times, grid)
+        band_low = np.clip(center - self.band_frames, 0, last - 1)
+        band_high = np.maximum.accumulate(np.clip(center + self.band_frames + 1, band_low + 1, last))
+        band_low[1:] = np.minimum(band_low[1:], band_high[:-1])
+        return band_low, band_high
+
+    def _segments(
+        self,
+        times: np.ndarray,
+        matched_times: np.ndarray,
+        offsets: np.ndarray,
+        scores: np.ndarray
+    ) -> List[Dict[str, Any]]:
+        """Per-segment timing statistics (segments are contiguous slices of user time)."""
+        segment_ids = np.floor((times - times[0]) / self.segment_seconds).astype(np.int64)
+        starts = np.flatnonzero(np.concatenate(([True], np.diff(segment_ids) != 0)))
+        ends = np.append(starts[1:], len(times)) - 1
+        counts = ends - starts + 1
+
+        mean_offsets = np.add.reduceat(offsets, starts) / counts
+        mean_scores = np.add.reduceat(scores, starts) / counts
+        durations = times[ends] - times[starts]
+        reference_durations = matched_times[ends] - matched_times[starts]
+        tempo_ratios = np.where(durations > 0, reference_durations / np.where(durations > 0, durations, 1.0), 1.0)
+
+        segments = []
+        for k in range(len(starts)):
+            mean_offset = float(mean_offsets[k])
+            if mean_offset > self.on_time_tolerance:
+                timing = "rushing"
+            elif mean_offset < -self.on_time_tolerance:
+                timing = "dragging"
+            else:
+                timing = "on_time"
+            segments.append({
+                "start_time": round(float(times[starts[k]]), 3),
+                "end_time": round(float(times[ends[k]]), 3),
+                "reference_start": round(float(matched_times[starts[k]]), 3),
+                "reference_end": round(float(matched_times[ends[k]]), 3),
+                "mean_offset": round(mean_offset, 3),
+                "drift": round(float(offsets[ends[k]] - offsets[starts[k]]), 3),
+                "tempo_ratio": round(float(tempo_ratios[k]), 3),
+                "score": round(float(mean_scores[k]), 3),
+                "timing": timing
+            })
+        return segments
+
+    def _path_points(
+        self,
+        grid: np.ndarray,
+        user_path: np.ndarray,
+        reference_path: np.ndarray,
+        max_points: int
+    ) -> List[Dict[str, float]]:
+        """Warping path as (user time, reference time) pairs, evenly subsampled."""
+        keep = np.unique(np.linspace(0, len(user_path) - 1, min(max_points, len(user_path))).astype(np.int64))
+        return [
+            {"user_time": round(user_time, 3), "reference_time": round(reference_time, 3)}
+            for user_time, reference_time in zip(
+                grid[user_path[keep]].tolist(), self.reference_times[reference_path[keep]].tolist()
+            )
+        ]
+
+    def _timeline(
+        self,
+        times: np.ndarray,
+        scores: np.ndarray,
+        resolution: str,
+        max_points: Optional[int]
+    ) -> List[Dict[str, Any]]:
+        """Aligned scores in the session timeline format."""
+        timeline = ScoringService()
+        for timestamp, score in zip(times.tolist(), scores.tolist()):
+            timeline.add_score(timestamp, score, pose_score=score)
+        return timeline.get_timeline(resolution=resolution, max_points=max_points)
@@ -0,0 +1,186 @@
+"""
+Rolling Session Summarizer
+
+Keeps a session summary ready while the user is still dancing.
+
+Instead of handing the full feedback history to FeedbackGenerationService when
+the session ends (and making the user wait for a large LLM call), this service
+folds each live feedback record into running aggregates as it arrives:
+- Severity counts and focus-area frequencies
+- Improvement candidates (first feedback per focus area)
+- Strength signals (positive feedback, running average score)
+
+A draft narrative can be refreshed in the background at intervals. Ending a
+session returns the latest summary immediately; a final LLM polish can be
+produced asynchronously afterwards.
+
+This service is stateful - create a new instance for each session.
+"""
+from typing import Any, Callable, Dict, Optional
+import threading
+import time
+from app.data.config import settings
+from app.services.feedback_generation import FeedbackGenerationService, SessionAggregates
+
+
+class RollingSessionSummarizer:
+    """
+    Incrementally maintained session summary.
+
+    Usage:
+    1. Create at session start
+    2. Call add_feedback() / record_score() as snapshots are processed
+    3. Optionally call maybe_refresh_draft() to keep a draft narrative fresh
+    4. Call get_summary() when the session ends (returns immediately)
+    5. Optionally call polish() in the background for the final narrative
+    """
+
+    def __init__(
+        self,
+        feedback_service: FeedbackGenerationService,
+        draft_interval: Optional[float] = None,
+        min_new_feedback: Optional[int] = None
+    ):
+        """
+        Initialize the summarizer.
+
+        Args:
+            feedback_service: Service used to build summaries and narratives
+            draft_interval: Minimum seconds between background draft refreshes
+            min_new_feedback: Minimum new feedback records before a draft refresh
+        """
+        self.feedback_service = feedback_service
+        self.draft_interval = (
+            draft_interval if draft_interval is not None
+            else settings.summary_draft_interval_seconds
+        )
+        self.min_new_feedback = (
+            min_new_feedback if min_new_feedback is not None
+            else settings.summary_draft_min_new_feedback
+        )
+
+        self.aggregates = SessionAggregates()
+        self._lock = threading.Lock()
+
+        # Running score average (replaces the end-of-session recompute)
+        self.score_sum = 0.0
+        self.score_count = 0
+
+        # Background draft narrative
+        self.draft_summary: Optional[str] = None
+        self.draft_feedback_count = 0
+        self.last_draft_time = 0.0
+        self._draft_thread: Optional[threading.Thread] = None
+
+    def add_feedback(self, feedback: Dict[str, Any]):
+        """
+        Fold a live feedback record into the running aggregates.
+
+        Args:
+            feedback: Live feedback record (same format as session feedback_history)
+        """
+        with self._lock:
+            self.aggregates.add(feedback)
+
+    def record_score(self, combined_score: float):
+        """Add a snapshot score to the running average."""
+        with self._lock:
+            self.score_sum += combined_score
+            self.score_count += 1
+
+    @property
+    def average_score(self) -> float:
+        """Running average of all recorded scores."""
+        return self.score_sum / self.score_count if self.score_count > 0 else 0.0
+
+    def maybe_refresh_draft(self, get_session_statistics: Callable[[], Dict[str, Any]]) -> bool:
+        """
+        Refresh the draft narrative in the background if it is stale.
+
+        A refresh starts only when the interval has elapsed, enough new
+        feedback has arrived and no refresh is already running.
+
+        Args:
+            get_session_statistics: Callable returning current session stats
+                (only invoked if a refresh is actually started)
+
+        Returns:
+            True if a background refresh was started
+        """
+        now = time.time()
+        with self._lock:
+            new_feedback = self.aggregates.feedback_count - self.draft_feedback_count
+            if (
+                new_feedback < self.min_new_feedback or
+                now - self.last_draft_time < self.draft_interval or
+                (self._draft_thread is not None and self._draft_thread.is_alive())
+            ):
+                return False
+
+            aggregates = self.aggregates.copy()
+            self.last_draft_time = now
+
+        session_statistics = get_session_statistics()
+        self._draft_thread = threading.Thread(
+            target=self._refresh_draft,
+            args=(aggregates, session_statistics),
+            daemon=True
+        )
+        self._draft_thread.start()
+        return True
+
+    def _refresh_draft(self, aggregates: SessionAggregates, session_statistics: Dict[str, Any]):
+        """Generate a draft narrative (runs on a background thread)."""
+        try:
+            draft = self.feedback_service.generate_summary_narrative(aggregates, session_statistics)
+            with self._lock:
+                self.draft_summary = draft
+                self.draft_feedback_count = aggregates.feedback_count
+        except Exception as e:
+            print(f"[SessionSummarizer] Draft refresh failed: {e}")
+
+    def get_summary(self, session_statistics: Dict[str, Any]) -> Dict[str, Any]:
+        """
+        Get the latest summary without waiting for the LLM.
+
+        Uses the most recent background draft if one exists, otherwise a
+        template narrative.
+
+        Args:
+            session_statistics: Session stats from ScoringService
+
+        Returns:
+            Summary dictionary (same structure as generate_session_summary())
+            plus "summary_status": "draft" or "template"
+        """
+        with self._lock:
+            aggregates = self.aggregates.copy()
+            draft = self.draft_summary
+
+        summary = self.feedback_service.build_session_summary(
+            aggregates,
+            session_statistics,
+            overall_summary=draft,
+            use_llm=False
+        )
+        summary["summary_status"] = "draft" if draft is not None else "template"
+        return summary
+
+    def polish(self, session_statistics: Dict[str, Any]) -> Dict[str, Any]:
+        """
+        Generate the final summary with a fresh LLM narrative (blocking).
+
+        Intended to run in the background after the session has ended.
+
+        Args:
+            session_statistics: Final session stats from ScoringService
+
+        Returns:
+            Summary dictionary plus "summary_status": "final"
+        """
+        with self._lock:
+            aggregates = self.aggregates.copy()
+
+        summary = self.feedback_service.build_session_summary(aggregates, session_statistics)
+        summary["summary_status"] = "final"
+        return summary
@@ -0,0 +1,119 @@
+"""
+Benchmark: coordinate vs angle-space matching engines
+
+Compares the two PoseComparisonService matching modes on a processed
+reference clip:
+- Latency of a full reference search per user pose
+- Ranking agreement of the per-frame pose scores (Spearman correlation, top-10 overlap)
+- Match accuracy for user poses taken from the reference with noise, with
+  and without a camera change (zoom + shift)
+
+Run: python -m app.services.tests.benchmark_matching_modes [reference_name]
+"""
+
+import sys
+import os
+import time
+import numpy as np
+from ..pose_comparison_service import PoseComparisonService
+from ..pose_comparison_config import PoseComparisonConfig
+
+
+def load_reference_poses(name: str):
+    """Load a processed reference clip in PoseComparisonService format."""
+    current_dir = os.path.dirname(os.path.abspath(__file__))
+    data_file = os.path.join(current_dir, "..", "..", "data", "processed_poses", f"{name}.npy")
+    data = np.load(data_file, allow_pickle=True)
+
+    return [
+        {
+            'landmarks': frame_data['landmarks'],
+            'timestamp': frame_data['timestamp'],
+            'frame_number': frame_data['frame_number']
+        }
+        for frame_data in data if frame_data.get('has_pose', False)
+    ]
+
+
+def rank(values: np.ndarray) -> np.ndarray:
+    """Ranks of values (0 = smallest)."""
+    ranks = np.empty(len(values))
+    ranks[np.argsort(values)] = np.arange(len(values))
+    return ranks
+
+
+def spearman(a: np.ndarray, b: np.ndarray) -> float:
+    """Spearman rank correlation."""
+    return float(np.corrcoef(rank(a), rank(b))[0, 1])
+
+
+def make_user_pose(reference: np.ndarray, rng, noise: float, camera_change: bool) -> np.ndarray:
+    """Reference landmarks with noise and an optional camera zoom/shift."""
+    user = reference.copy()
+    user[:, :3] += rng.normal(0, noise, size=(33, 3))
+    if camera_change:
+        center = user[:, :2].mean(axis=0)
+        user[:, :2] = (user[:, :2] - center) * 0.7 + center + np.array([0.12, 0.05])
+    return user
+
+
+def run_benchmark(reference_name: str = "magnetic_poses", num_queries: int = 200, seed: int = 0):
+    """Run the benchmark and print a report."""
+    print("🧪 Benchmark: coordinate vs angle-space matching")
+    print("=" * 60)
+
+    reference_poses = load_reference_poses(reference_name)
+    print(f"✅ Loaded {len(reference_poses)} reference poses from {reference_name}")
+
+    coordinate_service = PoseComparisonService(reference_poses, PoseComparisonConfig(matching_mode="coordinates"))
+    angle_service = PoseComparisonService(reference_poses, PoseComparisonConfig(matching_mode="angles"))
+
+    start = time.perf_counter()
+    matcher = angle_service._get_angle_matcher()
+    print(f"   Angle feature precompute: {(time.perf_counter() - start) * 1000:.1f} ms "
+          f"({matcher.reference_embedding.shape[1]} dims vs "
+          f"{len(coordinate_service.reference_landmarks[0])} coordinate dims)")
+
+    rng = np.random.default_rng(seed)
+    query_indices = rng.choice(len(reference_poses), size=min(num_queries, len(reference_poses)), replace=False)
+
+    for camera_change in (False, True):
+        label = "camera change" if camera_change else "same camera"
+        coordinate_times, angle_times = [], []
+        correlations, overlaps = [], []
+        coordinate_hits, angle_hits = 0, 0
+
+        for true_idx in query_indices:
+            user = make_user_pose(reference_poses[true_idx]['landmarks'], rng, 0.005, camera_change)
+
+            start = time.perf_counter()
+            coordinate_scores = coordinate_service._calculate_pose_scores(
+                user, coordinate_service._reference_pose_matrix, coordinate_service._reference_pose_norms
+            )
+            coordinate_times.append(time.perf_counter() - start)
+
+            start = time.perf_counter()
+            angle_scores = matcher.pose_scores(matcher.user_angles(user))
+            angle_times.append(time.perf_counter() - start)
+
+            correlations.append(spearman(coordinate_scores, angle_scores))
+            top_coordinate = set(np.argsort(-coordinate_scores)[:10].tolist())
+            top_angle = set(np.argsort(-angle_scores)[:10].tolist())
+            overlaps.append(len(top_coordinate & top_angle) / 10)
+
+            coordinate_hits += abs(int(np.argmax(coordinate_scores)) - int(true_idx)) <= 2
+            angle_hits += abs(int(np.argmax(angle_scores)) - int(true_idx)) <= 2
+
+        print(f"\n📊 {label} ({len(query_indices)} queries)")
+        print(f"   Latency per search: coordinates {np.mean(coordinate_times) * 1000:.2f} ms, "
+              f"angles {np.mean(angle_times) * 1000:.3f} ms "
+              f"({np.mean(coordinate_times) / np.mean(angle_times):.0f}x)")
+        print(f"   Ranking agreement: Spearman {np.mean(correlations):.3f}, top-10 overlap {np.mean(overlaps):.2f}")
+        print(f"   Match within ±2 frames: coordinates {coordinate_hits / len(query_indices):.1%}, "
+              f"angles {angle_hits / len(query_indices):.1%}")
+
+    return True
+
+
+if __name__ == "__main__":
+    run_benchmark(sys.argv[1] if len(sys.argv) > 1 else "magnetic_poses")
@@ -0,0 +1,251 @@
+"""
+Timing Synchronization
+
+Estimates how far the dancer is ahead of or behind the reference from the
+rhythm of their movement rather than from individual poses.
+
+Per-limb motion-energy signals (sum of limb-relative landmark speeds) are
+precomputed for the reference. The user's recent window is resampled to the
+reference frame rate, and normalized cross-correlation against the reference
+signals is computed for all lags at once with the FFT (O(n log n)). The
+correlation peak gives:
+- The reference position the user's motion currently matches (used to
+  re-center the reference search window)
+- The timing offset against the reference clock (when playback start is known)
+- Per-limb offsets relative to the whole body (e.g. arms late by 0.2s)
+"""
+from collections import deque
+from typing import Any, Dict, Optional
+import numpy as np
+from app.services.limb_similarity import LIMB_NAMES, limb_motion_energy, normalize_limb_frames
+
+
+# Column permutation of the energy signals for a mirrored dancer (left <-> right)
+_MIRRORED_LIMBS = np.array([
+    LIMB_NAMES.index(name.replace('left_', '#').replace('right_', 'left_').replace('#', 'right_'))
+    for name in LIMB_NAMES
+])
+
+
+def sliding_normalized_correlation(signal: np.ndarray, template: np.ndarray) -> np.ndarray:
+    """
+    Normalized cross-correlation of a template at every position of a signal (FFT).
+
+    Args:
+        signal: (F, G) signals
+        template: (n, G) template, n <= F
+
+    Returns:
+        (F - n + 1, G) correlation coefficients in [-1, 1] (0 where undefined)
+    """
+    num_frames, n = len(signal), len(template)
+    num_positions = num_frames - n + 1
+
+    template = template - template.mean(axis=0)
+    template_norm = np.sqrt(np.sum(template ** 2, axis=0))
+
+    size = 1 << int(np.ceil(np.log2(num_frames + n)))
+    products = np.fft.rfft(signal, size, axis=0) * np.conj(np.fft.rfft(template, size, axis=0))
+    correlation = np.fft.irfft(products, size, axis=0)[:num_positions]
+
+    # Windowed signal variance from prefix sums
+    cumsum = np.concatenate([np.zeros((1, signal.shape[1])), np.cumsum(signal, axis=0)])
+    cumsum_sq = np.concatenate([np.zeros((1, signal.shape[1])), np.cumsum(signal ** 2, axis=0)])
+    window_sum = cumsum[n:] - cumsum[:num_positions]
+    window_sum_sq = cumsum_sq[n:] - cumsum_sq[:num_positions]
+    window_norm = np.sqrt(np.maximum(window_sum_sq - window_sum ** 2 / n, 0.0))
+
+    norms = window_norm * template_norm
+    valid = norms > 1e-9
+    return np.where(valid, correlation / np.where(valid, norms, 1.0), 0.0)
+
+
+class TimingSynchronizer:
+    """
+    Motion-energy synchronizer between the user and a reference clip.
+
+    Usage:
+    1. Create once per reference clip
+    2. Optionally set_reference_clock() when reference playback starts
+    3. Call add_user_pose() for each user pose, then estimate()
+    """
+
+    def __init__(
+        self,
+        reference_landmarks: np.ndarray,
+        reference_timestamps: np.ndarray,
+        window_seconds: float = 4.0,
+        min_window_seconds: float = 2.0,
+        max_lag_seconds: float = 2.0,
+        max_limb_lag_seconds: float = 0.5,
+        interval: float = 0.5,
+        reference_energy: Optional[np.ndarray] = None
+    ):
+        """
+        Initialize and precompute the reference motion-energy signals.
+
+        Args:
+            reference_landmarks: (F, 33, C) reference landmarks, C >= 3
+            reference_timestamps: (F,) reference timestamps in seconds
+            window_seconds: Length of the user window correlated
+            min_window_seconds: Minimum user history before estimating
+            max_lag_seconds: Search range around the expected position
+            max_limb_lag_seconds: Search range of per-limb offsets around the body's
+            interval: Minimum seconds between estimates (positions are
+                extrapolated in between)
+            reference_energy: Precomputed (F - 1, G) limb_motion_energy() of the
+                reference (e.g. from the feature bundle); computed if None
+        """
+        self.reference_times = np.asarray(reference_timestamps, dtype=np.float64)
+        steps = np.diff(self.reference_times)
+        steps = steps[steps > 0]
+        self.fps = 1.0 / float(np.median(steps)) if len(steps) else 15.0
+
+        self.window_seconds = window_seconds
+        self.min_window_seconds = min_window_seconds
+        self.max_lag_frames = int(round(max_lag_seconds * self.fps))
+        self.max_limb_lag_frames = int(round(max_limb_lag_seconds * self.fps))
+        self.interval = interval
+
+        # (F - 1, G): energy[i] = motion from reference frame i to i + 1
+        self.reference_energy = (
+            reference_energy if reference_energy is not None
+            else limb_motion_energy(normalize_limb_frames(reference_landmarks))
+        )
+
+        self._user_times = deque()
+        self._user_rows = deque()
+        self.reference_clock_start: Optional[float] = None
+        self.last_estimate: Optional[Dict[str, Any]] = None
+
+    def set_reference_clock(self, start_time: Optional[float]):
+        """
+        Set the user timestamp at which reference playback started (None = unknown).
+
+        Enables timing offsets against the reference clock and resets tracking.
+        """
+        self.reference_clock_start = start_time
+        self.reset()
+
+    def reset(self):
+        """Clear the user window and the last estimate."""
+        self._user_times.clear()
+        self._user_rows.clear()
+        self.last_estimate = None
+
+    def add_user_pose(self, timestamp: float, landmarks: np.ndarray):
+        """Add one user pose (33, C) to the window."""
+        landmarks = np.asarray(landmarks)
+        if landmarks.ndim != 2 or landmarks.shape[0] < 33 or landmarks.shape[1] < 3:
+            return
+        if self._user_times and timestamp <= self._user_times[-1]:
+            return
+
+        self._user_times.append(timestamp)
+        self._user_rows.append(normalize_limb_frames(landmarks[np.newaxis])[0])
+        while timestamp - self._user_times[0] > self.window_seconds:
+            self._user_times.popleft()
+            self._user_rows.popleft()
+
+    def estimate(self, timestamp: float, mirrored: bool = False) -> Optional[Dict[str, Any]]:
+        """
+        Estimate the current alignment with the reference.
+
+        Args:
+            timestamp: Current user timestamp
+            mirrored: Dancer follows the mirrored reference (swap left/right limbs)
+
+        Returns:
+            None until enough history, otherwise:
+            {
+                "reference_index": 412,       # reference frame matching the user now
+                "reference_time": 27.47,      # its timestamp
+                "timing_offset": -0.27,       # + ahead / - behind the reference clock (None if unknown)
+                "limb_offsets": {"left_arm": -0.13, ...},  # + ahead / - behind the rest of the body
+                "confidence": 0.82            # correlation peak (-1 to 1)
+            }
+        """
+        last = self.last_estimate
+        if last is not None and timestamp - last['_timestamp'] < self.interval:
+            return self._extrapolate(last, timestamp)
+
+        if not self._user_times or self._user_times[-1] - self._user_times[0] < self.min_window_seconds:
+            return self._extrapolate(last, timestamp) if last is not None else None
+
+        # Resample the user window onto the reference frame rate
+        times = np.array(self._user_times)
+        rows = np.array(self._user_rows)
+        grid = times[0] + np.arange(int((times[-1] - times[0]) * self.fps) + 1) / self.fps
+        if len(grid) < 3 or len(grid) > len(self.reference_energy):
+            return self._extrapolate(last, timestamp) if last is not None else None
+
+        position = np.clip(np.searchsorted(times, grid, side='right') - 1, 0, len(times) - 2)
+        fraction = ((grid - times[position]) / (times[position + 1] - times[position]))[:, np.newaxis]
+        resampled = rows[position] * (1 - fraction) + rows[position + 1] * fraction
+
+        user_energy = limb_motion_energy(resampled)
+        reference_energy = self.reference_energy[:, _MIRRORED_LIMBS] if mirrored else self.reference_energy
+        correlation = sliding_normalized_correlation(reference_energy, user_energy)  # (P, G)
+
+        active = np.std(user_energy, axis=0) > 1e-9
+        if not active.any():
+            return self._extrapolate(last, timestamp) if last is not None else None
+        combined = correlation[:, active].mean(axis=1)
+
+        # Search around the expected start position of the window
+        expected = self._expected_start(grid[0], last)
+        low, high = 0, len(combined)
+        if expected is not None:
+            low = int(np.clip(expected - self.max_lag_frames, 0, len(combined) - 1))
+            high = int(np.clip(expected + self.max_lag_frames + 1, low + 1, len(combined)))
+        start = low + int(np.argmax(combined[low:high]))
+
+        # Per-limb offsets relative to the whole body
+        limb_offsets = {}
+        limb_low = max(0, start - self.max_limb_lag_frames)
+        limb_high = min(len(combined), start + self.max_limb_lag_frames + 1)
+        for group in np.flatnonzero(active).tolist():
+            limb_start = limb_low + int(np.argmax(correlation[limb_low:limb_high, group]))
+            limb_offsets[LIMB_NAMES[group]] = round((limb_start - start) / self.fps, 3)
+
+        reference_index = min(start + len(grid) - 1, len(self.reference_times) - 1)
+        timing_offset = None
+        if self.reference_clock_start is not None:
+            # Sub-frame peak position from a parabola through the peak and its neighbours
+            peak = float(start)
+            if 0 < start < len(combined) - 1:
+                left, center, right = combined[start - 1:start + 2]
+                curvature = left - 2 * center + right
+                if curvature < 0:
+                    peak += float(np.clip(0.5 * (left - right) / curvature, -0.5, 0.5))
+            matched_time = np.interp(peak, np.arange(len(self.reference_times)), self.reference_times)
+            timing_offset = round(float(matched_time - (grid[0] - self.reference_clock_start)), 3)
+
+        self.last_estimate = {
+            "reference_index": reference_index,
+            "reference_time": float(self.reference_times[reference_index]),
+            "timing_offset": timing_offset,
+            "limb_offsets": limb_offsets,
+            "confidence": round(float(combined[start]), 3),
+            "_timestamp": float(grid[-1]),
+            "_start": start,
+            "_window_start": float(grid[0])
+        }
+        return self._extrapolate(self.last_estimate, timestamp)
+
+    def _expected_start(self, window_start: float, last: Optional[Dict[str, Any]]) -> Optional[int]:
+        """Expected reference frame for the window start (from the clock or the last estimate)."""
+        if self.reference_clock_start is not None:
+            return int(np.searchsorted(self.reference_times, window_start - self.reference_clock_start))
+        if last is not None:
+            return int(round(last['_start'] + (window_start - last['_window_start']) * self.fps))
+        return None
+
+    def _extrapolate(self, estimate: Dict[str, Any], timestamp: float) -> Dict[str, Any]:
+        """Public view of an estimate, advanced to timestamp at reference speed."""
+        elapsed_frames = int(round(max(0.0, timestamp - estimate['_timestamp']) * self.fps))
+        reference_index = min(estimate['reference_index'] + elapsed_frames, len(self.reference_times) - 1)
+        result = {key: value for key, value in estimate.items() if not key.startswith('_')}
+        result['reference_index'] = reference_index
+        result['reference_time'] = float(self.reference_times[reference_index])
+        return result
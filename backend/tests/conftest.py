@@ -0,0 +1,39 @@
+"""
+Shared fixtures: reference poses loaded from the processed_poses files.
+"""
+
+import os
+import numpy as np
+import pytest
+
+
+PROCESSED_POSES_DIR = os.path.join(os.path.dirname(__file__), "..", "app", "data", "processed_poses")
+
+
+def load_pose_frames(filename):
+    """Frames with a pose from a processed poses file."""
+    data = np.load(os.path.join(PROCESSED_POSES_DIR, filename), allow_pickle=True)
+    return [frame for frame in data if frame.get('has_pose', False)]
+
+
+@pytest.fixture(scope="module")
+def reference_poses():
+    """test_poses.npy frames as PoseComparisonService takes them."""
+    return [
+        {
+            'landmarks': frame['landmarks'],
+            'timestamp': frame['timestamp'],
+            'frame_number': frame['frame_number']
+        }
+        for frame in load_pose_frames("test_poses.npy")
+    ]
+
+
+@pytest.fixture(scope="module")
+def reference():
+    """magnetic_poses.npy as (F, 33, 4) landmarks and (F,) timestamps."""
+    frames = load_pose_frames("magnetic_poses.npy")
+    return (
+        np.stack([frame['landmarks'] for frame in frames]),
+        np.array([frame['timestamp'] for frame in frames], dtype=np.float64)
+    )
@@ -0,0 +1,59 @@
+"""
+Tests for the batched angle kernel.
+
+Run with:
+    pytest tests/test_angle_batch.py -v
+"""
+
+import numpy as np
+import pytest
+from app.services.angle_calculator import AngleCalculator, POSE_ANGLES, HAND_ANGLES
+
+
+@pytest.fixture
+def calculator():
+    return AngleCalculator()
+
+
+class TestBatchAngles:
+    """Test that batch results match per-frame results."""
+
+    def test_batch_matches_single_frame(self, calculator):
+        rng = np.random.default_rng(3)
+        poses = rng.random((50, 33, 4))
+
+        table = calculator.calculate_pose_angles_batch(poses)
+
+        assert table.values.shape == (50, len(POSE_ANGLES))
+        for i in (0, 17, 49):
+            single = calculator.calculate_all_angles(poses[i, :, :3].flatten())
+            assert list(single) == list(table.names)
+            assert np.allclose(list(single.values()), table.values[i])
+
+    def test_flat_and_point_inputs_agree(self, calculator):
+        rng = np.random.default_rng(4)
+        hands = rng.random((10, 21, 3))
+
+        from_points = calculator.calculate_hand_angles_batch(hands)
+        from_flat = calculator.calculate_hand_angles_batch(hands.reshape(10, -1))
+
+        assert from_points.names == tuple(spec.name for spec in HAND_ANGLES)
+        assert np.allclose(from_points.values, from_flat.values)
+
+    def test_known_angles(self, calculator):
+        pose = np.zeros((1, 33, 3))
+        pose[0, 11, :2] = [0.3, 0.4]   # left shoulder
+        pose[0, 13, :2] = [0.3, 0.6]   # left elbow
+        pose[0, 15, :2] = [0.5, 0.6]   # left wrist -> 90 degree bend
+        pose[0, 23, :2] = [0.3, 0.7]
+        pose[0, 25, :2] = [0.3, 0.8]
+        pose[0, 27, :2] = [0.3, 0.9]   # straight left leg
+
+        table = calculator.calculate_pose_angles_batch(pose)
+
+        assert table.column('left_elbow_bend')[0] == pytest.approx(90.0)
+        assert table.column('left_knee_bend')[0] == pytest.approx(180.0)
+
+    def test_degenerate_angle_is_zero(self, calculator):
+        assert calculator.calculate_angle((0, 0), (0, 0), (1, 1)) == 0.0
+        assert calculator.calculate_pose_angles_batch(np.zeros((3, 33, 3))).column('right_elbow_bend').tolist() == [0.0] * 3
@@ -0,0 +1,77 @@
+"""
+Tests for the angle-space matching engine.
+
+Run with:
+    pytest tests/test_angle_matching.py -v
+"""
+
+import numpy as np
+import pytest
+from app.services.angle_matching import AngleSpaceMatcher, wrap_radians
+from app.services.pose_comparison_config import PoseComparisonConfig
+from app.services.pose_comparison_service import PoseComparisonService
+
+
+@pytest.fixture(scope="module")
+def matcher(reference_poses):
+    frames = np.stack([pose['landmarks'][:33, :3] for pose in reference_poses]).astype(np.float64)
+    return AngleSpaceMatcher(frames)
+
+
+class TestAngleSpaceMatcher:
+    def test_wrap_radians(self):
+        wrapped = wrap_radians(np.array([0.0, np.pi * 1.5, -np.pi * 1.5]))
+        np.testing.assert_allclose(wrapped, [0.0, -np.pi / 2, np.pi / 2])
+
+    def test_reference_frame_matches_itself(self, reference_poses, matcher):
+        for idx in (0, len(reference_poses) // 2, len(reference_poses) - 1):
+            scores = matcher.pose_scores(matcher.user_angles(reference_poses[idx]['landmarks']))
+            assert scores[idx] == pytest.approx(1.0)
+            assert scores.shape == (len(matcher),)
+            assert np.all((scores >= 0) & (scores <= 1))
+
+    def test_camera_zoom_and_shift_invariance(self, reference_poses, matcher):
+        landmarks = reference_poses[10]['landmarks'].copy()
+        moved = landmarks.copy()
+        moved[:, :2] = moved[:, :2] * 0.6 + np.array([0.2, -0.1])
+
+        np.testing.assert_allclose(
+            matcher.pose_scores(matcher.user_angles(moved)),
+            matcher.pose_scores(matcher.user_angles(landmarks)),
+            atol=1e-9
+        )
+
+    def test_find_best_match_with_motion(self, reference_poses, matcher):
+        idx, pose_score, motion_score = matcher.find_best_match(
+            reference_poses[20]['landmarks'], reference_poses[19]['landmarks'], 0.7, 0.3
+        )
+        assert abs(idx - 20) <= 1
+        assert 0.0 <= pose_score <= 1.0
+        assert 0.0 <= motion_score <= 1.0
+
+    def test_find_best_match_without_motion(self, reference_poses, matcher):
+        idx, pose_score, motion_score = matcher.find_best_match(
+            reference_poses[5]['landmarks'], None, 0.7, 0.3
+        )
+        assert idx == 5
+        assert pose_score == pytest.approx(1.0)
+        assert motion_score == 0.0
+
+
+class TestMatchingModeConfig:
+    def test_unknown_mode_rejected(self):
+        with pytest.raises(ValueError):
+            PoseComparisonConfig(matching_mode="pixels")
+
+    def test_mode_in_dict(self):
+        assert PoseComparisonConfig(matching_mode="angles").to_dict()['matching_mode'] == "angles"
+
+    def test_service_uses_angle_engine(self, reference_poses):
+        service = PoseComparisonService(reference_poses, PoseComparisonConfig(matching_mode="angles"))
+
+        for idx in (30, 31, 32):
+            result = service.update_user_pose(reference_poses[idx]['landmarks'], timestamp=idx / 15)
+
+        assert abs(result['best_match_idx'] - 32) <= 1
+        assert result['pose_score'] > 0.95
+        assert service._angle_matcher is not None
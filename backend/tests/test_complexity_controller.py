@@ -0,0 +1,131 @@
+"""
+Tests for the adaptive model complexity controller.
+
+Run with:
+    pytest tests/test_complexity_controller.py -v
+"""
+
+import pytest
+from app.services.complexity_controller import LatencyStats, ModelComplexityController, PoseModelPool
+
+
+def feed(controller, latency_ms, count, interval=0.5, request_ms=None, start=0.0):
+    """Record count snapshots arriving every interval seconds; returns the next start time."""
+    for i in range(count):
+        controller.record(
+            latency_ms / 1000.0,
+            request_started=start + i * interval,
+            request_seconds=(request_ms if request_ms is not None else latency_ms) / 1000.0
+        )
+    return start + count * interval
+
+
+class FakePose:
+    def __init__(self, level):
+        self.level = level
+        self.closed = False
+
+    def close(self):
+        self.closed = True
+
+
+class TestLatencyAdaptation:
+    def test_steps_down_after_sustained_violation(self):
+        controller = ModelComplexityController(initial_level=2, latency_budget_ms=80, downgrade_samples=5)
+        feed(controller, 120, 4)
+        assert controller.level == 2
+        feed(controller, 120, 1, start=2.0)
+        assert controller.level == 1
+        assert controller.get_stats()['switches'][-1]['reason'] == "latency"
+
+    def test_hysteresis_band_keeps_level(self):
+        controller = ModelComplexityController(initial_level=1, latency_budget_ms=80, upgrade_samples=5)
+        # Between headroom (40 ms) and the budget: neither direction
+        feed(controller, 60, 100)
+        assert controller.level == 1
+        assert controller.get_stats()['switches'] == []
+
+    def test_steps_up_with_headroom_after_longer_streak(self):
+        controller = ModelComplexityController(
+            initial_level=0, latency_budget_ms=80, downgrade_samples=5, upgrade_samples=20
+        )
+        feed(controller, 10, 19)
+        assert controller.level == 0
+        feed(controller, 10, 1, start=10.0)
+        assert controller.level == 1
+
+    def test_warmup_sample_of_new_model_ignored(self):
+        controller = ModelComplexityController(initial_level=0, latency_budget_ms=80, upgrade_samples=3)
+        pool = PoseModelPool(FakePose)
+        controller.acquire(pool)
+        start = feed(controller, 2000, 1)
+        start = feed(controller, 10, 3, start=start)
+        assert controller.level == 1
+
+        # First inference of the new model is slow (graph initialization)
+        controller.acquire(pool)
+        start = feed(controller, 2000, 1, start=start)
+        feed(controller, 50, 10, start=start)
+        assert controller.level == 1
+        assert controller.get_stats()['latency_by_level'][1]['peak_ms'] == 2000.0
+
+    def test_overload_steps_down(self):
+        controller = ModelComplexityController(initial_level=1, latency_budget_ms=80, max_utilization=0.8)
+        # Fast inference, but each snapshot keeps the server busy the whole interval
+        feed(controller, 30, 10, interval=0.1, request_ms=100)
+        assert controller.level == 0
+        assert controller.get_stats()['switches'][0]['reason'] == "load"
+        assert controller.utilization == pytest.approx(1.0)
+
+    def test_disabled_keeps_level(self):
+        controller = ModelComplexityController(initial_level=1, enabled=False)
+        feed(controller, 500, 50)
+        assert controller.level == 1
+
+    def test_stale_level_samples_do_not_drive_decisions(self):
+        controller = ModelComplexityController(initial_level=1, latency_budget_ms=80, downgrade_samples=2)
+        for _ in range(5):
+            controller.record(0.5, level=2)
+        assert controller.level == 1
+        assert controller.get_stats()['latency_by_level'][2]['count'] == 5
+
+
+class TestModelPool:
+    def test_one_model_per_level(self):
+        pool = PoseModelPool(FakePose)
+        assert pool.get(1) is pool.get(1)
+        assert pool.get(0).level == 0
+        assert pool.loaded_levels == [0, 1]
+
+        models = [pool.get(0), pool.get(1)]
+        pool.close()
+        assert all(model.closed for model in models)
+
+    def test_unavailable_level_dropped(self):
+        def create(level):
+            if level == 0:
+                raise RuntimeError("model download failed")
+            return FakePose(level)
+
+        controller = ModelComplexityController(initial_level=0)
+        pose, level = controller.acquire(PoseModelPool(create))
+        assert (pose.level, level) == (1, 1)
+        assert controller.levels == [1, 2]
+        assert controller.get_stats()['switches'][-1]['reason'] == "unavailable"
+
+    def test_no_level_left_raises(self):
+        def create(level):
+            raise RuntimeError("no models")
+
+        controller = ModelComplexityController(initial_level=1, min_level=1, max_level=1)
+        with pytest.raises(RuntimeError):
+            controller.acquire(PoseModelPool(create))
+
+
+class TestSessionLatency:
+    def test_session_stats_updated(self):
+        controller = ModelComplexityController()
+        session = LatencyStats(alpha=0.5)
+        controller.record(0.02, session=session)
+        controller.record(0.04, session=session)
+        assert session.to_dict() == {'count': 2, 'ema_ms': 30.0, 'peak_ms': 40.0}
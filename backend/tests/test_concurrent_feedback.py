@@ -0,0 +1,165 @@
+"""
+Tests for concurrent segment feedback generation.
+
+Run with:
+    pytest tests/test_concurrent_feedback.py -v
+"""
+
+import asyncio
+import time
+import pytest
+from app.services.feedback_generation import FeedbackGenerationService, FeedbackStream
+
+
+def make_segments(count):
+    """Create problem segments with increasing accuracy."""
+    return [
+        {
+            "timestamp_start": float(i),
+            "timestamp_end": float(i) + 1.0,
+            "accuracy": 0.3 + 0.05 * i,
+            "errors": [{"body_part": f"joint_{i}", "expected": 90, "actual": 60, "difference": 30}]
+        }
+        for i in range(count)
+    ]
+
+
+@pytest.fixture
+def service():
+    return FeedbackGenerationService()
+
+
+class TestConcurrentFeedback:
+    """Test fan-out, ordering and deadline fallback."""
+
+    def test_items_run_concurrently_and_stay_ordered(self, service, monkeypatch):
+        in_flight = []
+        peak = []
+
+        async def fake_llm(client, segment):
+            in_flight.append(segment)
+            peak.append(len(in_flight))
+            # Later segments finish first
+            await asyncio.sleep(0.2 - segment["timestamp_start"] * 0.03)
+            in_flight.remove(segment)
+            return service._build_feedback_item(segment, f"Fix {segment['errors'][0]['body_part']}")
+
+        monkeypatch.setattr(service, "_generate_single_feedback_async", fake_llm)
+
+        start = time.time()
+        feedback = service.generate_feedback(list(reversed(make_segments(5))), max_items=5)
+        elapsed = time.time() - start
+
+        assert elapsed < 0.5  # ~one round-trip, not five
+        assert max(peak) == 5
+        assert [item["feedback"] for item in feedback] == [f"Fix joint_{i}" for i in range(5)]
+
+    def test_semaphore_bounds_concurrency(self, service, monkeypatch):
+        in_flight = []
+        peak = []
+
+        async def fake_llm(client, segment):
+            in_flight.append(segment)
+            peak.append(len(in_flight))
+            await asyncio.sleep(0.02)
+            in_flight.remove(segment)
+            return service._build_feedback_item(segment, "ok")
+
+        monkeypatch.setattr(service, "_generate_single_feedback_async", fake_llm)
+
+        feedback = asyncio.run(service.generate_feedback_async(make_segments(6), max_items=6, max_concurrency=2))
+
+        assert len(feedback) == 6
+        assert max(peak) == 2
+
+    def test_straggler_gets_template_fallback(self, service, monkeypatch):
+        async def fake_llm(client, segment):
+            if segment["timestamp_start"] == 1.0:
+                await asyncio.sleep(5)
+            if segment["timestamp_start"] == 2.0:
+                raise RuntimeError("API error")
+            return service._build_feedback_item(segment, "LLM feedback")
+
+        monkeypatch.setattr(service, "_generate_single_feedback_async", fake_llm)
+
+        start = time.time()
+        feedback = asyncio.run(service.generate_feedback_async(make_segments(3), item_deadline=0.1))
+
+        assert time.time() - start < 1.0
+        assert feedback[0]["feedback"] == "LLM feedback"
+        assert feedback[1]["feedback"].startswith("Your joint_1 needs adjustment")
+        assert feedback[2]["feedback"].startswith("Your joint_2 needs adjustment")
+
+    def test_queued_items_keep_their_deadline(self, service, monkeypatch):
+        async def fake_llm(client, segment):
+            await asyncio.sleep(0.06)
+            return service._build_feedback_item(segment, "LLM feedback")
+
+        monkeypatch.setattr(service, "_generate_single_feedback_async", fake_llm)
+
+        # Items wait up to 0.18s for the semaphore, longer than their 0.1s deadline
+        feedback = asyncio.run(service.generate_feedback_async(
+            make_segments(4), max_items=4, max_concurrency=1, item_deadline=0.1
+        ))
+
+        assert [item["feedback"] for item in feedback] == ["LLM feedback"] * 4
+
+    def test_sync_wrapper_refuses_running_event_loop(self, service, monkeypatch):
+        async def fake_llm(client, segment):
+            return service._build_feedback_item(segment, "ok")
+
+        monkeypatch.setattr(service, "_generate_single_feedback_async", fake_llm)
+
+        async def caller():
+            return service.generate_feedback(make_segments(2))
+
+        with pytest.raises(RuntimeError):
+            asyncio.run(caller())
+
+        async def async_caller():
+            return await service.generate_feedback_async(make_segments(2))
+
+        assert len(asyncio.run(async_caller())) == 2
+
+
+class TestFeedbackStream:
+    """Test items submitted one at a time to a shared stream."""
+
+    def test_submitted_items_share_limit_and_cancel(self, service, monkeypatch):
+        in_flight = []
+        peak = []
+        started = []
+
+        async def fake_llm(client, segment):
+            started.append(segment["timestamp_start"])
+            in_flight.append(segment)
+            peak.append(len(in_flight))
+            try:
+                await asyncio.sleep(0.05)
+            finally:
+                in_flight.remove(segment)
+            return service._build_feedback_item(segment, "LLM feedback")
+
+        monkeypatch.setattr(service, "_generate_single_feedback_async", fake_llm)
+
+        async def session():
+            stream = FeedbackStream(service, max_concurrency=1, item_deadline=1.0)
+            segments = make_segments(3)
+            first = stream.submit(segments[0])
+            await asyncio.sleep(0.01)
+            # Pushed out while queued behind the first item
+            second = stream.submit(segments[1])
+            await asyncio.sleep(0.01)
+            second.cancel()
+            third = stream.submit(segments[2])
+            try:
+                return await asyncio.gather(first, third), second
+            finally:
+                await stream.close()
+
+        feedback, cancelled = asyncio.run(session())
+
+        assert cancelled.cancelled()
+        assert started == [0.0, 2.0]
+        assert max(peak) == 1
+        assert [item["feedback"] for item in feedback] == ["LLM feedback"] * 2
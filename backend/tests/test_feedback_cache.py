@@ -0,0 +1,208 @@
+"""
+Tests for the feedback response cache and its integration with LiveFeedbackService.
+
+Run with:
+    pytest tests/test_feedback_cache.py -v
+"""
+
+import asyncio
+import base64
+import time
+from types import SimpleNamespace
+import cv2
+import numpy as np
+import pytest
+from app.services.dual_snapshot_service import DualSnapshotData, DualSnapshotService
+from app.services.feedback_cache import FeedbackCache, build_feedback_signature, image_signature
+from app.services.live_feedback_service import LiveFeedbackService, SnapshotData
+
+
+def make_snapshot(score=0.5, best_match_idx=30, errors=None, timestamp=1.0):
+    """Create a minimal snapshot for cache tests."""
+    return SnapshotData(
+        timestamp=timestamp,
+        frame_base64="fake",
+        pose_similarity=score,
+        motion_similarity=score,
+        combined_score=score,
+        errors=errors or [],
+        best_match_idx=best_match_idx
+    )
+
+
+class TestFeedbackCache:
+    """Test TTL, LRU eviction and hit statistics."""
+
+    def test_hit_after_put(self):
+        cache = FeedbackCache(max_entries=4, ttl_seconds=60, enabled=True)
+        cache.put("a", "text")
+
+        assert cache.get("a") == "text"
+        assert cache.get("b") is None
+
+        stats = cache.get_statistics()
+        assert stats["total_hits"] == 1
+        assert stats["total_misses"] == 1
+        assert stats["top_entries"][0]["hits"] == 1
+
+    def test_lru_eviction(self):
+        cache = FeedbackCache(max_entries=2, ttl_seconds=60, enabled=True)
+        cache.put("a", 1)
+        cache.put("b", 2)
+        cache.get("a")  # "b" is now least recently used
+        cache.put("c", 3)
+
+        assert cache.get("b") is None
+        assert cache.get("a") == 1
+        assert cache.get_statistics()["total_evictions"] == 1
+
+    def test_ttl_expiration(self):
+        cache = FeedbackCache(max_entries=2, ttl_seconds=0.01, enabled=True)
+        cache.put("a", 1)
+        time.sleep(0.02)
+
+        assert cache.get("a") is None
+        assert cache.get_statistics()["total_expirations"] == 1
+
+
+class TestFeedbackSignature:
+    """Test that near-identical situations share a signature."""
+
+    def test_same_bucket_same_signature(self):
+        errors = [{"body_part": "left_elbow", "difference": 25.0}]
+        sig1 = build_feedback_signature(31, 0.52, ["left_elbow"], errors, 15, 0.1)
+        sig2 = build_feedback_signature(35, 0.58, ["left_elbow"], errors, 15, 0.1)
+        assert sig1 == sig2
+
+    def test_error_direction_changes_signature(self):
+        sig1 = build_feedback_signature(30, 0.5, ["left_elbow"], [{"body_part": "left_elbow", "difference": 20}])
+        sig2 = build_feedback_signature(30, 0.5, ["left_elbow"], [{"body_part": "left_elbow", "difference": -20}])
+        assert sig1 != sig2
+
+
+class TestLiveFeedbackCaching:
+    """Test that repeated snapshots are served without a new LLM call."""
+
+    def test_repeated_situation_uses_cache(self, monkeypatch):
+        service = LiveFeedbackService()
+        service.response_cache = FeedbackCache(max_entries=8, ttl_seconds=60, enabled=True)
+        calls = []
+
+        def fake_generate(snapshot):
+            calls.append(snapshot)
+            return service._build_feedback_result(snapshot, "Raise your left arm!")
+
+        monkeypatch.setattr(service, "_generate_live_feedback", fake_generate)
+
+        errors = [{"body_part": "left_elbow", "difference": 30.0}]
+        first = service.process_snapshot(make_snapshot(errors=errors, timestamp=1.0))
+        second = service.process_snapshot(make_snapshot(errors=errors, timestamp=1.5))
+
+        assert len(calls) == 1
+        assert second["feedback_text"] == first["feedback_text"]
+        assert second["timestamp"] == 1.5
+        assert service.get_statistics()["total_cache_hits"] == 1
+
+    def test_fallback_is_not_cached(self, monkeypatch):
+        service = LiveFeedbackService()
+        service.response_cache = FeedbackCache(max_entries=8, ttl_seconds=60, enabled=True)
+
+        def failing_generate(snapshot):
+            raise RuntimeError("API down")
+
+        monkeypatch.setattr(service, "_generate_live_feedback", failing_generate)
+        service.process_snapshot(make_snapshot())
+
+        assert len(service.response_cache) == 0
+
+
+def dancer_frame(arm_degrees):
+    """1280x720 data URL: textured background and a stick figure with one raised arm."""
+    rng = np.random.default_rng(0)
+    frame = cv2.GaussianBlur(rng.integers(0, 256, (720, 1280, 3), dtype=np.uint8), (31, 31), 0)
+    cv2.line(frame, (640, 250), (640, 500), (255, 255, 255), 14)
+    cv2.line(frame, (640, 500), (600, 650), (255, 255, 255), 14)
+    cv2.line(frame, (640, 500), (680, 650), (255, 255, 255), 14)
+    cv2.circle(frame, (640, 220), 30, (255, 255, 255), -1)
+    angle = np.radians(arm_degrees)
+    hand = (int(640 + 110 * np.cos(angle)), int(280 - 110 * np.sin(angle)))
+    cv2.line(frame, (640, 280), hand, (255, 255, 255), 14)
+    cv2.line(frame, (640, 280), (540, 360), (255, 255, 255), 14)
+    _, buffer = cv2.imencode(".jpg", frame)
+    return "data:image/jpeg;base64," + base64.b64encode(buffer).decode("ascii")
+
+
+def dancer_landmarks():
+    """Landmarks spanning the stick figure's box in dancer_frame()."""
+    landmarks = np.ones((33, 4))
+    landmarks[:, 0] = np.linspace(540 / 1280, 760 / 1280, 33)
+    landmarks[:, 1] = np.linspace(190 / 720, 650 / 720, 33)
+    return landmarks
+
+
+class FakePose:
+    """Pose estimator returning queued landmark arrays in call order."""
+
+    def __init__(self, queue):
+        self.queue = queue
+
+    def process(self, rgb):
+        landmarks = self.queue.pop(0)
+        return SimpleNamespace(pose_landmarks=SimpleNamespace(landmark=[
+            SimpleNamespace(x=x, y=y, z=z, visibility=v) for x, y, z, v in landmarks.tolist()
+        ]))
+
+
+def snapshot(image, video_time):
+    return DualSnapshotData(
+        timestamp=video_time, webcam_frame_base64=image, reference_frame_base64=image,
+        video_current_time=video_time, session_id="test"
+    )
+
+
+class TestDualSnapshotCaching:
+    """Test the person-box cache key and per-frame fields on dual snapshot hits."""
+
+    def test_person_box_hash_separates_poses(self):
+        service = DualSnapshotService(pose_factory=lambda: None)
+        frames = [dancer_frame(degrees) for degrees in (45, 0, -27)]
+
+        # The whole-frame hash cannot tell these poses apart
+        assert len({image_signature(frame) for frame in frames}) == 1
+
+        keys = {service._build_cache_key(snapshot(frame, 3.2), dancer_landmarks()) for frame in frames}
+        assert len(keys) == 3
+        assert service._build_cache_key(snapshot(frames[0], 3.2), None) is None
+
+    def test_cache_hit_recomputes_frame_fields(self, reference):
+        landmarks, _ = reference
+        queue = []
+        service = DualSnapshotService(pose_factory=lambda: FakePose(queue))
+        service.response_cache = FeedbackCache(max_entries=8, ttl_seconds=60, enabled=True)
+        calls = []
+
+        async def create(**kwargs):
+            calls.append(kwargs)
+            return SimpleNamespace(choices=[SimpleNamespace(message=SimpleNamespace(content=(
+                '{"feedback_text": "Raise your arms!", "similarity_score": 0.9, "severity": "low", '
+                '"focus_areas": ["arms"], "specific_issues": [], "recommendations": ["Reach higher"]}'
+            )))])
+
+        service.client = SimpleNamespace(chat=SimpleNamespace(completions=SimpleNamespace(create=create)))
+        image = dancer_frame(45)
+
+        # (user, reference) per analysis: the reference pose, then the same
+        # person box with the left elbow moved off its line
+        bent = landmarks[0].copy()
+        bent[13, :3] = (landmarks[0][11, :3] + landmarks[0][15, :3]) / 2 + [0.0, 0.05, 0.0]
+        queue.extend([landmarks[0], landmarks[0], bent, landmarks[0]])
+        first = asyncio.run(service.analyze_dual_snapshot(snapshot(image, 3.1)))
+        second = asyncio.run(service.analyze_dual_snapshot(snapshot(image, 3.3)))
+
+        assert len(calls) == 1
+        assert second.feedback_text == first.feedback_text == "Raise your arms!"
+        assert second.recommendations == ["Reach higher"]
+        assert second.timestamp == 3.3
+        assert first.similarity_score == pytest.approx(1.0)
+        assert second.similarity_score < first.similarity_score
+        assert first.specific_issues == [] and second.specific_issues
@@ -0,0 +1,112 @@
+"""
+Tests for the snapshot input stage (person crop and downscaling).
+
+Run with:
+    pytest tests/test_frame_input.py -v
+"""
+
+import base64
+from io import BytesIO
+import numpy as np
+import pytest
+from PIL import Image
+from app.services.frame_input import PersonCropper, decode_image, full_resolution, landmark_box
+
+
+def encode(width, height, fmt="JPEG"):
+    buffer = BytesIO()
+    Image.new("RGB", (width, height), (200, 100, 50)).save(buffer, fmt)
+    return base64.b64encode(buffer.getvalue()).decode()
+
+
+def person(x0=0.4, y0=0.2, x1=0.6, y1=0.9):
+    """Landmarks spread over the given box (all visible)."""
+    landmarks = np.ones((33, 4))
+    landmarks[:, 0] = np.linspace(x0, x1, 33)
+    landmarks[:, 1] = np.linspace(y0, y1, 33)
+    landmarks[:, 2] = 0.0
+    return landmarks
+
+
+class TestDecode:
+    def test_jpeg_decoded_at_reduced_scale(self):
+        image = decode_image(encode(1920, 1080), lambda width, height: (480, 270))
+        assert image.shape == (270, 480, 3)
+        assert np.allclose(image[10, 10], (200, 100, 50), atol=3)
+
+    def test_full_size_without_draft_or_for_png(self):
+        assert decode_image(encode(320, 240)).shape == (240, 320, 3)
+        assert decode_image(encode(320, 240, "PNG"), lambda width, height: (40, 30)).shape == (240, 320, 3)
+
+    def test_full_resolution_redecodes_only_reduced_frames(self):
+        data = encode(1920, 1080)
+        reduced = decode_image(data, lambda width, height: (480, 270))
+        assert full_resolution(data, reduced).shape == (1080, 1920, 3)
+
+        full = decode_image(data)
+        assert full_resolution(data, full) is full
+
+
+class TestCropping:
+    def test_search_then_tracked_crop(self):
+        cropper = PersonCropper(working_resolution=256, search_resolution=512)
+        frame = np.zeros((1080, 1920, 3), dtype=np.uint8)
+
+        model_input, box = cropper.prepare(frame)
+        assert model_input.shape == (288, 512, 3)
+        assert box == (0.0, 0.0, 1.0, 1.0)
+
+        cropper.update(person())
+        model_input, box = cropper.prepare(frame)
+        assert max(model_input.shape[:2]) == 256
+        assert box[0] < 0.4 and box[2] > 0.6 and box[1] < 0.2 and box[3] > 0.9
+
+    def test_decode_size_keeps_working_resolution(self):
+        cropper = PersonCropper(working_resolution=256, search_resolution=512)
+        assert cropper.decode_size(1920, 1080) == (512, 288)
+        cropper.box = (0.25, 0.0, 0.75, 0.5)
+        assert cropper.decode_size(1920, 1080) == (512, 288)
+        assert cropper.decode_size(320, 240) == (320, 240)
+
+    def test_landmarks_roundtrip_through_crop(self):
+        cropper = PersonCropper()
+        cropper.update(person())
+        frame = np.zeros((720, 1280, 3), dtype=np.uint8)
+        _, box = cropper.prepare(frame)
+
+        expected = person(0.45, 0.3, 0.55, 0.8)
+        in_crop = expected.copy()
+        in_crop[:, 0] = (expected[:, 0] - box[0]) / (box[2] - box[0])
+        in_crop[:, 1] = (expected[:, 1] - box[1]) / (box[3] - box[1])
+        assert np.allclose(PersonCropper.to_frame(in_crop, box), expected)
+
+
+class TestBoxTracking:
+    def test_small_motion_keeps_box(self):
+        cropper = PersonCropper()
+        cropper.update(person())
+        box = cropper.box
+        cropper.update(person(0.41, 0.21, 0.61, 0.91))
+        assert cropper.box == box
+        assert cropper.get_stats()['box_moves'] == 1
+
+    def test_leaving_or_shrinking_moves_box(self):
+        cropper = PersonCropper()
+        cropper.update(person())
+        cropper.update(person(0.6, 0.2, 0.8, 0.9))
+        assert cropper.box[2] > 0.8
+        cropper.update(person(0.65, 0.4, 0.7, 0.5))
+        assert cropper.box == pytest.approx(landmark_box(person(0.65, 0.4, 0.7, 0.5)))
+        assert cropper.get_stats()['box_moves'] == 3
+
+    def test_lost_person_returns_to_search(self):
+        cropper = PersonCropper()
+        cropper.update(person())
+        cropper.update(None)
+        assert cropper.box is None
+
+        hidden = person()
+        hidden[:, 3] = 0.0
+        cropper.update(person())
+        cropper.update(hidden)
+        assert cropper.box is None
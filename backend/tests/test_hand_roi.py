@@ -0,0 +1,98 @@
+"""
+Tests for pose-guided hand crops.
+
+The hand model is replaced by a fake that records the crops it receives
+and reports one hand at fixed crop coordinates.
+
+Run with:
+    pytest tests/test_hand_roi.py -v
+"""
+
+from types import SimpleNamespace
+import numpy as np
+import pytest
+from app.services.hand_roi import PoseGuidedHandDetector, crop_to_frame, hand_rois
+
+
+WIDTH, HEIGHT = 640, 480
+
+
+def pose_with_hands(left=(0.25, 0.5), right=(0.75, 0.5), visibility=1.0):
+    """Pose whose wrists sit at the given points with knuckles 0.05 above them."""
+    pose = np.zeros((33, 4))
+    pose[:, 3] = 1.0
+    for (x, y), (wrist, pinky, index) in zip((left, right), ((15, 17, 19), (16, 18, 20))):
+        pose[wrist, :2] = (x, y)
+        pose[pinky, :2] = (x - 0.01, y - 0.05)
+        pose[index, :2] = (x + 0.01, y - 0.05)
+    pose[15, 3] = visibility
+    return pose
+
+
+class FakeHands:
+    def __init__(self, found=True):
+        self.found = found
+        self.crops = []
+
+    def process(self, crop):
+        self.crops.append(crop.shape)
+        if not self.found:
+            return SimpleNamespace(multi_hand_landmarks=None, multi_handedness=None)
+        landmark = SimpleNamespace(landmark=[SimpleNamespace(x=0.5, y=0.5, z=0.1)] * 21)
+        handedness = SimpleNamespace(classification=[SimpleNamespace(label="Left", score=0.9)])
+        return SimpleNamespace(multi_hand_landmarks=[landmark], multi_handedness=[handedness])
+
+
+class TestRois:
+    def test_crop_centered_on_knuckles(self):
+        rois = hand_rois(pose_with_hands(), WIDTH, HEIGHT, scale=3.0)
+        assert set(rois) == {"left", "right"}
+
+        x0, y0, x1, y1 = rois["left"]
+        assert (x0 + x1) / 2 == pytest.approx(0.25 * WIDTH, abs=1)
+        assert (y0 + y1) / 2 == pytest.approx(0.45 * HEIGHT, abs=1)
+        # 3x the wrist-to-knuckles distance (24 px)
+        assert x1 - x0 == pytest.approx(72, abs=2)
+
+    def test_invisible_and_off_frame_hands_skipped(self):
+        assert set(hand_rois(pose_with_hands(visibility=0.1), WIDTH, HEIGHT)) == {"right"}
+        assert set(hand_rois(pose_with_hands(right=(1.3, 0.5)), WIDTH, HEIGHT)) == {"left"}
+
+    def test_small_hands_get_min_size(self):
+        pose = pose_with_hands()
+        pose[17, :2] = pose[19, :2] = pose[15, :2]
+        x0, y0, x1, y1 = hand_rois(pose, WIDTH, HEIGHT, min_size=48)["left"]
+        assert x1 - x0 == pytest.approx(48, abs=2)
+
+    def test_crop_to_frame_roundtrip(self):
+        box = (100, 50, 200, 150)
+        mapped = crop_to_frame(np.array([[0.0, 0.0, 0.0], [1.0, 1.0, 0.5]]), box, WIDTH, HEIGHT)
+        assert np.allclose(mapped[0], [100 / WIDTH, 50 / HEIGHT, 0.0])
+        assert np.allclose(mapped[1], [200 / WIDTH, 150 / HEIGHT, 0.5 * 100 / WIDTH])
+
+
+class TestDetector:
+    def test_landmarks_mapped_to_frame(self):
+        models = []
+        detector = PoseGuidedHandDetector(lambda: models.append(FakeHands()) or models[-1])
+        frame = np.zeros((HEIGHT, WIDTH, 3), dtype=np.uint8)
+
+        hand_landmarks, hand_classifications = detector.process(frame, pose_with_hands())
+        assert len(models) == 2
+        assert [model.crops[0][:2] for model in models] == [(72, 72), (72, 72)]
+        assert [hand[0, 0] for hand in hand_landmarks] == pytest.approx([0.25, 0.75], abs=0.01)
+        assert hand_landmarks[0][0, 1] == pytest.approx(0.45, abs=0.01)
+        assert hand_classifications == [{'label': "Left", 'confidence': 0.9}] * 2
+        assert detector.get_stats()['pixel_ratio'] == pytest.approx(2 * 72 * 72 / (WIDTH * HEIGHT), abs=0.001)
+
+    def test_empty_crop_backs_off(self):
+        model = FakeHands(found=False)
+        detector = PoseGuidedHandDetector(lambda: model, retry_interval=2)
+        frame = np.zeros((HEIGHT, WIDTH, 3), dtype=np.uint8)
+        pose = pose_with_hands(right=(1.3, 0.5))
+
+        for _ in range(6):
+            assert detector.process(frame, pose) == ([], [])
+        # Searched on snapshots 1 and 4, skipped in between
+        assert len(model.crops) == 2
+        assert detector.get_stats()['skipped_crops'] == 4
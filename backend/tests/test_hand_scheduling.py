@@ -0,0 +1,87 @@
+"""
+Tests for reference-driven hand inference scheduling.
+
+Run with:
+    pytest tests/test_hand_scheduling.py -v
+"""
+
+import os
+import numpy as np
+import pytest
+from app.services.hand_scheduling import HandInferenceScheduler
+from app.services.pose_comparison_service import PoseComparisonService
+from app.services.reference_features import ReferenceFeatures
+
+
+DATA_FILE = os.path.join(
+    os.path.dirname(__file__), "..", "app", "data", "processed_poses", "magnetic_poses.npy"
+)
+
+
+@pytest.fixture(scope="module")
+def frames():
+    return [frame for frame in np.load(DATA_FILE, allow_pickle=True) if frame.get('has_pose', False)]
+
+
+def track_with_gestures(num_frames, gesture_frames):
+    track = np.full((num_frames, 2), "", dtype="<U16")
+    track[gesture_frames, 1] = "open_hand"
+    return track
+
+
+class TestScheduling:
+    def test_runs_only_near_gestures(self):
+        timestamps = np.arange(100) / 10.0
+        scheduler = HandInferenceScheduler(track_with_gestures(100, [50]), timestamps, window_seconds=0.3)
+
+        assert scheduler.window_frames == 3
+        assert [index for index in range(100) if scheduler.should_run(index)] == list(range(47, 54))
+        assert scheduler.gesture_coverage == pytest.approx(0.07)
+        assert not scheduler.should_run(None)
+        assert scheduler.should_run(0, force=True)
+
+    def test_without_track_runs_every_frame(self):
+        scheduler = HandInferenceScheduler(None)
+        assert scheduler.should_run(None)
+        assert scheduler.should_run(10)
+        assert scheduler.get_stats()['scheduled'] is False
+
+    def test_reuse_until_max_age(self):
+        scheduler = HandInferenceScheduler(track_with_gestures(10, [0]), max_reuse_seconds=1.0)
+        assert scheduler.reuse(0.0) is None
+
+        scheduler.store(("hands", "labels"), timestamp=10.0)
+        assert scheduler.reuse(10.5) == ("hands", "labels")
+        assert scheduler.reuse(11.5) is None
+
+        stats = scheduler.get_stats()
+        assert (stats['runs'], stats['reuses']) == (1, 3)
+        assert stats['skip_ratio'] == pytest.approx(0.75)
+
+
+class TestReferenceGestureTrack:
+    def test_track_from_bundle_and_pose_dicts_agree(self, frames):
+        features = ReferenceFeatures.from_frames(frames)
+        from_dicts = PoseComparisonService([
+            {'landmarks': frame['landmarks'], 'timestamp': frame['timestamp'], 'gestures': frame['gestures']}
+            for frame in frames
+        ])
+        assert np.array_equal(
+            PoseComparisonService.from_features(features).get_reference_gesture_track(),
+            from_dicts.get_reference_gesture_track()
+        )
+
+    def test_magnetic_session_skips_most_hand_inference(self, frames):
+        features = ReferenceFeatures.from_frames(frames)
+        scheduler = HandInferenceScheduler(features.gestures, features.timestamps)
+
+        # A dancer matched frame by frame along the whole reference
+        for index in range(len(features)):
+            if scheduler.should_run(index):
+                scheduler.store(([], []), float(features.timestamps[index]))
+            else:
+                scheduler.reuse(float(features.timestamps[index]))
+
+        stats = scheduler.get_stats()
+        assert 0.0 < stats['gesture_coverage'] < 0.5
+        assert stats['skip_ratio'] == pytest.approx(1.0 - stats['gesture_coverage'], abs=0.01)
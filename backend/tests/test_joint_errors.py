@@ -0,0 +1,88 @@
+"""
+Tests for per-joint error detection against reference angle tracks.
+
+Run with:
+    pytest tests/test_joint_errors.py -v
+"""
+
+import numpy as np
+import pytest
+from app.services.joint_errors import JointErrorDetector
+
+
+def make_pose():
+    """Standing pose with straight arms and legs."""
+    pose = np.zeros((33, 3))
+    pose[11, :2] = [0.4, 0.3]   # left shoulder
+    pose[12, :2] = [0.6, 0.3]   # right shoulder
+    pose[13, :2] = [0.4, 0.45]  # left elbow
+    pose[14, :2] = [0.6, 0.45]
+    pose[15, :2] = [0.4, 0.6]   # left wrist
+    pose[16, :2] = [0.6, 0.6]
+    pose[23, :2] = [0.42, 0.6]  # left hip
+    pose[24, :2] = [0.58, 0.6]
+    pose[25, :2] = [0.42, 0.75]
+    pose[26, :2] = [0.58, 0.75]
+    pose[27, :2] = [0.42, 0.9]
+    pose[28, :2] = [0.58, 0.9]
+    return pose
+
+
+@pytest.fixture
+def detector():
+    reference = np.stack([make_pose() for _ in range(5)])
+    return JointErrorDetector(reference, thresholds=(5.0, 15.0, 30.0))
+
+
+class TestJointErrorDetector:
+    """Test severity classification and error format."""
+
+    def test_matching_pose_has_no_errors(self, detector):
+        assert detector.detect(make_pose(), 2) == []
+
+    def test_bent_elbow_is_high_severity(self, detector):
+        user = make_pose()
+        user[15, :2] = [0.55, 0.45]  # left forearm bent 90 degrees
+
+        errors = detector.detect(user, 0)
+
+        assert errors[0]["body_part"] == "left_elbow"
+        assert errors[0]["severity"] == "high"
+        assert errors[0]["expected_angle"] == pytest.approx(180.0)
+        assert errors[0]["actual_angle"] == pytest.approx(90.0)
+        assert errors[0]["difference"] == pytest.approx(-90.0)
+
+    def test_errors_sorted_by_magnitude(self, detector):
+        user = make_pose()
+        user[15, :2] = [0.55, 0.45]                  # large elbow error
+        user[27, :2] = [0.42 + 0.15 * np.sin(np.radians(20)), 0.75 + 0.15 * np.cos(np.radians(20))]  # 20 degree knee bend
+
+        errors = detector.detect(user, 0)
+        by_part = {error["body_part"]: error for error in errors}
+
+        assert [error["body_part"] for error in errors][:2] == ["left_elbow", "left_knee"]
+        assert by_part["left_knee"]["severity"] == "medium"
+
+    def test_invalid_input_returns_no_errors(self, detector):
+        assert detector.detect(np.zeros(10), 0) == []
+        assert detector.detect(make_pose(), 99) == []
+
+    def test_batch_matches_single_detection(self, detector):
+        bent = make_pose()
+        bent[15, :2] = [0.55, 0.45]
+        users = np.stack([make_pose(), bent, bent])
+
+        batch = detector.detect_batch(users, np.array([0, 1, 99]))
+
+        assert batch[0] == []
+        assert batch[1] == detector.detect(bent, 1)
+        assert batch[2] == []
+
+    def test_reference_clip_tracks(self):
+        from pathlib import Path
+        path = Path(__file__).resolve().parents[1] / "app" / "data" / "processed_poses" / "test_poses.npy"
+        frames = [f for f in np.load(path, allow_pickle=True) if f.get("has_pose")]
+        detector = JointErrorDetector(np.stack([f["landmarks"][:, :3] for f in frames]))
+
+        assert len(detector) == len(frames)
+        assert detector.detect(frames[10]["landmarks"], 10) == []
@@ -0,0 +1,109 @@
+"""
+Tests for the per-limb similarity breakdown and its recording in ScoringService.
+
+Run with:
+    pytest tests/test_limb_similarity.py -v
+"""
+
+import numpy as np
+import pytest
+from app.services.limb_similarity import LIMB_NAMES, LimbSimilarity
+from app.services.pose_comparison_service import PoseComparisonService
+from app.services.scoring import ScoringService
+
+
+@pytest.fixture(scope="module")
+def limbs(reference_poses):
+    return LimbSimilarity(np.stack([pose['landmarks'] for pose in reference_poses]))
+
+
+class TestLimbSimilarity:
+    def test_identical_pose_scores_one(self, reference_poses, limbs):
+        scores = limbs.compare(reference_poses[12]['landmarks'], 12)
+        assert list(scores) == list(LIMB_NAMES)
+        for score in scores.values():
+            assert score == pytest.approx(1.0)
+
+    def test_only_moved_limb_drops(self, reference_poses, limbs):
+        landmarks = reference_poses[12]['landmarks'].copy()
+        shoulder = landmarks[11, :3]
+        # Swing the left arm to the opposite side of the shoulder
+        for idx in (13, 15, 17, 19, 21):
+            landmarks[idx, :2] = shoulder[:2] - (landmarks[idx, :2] - shoulder[:2])
+
+        scores = limbs.compare(landmarks, 12)
+        assert scores['left_arm'] < 0.5
+        for limb in ('torso', 'right_arm', 'left_leg', 'right_leg'):
+            assert scores[limb] == pytest.approx(1.0)
+
+    def test_camera_zoom_invariance(self, reference_poses, limbs):
+        landmarks = reference_poses[40]['landmarks'].copy()
+        zoomed = landmarks.copy()
+        zoomed[:, :3] *= 1.5
+
+        original = limbs.compare(landmarks, 20)
+        moved = limbs.compare(zoomed, 20)
+        for limb in LIMB_NAMES:
+            assert moved[limb] == pytest.approx(original[limb], abs=1e-9)
+
+    def test_invalid_input(self, limbs):
+        assert limbs.compare(np.zeros((10, 3)), 0) == {}
+        assert limbs.compare(np.zeros((33, 4)), len(limbs)) == {}
+
+    def test_batch_matches_single_comparison(self, reference_poses, limbs):
+        users = np.stack([reference_poses[i]['landmarks'] for i in (3, 40, 77)])
+        indices = np.array([10, 40, len(limbs)])
+
+        batch = limbs.compare_batch(users, indices)
+        assert batch.shape == (3, len(LIMB_NAMES))
+        for row, (user, index) in enumerate(zip(users[:2], indices[:2])):
+            assert np.allclose(batch[row], limbs.compare_array(user, int(index)))
+        assert np.all(batch[2] == 0.0)
+
+    def test_comparison_result_contains_limb_scores(self, reference_poses):
+        service = PoseComparisonService(reference_poses)
+        result = service.update_user_pose(reference_poses[5]['landmarks'], timestamp=0.0)
+
+        assert set(result['limb_scores']) == set(LIMB_NAMES)
+        assert all(0.0 <= score <= 1.0 for score in result['limb_scores'].values())
+
+
+class TestLimbScoreRecording:
+    def test_problem_segments_report_weakest_limb(self):
+        service = ScoringService()
+        segments = []
+        service.add_problem_listener(segments.append)
+
+        for i in range(6):
+            bad = 1 <= i <= 4
+            service.add_score(
+                timestamp=i * 0.5,
+                combined_score=0.4 if bad else 0.9,
+                limb_scores={'left_arm': 0.3 if bad else 0.9, 'torso': 0.95}
+            )
+
+        [area] = service.identify_problem_areas()
+        assert area['weakest_limb'] == 'left_arm'
+        assert area['limb_scores']['left_arm'] == pytest.approx(0.3)
+        assert area['limb_scores']['torso'] == pytest.approx(0.95)
+
+        [segment] = segments
+        assert segment['limb_scores'] == pytest.approx(area['limb_scores'])
+        assert segment['weakest_limb'] == 'left_arm'
+
+    def test_missing_limb_scores_are_skipped(self):
+        service = ScoringService()
+        service.add_score(0.0, 0.9)
+        service.add_score(0.5, 0.8, limb_scores={'left_leg': 0.6})
+        service.add_score(1.0, 0.7, limb_scores={'left_leg': 0.8, 'head': 1.0})
+
+        averages = service.get_session_statistics()['limb_averages']
+        assert averages['left_leg'] == pytest.approx(0.7)
+        assert averages['head'] == pytest.approx(1.0)
+
+        records = service.score_records
+        assert records[0].limb_scores == {}
+        assert records[1].limb_scores == pytest.approx({'left_leg': 0.6})
+
+        service.reset()
+        assert service.get_session_statistics()['limb_averages'] == {}
@@ -0,0 +1,100 @@
+"""
+Tests for motion-gated snapshot processing.
+
+Run with:
+    pytest tests/test_motion_gate.py -v
+"""
+
+import base64
+from io import BytesIO
+import numpy as np
+import pytest
+from PIL import Image
+from app.services.frame_input import decode_thumbnail
+from app.services.motion_gate import MotionGate
+
+
+def scene(arm_offset=0, size=(48, 64)):
+    """Gray background with a dancer (dark block) and an arm at arm_offset."""
+    image = np.full(size, 120, dtype=np.uint8)
+    image[10:40, 28:36] = 40
+    image[14:17, 36 + arm_offset:46 + arm_offset] = 40
+    return image
+
+
+def dancer(visibility=0.9):
+    landmarks = np.zeros((33, 4))
+    landmarks[:, 3] = visibility
+    return landmarks
+
+
+RESULT = {'timestamp': 0.0, 'pose_landmarks': [[0.5, 0.5, 0.0, 0.9]] * 33, 'comparison_result': {'combined_score': 0.8},
+          'hands_inferred': True, 'frame_reused': False, 'success': True}
+
+
+class TestChange:
+    def test_noise_is_not_change(self):
+        gate = MotionGate()
+        gate.store(scene(), RESULT, 0.0, dancer(), 0.05)
+        noisy = np.clip(scene().astype(int) + np.random.default_rng(0).integers(-8, 9, (48, 64)), 0, 255)
+        assert gate.change(noisy.astype(np.uint8)) == 0.0
+
+    def test_arm_motion_counts_inside_person_box(self):
+        gate = MotionGate()
+        gate.store(scene(), RESULT, 0.0, dancer(), 0.05)
+        moved = scene(arm_offset=6)
+        whole_frame = gate.change(moved)
+        in_box = gate.change(moved, box=(0.35, 0.15, 0.85, 0.9))
+        assert 0 < whole_frame < in_box
+        assert in_box >= gate.changed_pixel_ratio
+
+
+class TestReuse:
+    def test_unchanged_snapshot_reuses_result(self):
+        gate = MotionGate(max_reuse_seconds=1.0)
+        assert gate.reuse(scene(), None, 0.0) is None
+        gate.store(scene(), RESULT, 0.0, dancer(), 0.05)
+        assert not gate.absent
+
+        reused = gate.reuse(scene(), None, 0.5)
+        assert reused['frame_reused'] is True
+        assert reused['hands_inferred'] is False
+        assert reused['timestamp'] == 0.5
+        assert reused['comparison_result'] == RESULT['comparison_result']
+        assert RESULT['frame_reused'] is False
+
+        # Changed, or held for longer than max_reuse_seconds: process again
+        assert gate.reuse(scene(arm_offset=6), (0.35, 0.15, 0.85, 0.9), 0.6) is None
+        assert gate.reuse(scene(), None, 1.5) is None
+
+    def test_absent_dancer_skipped_longer(self):
+        gate = MotionGate(max_reuse_seconds=1.0, absent_refresh_seconds=3.0, min_visibility=0.3)
+        gate.store(scene(), {**RESULT, 'pose_landmarks': None}, 0.0, dancer(visibility=0.1), 0.05)
+        assert gate.absent
+        assert gate.reuse(scene(), None, 2.5) is not None
+        assert gate.reuse(scene(), None, 3.5) is None
+
+        gate.store(scene(), {**RESULT, 'pose_landmarks': None}, 4.0, None, 0.05)
+        assert gate.reuse(scene(), None, 5.0) is not None
+
+    def test_stats_count_saved_work(self):
+        gate = MotionGate()
+        gate.store(scene(), RESULT, 0.0, dancer(), 0.04)
+        for t in (0.1, 0.2, 0.3):
+            gate.reuse(scene(), None, t)
+        gate.store(scene(), RESULT, 1.0, None, 0.04)
+        gate.reuse(scene(), None, 1.1)
+
+        stats = gate.get_stats()
+        assert (stats['processed'], stats['reused'], stats['absent_skipped']) == (2, 3, 1)
+        assert stats['saved_ratio'] == pytest.approx(4 / 6, abs=0.001)
+        assert stats['saved_seconds'] == pytest.approx(0.16)
+
+
+class TestThumbnail:
+    def test_jpeg_thumbnail(self):
+        buffer = BytesIO()
+        Image.new("RGB", (1920, 1080), (200, 100, 50)).save(buffer, "JPEG")
+        thumbnail = decode_thumbnail(base64.b64encode(buffer.getvalue()).decode())
+        assert thumbnail.shape == (48, 64)
+        assert thumbnail.dtype == np.uint8
@@ -0,0 +1,95 @@
+"""
+Tests for the library-wide pose index (song and section identification).
+
+Run with:
+    pytest tests/test_pose_library_index.py -v
+"""
+
+import os
+import numpy as np
+import pytest
+from app.services.pose_library_index import PoseLibraryIndex, kmeans
+
+
+DATA_DIR = os.path.join(os.path.dirname(__file__), "..", "app", "data", "processed_poses")
+
+
+def load_frames(name):
+    data = np.load(os.path.join(DATA_DIR, f"{name}.npy"), allow_pickle=True)
+    frames = [frame for frame in data if frame.get('has_pose', False)]
+    return (
+        np.stack([frame['landmarks'] for frame in frames]),
+        np.array([frame['timestamp'] for frame in frames], dtype=np.float64)
+    )
+
+
+@pytest.fixture(scope="module")
+def magnetic():
+    return load_frames("magnetic_poses")
+
+
+@pytest.fixture(scope="module")
+def split_index(magnetic):
+    """Index with the two halves of the clip as two separate 'songs'."""
+    landmarks, timestamps = magnetic
+    half = len(landmarks) // 2
+    index = PoseLibraryIndex()
+    index.add_video("first_half", landmarks[:half], timestamps[:half])
+    index.add_video("second_half", landmarks[half:], timestamps[half:] - timestamps[half])
+    index.build()
+    return index
+
+
+def user_clip(landmarks, timestamps, start, rng, frames=40, step=2):
+    """Reference frames at a lower frame rate, with noise and a different camera framing."""
+    selection = np.arange(start, start + frames, step)
+    clip = landmarks[selection].astype(np.float64)
+    clip[:, :, :3] += rng.normal(0, 0.004, clip[:, :, :3].shape)
+    clip[:, :, :2] = clip[:, :, :2] * 0.8 + 0.1
+    return clip, timestamps[selection] + 100.0  # user clock differs from the reference
+
+
+class TestPoseLibraryIndex:
+    def test_kmeans_separates_clusters(self):
+        rng = np.random.default_rng(0)
+        points = np.concatenate([rng.normal(0, 0.1, (50, 2)), rng.normal(5, 0.1, (50, 2))])
+        centers = kmeans(points, 2)
+        assert sorted(np.round(centers[:, 0]).tolist()) == [0.0, 5.0]
+
+    def test_identifies_video_and_offset(self, magnetic, split_index):
+        landmarks, timestamps = magnetic
+        half = len(landmarks) // 2
+        rng = np.random.default_rng(1)
+
+        for start in (50, 300, half + 40, half + 400):
+            clip, clip_times = user_clip(landmarks, timestamps, start, rng)
+            best = split_index.identify(clip, clip_times)[0]
+
+            if start < half:
+                assert best['video_name'] == "first_half"
+                expected = timestamps[start]
+            else:
+                assert best['video_name'] == "second_half"
+                expected = timestamps[start] - timestamps[half]
+            assert best['offset'] == pytest.approx(expected, abs=0.5)
+            assert best['current_time'] == pytest.approx(best['offset'] + clip_times[-1] - clip_times[0], abs=0.01)
+            assert 0.0 < best['confidence'] <= 1.0
+
+    def test_partitions_cover_all_frames(self, magnetic, split_index):
+        assert len(split_index) == len(magnetic[0])
+        assert split_index.list_offsets[-1] == len(split_index)
+        assert split_index.components.shape[0] == 16
+
+    def test_candidates_are_distinct(self, magnetic, split_index):
+        clip, clip_times = user_clip(*magnetic, 200, np.random.default_rng(2))
+        candidates = split_index.identify(clip, clip_times, top_k=3)
+        assert 1 <= len(candidates) <= 3
+        keys = [(c['video_name'], round(c['offset'])) for c in candidates]
+        assert len(set(keys)) == len(keys)
+
+    def test_from_directory_uses_reference_names(self):
+        index = PoseLibraryIndex.from_directory(DATA_DIR)
+        assert "magnetic" in index.video_names
+
+    def test_empty_index(self, magnetic):
+        assert PoseLibraryIndex().identify(magnetic[0][:10]) == []
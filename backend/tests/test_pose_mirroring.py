@@ -0,0 +1,96 @@
+"""
+Tests for mirror-mode matching (mirrored reference + orientation detection).
+
+Run with:
+    pytest tests/test_pose_mirroring.py -v
+"""
+
+import numpy as np
+import pytest
+from app.services.angle_matching import AngleSpaceMatcher
+from app.services.pose_comparison_config import PoseComparisonConfig
+from app.services.pose_comparison_service import PoseComparisonService
+from app.services.pose_mirroring import MIRROR_PERMUTATION, OrientationDetector, mirror_landmarks
+
+
+class TestMirrorLandmarks:
+    def test_permutation_is_an_involution(self):
+        assert sorted(MIRROR_PERMUTATION.tolist()) == list(range(33))
+        np.testing.assert_array_equal(MIRROR_PERMUTATION[MIRROR_PERMUTATION], np.arange(33))
+
+    def test_swaps_sides_and_flips_x(self, reference_poses):
+        landmarks = reference_poses[0]['landmarks']
+        mirrored = mirror_landmarks(landmarks)
+
+        assert mirrored[11, 0] == pytest.approx(1.0 - landmarks[12, 0])
+        assert mirrored[11, 1] == pytest.approx(landmarks[12, 1])
+        np.testing.assert_allclose(mirror_landmarks(mirrored), landmarks)
+
+    def test_batched(self, reference_poses):
+        frames = np.stack([pose['landmarks'] for pose in reference_poses[:4]])
+        np.testing.assert_allclose(mirror_landmarks(frames)[2], mirror_landmarks(frames[2]))
+
+
+class TestOrientationDetector:
+    def test_switches_with_hysteresis(self):
+        detector = OrientationDetector(window=4, margin=0.05)
+        assert detector.update(0.9, 0.92) is False  # within margin
+        assert detector.update(0.8, 0.99) is True
+        assert detector.update(0.9, 0.88) is True   # mean advantage still positive
+        detector.reset()
+        assert detector.mirrored is False
+
+
+class TestMirrorMatching:
+    def test_unknown_mirror_mode_rejected(self):
+        with pytest.raises(ValueError):
+            PoseComparisonConfig(mirror_mode="sideways")
+
+    def test_orientation_scores_in_one_product(self, reference_poses):
+        frames = np.stack([pose['landmarks'][:, :3] for pose in reference_poses])
+        matcher = AngleSpaceMatcher(frames, mirror=True)
+
+        scores = matcher.orientation_pose_scores(matcher.user_angles(mirror_landmarks(frames[30])))
+        assert scores.shape == (2, len(frames))
+        assert scores[1, 30] == pytest.approx(1.0)
+        np.testing.assert_allclose(scores[0], matcher.pose_scores(matcher.user_angles(mirror_landmarks(frames[30]))))
+
+    def test_vectorized_coordinate_scores_match_loop(self, reference_poses):
+        service = PoseComparisonService(reference_poses)
+        user = reference_poses[15]['landmarks'] + np.random.default_rng(0).normal(0, 0.01, (33, 4))
+
+        expected = [service._calculate_pose_similarity(user, ref) for ref in service.reference_landmarks]
+        scores = service._calculate_pose_scores(user, service._reference_pose_matrix, service._reference_pose_norms)
+        np.testing.assert_allclose(scores, expected, atol=1e-12)
+
+    def test_auto_detects_mirrored_dancer(self, reference_poses):
+        service = PoseComparisonService(
+            reference_poses, PoseComparisonConfig(matching_mode="angles", mirror_mode="auto")
+        )
+
+        for idx in range(20, 30):
+            result = service.update_user_pose(mirror_landmarks(reference_poses[idx]['landmarks']), timestamp=idx / 15)
+
+        assert result['mirrored'] is True
+        assert abs(result['best_match_idx'] - 29) <= 1
+        assert result['pose_score'] > 0.95
+        # Limb breakdown is taken against the mirrored reference frame
+        assert min(result['limb_scores'].values()) > 0.9
+
+    def test_auto_stays_normal_for_normal_dancer(self, reference_poses):
+        service = PoseComparisonService(
+            reference_poses, PoseComparisonConfig(matching_mode="angles", mirror_mode="auto")
+        )
+
+        for idx in range(20, 30):
+            result = service.update_user_pose(reference_poses[idx]['landmarks'].copy(), timestamp=idx / 15)
+
+        assert result['mirrored'] is False
+        assert abs(result['best_match_idx'] - 29) <= 1
+
+    def test_mirror_on_uses_mirrored_reference(self, reference_poses):
+        service = PoseComparisonService(reference_poses, PoseComparisonConfig(mirror_mode="on"))
+        result = service.update_user_pose(reference_poses[3]['landmarks'].copy(), timestamp=0.0)
+
+        assert result['mirrored'] is True
+        assert service._mirror_reference['pose_matrix'].shape[0] == 2 * len(service.reference_landmarks)
@@ -0,0 +1,184 @@
+"""
+Tests for offline practice-video evaluation.
+
+The pose estimator is replaced by a fake that reads the frame index drawn
+into each synthetic video frame and returns the reference pose for it, so
+the decode/worker pipeline and the batch scoring are tested without
+running MediaPipe.
+
+Run with:
+    pytest tests/test_practice_evaluation.py -v
+"""
+
+from types import SimpleNamespace
+import cv2
+import numpy as np
+import pytest
+from app.services.pose_comparison_service import PoseComparisonService
+from app.services.pose_mirroring import mirror_landmarks
+from app.services.practice_evaluation import PracticeVideoEvaluator
+
+
+VIDEO_FPS = 30.0
+BITS = 12
+CELL = 16
+
+
+@pytest.fixture(scope="module")
+def service(reference):
+    landmarks, timestamps = reference
+    return PoseComparisonService([
+        {'landmarks': frame, 'timestamp': timestamp, 'frame_number': i}
+        for i, (frame, timestamp) in enumerate(zip(landmarks, timestamps))
+    ])
+
+
+def write_video(path, num_frames):
+    """Video whose frames show their index as black/white bit cells."""
+    writer = cv2.VideoWriter(path, cv2.VideoWriter_fourcc(*'MJPG'), VIDEO_FPS, (BITS * CELL, CELL))
+    for index in range(num_frames):
+        bits = (index >> np.arange(BITS)) & 1
+        row = np.repeat(bits * 255, CELL).astype(np.uint8)
+        writer.write(np.repeat(np.tile(row, (CELL, 1))[:, :, np.newaxis], 3, axis=2))
+    writer.release()
+
+
+class FakePose:
+    """Pose estimator returning the reference pose at (frame time - lag)."""
+
+    def __init__(self, landmarks, timestamps, lag):
+        self.landmarks, self.timestamps, self.lag = landmarks, timestamps, lag
+        self.indices = []
+        self.closed = False
+
+    def process(self, rgb):
+        bits = rgb[CELL // 2, CELL // 2::CELL, 0][:BITS] > 127
+        index = int(np.sum(bits.astype(np.int64) << np.arange(BITS)))
+        self.indices.append(index)
+        reference_time = index / VIDEO_FPS - self.lag
+        if reference_time < 0:
+            return SimpleNamespace(pose_landmarks=None)
+        pose = self.landmarks[np.argmin(np.abs(self.timestamps - reference_time))]
+        return SimpleNamespace(pose_landmarks=SimpleNamespace(landmark=[
+            SimpleNamespace(x=x, y=y, z=z, visibility=v) for x, y, z, v in pose.tolist()
+        ]))
+
+    def close(self):
+        self.closed = True
+
+
+@pytest.fixture
+def evaluator_factory(reference, service):
+    landmarks, timestamps = reference
+    created = []
+
+    def make(lag=0.0, **kwargs):
+        def factory():
+            pose = FakePose(landmarks, timestamps, lag)
+            created.append(pose)
+            return pose
+        return PracticeVideoEvaluator(service, pose_factory=factory, **kwargs)
+    make.created = created
+    return make
+
+
+class TestPoseExtraction:
+    def test_frames_in_order_with_stride(self, tmp_path, evaluator_factory):
+        path = str(tmp_path / "practice.avi")
+        write_video(path, 95)
+        evaluator = evaluator_factory(num_workers=3, target_fps=15.0, chunk_frames=8)
+
+        extracted = evaluator.extract_poses(path)
+        assert np.array_equal(extracted.frame_numbers, np.arange(0, 95, 2))
+        assert np.allclose(extracted.timestamps, extracted.frame_numbers / VIDEO_FPS)
+        assert extracted.has_pose.all()
+        assert extracted.landmarks.shape == (48, 33, 4)
+
+        # One fresh estimator per chunk, tracking consecutive frames only
+        created = evaluator_factory.created
+        assert len(created) == 6
+        assert all(pose.closed for pose in created)
+        assert sorted(pose.indices[0] for pose in created) == list(range(0, 95, 16))
+        assert all(np.all(np.diff(pose.indices) == 2) for pose in created)
+
+    def test_estimator_failure_raises(self, tmp_path, service):
+        path = str(tmp_path / "practice.avi")
+        write_video(path, 95)
+
+        def broken_factory():
+            raise OSError("model file missing")
+        evaluator = PracticeVideoEvaluator(service, num_workers=2, chunk_frames=8, pose_factory=broken_factory)
+
+        with pytest.raises(RuntimeError, match="model file missing"):
+            evaluator.extract_poses(path)
+
+    def test_missing_file(self, evaluator_factory):
+        with pytest.raises(FileNotFoundError):
+            evaluator_factory().extract_poses("/nonexistent/video.mp4")
+
+
+class TestEvaluation:
+    def test_report_matches_live_structures(self, tmp_path, evaluator_factory):
+        path = str(tmp_path / "practice.avi")
+        write_video(path, 900)  # 30 seconds
+        evaluator = evaluator_factory(lag=0.4, num_workers=4)
+
+        report = evaluator.evaluate(path, mirror_mode="off")
+        assert report["processing"]["frames_with_pose"] == report["total_poses"]
+        assert report["total_poses"] > 400
+        assert report["average_similarity"] > 0.8
+        assert report["statistics"]["total_frames"] == report["total_poses"]
+        assert set(report["timeline"][0]) == {"timestamp", "score", "min_score", "max_score", "label"}
+        assert isinstance(report["problem_areas"], list)
+        assert report["timing_report"]["mean_offset"] == pytest.approx(-0.4, abs=0.1)
+        assert report["mirrored"] is False
+
+    @pytest.mark.parametrize("matching_mode", ["coordinates", "angles"])
+    def test_scores_follow_matching_mode(self, tmp_path, evaluator_factory, service, matching_mode, monkeypatch):
+        monkeypatch.setattr(service.config, "matching_mode", matching_mode)
+        path = str(tmp_path / "practice.avi")
+        write_video(path, 300)
+        evaluator = evaluator_factory(num_workers=2)
+
+        report = evaluator.evaluate(path, mirror_mode="off")
+        assert report["average_similarity"] > 0.8
+        assert (evaluator._matcher is not None) == (matching_mode == "angles")
+
+    def test_coordinate_scores_use_pose_matrix_rows(self, reference, evaluator_factory, service):
+        landmarks, _ = reference
+        user = landmarks[40:60]
+        indices = np.arange(45, 65)
+
+        pose_scores, motion_scores = evaluator_factory()._coordinate_scores(user, indices, mirrored=False)
+        user_matrix, user_norms = service._build_pose_matrix([
+            service._filter_essential_landmarks(frame[:, :3].flatten()) for frame in user
+        ])
+        pose_matrix, pose_norms = service.get_reference_pose_matrix()
+        expected = np.sum(user_matrix * pose_matrix[indices], axis=1) / (user_norms * pose_norms[indices])
+        assert pose_scores == pytest.approx(np.clip(expected, 0.0, 1.0))
+        assert motion_scores[0] == 0.0
+
+        same_pose_scores, _ = evaluator_factory()._coordinate_scores(landmarks[indices], indices, mirrored=False)
+        assert same_pose_scores == pytest.approx(1.0)
+
+    def test_auto_mirror_picks_orientation(self, tmp_path, evaluator_factory):
+        path = str(tmp_path / "practice.avi")
+        write_video(path, 300)
+        evaluator = evaluator_factory(num_workers=2)
+
+        extracted = evaluator.extract_poses(path)
+        extracted.landmarks = mirror_landmarks(extracted.landmarks)
+
+        report = evaluator.score(extracted, mirror_mode="auto")
+        assert report["mirrored"] is True
+        assert report["average_similarity"] > 0.8
+
+    def test_no_poses(self, tmp_path, evaluator_factory):
+        path = str(tmp_path / "practice.avi")
+        write_video(path, 20)
+        evaluator = evaluator_factory(lag=10.0, num_workers=2)
+
+        report = evaluator.evaluate(path)
+        assert report["total_poses"] == 0
+        assert report["timeline"] == []
+        assert report["timing_report"] is None
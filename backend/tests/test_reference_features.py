@@ -0,0 +1,120 @@
+"""
+Tests for the precomputed reference feature bundle.
+
+A PoseComparisonService built from the (memory-mapped) bundle must behave
+exactly like one that computes its reference features from pose dicts.
+
+Run with:
+    pytest tests/test_reference_features.py -v
+"""
+
+import os
+import numpy as np
+import pytest
+from app.services.pose_comparison_config import PoseComparisonConfig
+from app.services.pose_comparison_service import PoseComparisonService
+from app.services.process_video_pose import VideoPoseProcessor
+from app.services.reference_features import ReferenceFeatures
+from app.services.reference_library import ReferenceLibrary
+
+
+DATA_FILE = os.path.join(
+    os.path.dirname(__file__), "..", "app", "data", "processed_poses", "magnetic_poses.npy"
+)
+
+
+@pytest.fixture(scope="module")
+def frames():
+    return [frame for frame in np.load(DATA_FILE, allow_pickle=True)[:400] if frame.get('has_pose', False)]
+
+
+@pytest.fixture(scope="module")
+def loaded_features(frames, tmp_path_factory):
+    processor = VideoPoseProcessor(str(tmp_path_factory.mktemp("library")))
+    processor.save_poses(os.path.join(processor.processed_poses_dir, "clip_poses.npy"), frames)
+    ReferenceLibrary(processor).rebuild()
+    return ReferenceFeatures.load(processor.processed_poses_dir, "clip")
+
+
+def dict_service(frames, config=None):
+    return PoseComparisonService([
+        {'landmarks': frame['landmarks'], 'timestamp': frame['timestamp'], 'frame_number': frame['frame_number']}
+        for frame in frames
+    ], config)
+
+
+class TestFeatureBundle:
+    def test_loaded_arrays_are_memory_mapped(self, loaded_features, frames):
+        assert loaded_features is not None
+        assert len(loaded_features) == len(frames)
+        assert isinstance(loaded_features.landmarks, np.memmap)
+        assert not loaded_features.normalized.flags.writeable
+
+    def test_arrays_aligned_to_timestamps(self, loaded_features, frames):
+        features = loaded_features
+        assert np.array_equal(features.timestamps, [frame['timestamp'] for frame in frames])
+        assert np.array_equal(features.frame_numbers, [frame['frame_number'] for frame in frames])
+        for name in ("visible", "filtered", "normalized", "velocities", "accelerations",
+                     "angles", "limb_rows", "limb_energy", "embedding", "gestures"):
+            assert len(getattr(features, name)) == len(frames), name
+
+        assert np.allclose(features.velocities[0], 0.0)
+        assert np.allclose(features.velocities[5], features.filtered[5] - features.filtered[4])
+        assert np.allclose(features.accelerations[5], features.velocities[5] - features.velocities[4])
+
+    def test_gesture_labels(self, loaded_features, frames):
+        for frame, labels in zip(frames, loaded_features.gestures):
+            expected = {
+                gesture['handedness']['label']: gesture['gesture']
+                for gesture in frame['gestures'] if gesture.get('handedness')
+            }
+            assert labels.tolist() == [expected.get("Left", ""), expected.get("Right", "")]
+        assert (loaded_features.gestures != "").any()
+
+    def test_pose_dicts_keep_gestures_shape(self, loaded_features, frames):
+        for frame, pose_dict in zip(frames, loaded_features.pose_dicts()):
+            assert len(pose_dict['gestures']) == len(frame['gestures'])
+            for expected, gesture in zip(frame['gestures'], pose_dict['gestures']):
+                assert gesture['hand_landmarks'].shape == (21, 4)
+                assert np.allclose(gesture['hand_landmarks'], expected['hand_landmarks'])
+                assert gesture['handedness'] == pytest.approx(expected['handedness'])
+                assert gesture['gesture'] == expected['gesture']
+        assert not any('hand_gestures' in pose_dict for pose_dict in loaded_features.pose_dicts())
+
+
+class TestServiceParity:
+    def test_precomputed_reference_matches(self, loaded_features, frames):
+        config = PoseComparisonConfig(matching_mode="angles", mirror_mode="auto")
+        computed = dict_service(frames, config)
+        bundled = PoseComparisonService.from_features(loaded_features, config)
+
+        assert np.allclose(bundled._reference_pose_matrix, computed._reference_pose_matrix)
+        assert np.allclose(bundled._reference_pose_norms, computed._reference_pose_norms)
+        assert np.allclose(bundled.reference_landmarks, np.stack(computed.reference_landmarks))
+        assert np.allclose(bundled.reference_motions, np.stack(computed.reference_motions))
+        assert np.allclose(
+            bundled.joint_error_detector.reference_angles.values, computed.joint_error_detector.reference_angles.values
+        )
+        assert np.allclose(bundled.limb_similarity.reference_matrix, computed.limb_similarity.reference_matrix)
+        assert np.allclose(bundled.synchronizer.reference_energy, computed.synchronizer.reference_energy)
+        assert np.allclose(
+            bundled._get_angle_matcher().orientation_angles, computed._get_angle_matcher().orientation_angles
+        )
+        assert np.allclose(
+            bundled.get_session_aligner().reference_features, computed.get_session_aligner().reference_features
+        )
+
+    @pytest.mark.parametrize("matching_mode", ["coordinates", "angles"])
+    def test_live_scores_identical(self, loaded_features, frames, matching_mode):
+        config = PoseComparisonConfig(matching_mode=matching_mode, mirror_mode="auto", dtw_enabled=False)
+        computed = dict_service(frames, config)
+        bundled = PoseComparisonService.from_features(loaded_features, config)
+
+        rng = np.random.default_rng(0)
+        for step, index in enumerate(range(20, 120, 3)):
+            user = frames[index]['landmarks'] + rng.normal(0.0, 0.01, (33, 4))
+            expected = computed.update_user_pose(user, timestamp=step / 7.5)
+            actual = bundled.update_user_pose(user, timestamp=step / 7.5)
+            assert actual['best_match_idx'] == expected['best_match_idx']
+            assert actual['combined_score'] == pytest.approx(expected['combined_score'])
+            assert actual['mirrored'] == expected['mirrored']
@@ -0,0 +1,125 @@
+"""
+Tests for checkpointed reference ingestion jobs.
+
+Run with:
+    pytest tests/test_reference_ingestion.py -v
+"""
+
+import json
+import os
+import cv2
+import numpy as np
+import pytest
+from app.services.process_video_pose import VideoPoseProcessor
+from app.services.reference_ingestion import ReferenceIngestionQueue
+from app.services.reference_library import ReferenceLibrary
+
+
+class SimulatedCrash(BaseException):
+    """Stands in for the server being killed mid-job (not caught as a job failure)."""
+
+
+class CountingProcessor(VideoPoseProcessor):
+    """Processor recording the chunks it processes, optionally crashing on one."""
+
+    def __init__(self, data_dir, crash_on_call=None):
+        super().__init__(data_dir)
+        self.calls = []
+        self.crash_on_call = crash_on_call
+
+    def process_frame_range(self, video_path, start_frame=0, end_frame=None, warmup_frames=0, stride=4, **kwargs):
+        self.calls.append(start_frame)
+        if len(self.calls) == self.crash_on_call:
+            raise SimulatedCrash()
+        return super().process_frame_range(video_path, start_frame, end_frame, warmup_frames, stride, **kwargs)
+
+
+@pytest.fixture
+def data_dir(tmp_path):
+    processor = VideoPoseProcessor(str(tmp_path))
+    writer = cv2.VideoWriter(
+        os.path.join(processor.reference_videos_dir, "song.avi"), cv2.VideoWriter_fourcc(*'MJPG'), 30.0, (96, 72)
+    )
+    for index in range(130):
+        writer.write(np.full((72, 96, 3), index % 256, dtype=np.uint8))
+    writer.release()
+    return str(tmp_path)
+
+
+def saved_frame_numbers(data_dir, name="song_poses.npy"):
+    return [frame["frame_number"] for frame in np.load(os.path.join(data_dir, "processed_poses", name), allow_pickle=True)]
+
+
+class TestIngestionJobs:
+    def test_job_completes_with_serial_output(self, data_dir):
+        jobs = ReferenceIngestionQueue(VideoPoseProcessor(data_dir), chunk_seconds=1.0, warmup_seconds=0.2)
+        jobs.start()
+
+        job = jobs.submit("song.avi")
+        assert job["status"] == "queued"
+        assert jobs.wait(timeout=120)
+
+        finished = jobs.get_job(job["job_id"])
+        assert finished["status"] == "completed"
+        assert finished["progress"] == 1.0
+        assert finished["completed_chunks"] == finished["num_chunks"] == 5
+        assert finished["frames_per_second"] > 0
+        assert saved_frame_numbers(data_dir) == list(range(2, 131, 2))
+
+        # Partial chunk files are removed once the output is assembled
+        job_dir = os.path.join(jobs.jobs_dir, job["job_id"])
+        assert os.listdir(job_dir) == ["job.json"]
+
+    def test_resume_after_crash_skips_finished_chunks(self, data_dir):
+        crashing = ReferenceIngestionQueue(
+            CountingProcessor(data_dir, crash_on_call=3), chunk_seconds=1.0, warmup_seconds=0.2
+        )
+        job = crashing.submit("song.avi")
+        with pytest.raises(SimulatedCrash):
+            crashing.run_job(crashing._jobs[job["job_id"]])
+
+        with open(os.path.join(crashing.jobs_dir, job["job_id"], "job.json")) as f:
+            state = json.load(f)
+        assert state["status"] == "running"
+        assert state["completed_chunks"] == [0, 1]
+
+        # "Restart": a new queue over the same directories picks the job up
+        processor = CountingProcessor(data_dir)
+        resumed = ReferenceIngestionQueue(processor, chunk_seconds=1.0, warmup_seconds=0.2)
+        resumed.start()
+        assert resumed.wait(timeout=120)
+
+        assert resumed.get_job(job["job_id"])["status"] == "completed"
+        assert processor.calls == [60, 90, 120]
+        assert saved_frame_numbers(data_dir) == list(range(2, 131, 2))
+
+    def test_missing_video_and_failed_job(self, data_dir):
+        jobs = ReferenceIngestionQueue(VideoPoseProcessor(data_dir))
+        with pytest.raises(FileNotFoundError):
+            jobs.submit("missing.mp4")
+
+        with open(os.path.join(data_dir, "reference_videos", "broken.mp4"), "wb") as f:
+            f.write(b"not a video")
+        jobs.start()
+        job = jobs.submit("broken.mp4")
+        assert jobs.wait(timeout=30)
+
+        failed = jobs.get_job(job["job_id"])
+        assert failed["status"] == "failed"
+        assert "Could not open video file" in failed["error"]
+        assert jobs.get_job("unknown") is None
+
+    def test_completed_job_recorded_in_library(self, data_dir):
+        processor = VideoPoseProcessor(data_dir)
+        library = ReferenceLibrary(processor)
+        jobs = ReferenceIngestionQueue(processor, chunk_seconds=2.0, warmup_seconds=0.2, library=library)
+        jobs.start()
+        job = jobs.submit("song.avi")
+        assert jobs.wait(timeout=120)
+        assert jobs.get_job(job["job_id"])["status"] == "completed"
+
+        poses = library.load_manifest()["references"]["song"]["artifacts"]["poses"]
+        assert poses["file"] == "song_poses.npy"
+        assert poses["source_sha256"] == library.load_manifest()["references"]["song"]["video"]["sha256"]
+        # The synthetic video has no person: no derived stages, but the poses are current
+        assert "poses" not in library.status()[0]["stale"]
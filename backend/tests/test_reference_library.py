@@ -0,0 +1,175 @@
+"""
+Tests for the reference library manifest and incremental rebuilds.
+
+The MediaPipe stage is replaced by a processor that writes a slice of the
+bundled reference poses, so staleness and rebuild decisions are tested
+without running pose detection.
+
+Run with:
+    pytest tests/test_reference_library.py -v
+"""
+
+import json
+import os
+import numpy as np
+import pytest
+from app.services import pose_library_index, reference_library
+from app.services.pose_library_index import PoseLibraryIndex
+from app.services.process_video_pose import VideoPoseProcessor
+from app.services.reference_library import ReferenceLibrary, load_stage_arrays
+
+
+DATA_FILE = os.path.join(
+    os.path.dirname(__file__), "..", "app", "data", "processed_poses", "magnetic_poses.npy"
+)
+
+
+class FakeExtractionProcessor(VideoPoseProcessor):
+    """Processor whose MediaPipe stage copies reference frames (and counts calls)."""
+
+    def __init__(self, data_dir):
+        super().__init__(data_dir)
+        self.extracted = []
+        self.frames = np.load(DATA_FILE, allow_pickle=True)[:120].tolist()
+
+    def process_video(self, video_filename, output_filename=None, num_workers=1,
+                      warmup_seconds=1.0, target_fps=15.0):
+        self.extracted.append(video_filename)
+        self.save_poses(os.path.join(self.processed_poses_dir, output_filename), self.frames)
+        return {"poses": self.frames}
+
+
+def write_video(processor, filename, content=b"video-v1"):
+    with open(os.path.join(processor.reference_videos_dir, filename), "wb") as f:
+        f.write(content)
+
+
+@pytest.fixture
+def library(tmp_path):
+    processor = FakeExtractionProcessor(str(tmp_path))
+    write_video(processor, "song.mp4")
+    return ReferenceLibrary(processor)
+
+
+class TestIncrementalRebuild:
+    def test_new_video_built_once(self, library):
+        assert library.plan() == {"song": ["poses", "features"]}
+
+        result = library.rebuild()
+        assert result["rebuilt"] == {"song": ["poses", "features"]}
+        assert result["failed"] == {}
+        assert library.processor.extracted == ["song.mp4"]
+
+        record = library.load_manifest()["references"]["song"]
+        assert record["video_filename"] == "song.mp4"
+        assert record["artifacts"]["poses"]["source_sha256"] == record["video"]["sha256"]
+        assert record["artifacts"]["features"]["source_sha256"] == record["artifacts"]["poses"]["sha256"]
+
+        # Nothing is stale on the second run
+        assert library.plan() == {}
+        assert library.rebuild()["rebuilt"] == {}
+        assert library.processor.extracted == ["song.mp4"]
+
+    def test_derived_stage_upgrade_skips_mediapipe(self, library, monkeypatch):
+        library.rebuild()
+        poses_path = os.path.join(library.processor.processed_poses_dir, "song_poses.npy")
+        poses_mtime = os.stat(poses_path).st_mtime_ns
+
+        version, builder = reference_library.DERIVED_STAGES["features"]
+        monkeypatch.setitem(reference_library.DERIVED_STAGES, "features", (version + 1, builder))
+
+        status = library.status()[0]
+        assert status["stale"] == {"features": f"version {version} -> {version + 1}"}
+
+        result = library.rebuild()
+        assert result["rebuilt"] == {"song": ["features"]}
+        assert library.processor.extracted == ["song.mp4"]
+        assert os.stat(poses_path).st_mtime_ns == poses_mtime
+        assert library.load_manifest()["references"]["song"]["artifacts"]["features"]["version"] == version + 1
+
+    def test_changed_video_and_pipeline_version_rerun_extraction(self, library, monkeypatch):
+        library.rebuild()
+
+        write_video(library.processor, "song.mp4", b"video-v2, re-encoded")
+        assert library.status()[0]["stale"]["poses"] == "video content changed"
+        library.rebuild()
+        assert library.processor.extracted == ["song.mp4"] * 2
+
+        monkeypatch.setattr(reference_library, "POSE_PIPELINE_VERSION", 99)
+        assert library.plan() == {"song": ["poses", "features"]}
+        library.rebuild()
+        assert library.processor.extracted == ["song.mp4"] * 3
+        assert library.plan() == {}
+
+    def test_force_and_name_filter(self, library):
+        write_video(library.processor, "other.mp4", b"other video")
+        library.rebuild(names=["song"])
+        assert library.processor.extracted == ["song.mp4"]
+        assert list(library.plan()) == ["other"]
+
+        library.rebuild(names=["song"], force=True)
+        assert library.processor.extracted == ["song.mp4", "song.mp4"]
+
+    def test_dry_run_changes_nothing(self, library):
+        result = library.rebuild(dry_run=True)
+        assert result["plan"] == {"song": ["poses", "features"]}
+        assert library.processor.extracted == []
+        assert not os.path.exists(os.path.join(library.processor.processed_poses_dir, "song_poses.npy"))
+
+
+class TestExistingPoseFiles:
+    def test_poses_without_video_get_derived_stages_only(self, tmp_path):
+        processor = FakeExtractionProcessor(str(tmp_path))
+        processor.save_poses(os.path.join(processor.processed_poses_dir, "legacy_poses.npy"), processor.frames)
+        library = ReferenceLibrary(processor)
+
+        assert library.plan() == {"legacy": ["features"]}
+        library.rebuild()
+        assert processor.extracted == []
+        assert library.load_manifest()["references"]["legacy"]["artifacts"]["poses"]["version"] is None
+
+    def test_pruned_when_source_and_poses_removed(self, library):
+        library.rebuild()
+        os.remove(os.path.join(library.processor.reference_videos_dir, "song.mp4"))
+        os.remove(os.path.join(library.processor.processed_poses_dir, "song_poses.npy"))
+
+        assert library.prune() == ["song"]
+        assert library.load_manifest()["references"] == {}
+        assert not os.path.exists(os.path.join(library.features_dir, "song"))
+
+
+class TestLibraryIndexCache:
+    def test_index_uses_cached_embeddings(self, library, monkeypatch):
+        library.rebuild()
+        directory = library.processor.processed_poses_dir
+        frames = [frame for frame in library.processor.frames if frame['has_pose']]
+        expected = PoseLibraryIndex()
+        expected.add_video(
+            "song", np.stack([frame['landmarks'] for frame in frames]), [frame['timestamp'] for frame in frames]
+        )
+        expected.build()
+
+        def fail(landmarks):
+            raise AssertionError("embedding recomputed")
+        monkeypatch.setattr(pose_library_index, "pose_embedding", fail)
+
+        cached = PoseLibraryIndex.from_directory(directory)
+        assert cached.video_names == ["song"]
+        assert len(cached) == len(expected)
+        assert np.allclose(cached.vectors, expected.vectors)
+
+    def test_modified_poses_file_invalidates_cache(self, library):
+        library.rebuild()
+        directory = library.processor.processed_poses_dir
+        assert load_stage_arrays(directory, "song", "features") is not None
+
+        library.processor.save_poses(os.path.join(directory, "song_poses.npy"), library.processor.frames[:50])
+        assert load_stage_arrays(directory, "song", "features") is None
+        assert library.status()[0]["stale"] == {"features": "poses file changed"}
+
+    def test_manifest_is_valid_json(self, library):
+        library.rebuild()
+        with open(library.manifest_path) as f:
+            manifest = json.load(f)
+        assert manifest["format"] == reference_library.MANIFEST_FORMAT
+        assert set(manifest["references"]["song"]["artifacts"]) == {"poses", "features"}
@@ -0,0 +1,199 @@
+"""
+Tests for the columnar ScoringService.
+
+Run with:
+    pytest tests/test_scoring.py -v
+"""
+
+import numpy as np
+import pytest
+from app.services.scoring import ScoringService, lttb_indices
+
+
+BODY_PARTS = ["left_elbow", "right_elbow", "left_knee", "right_knee"]
+
+
+def reference_problem_areas(records, threshold=0.65, min_duration=1.0):
+    """Straightforward per-record segmentation used as the expected result."""
+    segments, current = [], None
+    for timestamp, score, errors in records:
+        if score < threshold:
+            if current is None:
+                current = {"start": timestamp, "end": timestamp, "scores": [], "parts": set(), "errors": 0}
+            current["end"] = timestamp
+            current["scores"].append(score)
+            current["errors"] += len(errors)
+            current["parts"].update(e["body_part"] for e in errors if e.get("body_part"))
+        elif current is not None:
+            segments.append(current)
+            current = None
+    if current is not None:
+        segments.append(current)
+    return [s for s in segments if s["end"] - s["start"] >= min_duration]
+
+
+@pytest.fixture
+def session():
+    rng = np.random.default_rng(7)
+    service = ScoringService()
+    records = []
+    for i in range(600):
+        timestamp = float(np.float32(i * 0.1))
+        score = float(np.float32(0.5 + 0.4 * np.sin(i / 15.0) + rng.normal(0, 0.05)))
+        errors = [{"body_part": part} for part in rng.choice(BODY_PARTS, size=rng.integers(0, 3), replace=False)]
+        if i % 50 == 0:
+            errors.append({"message": "no body part"})
+        service.add_score(timestamp, score, errors=errors)
+        records.append((timestamp, score, errors))
+    return service, records
+
+
+class TestScoringService:
+    """Test vectorized analytics against per-record reference results."""
+
+    def test_problem_areas_match_reference(self, session):
+        service, records = session
+        expected = reference_problem_areas(records)
+        actual = service.identify_problem_areas()
+
+        assert len(actual) == len(expected) > 0
+        for segment, reference in zip(actual, expected):
+            assert segment["start_time"] == pytest.approx(reference["start"])
+            assert segment["end_time"] == pytest.approx(reference["end"])
+            assert segment["average_score"] == pytest.approx(np.mean(reference["scores"]), abs=1e-6)
+            assert segment["error_count"] == reference["errors"]
+            assert set(segment["body_parts"]) == reference["parts"]
+
+    def test_statistics(self, session):
+        service, records = session
+        scores = np.array([score for _, score, _ in records])
+        stats = service.get_session_statistics()
+
+        assert stats["total_frames"] == 600
+        assert stats["average_score"] == pytest.approx(scores.mean(), abs=1e-6)
+        assert stats["best_moment"]["score"] == pytest.approx(scores.max())
+        assert stats["worst_moment"]["timestamp"] == pytest.approx(records[int(scores.argmin())][0])
+        assert sum(stats["score_distribution"].values()) == 600
+        assert stats["score_distribution"]["excellent"] == int((scores >= 0.85).sum())
+
+    def test_band_boundaries(self):
+        service = ScoringService()
+        for i, score in enumerate([0.55, 0.7, 0.85, 0.5499]):
+            service.add_score(float(i), score)
+
+        labels = [point["label"] for point in service.get_timeline()]
+        assert labels == ["Okay", "Good", "Great!", "Needs Work"]
+        assert service.get_session_statistics()["score_distribution"] == {
+            "excellent": 1, "good": 1, "okay": 1, "needs_work": 1
+        }
+
+    def test_score_records_and_reset(self, session):
+        service, records = session
+        score_records = service.score_records
+
+        assert len(score_records) == 600
+        assert score_records[0].errors == records[0][2]
+
+        service.reset()
+        assert service.get_timeline() == []
+        assert service.get_session_statistics()["total_frames"] == 0
+
+
+class TestTimeline:
+    """Test bucketed timeline resolutions and LTTB downsampling."""
+
+    def test_raw_returns_every_record(self, session):
+        service, records = session
+        timeline = service.get_timeline(resolution="raw")
+
+        assert len(timeline) == len(records)
+        assert timeline[5]["min_score"] == timeline[5]["score"] == timeline[5]["max_score"]
+
+    def test_bucket_aggregation(self):
+        service = ScoringService()
+        for timestamp, score in [(0.0, 0.2), (0.4, 0.6), (0.6, 0.9), (1.7, 0.5)]:
+            service.add_score(timestamp, score)
+
+        timeline = service.get_timeline(resolution="0.5s")
+
+        assert [point["timestamp"] for point in timeline] == pytest.approx([0.0, 0.5, 1.5])
+        assert timeline[0]["score"] == pytest.approx(0.4)
+        assert timeline[0]["min_score"] == pytest.approx(0.2)
+        assert timeline[0]["max_score"] == pytest.approx(0.6)
+        assert timeline[1]["label"] == "Great!"
+
+    def test_one_second_buckets(self, session):
+        service, _ = session
+        assert len(service.get_timeline(resolution="1s")) == 60
+        assert len(service.get_timeline(resolution="0.5s")) == 120
+
+    def test_invalid_resolution(self, session):
+        service, _ = session
+        with pytest.raises(ValueError):
+            service.get_timeline(resolution="fast")
+
+    def test_max_points_bounds_payload(self, session):
+        service, _ = session
+        timeline = service.get_timeline(resolution="raw", max_points=50)
+
+        assert len(timeline) == 50
+        timestamps = [point["timestamp"] for point in timeline]
+        assert timestamps == sorted(timestamps)
+
+    def test_lttb_keeps_spike(self):
+        x = np.arange(1000, dtype=np.float64)
+        y = np.zeros(1000)
+        y[537] = 1.0
+
+        selected = lttb_indices(x, y, 20)
+
+        assert len(selected) == 20
+        assert selected[0] == 0 and selected[-1] == 999
+        assert 537 in selected
+
+
+class TestStreamingProblemAreas:
+    """Test that problem segments are emitted online as they close."""
+
+    def test_streamed_segments_match_batch(self):
+        rng = np.random.default_rng(11)
+        service = ScoringService()
+        streamed = []
+        service.add_problem_listener(streamed.append)
+
+        for i in range(600):
+            score = 0.5 + 0.4 * np.sin(i / 15.0) + rng.normal(0, 0.05)
+            errors = [{"body_part": part} for part in rng.choice(BODY_PARTS, size=rng.integers(0, 3), replace=False)]
+            service.add_score(i * 0.1, score, errors=errors)
+        service.close_problem_segment()
+
+        batch = service.identify_problem_areas()
+        assert len(streamed) == len(batch) > 0
+        for online, offline in zip(streamed, batch):
+            assert online["start_time"] == offline["start_time"]
+            assert online["end_time"] == offline["end_time"]
+            assert online["error_count"] == offline["error_count"] == len(online["errors"])
+            assert online["body_parts"] == offline["body_parts"]
+            assert online["average_score"] == pytest.approx(offline["average_score"], abs=1e-6)
+
+    def test_segment_emitted_when_run_closes(self):
+        service = ScoringService(problem_threshold=0.65, min_problem_duration=1.0)
+
+        assert service.add_score(0.0, 0.4, errors=[{"body_part": "left_knee"}]) is None
+        assert service.add_score(0.5, 0.5) is None
+        assert service.add_score(1.0, 0.5) is None
+        segment = service.add_score(1.5, 0.9, errors=[{"body_part": "right_knee"}])
+
+        assert segment["start_time"] == 0.0
+        assert segment["end_time"] == 1.0
+        assert segment["body_parts"] == ["left_knee"]
+        assert segment["error_count"] == 1
+
+    def test_short_run_not_emitted(self):
+        service = ScoringService()
+        service.add_score(0.0, 0.4)
+        service.add_score(0.5, 0.4)
+
+        assert service.add_score(1.0, 0.9) is None
+        assert service.close_problem_segment() is None
+        assert service.emitted_problem_segments == 0
@@ -0,0 +1,140 @@
+"""
+Tests for full-session banded DTW alignment.
+
+Run with:
+    pytest tests/test_session_alignment.py -v
+"""
+
+import numpy as np
+import pytest
+from app.services.pose_comparison_service import PoseComparisonService
+from app.services.pose_mirroring import mirror_landmarks
+from app.services.session_alignment import SessionAligner, banded_dtw
+
+
+@pytest.fixture(scope="module")
+def aligner(reference):
+    return SessionAligner(*reference)
+
+
+def record_session(landmarks, timestamps, user_times, reference_times, seed=0):
+    """User poses copied from the reference at the given reference times (with noise)."""
+    rng = np.random.default_rng(seed)
+    indices = np.array([np.argmin(np.abs(timestamps - t)) for t in reference_times])
+    return landmarks[indices] + np.concatenate(
+        [rng.normal(0, 0.003, size=(len(indices), 33, 3)), np.zeros((len(indices), 33, 1))], axis=2
+    )
+
+
+def full_dtw_cost(user, reference):
+    """Open-begin/open-end DTW cost without a band (O(N * M) loops)."""
+    cost = np.linalg.norm(user[:, np.newaxis] - reference[np.newaxis], axis=2)
+    accumulated = np.full(cost.shape, np.inf)
+    accumulated[0] = cost[0]
+    for i in range(1, len(user)):
+        for j in range(len(reference)):
+            best = accumulated[i - 1, j]
+            if j > 0:
+                best = min(best, accumulated[i - 1, j - 1], accumulated[i, j - 1])
+            accumulated[i, j] = cost[i, j] + best
+    return accumulated[-1].min()
+
+
+class TestBandedDTW:
+    def test_full_band_matches_brute_force(self):
+        rng = np.random.default_rng(0)
+        user = rng.normal(size=(12, 3))
+        reference = rng.normal(size=(15, 3))
+
+        user_path, reference_path, cost = banded_dtw(
+            user, reference, np.zeros(12, dtype=np.int64), np.full(12, 15, dtype=np.int64)
+        )
+        assert cost == pytest.approx(full_dtw_cost(user, reference))
+
+        # Path is connected and its cells add up to the cost
+        steps = np.stack([np.diff(user_path), np.diff(reference_path)], axis=1)
+        assert set(map(tuple, steps.tolist())) <= {(1, 1), (1, 0), (0, 1)}
+        assert user_path[0] == 0 and user_path[-1] == 11
+        path_cost = np.linalg.norm(user[user_path] - reference[reference_path], axis=1).sum()
+        assert path_cost == pytest.approx(cost)
+
+    def test_band_restricts_path(self):
+        rng = np.random.default_rng(1)
+        reference = rng.normal(size=(40, 4))
+        user = reference[5:35]
+        low = np.clip(np.arange(30) + 5 - 2, 0, 39)
+        high = np.clip(np.arange(30) + 5 + 3, 1, 40)
+
+        user_path, reference_path, cost = banded_dtw(user, reference, low, high)
+        assert cost == pytest.approx(0.0, abs=1e-6)
+        assert np.array_equal(reference_path - user_path, np.full(len(user_path), 5))
+
+
+class TestSessionAligner:
+    @pytest.mark.parametrize("lag, expected_timing", [(0.4, "dragging"), (-0.5, "rushing"), (0.0, "on_time")])
+    def test_constant_offset(self, reference, aligner, lag, expected_timing):
+        landmarks, timestamps = reference
+        user_times = np.arange(2.0, 60.0, 0.1)
+        session = record_session(landmarks, timestamps, user_times, user_times - lag)
+
+        report = aligner.align(session, user_times)
+        assert report["mean_offset"] == pytest.approx(-lag, abs=0.1)
+        assert report["tempo_ratio"] == pytest.approx(1.0, abs=0.05)
+        assert report["aligned_score"] > 0.9
+
+        timings = [segment["timing"] for segment in report["segments"]]
+        assert timings.count(expected_timing) >= len(timings) - 1
+
+    def test_drift_shows_in_segments(self, reference, aligner):
+        landmarks, timestamps = reference
+        user_times = np.arange(2.0, 42.0, 0.1)
+        # Dancer slows down: 1.0s behind by the end
+        session = record_session(landmarks, timestamps, user_times, user_times - (user_times - 2.0) / 40.0)
+
+        report = aligner.align(session, user_times)
+        segments = report["segments"]
+        assert segments[0]["timing"] == "on_time"
+        assert segments[-1]["timing"] == "dragging"
+        assert segments[-1]["mean_offset"] < segments[0]["mean_offset"] - 0.5
+        assert report["tempo_ratio"] == pytest.approx(0.975, abs=0.05)
+
+    def test_report_format(self, reference, aligner):
+        landmarks, timestamps = reference
+        user_times = np.arange(0.0, 30.0, 0.25)
+        session = record_session(landmarks, timestamps, user_times, user_times)
+
+        report = aligner.align(session, user_times, timeline_max_points=20, max_path_points=50)
+        assert len(report["path"]) <= 50
+        assert report["path"][0]["user_time"] <= report["path"][-1]["user_time"]
+        assert 0 < len(report["aligned_timeline"]) <= 20
+        assert set(report["aligned_timeline"][0]) == {"timestamp", "score", "min_score", "max_score", "label"}
+        assert report["segments"][0]["start_time"] == pytest.approx(0.0)
+
+    def test_mirrored_session(self, reference, aligner):
+        landmarks, timestamps = reference
+        user_times = np.arange(2.0, 30.0, 0.1)
+        session = mirror_landmarks(record_session(landmarks, timestamps, user_times, user_times))
+
+        mirrored = aligner.align(session, user_times, mirrored=True)
+        normal = aligner.align(session, user_times)
+        assert mirrored["aligned_score"] > normal["aligned_score"]
+        assert mirrored["mean_abs_offset"] < 0.1
+
+    def test_too_short(self, aligner):
+        assert aligner.align(np.zeros((1, 33, 4)), np.array([1.0])) is None
+        assert aligner.align(np.zeros((2, 10, 4)), np.array([1.0, 2.0])) is None
+
+
+class TestServiceIntegration:
+    def test_aligner_cached_per_config(self, reference):
+        landmarks, timestamps = reference
+        poses = [
+            {'landmarks': frame, 'timestamp': timestamp, 'frame_number': i}
+            for i, (frame, timestamp) in enumerate(zip(landmarks[:200], timestamps[:200]))
+        ]
+        service = PoseComparisonService(poses)
+
+        aligner = service.get_session_aligner()
+        assert aligner is service.get_session_aligner()
+        assert len(aligner) == 200
+        assert np.array_equal(aligner.reference_times, timestamps[:200])
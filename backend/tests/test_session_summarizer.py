@@ -0,0 +1,109 @@
+"""
+Tests for incremental session summaries.
+
+Run with:
+    pytest tests/test_session_summarizer.py -v
+"""
+
+import pytest
+from app.services.feedback_generation import FeedbackGenerationService, SessionAggregates
+from app.services.session_summarizer import RollingSessionSummarizer
+
+
+def make_feedback(i, severity="medium", focus_areas=None, positive=False):
+    """Create a live feedback record in feedback_history format."""
+    return {
+        "timestamp": float(i),
+        "feedback_text": f"Feedback {i}",
+        "severity": severity,
+        "focus_areas": focus_areas if focus_areas is not None else ["left_arm"],
+        "similarity_score": 0.5 + 0.01 * i,
+        "is_positive": positive
+    }
+
+
+SESSION_STATS = {
+    "average_score": 0.62,
+    "best_score": 0.9,
+    "consistency": 0.8,
+    "improvement_trend": "improving"
+}
+
+
+@pytest.fixture
+def feedback_service(monkeypatch):
+    service = FeedbackGenerationService()
+    calls = []
+
+    def fake_narrative(aggregates, stats):
+        calls.append(aggregates.feedback_count)
+        return f"Narrative for {aggregates.feedback_count} items"
+
+    monkeypatch.setattr(service, "generate_summary_narrative", fake_narrative)
+    service.narrative_calls = calls
+    return service
+
+
+class TestSessionAggregates:
+    """Test running aggregation of feedback records."""
+
+    def test_counts_and_common_problems(self):
+        aggregates = SessionAggregates()
+        for i in range(6):
+            aggregates.add(make_feedback(i, severity="high" if i < 2 else "low"))
+        aggregates.add(make_feedback(6, focus_areas=["right_leg"], positive=True))
+
+        assert aggregates.feedback_count == 7
+        assert aggregates.positive_count == 1
+        assert aggregates.severity_counts["high"] == 2
+        assert aggregates.common_problems()[0] == ("left_arm", 6)
+        assert len(aggregates.sample_feedback()) <= 7
+
+
+class TestRollingSessionSummarizer:
+    """Test that ending a session does not wait for the LLM."""
+
+    def test_get_summary_does_not_call_llm(self, feedback_service):
+        summarizer = RollingSessionSummarizer(feedback_service, draft_interval=0, min_new_feedback=1)
+        for i in range(4):
+            summarizer.add_feedback(make_feedback(i))
+
+        summary = summarizer.get_summary(SESSION_STATS)
+
+        assert feedback_service.narrative_calls == []
+        assert summary["summary_status"] == "template"
+        assert summary["feedback_count"] == 4
+        assert summary["improvement_areas"]
+
+    def test_draft_refresh_is_used(self, feedback_service):
+        summarizer = RollingSessionSummarizer(feedback_service, draft_interval=0, min_new_feedback=2)
+        summarizer.add_feedback(make_feedback(0))
+        assert summarizer.maybe_refresh_draft(lambda: SESSION_STATS) is False
+
+        summarizer.add_feedback(make_feedback(1))
+        assert summarizer.maybe_refresh_draft(lambda: SESSION_STATS) is True
+        summarizer._draft_thread.join(timeout=5)
+
+        summary = summarizer.get_summary(SESSION_STATS)
+        assert summary["summary_status"] == "draft"
+        assert summary["overall_summary"] == "Narrative for 2 items"
+
+    def test_polish_matches_full_summary(self, feedback_service):
+        summarizer = RollingSessionSummarizer(feedback_service)
+        history = [make_feedback(i, positive=(i % 3 == 0)) for i in range(8)]
+        for record in history:
+            summarizer.add_feedback(record)
+
+        polished = summarizer.polish(SESSION_STATS)
+        full = feedback_service.generate_session_summary(history, SESSION_STATS)
+
+        assert polished["summary_status"] == "final"
+        for key in ("overall_summary", "key_insights", "improvement_areas", "strengths", "severity_distribution"):
+            assert polished[key] == full[key]
+
+    def test_running_average_score(self, feedback_service):
+        summarizer = RollingSessionSummarizer(feedback_service)
+        assert summarizer.average_score == 0.0
+        summarizer.record_score(0.4)
+        summarizer.record_score(0.8)
+        assert summarizer.average_score == pytest.approx(0.6)
@@ -0,0 +1,91 @@
+"""
+Tests for FFT-based timing synchronization.
+
+Run with:
+    pytest tests/test_timing_sync.py -v
+"""
+
+import numpy as np
+import pytest
+from app.services.pose_comparison_service import PoseComparisonService
+from app.services.timing_sync import TimingSynchronizer, sliding_normalized_correlation
+
+
+LEFT_ARM = [13, 15, 17, 19, 21]
+
+
+def user_pose(landmarks, timestamps, reference_time, arm_delay=0.0):
+    """Reference pose at reference_time (left arm optionally from arm_delay earlier)."""
+    pose = landmarks[np.argmin(np.abs(timestamps - reference_time))].copy()
+    if arm_delay:
+        delayed = landmarks[np.argmin(np.abs(timestamps - (reference_time - arm_delay)))]
+        pose[LEFT_ARM] = delayed[LEFT_ARM] - delayed[11] + pose[11]
+    return pose
+
+
+class TestSlidingCorrelation:
+    def test_matches_brute_force(self):
+        rng = np.random.default_rng(0)
+        signal = rng.normal(size=(60, 2))
+        template = signal[20:32] * 3.0 + 1.0
+
+        correlation = sliding_normalized_correlation(signal, template)
+        assert correlation.shape == (49, 2)
+        for k in (0, 20, 48):
+            for g in range(2):
+                expected = np.corrcoef(signal[k:k + 12, g], template[:, g])[0, 1]
+                assert correlation[k, g] == pytest.approx(expected, abs=1e-9)
+        assert np.argmax(correlation[:, 0]) == 20
+
+
+class TestTimingSynchronizer:
+    def test_offset_against_reference_clock(self, reference):
+        landmarks, timestamps = reference
+        sync = TimingSynchronizer(landmarks, timestamps)
+        sync.set_reference_clock(1000.0)
+
+        for t in np.arange(20.0, 26.0, 0.1):  # dancer 0.4s behind, 10 FPS camera
+            sync.add_user_pose(1000.0 + t, user_pose(landmarks, timestamps, t - 0.4))
+            estimate = sync.estimate(1000.0 + t)
+
+        assert estimate['timing_offset'] == pytest.approx(-0.4, abs=0.1)
+        assert estimate['reference_time'] == pytest.approx(25.9 - 0.4, abs=0.3)
+        assert estimate['confidence'] > 0.7
+
+    def test_limb_offsets_without_clock(self, reference):
+        landmarks, timestamps = reference
+        sync = TimingSynchronizer(landmarks, timestamps)
+
+        for t in np.arange(40.0, 46.0, 0.1):
+            sync.add_user_pose(500.0 + t, user_pose(landmarks, timestamps, t, arm_delay=0.4))
+            estimate = sync.estimate(500.0 + t)
+
+        assert estimate['timing_offset'] is None
+        assert estimate['reference_time'] == pytest.approx(45.9, abs=0.3)
+        assert estimate['limb_offsets']['left_arm'] == pytest.approx(-0.4, abs=0.15)
+        assert estimate['limb_offsets']['right_arm'] == pytest.approx(0.0, abs=0.15)
+
+    def test_needs_minimum_window(self, reference):
+        landmarks, timestamps = reference
+        sync = TimingSynchronizer(landmarks, timestamps)
+        sync.add_user_pose(0.0, landmarks[0])
+        sync.add_user_pose(0.5, landmarks[4])
+        assert sync.estimate(0.5) is None
+
+    def test_service_reports_timing_and_recenters(self, reference):
+        landmarks, timestamps = reference
+        poses = [
+            {'landmarks': lm, 'timestamp': ts, 'frame_number': i}
+            for i, (lm, ts) in enumerate(zip(landmarks, timestamps))
+        ]
+        service = PoseComparisonService(poses)
+        service.set_reference_clock(0.0)
+
+        for t in np.arange(60.0, 64.0, 0.1):
+            result = service.update_user_pose(user_pose(landmarks, timestamps, t), timestamp=t)
+
+        timing = result['timing']
+        assert timing is not None and timing['confidence'] >= service.config.sync_min_confidence
+        assert abs(timing['timing_offset']) < 0.2
+        # Pose search within ±10 frames of the synchronized position, motion refinement ±10 more
+        assert abs(result['best_match_idx'] - timing['reference_index']) <= 20
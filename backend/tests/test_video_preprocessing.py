@@ -0,0 +1,63 @@
+"""
+Tests for reference video preprocessing (VideoPoseProcessor).
+
+Run with:
+    pytest tests/test_video_preprocessing.py -v
+"""
+
+import cv2
+import numpy as np
+import pytest
+from app.services.process_video_pose import VideoPoseProcessor
+
+
+def write_video(path, num_frames, fps=30.0):
+    """Small synthetic video (no person in it)."""
+    writer = cv2.VideoWriter(path, cv2.VideoWriter_fourcc(*'MJPG'), fps, (96, 72))
+    for index in range(num_frames):
+        writer.write(np.full((72, 96, 3), index % 256, dtype=np.uint8))
+    writer.release()
+
+
+@pytest.fixture
+def processor(tmp_path):
+    processor = VideoPoseProcessor(str(tmp_path))
+    write_video(f"{processor.reference_videos_dir}/clip.avi", 130)
+    return processor
+
+
+class TestParallelProcessing:
+    def test_parallel_output_matches_serial_numbering(self, processor):
+        serial = processor.process_video("clip.avi", "serial_poses.npy")
+        parallel = processor.process_video("clip.avi", "parallel_poses.npy", num_workers=3, warmup_seconds=0.5)
+
+        serial_frames = [(p["frame_number"], p["timestamp"]) for p in serial["poses"]]
+        parallel_frames = [(p["frame_number"], p["timestamp"]) for p in parallel["poses"]]
+        assert parallel_frames == serial_frames
+        # 30 FPS source sampled at the default 15 FPS target
+        assert [frame for frame, _ in serial_frames] == list(range(2, 131, 2))
+        assert serial["video_info"]["frame_stride"] == 2
+
+        saved = processor.load_processed_poses("parallel_poses.npy")
+        assert [p["frame_number"] for p in saved] == [frame for frame, _ in serial_frames]
+
+    def test_frame_range_skips_warmup_frames(self, processor):
+        video_path = f"{processor.reference_videos_dir}/clip.avi"
+        frames = processor.process_frame_range(video_path, 40, 80, warmup_frames=20, stride=4)
+        assert [p["frame_number"] for p in frames] == list(range(44, 81, 4))
+
+
+class TestFrameStride:
+    @pytest.mark.parametrize("fps, target_fps, stride", [
+        (60.0, 15.0, 4), (30.0, 15.0, 2), (29.97, 15.0, 2), (24.0, 15.0, 2), (10.0, 15.0, 1), (0.0, 15.0, 1)
+    ])
+    def test_stride_from_source_fps(self, fps, target_fps, stride):
+        assert VideoPoseProcessor.frame_stride(fps, target_fps) == stride
+
+    def test_60fps_source_keeps_every_fourth_frame(self, tmp_path):
+        processor = VideoPoseProcessor(str(tmp_path))
+        write_video(f"{processor.reference_videos_dir}/clip60.avi", 50, fps=60.0)
+
+        result = processor.process_video("clip60.avi", target_fps=15.0)
+        assert [p["frame_number"] for p in result["poses"]] == list(range(4, 51, 4))
+        assert result["video_info"]["sample_fps"] == pytest.approx(15.0)